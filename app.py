@@ -20,12 +20,15 @@ from datetime import datetime
 # 导入控制器
 from backend.controllers.template_controller import template_bp
 from backend.controllers.parameter_controller import parameter_bp
-from backend.controllers.render_controller import render_bp
+from backend.controllers.render_controller import render_bp, render_job_queue
 from backend.controllers.file_controller import file_bp
 
 # 创建Flask应用
 app = Flask(__name__)
 
+# 请求体大小上限（模板包批量导入、点数组上传各自另有更小的限制）
+app.config['MAX_CONTENT_LENGTH'] = int(os.environ.get('MAX_CONTENT_LENGTH', 256 * 1024 * 1024))
+
 # 启用ProxyFix用于生产环境代理支持
 app.wsgi_app = ProxyFix(app.wsgi_app, x_proto=1, x_host=1)
 
@@ -53,6 +56,9 @@ app.register_blueprint(parameter_bp)
 app.register_blueprint(render_bp)
 app.register_blueprint(file_bp, url_prefix='/api/files')
 
+# 启动渲染任务队列，恢复上次退出时未完成的任务
+render_job_queue.start()
+
 @app.route('/api/health', methods=['GET'])
 def health_check():
     """健康检查接口"""
@@ -122,6 +128,14 @@ def not_found(error):
         ]
     }), 404
 
+@app.errorhandler(413)
+def request_too_large(error):
+    """413错误处理"""
+    return jsonify({
+        'error': 'Request Entity Too Large',
+        'message': f'请求体超过 {app.config["MAX_CONTENT_LENGTH"]} 字节上限'
+    }), 413
+
 @app.errorhandler(500)
 def internal_error(error):
     """500错误处理"""
@@ -13,7 +13,7 @@
 - ❌ 不负责文件系统权限（系统级）
 """
 
-from flask import Blueprint, request, jsonify, send_file, abort
+from flask import Blueprint, request, jsonify, send_file, abort, Response
 import os
 import sys
 import logging
@@ -31,6 +31,11 @@ backend_path = Path(__file__).parent.parent
 if str(backend_path) not in sys.path:
     sys.path.insert(0, str(backend_path))
 
+from utils.cow_copy import break_link
+from utils.gcode_analyzer import MachineProfile, analyze_file
+from utils.toolpath_preview import encode_binary, geometry_headers, parse_budget, preview_file
+from .template_controller import template_manager
+
 # 创建蓝图
 file_bp = Blueprint('file', __name__, url_prefix='/api/files')
 
@@ -158,11 +163,33 @@ class FileManager:
         if create_dirs:
             target_path.parent.mkdir(parents=True, exist_ok=True)
 
+        # 复制的模板包可能与源包共享硬链接，写入前断开
+        break_link(target_path)
+
         with open(target_path, 'w', encoding='utf-8') as f:
             f.write(content)
 
+        self._snapshot_package(target_path)
+
         return True
 
+    def _snapshot_package(self, path: Path) -> None:
+        """保存模板包内文件后记录版本快照"""
+        try:
+            rel_parts = path.relative_to(self.workspace_root / 'packages').parts
+        except ValueError:
+            return
+
+        if len(rel_parts) < 2 or rel_parts[0].startswith('.'):
+            return
+
+        # 与版本接口一样按package.yaml中的包名记录，目录名可能不同
+        package = template_manager.get_package_by_path(self.workspace_root / 'packages' / rel_parts[0])
+        if package is None:
+            return
+
+        template_manager.snapshot_package(package, 'save', f"保存 {'/'.join(rel_parts[1:])}")
+
     def delete_file(self, path: str, recursive: bool = False) -> bool:
         """删除文件或目录"""
         target_path = self._validate_path(path)
@@ -231,6 +258,7 @@ class FileManager:
             raise FileExistsError(f"目标文件已存在: {destination}")
 
         import shutil
+        break_link(dest_path)
         shutil.copy2(source_path, dest_path)
 
         return True
@@ -699,6 +727,124 @@ def search_files():
         }), 500
 
 
+@file_bp.route('/analyze', methods=['POST'])
+def analyze_program():
+    """分析工作区中的G代码程序（逐行读取，由gcode_analyzer解析）"""
+    try:
+        data = request.get_json(silent=True) or {}
+        path = data.get('path')
+        machine = data.get('machine')
+        if not path or (machine is not None and not isinstance(machine, dict)):
+            return jsonify({
+                'success': False,
+                'error': '缺少必要参数',
+                'message': '请提供path参数，machine必须是对象'
+            }), 400
+
+        target_path = file_manager._validate_path(path)
+        if not target_path.is_file():
+            return jsonify({
+                'success': False,
+                'error': '文件不存在',
+                'message': '要分析的程序文件不存在'
+            }), 404
+
+        try:
+            profile = MachineProfile.from_config(machine)
+        except (ValueError, TypeError) as e:
+            return jsonify({
+                'success': False,
+                'error': str(e),
+                'message': '机床参数无效'
+            }), 400
+
+        return jsonify({
+            'success': True,
+            'data': analyze_file(target_path, profile),
+            'path': path,
+            'timestamp': datetime.now().isoformat()
+        })
+
+    except PermissionError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e),
+            'message': '无权限访问指定路径'
+        }), 403
+
+    except Exception as e:
+        logger.error(f'分析程序失败: {e}')
+        return jsonify({
+            'success': False,
+            'error': str(e),
+            'message': '分析失败'
+        }), 500
+
+
+@file_bp.route('/geometry', methods=['POST'])
+def program_geometry():
+    """工作区中G代码程序的预览几何（抽稀到顶点预算，按内容哈希缓存）"""
+    try:
+        data = request.get_json(silent=True) or {}
+        path = data.get('path')
+        machine = data.get('machine')
+        output_format = data.get('format', 'json')
+        if not path or (machine is not None and not isinstance(machine, dict)) or output_format not in ('json', 'binary'):
+            return jsonify({
+                'success': False,
+                'error': '缺少必要参数',
+                'message': '请提供path参数，machine必须是对象，format为json或binary'
+            }), 400
+
+        target_path = file_manager._validate_path(path)
+        if not target_path.is_file():
+            return jsonify({
+                'success': False,
+                'error': '文件不存在',
+                'message': '要预览的程序文件不存在'
+            }), 404
+
+        try:
+            budget = parse_budget(data.get('budget'))
+            profile = MachineProfile.from_config(machine)
+        except (ValueError, TypeError) as e:
+            return jsonify({
+                'success': False,
+                'error': str(e),
+                'message': '预览参数无效'
+            }), 400
+
+        geometry, cached = preview_file(target_path, budget, profile)
+        if output_format == 'binary':
+            return Response(
+                encode_binary(geometry),
+                mimetype='application/octet-stream',
+                headers=geometry_headers(geometry, cached)
+            )
+        return jsonify({
+            'success': True,
+            'data': geometry,
+            'cached': cached,
+            'path': path,
+            'timestamp': datetime.now().isoformat()
+        })
+
+    except PermissionError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e),
+            'message': '无权限访问指定路径'
+        }), 403
+
+    except Exception as e:
+        logger.error(f'生成预览几何失败: {e}')
+        return jsonify({
+            'success': False,
+            'error': str(e),
+            'message': '预览失败'
+        }), 500
+
+
 @file_bp.route('/download/<path:file_path>', methods=['GET'])
 def download_file(file_path):
     """下载文件"""
@@ -787,6 +933,7 @@ def upload_file():
         target_path.parent.mkdir(parents=True, exist_ok=True)
 
         # 保存文件
+        break_link(target_path)
         uploaded_file.save(str(target_path))
 
         logger.info(f'✅ 上传成功: {target_name}')
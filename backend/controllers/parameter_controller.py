@@ -20,9 +20,21 @@ import os
 import logging
 from typing import Dict, Any, List, Tuple, Optional
 import re
+import sys
 from datetime import datetime
+from pathlib import Path
 from .template_controller import template_manager
 
+# 添加 backend 目录到 Python 路径
+backend_path = Path(__file__).parent.parent
+if str(backend_path) not in sys.path:
+    sys.path.insert(0, str(backend_path))
+
+from utils.point_array import (
+    MAX_UPLOAD_BYTES, MAX_UPLOAD_POINTS, PointArray, get_array_store, is_array_ref, parse_csv, parse_npy,
+    to_point_array
+)
+
 # 创建蓝图
 parameter_bp = Blueprint('parameter', __name__, url_prefix='/api/parameters')
 
@@ -42,6 +54,7 @@ class ParameterType:
     COORDINATE = "coordinate"
     TOOL = "tool"
     MATERIAL = "material"
+    POINTS = "points"  # 列式坐标点数组
 
 class ParameterValidator:
     """参数验证器"""
@@ -52,6 +65,9 @@ class ParameterValidator:
         if value is None:
             return True  # None值在required检查时处理
         
+        if param_type == ParameterType.POINTS:
+            return isinstance(value, (list, dict, PointArray))
+        
         type_map = {
             ParameterType.STRING: str,
             ParameterType.NUMBER: (int, float),
@@ -88,6 +104,36 @@ class ParameterValidator:
         except (ValueError, TypeError):
             return True
     
+    @staticmethod
+    def validate_points(value: Any, param_config: Dict[str, Any]) -> Tuple[Optional[str], Optional[str]]:
+        """
+        验证points类型参数（点列表、列字典或点数组引用）
+        
+        Returns:
+            (错误信息, 警告信息)
+        """
+        try:
+            points = to_point_array(value, param_config.get('axes'))
+        except ValueError as e:
+            return str(e), None
+        
+        axes = param_config.get('axes')
+        if axes:
+            missing = [axis for axis in axes.lower() if points.column(axis) is None]
+            if missing:
+                return f"缺少坐标轴: {''.join(missing).upper()}", None
+        max_points = param_config.get('max_points')
+        if max_points and len(points) > max_points:
+            return f"点数 {len(points)} 超过上限 {max_points}", None
+        
+        param_range = param_config.get('range')
+        if param_range and len(param_range) == 2:
+            min_val, max_val = param_range
+            outside = [axis.upper() for axis, (low, high) in points.bounds().items() if low < min_val or high > max_val]
+            if outside:
+                return None, f"坐标 {''.join(outside)} 超出推荐范围 {param_range}"
+        return None, None
+    
     @staticmethod
     def validate_options(value: Any, options: List[Any]) -> bool:
         """验证参数选项"""
@@ -105,12 +151,7 @@ class ParameterCalculator:
         calculated = {}
         
         try:
-            # 示例：计算切削时间
-            if "workpiece.length" in parameters and "process.feed_rate" in parameters:
-                length = parameters["workpiece.length"]
-                feed_rate = parameters["process.feed_rate"]
-                if feed_rate > 0:
-                    calculated["process.estimated_time"] = length / feed_rate
+            # 加工时间由渲染结果的分析给出（outputs.files.<输出>.analyze，见gcode_analyzer）
             
             # 示例：计算材料去除率
             if all(key in parameters for key in ["workpiece.diameter", "workpiece.length", "process.cutting_depth", "process.feed_rate"]):
@@ -170,10 +211,18 @@ class ParameterManager:
                     
                     # 类型检查
                     param_type = param_config.get("type", ParameterType.STRING)
-                    if not self.validator.validate_type(value, param_type):
+                    if not self.validator.validate_type(value, param_type) and not is_array_ref(value):
                         errors[full_param_name] = f"参数类型错误，期望 {param_type}"
                         continue
                     
+                    if param_type == ParameterType.POINTS:
+                        error, warning = self.validator.validate_points(value, param_config)
+                        if error:
+                            errors[full_param_name] = error
+                        elif warning:
+                            warnings[full_param_name] = warning
+                        continue
+                    
                     # 范围检查
                     param_range = param_config.get("range")
                     if param_range and not self.validator.validate_range(value, param_range):
@@ -295,6 +344,101 @@ def calculate_parameters(package_name: str):
             'message': f'参数计算失败: {package_name}'
         }), 500
 
+def _array_too_large():
+    return jsonify({
+        'success': False,
+        'error': f'Upload exceeds {MAX_UPLOAD_BYTES} bytes',
+        'message': f'点数组文件不能超过 {MAX_UPLOAD_BYTES // (1024 * 1024)}MB'
+    }), 413
+
+@parameter_bp.route('/arrays', methods=['POST'])
+def upload_point_array():
+    """
+    上传点数组文件（.npy或CSV）
+    
+    multipart上传file字段，或直接以请求体上传并用?format=npy|csv指定格式；
+    可选axes指定轴名（如XYZ）。返回的ref可直接作为points参数的值。
+    文件超过MAX_UPLOAD_BYTES返回413，点数超过MAX_UPLOAD_POINTS返回400，均在解析之前检查。
+    """
+    try:
+        # multipart边界和表单字段另留64KB
+        if (request.content_length or 0) > MAX_UPLOAD_BYTES + 64 * 1024:
+            return _array_too_large()
+        upload = request.files.get('file')
+        axes = request.values.get('axes') or None
+        if upload:
+            data = upload.read(MAX_UPLOAD_BYTES + 1)
+            file_format = request.values.get('format') or Path(upload.filename or '').suffix.lstrip('.').lower()
+        else:
+            data = request.stream.read(MAX_UPLOAD_BYTES + 1)
+            file_format = request.values.get('format', '')
+        if len(data) > MAX_UPLOAD_BYTES:
+            return _array_too_large()
+        
+        if not data:
+            return jsonify({
+                'success': False,
+                'error': 'No file provided',
+                'message': '请上传点数组文件'
+            }), 400
+        
+        if file_format == 'npy' or data[:6] == b'\x93NUMPY':
+            points = parse_npy(data, axes, MAX_UPLOAD_POINTS)
+        elif file_format in ('csv', 'txt', 'xyz', ''):
+            points = parse_csv(data, axes, MAX_UPLOAD_POINTS)
+        else:
+            return jsonify({
+                'success': False,
+                'error': f'Unsupported format: {file_format}',
+                'message': '只支持.npy和CSV文件'
+            }), 400
+        
+        result = get_array_store().save(points)
+        logger.info(f'✅ 保存点数组: {result["id"]}, {len(points)} 点')
+        return jsonify({
+            'success': True,
+            'data': result,
+            'timestamp': datetime.now().isoformat()
+        })
+        
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e),
+            'message': '点数组文件格式错误'
+        }), 400
+    except Exception as e:
+        logger.error(f'Failed to upload point array: {e}')
+        return jsonify({
+            'success': False,
+            'error': str(e),
+            'message': '上传点数组失败'
+        }), 500
+
+@parameter_bp.route('/arrays/<array_id>', methods=['GET'])
+def get_point_array(array_id: str):
+    """获取点数组摘要（轴、点数、大小、范围）"""
+    try:
+        points = get_array_store().load(array_id)
+        return jsonify({
+            'success': True,
+            'data': {'id': array_id, **points.describe()},
+            'timestamp': datetime.now().isoformat()
+        })
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e),
+            'message': f'点数组不存在: {array_id}'
+        }), 404
+    except Exception as e:
+        logger.error(f'Failed to get point array {array_id}: {e}')
+        return jsonify({
+            'success': False,
+            'error': str(e),
+            'message': '获取点数组失败'
+        }), 500
+
 @parameter_bp.route('/<package_name>/presets', methods=['GET'])
 def get_presets(package_name: str):
     """获取模板包的所有参数预设"""
@@ -4,7 +4,7 @@
 严格遵循PROJECT_REQUIREMENTS.md文档约束
 """
 
-from flask import Blueprint, request, jsonify, send_file
+from flask import Blueprint, request, jsonify, send_file, Response, stream_with_context
 import logging
 from pathlib import Path
 import yaml
@@ -12,11 +12,41 @@ import tempfile
 import zipfile
 import math
 import os
+import sys
+import time
 from datetime import datetime
 from typing import List, Dict, Any, Optional
-from jinja2 import Environment, TemplateError, TemplateSyntaxError, TemplateNotFound, FileSystemLoader
+from jinja2 import TemplateError, TemplateSyntaxError, TemplateNotFound
 import json
 import jinja2
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+# 添加 backend 目录到 Python 路径
+backend_path = Path(__file__).parent.parent
+if str(backend_path) not in sys.path:
+    sys.path.insert(0, str(backend_path))
+
+from utils.package_loader import create_dependency_loader
+from utils.package_bundle import source_manifest
+from utils.batch_render import (
+    MAX_BATCH_SIZE, dedupe_requests, run_batch, default_worker_count, get_render_executor
+)
+from utils.render_jobs import RenderJobQueue, RenderJobStore, JobNotFoundError
+from utils.render_scheduler import get_render_scheduler
+from utils.render_stream import coalesce_chunks, stream_ndjson, stream_text
+from utils.render_results import RenderResultStore, get_result_store
+from utils.gcode_format import format_coord, gcode_block
+from utils.point_array import points_parameters, prepare_parameters
+from utils.gcode_postprocess import create_pipeline, iter_lines
+from utils.gcode_analyzer import GcodeAnalyzer, MachineProfile
+from utils.dnc_feed import DEFAULT_BAUD, DncBusyError, DncError, SessionNotFoundError, get_dnc_manager
+from utils.program_split import ProgramSplitter
+from utils.toolpath_preview import (
+    encode_binary, geometry_headers, parse_budget, preview_content, preview_file
+)
+from utils.toolpath_ir import EMITTERS, create_emitter, output_dialects, translate, translate_many
+from utils.toolpath_patterns import PATTERN_FILTERS, PATTERN_GLOBALS
+from utils.render_sandbox import RenderLimits, create_sandboxed_environment, guarded, guarded_lazy, limit_output
 
 # 创建蓝图
 render_bp = Blueprint('render', __name__, url_prefix='/api/render')
@@ -26,10 +56,18 @@ logger = logging.getLogger(__name__)
 class JinjaRenderer:
     """Jinja2渲染引擎"""
     
-    def __init__(self, workspace_path: str = "templates"):
+    def __init__(
+        self,
+        workspace_path: str = "templates",
+        dependencies: Optional[List[tuple]] = None,
+        result_store: Optional[RenderResultStore] = None
+    ):
         self.workspace_path = Path(workspace_path)
-        self.env = Environment(
-            loader=jinja2.FileSystemLoader(str(self.workspace_path)),
+        # 设置后，render_package的超大输出落盘并返回下载句柄
+        self.result_store = result_store
+        self._point_parameters: Optional[Dict[str, Optional[str]]] = None
+        self.env = create_sandboxed_environment(
+            loader=create_dependency_loader(self.workspace_path, dependencies),
             autoescape=False,
             trim_blocks=True,
             lstrip_blocks=True,
@@ -142,6 +180,9 @@ class JinjaRenderer:
         self.env.filters['abs'] = abs_filter
         self.env.filters['min'] = min_filter
         self.env.filters['max'] = max_filter
+        self.env.filters['coord'] = format_coord
+        self.env.filters['gcode_block'] = gcode_block
+        self.env.filters.update(PATTERN_FILTERS)
         
         # 设置全局函数
         self.env.globals.update({
@@ -156,14 +197,16 @@ class JinjaRenderer:
             'cos': cos_filter,
             'abs': abs_filter,
             'min': min_filter,
-            'max': max_filter
+            'max': max_filter,
+            'gcode_block': gcode_block,
+            **PATTERN_GLOBALS
         })
     
     def render_template(self, template_path: str, parameters: Dict[str, Any]) -> Dict[str, Any]:
         """渲染单个模板"""
         try:
             template = self.env.get_template(template_path)
-            result = template.render(**parameters)
+            result = ''.join(limit_output(template.generate(**parameters)))
             return {
                 'success': True,
                 'content': result,
@@ -185,49 +228,137 @@ class JinjaRenderer:
                 'template_path': template_path
             }
     
-    def render_package(self, package_path: str, parameters: Dict[str, Any]) -> Dict[str, Any]:
-        """渲染模板包"""
+    def generate_template(self, template_path: str, parameters: Dict[str, Any]):
+        """
+        流式渲染单个模板
+        
+        模板加载和语法错误在调用时立即抛出；返回的迭代器逐段产生内容，
+        不在内存中拼接完整程序。
+        """
+        template = self.env.get_template(template_path)
+        return limit_output(template.generate(**parameters))
+    
+    @staticmethod
+    def enabled_outputs(package_config: Dict[str, Any]) -> List[tuple]:
+        """按声明顺序返回启用的输出 [(输出名, 输出配置)]"""
+        files = (package_config.get('outputs') or {}).get('files') or {}
+        return [(name, config) for name, config in files.items() if config.get('enabled', True)]
+    
+    def render_output(self, output_name: str, output_config: Dict[str, Any], parameters: Dict[str, Any]) -> Dict[str, Any]:
+        """渲染模板包的一个输出文件，失败时返回带错误信息的条目"""
+        start = time.perf_counter()
+        template_path = output_config['template']
+        
         try:
-            package_config = self._load_package_config(package_path)
-            results = {}
-            
-            for output_name, output_config in package_config.get('outputs', {}).get('files', {}):
-                if not output_config.get('enabled', True):
+            dialects = output_dialects(output_config)
+            error = None
+        except ValueError as e:
+            dialects, error = None, str(e)
+        filename = self.output_filename(output_config, parameters)
+        if error:
+            result = {'success': False, 'error': error}
+        elif dialects:
+            # 模板输出刀路中间表示，按方言写出（第一个方言为主条目，其余为variants）
+            stem = self._generate_filename(output_config.get('filename_pattern', 'output'), parameters)
+            result = self._render_toolpath(template_path, parameters, stem, dialects)
+        else:
+            result = self._render_output(
+                template_path, parameters, filename, output_config.get('postprocess'), output_config.get('split'),
+                output_config.get('analyze')
+            )
+        
+        if result['success']:
+            entry = {
+                'filename': filename,
+                'content': result['content'],
+                'description': output_config.get('description', ''),
+                'success': True,
+                'render_time': result['render_time']
+            }
+            for key in ('size', 'lines', 'sha256', 'spilled', 'handle', 'postprocess', 'split', 'subprograms',
+                        'toolpath', 'variants', 'analysis'):
+                if key in result:
+                    entry[key] = result[key]
+        else:
+            entry = {
+                'filename': filename,
+                'content': '',
+                'description': output_config.get('description', ''),
+                'success': False,
+                'error': result.get('error', '未知错误'),
+                'render_time': datetime.now().isoformat()
+            }
+        entry['elapsed'] = round(time.perf_counter() - start, 4)
+        return entry
+    
+    @staticmethod
+    def package_result(package_path: str, results: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        汇总各输出的渲染结果（results按声明顺序）
+        
+        其他方言的输出（<输出名>/<方言>）和拆分出的子程序（<输出名>/<子程序名>）作为独立条目紧跟在主条目之后。
+        """
+        timings = {name: entry.get('elapsed') for name, entry in results.items()}
+        results = JinjaRenderer._flatten_attached(results)
+        return {
+            'success': True,
+            'package_path': package_path,
+            'results': results,
+            # JSON响应按键排序，声明顺序单独给出
+            'order': list(results),
+            'total': len(results),
+            'failed': sum(1 for entry in results.values() if not entry.get('success')),
+            'timings': timings,
+            'render_time': datetime.now().isoformat()
+        }
+    
+    # 随主条目返回、展开为独立条目的附属文件 -> 描述
+    ATTACHED_FILES = {'variants': '格式', 'subprograms': '子程序'}
+    
+    @staticmethod
+    def _flatten_attached(results: Dict[str, Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        flattened = {}
+        for name, entry in results.items():
+            flattened[name] = entry
+            for attached, label in JinjaRenderer.ATTACHED_FILES.items():
+                parts = entry.get(attached)
+                if not parts or not isinstance(parts[0], dict):
                     continue
-                
-                template_path = output_config['template']
-                filename_pattern = output_config.get('filename_pattern', 'output')
-                extension = output_config.get('extension', '.nc')
-                
-                result = self.render_template(template_path, parameters)
-                
-                filename = self._generate_filename(filename_pattern, parameters) + extension
-                
-                if result['success']:
-                    results[output_name] = {
-                        'filename': filename,
-                        'content': result['content'],
-                        'description': output_config.get('description', ''),
+                entry[attached] = []
+                for part in parts:
+                    key = f"{name}/{part['name']}"
+                    flattened[key] = {
+                        'filename': part['filename'],
+                        'content': part.get('content', ''),
+                        'description': f"{entry.get('description') or name} - {label} {part['name']}",
                         'success': True,
-                        'render_time': result['render_time']
-                    }
-                else:
-                    results[output_name] = {
-                        'filename': filename,
-                        'content': '',
-                        'description': output_config.get('description', ''),
-                        'success': False,
-                        'error': result.get('error', '未知错误'),
-                        'render_time': datetime.now().isoformat()
+                        'parent': name,
+                        'render_time': entry.get('render_time'),
+                        **{k: part[k] for k in ('size', 'lines', 'sha256', 'spilled', 'handle') if k in part}
                     }
-            
-            return {
-                'success': True,
-                'package_path': package_path,
-                'results': results,
-                'total': len(results),
-                'render_time': datetime.now().isoformat()
+                    entry[attached].append(key)
+        return flattened
+    
+    def prepare_parameters(self, parameters: Dict[str, Any]) -> Dict[str, Any]:
+        """渲染前把points类型参数和点数组引用转换为列式点数组"""
+        if self._point_parameters is None:
+            try:
+                variables = self._load_package_config(str(self.workspace_path)).get('variables')
+            except FileNotFoundError:
+                variables = None
+            self._point_parameters = points_parameters(variables)
+        return prepare_parameters(parameters, self._point_parameters)
+    
+    def render_package(self, package_path: str, parameters: Dict[str, Any]) -> Dict[str, Any]:
+        """渲染模板包（在当前进程中依次渲染各输出）"""
+        try:
+            package_config = self._load_package_config(package_path)
+            parameters = self.prepare_parameters(parameters)
+            results = {
+                output_name: self.render_output(output_name, output_config, parameters)
+                for output_name, output_config in self.enabled_outputs(package_config)
             }
+            return self.package_result(package_path, results)
             
         except Exception as e:
             logger.error(f"渲染模板包失败: {package_path}, 错误: {str(e)}")
@@ -240,6 +371,110 @@ class JinjaRenderer:
                 'render_time': datetime.now().isoformat()
             }
     
+    def _render_output(
+        self,
+        template_path: str,
+        parameters: Dict[str, Any],
+        filename: str,
+        postprocess: Optional[Dict[str, Any]] = None,
+        split: Optional[Dict[str, Any]] = None,
+        analyze: Any = None
+    ) -> Dict[str, Any]:
+        """
+        渲染一个输出文件；配置了结果目录时边生成边写入，超过阈值落盘
+        
+        配置了后处理（outputs.files.<输出>.postprocess）时，输出逐行经过后处理后再写入；
+        配置了分析（analyze: true 或机床参数）时，写入的同时分析程序（analysis）；
+        配置了拆分（split）时，超过上限的程序拆分为主程序和子程序（subprograms）。
+        """
+        if self.result_store is None and not postprocess and not split and not analyze:
+            return self.render_template(template_path, parameters)
+        try:
+            template = self.env.get_template(template_path)
+            pieces = limit_output(template.generate(**parameters))
+            pipeline = create_pipeline(postprocess)
+            if pipeline is not None:
+                pieces = pipeline.run(pieces)
+            analyzer = None
+            if analyze:
+                analyzer = GcodeAnalyzer(MachineProfile.from_config(analyze if isinstance(analyze, dict) else None))
+                pieces = analyzer.observe(pieces)
+            store = self.result_store or RenderResultStore(spill_threshold=sys.maxsize)
+            splitter = ProgramSplitter.from_config(split) if split else None
+            if splitter is not None:
+                main_lines = splitter.split(iter_lines(pieces), filename, store.spool)
+                pieces = (line + '\n' for line in main_lines)
+            result = store.render_to(pieces, filename)
+            if pipeline is not None:
+                result['postprocess'] = pipeline.report()
+            if analyzer is not None:
+                result['analysis'] = analyzer.report()
+            if splitter is not None:
+                result['split'] = splitter.report()
+                if splitter.parts:
+                    result['subprograms'] = splitter.parts
+            return {
+                'success': True,
+                **result,
+                'template_path': template_path,
+                'render_time': datetime.now().isoformat()
+            }
+        except Exception as e:
+            logger.error(f"模板渲染失败: {template_path}, 错误: {str(e)}")
+            return {
+                'success': False,
+                'error': str(e),
+                'template_path': template_path
+            }
+
+    def _render_toolpath(
+        self,
+        template_path: str,
+        parameters: Dict[str, Any],
+        stem: str,
+        dialects: List[str]
+    ) -> Dict[str, Any]:
+        """
+        渲染刀路中间表示一次，同时写出各方言的程序（outputs.files.<输出>.dialects）
+
+        第一个方言的结果作为主结果返回，其余在variants中。
+        """
+        outputs = {}
+        try:
+            emitters = {dialect: create_emitter(dialect, program_name=stem) for dialect in dialects}
+            template = self.env.get_template(template_path)
+            pieces = limit_output(template.generate(**parameters))
+            store = self.result_store or RenderResultStore(spill_threshold=sys.maxsize)
+            outputs = {dialect: store.spool() for dialect in emitters}
+            report = translate_many(
+                iter_lines(pieces), emitters, {dialect: output.write for dialect, output in outputs.items()}
+            )
+            files = [
+                {'name': dialect, 'dialect': dialect,
+                 'filename': stem + emitter.extension, **outputs[dialect].finish(stem + emitter.extension)}
+                for dialect, emitter in emitters.items()
+            ]
+            main, variants = files[0], files[1:]
+            result = {k: v for k, v in main.items() if k not in ('name', 'dialect', 'filename')}
+            if variants:
+                result['variants'] = variants
+            return {
+                'success': True,
+                **result,
+                'toolpath': report,
+                'template_path': template_path,
+                'render_time': datetime.now().isoformat()
+            }
+        except Exception as e:
+            for output in outputs.values():
+                output.abort()
+            logger.error(f"刀路渲染失败: {template_path}, 错误: {str(e)}")
+            return {
+                'success': False,
+                'error': str(e),
+                'template_path': template_path
+            }
+
     def _load_package_config(self, package_path: str) -> Dict[str, Any]:
         """加载模板包配置"""
         config_file = Path(package_path) / "package.yaml"
@@ -250,6 +485,15 @@ class JinjaRenderer:
         with open(config_file, 'r', encoding='utf-8') as f:
             return yaml.safe_load(f)
     
+    def output_filename(self, output_config: Dict[str, Any], parameters: Dict[str, Any]) -> str:
+        """输出的文件名：文件名模式的渲染结果 + 扩展名（刀路输出取第一个方言的扩展名）"""
+        stem = self._generate_filename(output_config.get('filename_pattern', 'output'), parameters)
+        try:
+            dialects = output_dialects(output_config)
+        except ValueError:
+            dialects = None
+        return stem + (EMITTERS[dialects[0]].extension if dialects else output_config.get('extension', '.nc'))
+    
     def _generate_filename(self, pattern: str, parameters: Dict[str, Any]) -> str:
         """生成文件名"""
         try:
@@ -263,18 +507,15 @@ class JinjaRenderer:
         """获取可用的输出文件列表"""
         try:
             config = self._load_package_config(package_path)
-            outputs = []
-            
-            for output_name, output_config in config.get('outputs', {}).get('files', {}):
-                if output_config.get('enabled', True):
-                    outputs.append({
-                        'name': output_name,
-                        'template': output_config.get('template'),
-                        'description': output_config.get('description', ''),
-                        'enabled': True
-                    })
-            
-            return outputs
+            return [
+                {
+                    'name': output_name,
+                    'template': output_config.get('template'),
+                    'description': output_config.get('description', ''),
+                    'enabled': True
+                }
+                for output_name, output_config in self.enabled_outputs(config)
+            ]
         except Exception as e:
             logger.error(f"获取输出列表失败: {package_path}, 错误: {str(e)}")
             return []
@@ -304,6 +545,217 @@ class JinjaRenderer:
             }
 
 
+def _get_package(package_name: str):
+    """从全局模板管理器获取模板包"""
+    return _get_template_manager().get_package_by_name(package_name)
+
+
+def _get_template_manager():
+    from backend.controllers.template_controller import template_manager
+    return template_manager
+
+
+# 工作进程内的渲染引擎缓存：(包目录, 依赖) -> (源文件清单, 渲染引擎)
+_worker_renderers: Dict[tuple, tuple] = {}
+
+# 同步等待调度结果的超时时间（秒）
+INTERACTIVE_TIMEOUT = 30
+SINGLE_TIMEOUT = 120
+
+
+def _get_worker_renderer(package_path: str, dependencies: List[tuple]) -> JinjaRenderer:
+    """
+    获取工作进程内缓存的渲染引擎
+    
+    渲染引擎按模板包缓存，模板包或任一依赖包的源文件变化（清单不一致）时重建。
+    """
+    key = (package_path, tuple(dependencies))
+    manifest = [source_manifest(package_path)] + [source_manifest(path) for _, path in dependencies]
+    cached = _worker_renderers.get(key)
+    if not cached or cached[0] != manifest:
+        cached = (manifest, JinjaRenderer(package_path, dependencies, get_result_store()))
+        _worker_renderers[key] = cached
+    return cached[1]
+
+
+def _render_package_worker(package_path: str, dependencies: List[tuple], parameters: Dict[str, Any]) -> Dict[str, Any]:
+    """在渲染工作进程中渲染模板包"""
+    return _get_worker_renderer(package_path, dependencies).render_package(package_path, parameters)
+
+
+def _render_output_worker(
+    package_path: str, dependencies: List[tuple], output_name: str, parameters: Dict[str, Any]
+) -> Dict[str, Any]:
+    """在渲染工作进程中渲染模板包的一个输出文件"""
+    renderer = _get_worker_renderer(package_path, dependencies)
+    output_config = renderer._load_package_config(package_path)['outputs']['files'][output_name]
+    return renderer.render_output(output_name, output_config, renderer.prepare_parameters(parameters))
+
+
+def _render_template_worker(
+    package_path: str, dependencies: List[tuple], template_name: str, parameters: Dict[str, Any]
+) -> Dict[str, Any]:
+    """在渲染工作进程中渲染模板包内的单个模板"""
+    renderer = _get_worker_renderer(package_path, dependencies)
+    return renderer.render_template(template_name, renderer.prepare_parameters(parameters))
+
+
+def _render_source_worker(
+    package_path: str, dependencies: List[tuple], source: str, parameters: Dict[str, Any]
+) -> Dict[str, Any]:
+    """在渲染工作进程中渲染编辑中的模板内容（可import/extends包内和依赖包模板）"""
+    renderer = _get_worker_renderer(package_path, dependencies)
+    try:
+        parameters = renderer.prepare_parameters(parameters)
+        content = ''.join(limit_output(renderer.env.from_string(source).generate(**parameters)))
+        return {'success': True, 'content': content, 'render_time': datetime.now().isoformat()}
+    except Exception as e:
+        return {'success': False, 'error': str(e)}
+
+
+def _package_task_args(package) -> tuple:
+    """工作进程任务的公共参数：(包目录, 依赖列表)"""
+    dependencies = [(name, str(path)) for name, path in _get_template_manager().get_dependency_paths(package)]
+    return str(package.path), dependencies
+
+
+def _output_pieces(package, data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    流式渲染和DNC传输共用：按请求选择模板或输出（方言、后处理），返回惰性的渲染片段
+
+    模板加载错误在调用时抛出；generate()是惰性的，渲染在迭代片段时进行。
+
+    Returns:
+        {'pieces': 渲染片段, 'template': 模板名, 'filename': 输出文件名（未指定输出时为None）}
+
+    Raises:
+        LookupError: 输出或模板不存在
+        ValueError: 输出不支持请求的方言，或输出的dialects配置无效
+    """
+    parameters = data.get('parameters') or {}
+    template_name = data.get('template_name')
+    filename = None
+    output_name = data.get('output')
+    output_config: Dict[str, Any] = {}
+    if output_name:
+        output_config = (package.config.get('outputs', {}).get('files') or {}).get(output_name)
+        if not output_config:
+            raise LookupError(f'输出 {output_name} 不存在')
+        template_name = output_config['template']
+    template_name = template_name or package.config['templates']['main']
+
+    dialects = output_dialects(output_config)
+    dialect = data.get('dialect') or (dialects[0] if dialects else None)
+    if dialects and dialect not in dialects:
+        raise ValueError(f'输出 {output_name} 不支持方言 {dialect}')
+
+    package_path, dependencies = _package_task_args(package)
+    renderer = JinjaRenderer(package_path, dependencies)
+    if output_name:
+        stem = renderer._generate_filename(output_config.get('filename_pattern', 'output'), parameters)
+        filename = stem + (EMITTERS[dialect].extension if dialects else output_config.get('extension', '.nc'))
+
+    try:
+        pieces = renderer.generate_template(template_name, renderer.prepare_parameters(parameters))
+    except TemplateNotFound:
+        raise LookupError(f'模板 {template_name} 不存在')
+    if dialects:
+        pieces = translate(iter_lines(pieces), dialect, program_name=stem)
+    pipeline = create_pipeline(output_config.get('postprocess')) if output_name and not dialects else None
+    if pipeline is not None:
+        pieces = pipeline.run(pieces)
+    return {'pieces': pieces, 'template': template_name, 'filename': filename}
+
+
+def _current_user() -> Optional[str]:
+    """调度公平分配使用的用户标识"""
+    return request.headers.get('X-User') or request.remote_addr
+
+
+def _run_scheduled(priority: str, func, args: tuple, timeout: float) -> Dict[str, Any]:
+    """按优先级提交到调度器并等待结果；超时仍在排队的条目会被撤销"""
+    future = get_render_scheduler().submit(priority, _current_user(), func, *args)
+    try:
+        return future.result(timeout=timeout)
+    except FutureTimeoutError:
+        future.cancel()
+        raise
+
+
+def _render_package_scheduled(priority: str, package, parameters: Dict[str, Any], timeout: float) -> Dict[str, Any]:
+    """
+    渲染模板包：各输出作为独立条目提交到调度器并行渲染
+    
+    结果按声明顺序汇总；某个输出失败或超时只影响该输出。
+    """
+    start = time.perf_counter()
+    package_path, dependencies = _package_task_args(package)
+    outputs = JinjaRenderer.enabled_outputs(package.config)
+    if len(outputs) <= 1:
+        result = _run_scheduled(priority, _render_package_worker, (package_path, dependencies, parameters), timeout)
+    else:
+        scheduler = get_render_scheduler()
+        user = _current_user()
+        futures = [
+            (name, config, scheduler.submit(priority, user, _render_output_worker,
+                                            package_path, dependencies, name, parameters))
+            for name, config in outputs
+        ]
+        deadline = time.monotonic() + timeout
+        results = {}
+        namer = None
+        for name, config, future in futures:
+            try:
+                results[name] = future.result(timeout=max(0, deadline - time.monotonic()))
+            except Exception as e:
+                if isinstance(e, FutureTimeoutError):
+                    future.cancel()
+                    e = f'渲染超时（{timeout}秒）'
+                logger.error(f"渲染输出失败: {package.name}/{name}, 错误: {str(e)}")
+                # 失败条目的文件名与渲染成功时相同（按文件名模式生成）
+                namer = namer or JinjaRenderer(package_path, dependencies)
+                results[name] = {
+                    'filename': namer.output_filename(config, parameters),
+                    'content': '',
+                    'description': config.get('description', ''),
+                    'success': False,
+                    'error': str(e),
+                    'render_time': datetime.now().isoformat()
+                }
+        result = JinjaRenderer.package_result(package_path, results)
+    result['elapsed'] = round(time.perf_counter() - start, 4)
+    return result
+
+
+def _resolve_render_task(item: Dict[str, Any]) -> tuple:
+    """将渲染请求解析为工作进程任务 (函数, 参数)"""
+    package = _get_package(item['templateName'])
+    if not package:
+        raise LookupError(f"模板包 {item['templateName']} 不存在")
+    return _render_package_worker, (*_package_task_args(package), item.get('parameters') or {})
+
+
+def _validate_render_requests(requests_data: List[Any]) -> Optional[str]:
+    """校验批量渲染请求列表，返回错误信息"""
+    if len(requests_data) > MAX_BATCH_SIZE:
+        return f'单次批量渲染最多 {MAX_BATCH_SIZE} 个请求'
+    for index, item in enumerate(requests_data):
+        if not isinstance(item, dict) or not isinstance(item.get('templateName'), str) \
+                or not isinstance(item.get('parameters', {}), dict):
+            return f'第 {index} 个请求格式错误，需要templateName和parameters'
+    return None
+
+
+# 全局渲染任务队列
+def _job_executor(job: Dict[str, Any]):
+    """渲染任务按类型进入single或batch优先级"""
+    priority = 'single' if job['kind'] == 'single' else 'batch'
+    return get_render_scheduler().executor(priority, job.get('user'))
+
+
+render_job_queue = RenderJobQueue(RenderJobStore(), _resolve_render_task, _job_executor)
+
+
 @render_bp.route('/templates/<package_name>/render', methods=['POST'])
 def render_template(package_name: str):
     """渲染指定模板包"""
@@ -317,19 +769,15 @@ def render_template(package_name: str):
         
         parameters = data['parameters']
         
-        # 这里应该调用模板管理器，现在先简化处理
-        from backend.controllers.template_controller import TemplateManager
-        package_manager = TemplateManager()
-        template_path = package_manager.get_package_by_name(package_name)
-        if not template_path:
+        package = _get_package(package_name)
+        if not package:
             return jsonify({
                 'success': False,
                 'error': f'模板包 {package_name} 不存在'
             }), 404
         
-        # 渲染模板包
-        render_engine = JinjaRenderer(str(template_path))
-        result = render_engine.render_package(str(template_path), parameters)
+        # 渲染模板包（single优先级）
+        result = _render_package_scheduled('single', package, parameters, SINGLE_TIMEOUT)
         
         return jsonify({
             'success': True,
@@ -359,19 +807,21 @@ def preview_template(package_name: str):
         parameters = data['parameters']
         template_name = data.get('template_name')
         
-        from backend.controllers.template_controller import TemplateManager
-        package_manager = TemplateManager()
-        template_path = package_manager.get_package_by_name(package_name)
-        if not template_path:
+        package = _get_package(package_name)
+        if not package:
             return jsonify({
                 'success': False,
                 'error': f'模板包 {package_name} 不存在'
             }), 404
         
-        render_engine = JinjaRenderer(str(template_path))
-        
         if template_name:
-            result = render_engine.render_template(template_name, parameters)
+            result = _run_scheduled('interactive', _render_template_worker,
+                                    (*_package_task_args(package), template_name, parameters), INTERACTIVE_TIMEOUT)
+            if not result.get('success'):
+                return jsonify({
+                    'success': False,
+                    'error': result.get('error', '渲染失败')
+                }), 400
             return jsonify({
                 'success': True,
                 'data': {
@@ -394,6 +844,51 @@ def preview_template(package_name: str):
         }), 500
 
 
+@render_bp.route('/preview/<package_name>/auto', methods=['POST'])
+def auto_preview_template(package_name: str):
+    """实时预览编辑中的模板内容（interactive优先级）"""
+    try:
+        data = request.get_json(silent=True) or {}
+        source = data.get('template_content')
+        parameters = data.get('parameters') or {}
+        if not isinstance(source, str) or not isinstance(parameters, dict):
+            return jsonify({
+                'success': False,
+                'error': '请提供template_content和parameters参数'
+            }), 400
+        
+        package = _get_package(package_name)
+        if not package:
+            return jsonify({
+                'success': False,
+                'error': f'模板包 {package_name} 不存在'
+            }), 404
+        
+        start = time.perf_counter()
+        result = _run_scheduled('interactive', _render_source_worker,
+                                (*_package_task_args(package), source, parameters), INTERACTIVE_TIMEOUT)
+        if not result.get('success'):
+            return jsonify({
+                'success': False,
+                'error': result.get('error', '渲染失败')
+            }), 400
+        
+        return jsonify({
+            'success': True,
+            'data': {
+                'content': result['content'],
+                'preview_time': round((time.perf_counter() - start) * 1000, 2)
+            }
+        })
+        
+    except Exception as e:
+        logger.error(f"实时预览失败: {package_name}, 错误: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
 @render_bp.route('/templates/<package_name>/export', methods=['POST'])
 def export_template(package_name: str):
     """导出渲染结果为ZIP文件"""
@@ -407,17 +902,14 @@ def export_template(package_name: str):
         
         parameters = data['parameters']
         
-        from backend.controllers.template_controller import TemplateManager
-        package_manager = TemplateManager()
-        template_path = package_manager.get_package_by_name(package_name)
-        if not template_path:
+        package = _get_package(package_name)
+        if not package:
             return jsonify({
                 'success': False,
                 'error': f'模板包 {package_name} 不存在'
             }), 404
         
-        render_engine = JinjaRenderer(str(template_path))
-        result = render_engine.render_package(str(template_path), parameters)
+        result = _render_package_scheduled('single', package, parameters, SINGLE_TIMEOUT)
         
         if not result.get('success'):
             return jsonify({
@@ -432,7 +924,11 @@ def export_template(package_name: str):
         with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
             # 添加渲染结果文件
             for filename, file_data in result.get('results', {}).items():
-                zipf.writestr(file_data.get('filename', filename), file_data.get('content', ''))
+                handle = file_data.get('handle')
+                if handle and get_result_store().get(handle['id']):
+                    zipf.write(get_result_store().path(handle['id']), file_data.get('filename', filename))
+                else:
+                    zipf.writestr(file_data.get('filename', filename), file_data.get('content', ''))
             
             # 添加渲染信息文件
             info_content = f"""# {package_name} 导出信息
@@ -461,4 +957,568 @@ def export_template(package_name: str):
         return jsonify({
             'success': False,
             'error': str(e)
-        }), 500
\ No newline at end of file
+        }), 500
+
+
+@render_bp.route('/results/<result_id>', methods=['GET'])
+def download_result(result_id: str):
+    """下载落盘的渲染结果"""
+    try:
+        store = get_result_store()
+        meta = store.get(result_id)
+        if not meta:
+            return jsonify({
+                'success': False,
+                'error': f'渲染结果 {result_id} 不存在或已过期'
+            }), 404
+        
+        response = send_file(
+            store.path(result_id),
+            mimetype='text/plain',
+            as_attachment=request.args.get('inline') != '1',
+            download_name=meta['filename'],
+            conditional=True,
+            etag=meta['sha256']
+        )
+        response.headers['X-Content-SHA256'] = meta['sha256']
+        response.headers['X-Content-Lines'] = str(meta['lines'])
+        return response
+        
+    except Exception as e:
+        logger.error(f"下载渲染结果失败: {result_id}, 错误: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+@render_bp.route('/geometry', methods=['POST'])
+def result_geometry():
+    """渲染结果的预览几何：落盘结果按result_id（使用已记录的SHA256），未落盘的结果直接提交content"""
+    try:
+        data = request.get_json(silent=True) or {}
+        result_id = data.get('result_id')
+        content = data.get('content')
+        machine = data.get('machine')
+        output_format = data.get('format', 'json')
+        if (not result_id and not isinstance(content, str)) or (machine is not None and not isinstance(machine, dict)) \
+                or output_format not in ('json', 'binary'):
+            return jsonify({
+                'success': False,
+                'error': '请提供result_id或content，machine必须是对象，format为json或binary'
+            }), 400
+
+        try:
+            budget = parse_budget(data.get('budget'))
+            profile = MachineProfile.from_config(machine)
+        except (ValueError, TypeError) as e:
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 400
+
+        if result_id:
+            store = get_result_store()
+            meta = store.get(result_id)
+            if not meta:
+                return jsonify({
+                    'success': False,
+                    'error': f'渲染结果 {result_id} 不存在或已过期'
+                }), 404
+            geometry, cached = preview_file(store.path(result_id), budget, profile, meta['sha256'])
+        else:
+            geometry, cached = preview_content(content, budget, profile)
+
+        if output_format == 'binary':
+            return Response(
+                encode_binary(geometry),
+                mimetype='application/octet-stream',
+                headers=geometry_headers(geometry, cached)
+            )
+        return jsonify({
+            'success': True,
+            'data': geometry,
+            'cached': cached,
+            'timestamp': datetime.now().isoformat()
+        })
+
+    except Exception as e:
+        logger.error(f"生成预览几何失败: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+@render_bp.route('/templates/batch-render', methods=['POST'])
+def batch_render():
+    """
+    批量渲染模板包
+    
+    请求体: {"requests": [{"templateName": ..., "parameters": {...}}, ...]}
+    响应为NDJSON流：每个请求一行结果（按完成顺序，index对应请求下标），
+    最后一行为汇总。规范化后相同的请求只渲染一次。
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        requests_data = data.get('requests')
+        if not isinstance(requests_data, list) or not requests_data:
+            return jsonify({
+                'success': False,
+                'error': '请提供requests列表'
+            }), 400
+        
+        error = _validate_render_requests(requests_data)
+        if error:
+            return jsonify({
+                'success': False,
+                'error': error
+            }), 400
+        
+        unique, indices = dedupe_requests(requests_data)
+        user = _current_user()
+        
+        def generate():
+            start = time.perf_counter()
+            counts = {'succeeded': 0, 'failed': 0}
+            
+            def lines(key, payload):
+                item = unique[key]
+                for index in indices[key]:
+                    counts['succeeded' if payload.get('success') else 'failed'] += 1
+                    yield json.dumps({
+                        'type': 'result',
+                        'index': index,
+                        'templateName': item['templateName'],
+                        'key': key,
+                        **payload
+                    }, ensure_ascii=False) + '\n'
+            
+            # 在请求线程中解析模板包和依赖，找不到的直接返回错误
+            tasks = []
+            for key, item in unique.items():
+                try:
+                    func, args = _resolve_render_task(item)
+                except Exception as e:
+                    yield from lines(key, {'success': False, 'error': str(e), 'elapsed': 0})
+                    continue
+                tasks.append((key, func, args))
+            
+            workers = default_worker_count()
+            executor = get_render_scheduler().executor('batch', user)
+            for key, result, error, elapsed in run_batch(executor, iter(tasks), workers * 2):
+                if error is not None:
+                    payload = {'success': False, 'error': str(error)}
+                else:
+                    payload = {'success': bool(result.get('success')), 'data': result}
+                    if not result.get('success'):
+                        payload['error'] = result.get('error', '渲染失败')
+                yield from lines(key, {**payload, 'elapsed': round(elapsed, 4)})
+            
+            elapsed = time.perf_counter() - start
+            yield json.dumps({
+                'type': 'summary',
+                'total': len(requests_data),
+                'unique': len(unique),
+                **counts,
+                'workers': workers,
+                'elapsed': round(elapsed, 4),
+                'timestamp': datetime.now().isoformat()
+            }, ensure_ascii=False) + '\n'
+        
+        return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+        
+    except Exception as e:
+        logger.error(f"批量渲染失败: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+@render_bp.route('/render', methods=['POST'])
+def submit_render_job():
+    """
+    提交异步渲染任务
+    
+    请求体: {"requests": [{"templateName", "parameters"}]} 或单个 {"templateName", "parameters"}
+    立即返回任务ID，通过 /render/<id>/progress 查询进度
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        if 'requests' in data:
+            requests_data = data['requests']
+            kind = 'batch'
+        else:
+            requests_data = [{'templateName': data.get('templateName'), 'parameters': data.get('parameters', {})}]
+            kind = 'single'
+        
+        if not isinstance(requests_data, list) or not requests_data:
+            return jsonify({
+                'success': False,
+                'error': '请提供requests列表或templateName'
+            }), 400
+        
+        error = _validate_render_requests(requests_data)
+        if error:
+            return jsonify({
+                'success': False,
+                'error': error
+            }), 400
+        
+        user = request.headers.get('X-User') or request.remote_addr
+        job = render_job_queue.submit(requests_data, kind=kind, user=user)
+        
+        return jsonify({
+            'success': True,
+            'data': job,
+            'message': '渲染任务已提交',
+            'timestamp': datetime.now().isoformat()
+        }), 202
+        
+    except Exception as e:
+        logger.error(f"提交渲染任务失败: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+@render_bp.route('/render/<job_id>/progress', methods=['GET'])
+def get_render_progress(job_id: str):
+    """获取渲染任务进度"""
+    try:
+        return jsonify({
+            'success': True,
+            **render_job_queue.progress(job_id),
+            'timestamp': datetime.now().isoformat()
+        })
+    except JobNotFoundError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 404
+    except Exception as e:
+        logger.error(f"获取渲染进度失败: {job_id}, 错误: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+@render_bp.route('/render/<job_id>/cancel', methods=['POST'])
+def cancel_render_job(job_id: str):
+    """取消渲染任务（在条目之间生效）"""
+    try:
+        cancelled = render_job_queue.cancel(job_id)
+        return jsonify({
+            'success': True,
+            'cancelled': cancelled,
+            'message': '已请求取消渲染任务' if cancelled else '渲染任务已结束，无法取消',
+            'timestamp': datetime.now().isoformat()
+        })
+    except JobNotFoundError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 404
+    except Exception as e:
+        logger.error(f"取消渲染任务失败: {job_id}, 错误: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+@render_bp.route('/render/<job_id>/results', methods=['GET'])
+def get_render_job_results(job_id: str):
+    """分页获取渲染任务的条目结果（按请求下标排序）"""
+    try:
+        offset = max(0, request.args.get('offset', 0, type=int))
+        limit = min(500, max(1, request.args.get('limit', 100, type=int)))
+        results = render_job_queue.results(job_id, offset, limit)
+        return jsonify({
+            'success': True,
+            'data': results,
+            'offset': offset,
+            'limit': limit,
+            'timestamp': datetime.now().isoformat()
+        })
+    except JobNotFoundError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 404
+    except Exception as e:
+        logger.error(f"获取渲染结果失败: {job_id}, 错误: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+@render_bp.route('/scheduler/stats', methods=['GET'])
+def get_scheduler_stats():
+    """获取渲染调度统计（各优先级排队等待时间、渲染进程超时和回收次数）"""
+    try:
+        return jsonify({
+            'success': True,
+            'data': {
+                **get_render_scheduler().get_stats(),
+                'workers': get_render_executor().get_stats()
+            },
+            'timestamp': datetime.now().isoformat()
+        })
+    except Exception as e:
+        logger.error(f"获取调度统计失败: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+@render_bp.route('/templates/<package_name>/stream', methods=['POST'])
+def stream_render_template(package_name: str):
+    """
+    流式渲染模板（single优先级）
+    
+    请求体: {"parameters": {...}, "template_name": 可选, "output": 可选输出名, "format": "text"|"ndjson",
+             "dialect": 可选，刀路输出（dialects）的方言，默认第一个}
+    未指定模板时使用主模板。内容由Template.generate()逐块写入响应。
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        parameters = data.get('parameters') or {}
+        stream_format = data.get('format') or request.args.get('format', 'text')
+        if not isinstance(parameters, dict) or stream_format not in ('text', 'ndjson'):
+            return jsonify({
+                'success': False,
+                'error': '请提供parameters参数，format只能是text或ndjson'
+            }), 400
+        
+        package = _get_package(package_name)
+        if not package:
+            return jsonify({
+                'success': False,
+                'error': f'模板包 {package_name} 不存在'
+            }), 404
+        
+        try:
+            source = _output_pieces(package, data)
+        except LookupError as e:
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 404
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 400
+        pieces, template_name, filename = source['pieces'], source['template'], source['filename']
+        
+        user = _current_user()
+        scheduler = get_render_scheduler()
+        
+        limits = RenderLimits.from_env()
+        
+        def generate():
+            with scheduler.slot('single', user, timeout=SINGLE_TIMEOUT), guarded(limits):
+                chunks = coalesce_chunks(pieces)
+                if stream_format == 'ndjson':
+                    yield from stream_ndjson(chunks, {
+                        'package': package_name, 'template': template_name, 'filename': filename
+                    })
+                else:
+                    yield from stream_text(chunks, on_error=lambda e: f"\n; 渲染失败: {e}\n")
+        
+        response = Response(
+            stream_with_context(generate()),
+            mimetype='application/x-ndjson' if stream_format == 'ndjson' else 'text/plain'
+        )
+        response.headers['X-Accel-Buffering'] = 'no'
+        if filename and stream_format == 'text':
+            response.headers['Content-Disposition'] = f'inline; filename="{filename}"'
+        return response
+        
+    except Exception as e:
+        logger.error(f"流式渲染失败: {package_name}, 错误: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+def _start_dnc(lines, data: Dict[str, Any], name: str):
+    """按请求参数开始DNC传输，返回响应"""
+    try:
+        session = get_dnc_manager().start(
+            lines,
+            data.get('host'),
+            data.get('port'),
+            baud=data.get('baud', DEFAULT_BAUD),
+            line_ending=data.get('line_ending', 'crlf'),
+            name=name,
+            restart_from=data.get('restart_from')
+        )
+    except DncBusyError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 409
+    except DncError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    return jsonify({
+        'success': True,
+        'data': session.to_dict(),
+        'timestamp': datetime.now().isoformat()
+    }), 202
+
+
+@render_bp.route('/templates/<package_name>/dnc', methods=['POST'])
+def dnc_render_template(package_name: str):
+    """
+    渲染模板并以DNC方式发送到数控系统（边渲染边发送）
+    
+    请求体: {"parameters", "template_name"?, "output"?, "dialect"?（同流式渲染）,
+             "host", "port", "baud"?（默认9600，0不限速）, "line_ending"?, "restart_from"?（程序段序号或"N120"）}
+    渲染在传输线程中按发送进度惰性进行，不占用调度器名额；渲染超时只计生成程序的时间（不含等待发送），输出大小和循环次数限制同样有效。
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        if not isinstance(data.get('parameters') or {}, dict):
+            return jsonify({
+                'success': False,
+                'error': 'parameters必须是对象'
+            }), 400
+        
+        package = _get_package(package_name)
+        if not package:
+            return jsonify({
+                'success': False,
+                'error': f'模板包 {package_name} 不存在'
+            }), 404
+        
+        try:
+            source = _output_pieces(package, data)
+        except LookupError as e:
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 404
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 400
+        
+        lines = iter_lines(guarded_lazy(source['pieces'], RenderLimits.from_env()))
+        return _start_dnc(lines, data, source['filename'] or source['template'])
+        
+    except Exception as e:
+        logger.error(f"DNC传输失败: {package_name}, 错误: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+@render_bp.route('/results/<result_id>/dnc', methods=['POST'])
+def dnc_result(result_id: str):
+    """以DNC方式发送落盘的渲染结果（逐行读取，请求体同上，不含渲染参数）"""
+    try:
+        data = request.get_json(silent=True) or {}
+        store = get_result_store()
+        meta = store.get(result_id)
+        if not meta:
+            return jsonify({
+                'success': False,
+                'error': f'渲染结果 {result_id} 不存在或已过期'
+            }), 404
+        path = store.path(result_id)
+        
+        def lines():
+            with open(path, 'r', encoding='utf-8', errors='replace', newline='') as f:
+                yield from f
+        
+        return _start_dnc(lines(), data, meta['filename'])
+        
+    except Exception as e:
+        logger.error(f"DNC传输失败: {result_id}, 错误: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+@render_bp.route('/dnc', methods=['GET'])
+def list_dnc_sessions():
+    """DNC传输列表（进行中和最近结束的）"""
+    try:
+        return jsonify({
+            'success': True,
+            'data': get_dnc_manager().list(),
+            'timestamp': datetime.now().isoformat()
+        })
+    except Exception as e:
+        logger.error(f"获取DNC传输列表失败: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+@render_bp.route('/dnc/<session_id>', methods=['GET'])
+def get_dnc_session(session_id: str):
+    """DNC传输状态：已发送字节数和行数、暂停原因（api/xoff）"""
+    try:
+        return jsonify({
+            'success': True,
+            'data': get_dnc_manager().get(session_id).to_dict(),
+            'timestamp': datetime.now().isoformat()
+        })
+    except SessionNotFoundError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 404
+    except Exception as e:
+        logger.error(f"获取DNC传输状态失败: {session_id}, 错误: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+
+@render_bp.route('/dnc/<session_id>/<action>', methods=['POST'])
+def control_dnc_session(session_id: str, action: str):
+    """暂停（pause）、继续（resume）或取消（cancel）DNC传输；数控系统的XOFF暂停不受resume影响"""
+    try:
+        if action not in ('pause', 'resume', 'cancel'):
+            return jsonify({
+                'success': False,
+                'error': f'不支持的操作: {action}'
+            }), 404
+        session = get_dnc_manager().get(session_id)
+        applied = getattr(session, action)()
+        return jsonify({
+            'success': True,
+            'applied': applied,
+            'message': None if applied else 'DNC传输已结束',
+            'data': session.to_dict(),
+            'timestamp': datetime.now().isoformat()
+        })
+    except SessionNotFoundError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 404
+    except Exception as e:
+        logger.error(f"控制DNC传输失败: {session_id}, 错误: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
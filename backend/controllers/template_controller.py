@@ -22,6 +22,8 @@ from pathlib import Path
 from typing import List, Dict, Any, Optional
 import zipfile
 import tempfile
+import shutil
+import time
 from datetime import datetime
 
 # 添加 backend 目录到 Python 路径
@@ -30,6 +32,15 @@ if str(backend_path) not in sys.path:
     sys.path.insert(0, str(backend_path))
 
 from utils.jinja_renderer import RenderEngine
+from utils.package_archive import PackageArchive, stage_archives, stage_worker_count
+from utils.cow_copy import clone_tree
+from utils.package_preview import DefaultPreviewCache
+from utils.render_sandbox import RenderLimits, guarded
+from utils.toolpath_ir import check_output_dialects
+from utils.version_store import get_version_store, VersionNotFoundError
+from utils.package_metadata import PackageSummary, load_summary, get_config_cache, deep_sizeof
+from utils.package_bundle import BUNDLE_FILENAME, build_bundle, open_bundle
+from utils.package_loader import DependencyError, parse_dependencies, resolve_load_order, get_shared_code_cache
 
 # 创建蓝图
 template_bp = Blueprint('template', __name__, url_prefix='/api/templates')
@@ -43,59 +54,92 @@ class TemplatePackage:
         self.path = Path(package_path)
         self.config_file = self.path / "package.yaml"
         self.templates_dir = self.path / "templates"
-        self._config = None
+        self._summary: Optional[PackageSummary] = None
+        self._default_parameters = None
+    
+    @property
+    def summary(self) -> PackageSummary:
+        """摘要层元数据（优先读取编译包，否则只解析package节，常驻内存）"""
+        if self._summary is None:
+            bundle = open_bundle(self.path)
+            if bundle:
+                self._summary = PackageSummary.from_section(bundle.header['summary'], bundle.header['digest'])
+            else:
+                self._summary = load_summary(self.config_file)
+        return self._summary
     
     @property
     def config(self) -> dict:
-        """获取YAML配置"""
-        if self._config is None:
-            self._config = self._load_config()
-        return self._config
+        """获取YAML配置（按需加载到全局LRU缓存）"""
+        return get_config_cache().get(self.config_file, self.summary.digest, self._load_config)
     
     @property
     def name(self) -> str:
         """包名"""
-        return self.config["package"]["name"]
+        return self.summary.name
     
     @property
     def display_name(self) -> str:
         """显示名称"""
-        return self.config["package"]["displayName"]
+        return self.summary.display_name
     
     @property
     def version(self) -> str:
         """版本号"""
-        return self.config["package"]["version"]
+        return self.summary.version
     
     @property
     def description(self) -> str:
         """描述"""
-        return self.config["package"]["description"]
+        return self.summary.description
     
     @property
     def category(self) -> str:
         """分类"""
-        return self.config["package"]["category"]
+        return self.summary.category
     
     @property
     def tags(self) -> List[str]:
         """标签列表"""
-        return self.config["package"].get("tags", [])
+        return list(self.summary.tags)
     
     @property
     def author(self) -> str:
         """作者"""
-        return self.config["package"].get("author", "")
+        return self.summary.author
     
     @property
     def icon(self) -> str:
         """图标"""
-        return self.config["package"].get("icon", "📦")
+        return self.summary.icon
     
     @property
     def color(self) -> str:
         """主题色"""
-        return self.config["package"].get("color", "#2196F3")
+        return self.summary.color
+    
+    @property
+    def dependencies(self) -> List[str]:
+        """直接依赖的模板包名"""
+        return parse_dependencies(self.config)
+    
+    @property
+    def default_parameters(self) -> Dict[str, Any]:
+        """默认参数（加载时计算一次）"""
+        if self._default_parameters is None:
+            default_params = {}
+            variables = self.config.get('variables') or {}
+            for group_name, group_data in (variables.get('groups') or {}).items():
+                for param_name, param_data in (group_data.get('parameters') or {}).items():
+                    if 'default' in param_data:
+                        default_params[param_name] = param_data['default']
+            self._default_parameters = default_params
+        return self._default_parameters
+    
+    def reload(self):
+        """丢弃缓存的元数据，下次访问时重新加载"""
+        self._summary = None
+        self._default_parameters = None
     
     def get_template_files(self) -> List[str]:
         """获取所有模板文件列表"""
@@ -106,8 +150,11 @@ class TemplatePackage:
         return templates
     
     def _load_config(self) -> dict:
-        """加载YAML配置文件"""
+        """加载YAML配置文件（编译包比源文件新时直接反序列化）"""
         try:
+            bundle = open_bundle(self.path)
+            if bundle:
+                return bundle.load_config()
             with open(self.config_file, 'r', encoding='utf-8') as f:
                 return yaml.safe_load(f)
         except Exception as e:
@@ -121,21 +168,193 @@ class TemplateManager:
         self.workspace_path = Path(workspace_path)
         self.packages_dir = self.workspace_path
         self.packages: Dict[str, TemplatePackage] = {}
+        self.previews = DefaultPreviewCache(self._render_default_preview)
+        self.versions = get_version_store()
+        self._load_orders: Dict[str, List[str]] = {}
         self._scan_packages()
     
     def _scan_packages(self):
         """扫描所有模板包"""
-        self.packages.clear()
+        packages = {}
         if self.packages_dir.exists():
             for package_dir in self.packages_dir.iterdir():
-                if package_dir.is_dir():
-                    config_file = package_dir / "package.yaml"
-                    if config_file.exists():
-                        try:
-                            package = TemplatePackage(str(package_dir))
-                            self.packages[package.name] = package
-                        except Exception as e:
-                            logger.warning(f"Failed to load package {package_dir}: {e}")
+                # 跳过导入过程中的暂存/回收目录
+                if package_dir.is_dir() and not package_dir.name.startswith('.'):
+                    package = self._open_package(package_dir)
+                    if package:
+                        packages[package.name] = package
+        # 整体替换注册表，扫描期间读取方看到的始终是完整的旧表
+        self.packages = packages
+        self._load_orders = {}
+        self._schedule_previews(packages.values())
+    
+    def _open_package(self, package_dir: Path) -> Optional[TemplatePackage]:
+        """打开单个模板包，不修改注册表"""
+        config_file = Path(package_dir) / "package.yaml"
+        if not config_file.exists():
+            return None
+        try:
+            package = TemplatePackage(str(package_dir))
+            package.name  # 触发摘要加载，无效的package.yaml在此抛出异常
+            return package
+        except Exception as e:
+            logger.warning(f"Failed to load package {package_dir}: {e}")
+            return None
+    
+    def load_package(self, package_dir: Path) -> Optional[TemplatePackage]:
+        """重新生成编译包，并加载（或重新加载）单个模板包到注册表"""
+        self.build_bundle(package_dir)
+        package = self._open_package(package_dir)
+        if package:
+            self.packages[package.name] = package
+            self._load_orders = {}
+            self._schedule_previews([package])
+        return package
+    
+    def remove_package(self, package_name: str) -> None:
+        """从注册表中移除模板包"""
+        self.packages.pop(package_name, None)
+        self._load_orders = {}
+        self.previews.invalidate(package_name)
+    
+    def build_bundle(self, package_dir: Path) -> Optional[Path]:
+        """
+        生成模板包编译包，失败只记录日志（加载时回退到源文件）
+        
+        为模板包使用的两个Jinja2环境（默认预览和渲染接口）分别预编译。
+        """
+        from backend.controllers.render_controller import JinjaRenderer
+        try:
+            if not (Path(package_dir) / "package.yaml").exists():
+                return None
+            environments = [RenderEngine(str(package_dir)).env, JinjaRenderer(str(package_dir)).env]
+            return build_bundle(package_dir, environments)
+        except Exception as e:
+            logger.warning(f"Failed to build bundle for {package_dir}: {e}")
+            return None
+    
+    def snapshot_package(self, package: TemplatePackage, source: str, description: str = '') -> Optional[Dict[str, Any]]:
+        """为模板包创建版本快照，失败只记录日志不影响主流程"""
+        try:
+            return self.versions.snapshot(
+                package.name, package.path, source=source,
+                description=description, version=package.version
+            )
+        except Exception as e:
+            logger.warning(f"Failed to snapshot package {package.name}: {e}")
+            return None
+    
+    def get_load_order(self, package: TemplatePackage) -> List[str]:
+        """
+        获取模板包的拓扑加载顺序（依赖在前、自身在最后）
+        
+        结果按包名缓存，注册表变化时整体失效。
+        
+        Raises:
+            DependencyError: 依赖缺失或循环依赖
+        """
+        order = self._load_orders.get(package.name)
+        if order is None:
+            def get_dependencies(name: str) -> Optional[List[str]]:
+                dependency = self.packages.get(name)
+                return dependency.dependencies if dependency else None
+            
+            order = resolve_load_order(package.name, get_dependencies)
+            self._load_orders[package.name] = order
+        return order
+    
+    def get_dependency_paths(self, package: TemplatePackage) -> List[tuple]:
+        """依赖包的 (包名, 目录) 列表，按模板查找优先级排列（离本包最近的在前）"""
+        order = self.get_load_order(package)
+        return [(name, self.packages[name].path) for name in reversed(order[:-1])]
+    
+    def create_render_engine(self, package: TemplatePackage) -> RenderEngine:
+        """创建可访问依赖包模板的渲染引擎"""
+        return RenderEngine(str(package.path), self.get_dependency_paths(package))
+    
+    def get_default_preview(self, package: TemplatePackage) -> Dict[str, Any]:
+        """获取默认参数预览（内存查找，必要时后台刷新）"""
+        return self.previews.get(package)
+    
+    def _schedule_previews(self, packages) -> None:
+        """后台预计算默认预览"""
+        for package in packages:
+            self.previews.schedule(package)
+    
+    def _render_default_preview(self, package: TemplatePackage) -> str:
+        """使用默认参数渲染主模板（在后台线程中进行，受渲染耗时、输出大小和循环次数限制）"""
+        try:
+            render_engine = self.create_render_engine(package)
+            main_template = package.config['templates']['main']
+            with guarded(RenderLimits.from_env()):
+                return render_engine.render_template(main_template, package.default_parameters)
+        except Exception as e:
+            return f'; 预览失败: {str(e)}\n; 请检查模板配置和参数定义'
+    
+    def install_archive(self, archive: PackageArchive) -> Optional[TemplatePackage]:
+        """
+        安装已验证的模板包压缩文件
+        
+        解压到暂存目录后发布为 packages/<包名>（已存在时原子交换），只刷新该包的注册表条目。
+        """
+        target_path = archive.install(self.packages_dir)
+        package = self.load_package(target_path)
+        if package:
+            self.snapshot_package(package, 'import', '导入模板包')
+        return package
+    
+    def install_archives(self, sources: List[tuple], max_workers: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        批量安装模板包
+        
+        验证和解压在有界线程池中并行执行；发布按提交顺序串行进行，
+        最后一次性替换注册表。同一批次中重复的包名只安装第一个。
+        
+        Args:
+            sources: (来源标识, zip路径或文件对象) 列表
+            max_workers: 并行度
+            
+        Returns:
+            每个来源的安装结果
+        """
+        staged = stage_archives(sources, self.packages_dir, max_workers)
+        packages = dict(self.packages)
+        seen = set()
+        
+        for result in staged:
+            staging = result.pop('staging', None)
+            config = result.pop('config', None)
+            if not result['success']:
+                continue
+            
+            name = result['name']
+            if name in seen:
+                shutil.rmtree(staging, ignore_errors=True)
+                result['success'] = False
+                result['error'] = f'批次中包名重复: {name}'
+                continue
+            seen.add(name)
+            
+            try:
+                target_path = self.packages_dir / name
+                PackageArchive.publish(staging, target_path)
+            except Exception as e:
+                shutil.rmtree(staging, ignore_errors=True)
+                result['success'] = False
+                result['error'] = str(e)
+                continue
+            
+            self.build_bundle(target_path)
+            package = self._open_package(target_path)
+            if package:
+                packages[package.name] = package
+                self.previews.schedule(package)
+                self.snapshot_package(package, 'import', '批量导入模板包')
+            result['displayName'] = config['package'].get('displayName', name)
+        
+        self.packages = packages
+        self._load_orders = {}
+        return staged
     
     def get_all_packages(self) -> List[Dict[str, Any]]:
         """获取所有模板包信息"""
@@ -155,10 +374,36 @@ class TemplateManager:
             })
         return packages_info
     
+    def get_memory_usage(self) -> Dict[str, Any]:
+        """按层统计元数据内存占用"""
+        summaries = [package._summary for package in self.packages.values() if package._summary is not None]
+        summary_bytes = deep_sizeof(summaries)
+        return {
+            'summaries': {
+                'count': len(summaries),
+                'bytes': summary_bytes,
+                'bytesPerPackage': round(summary_bytes / len(summaries), 1) if summaries else 0
+            },
+            'configs': get_config_cache().get_stats(),
+            'sharedTemplates': get_shared_code_cache().get_stats(),
+            'previews': {
+                **self.previews.get_stats(),
+                'bytes': deep_sizeof(list(self.previews.entries.values()))
+            }
+        }
+    
     def get_package_by_name(self, package_name: str) -> Optional[TemplatePackage]:
         """根据名称获取模板包"""
         return self.packages.get(package_name)
     
+    def get_package_by_path(self, package_dir: Path) -> Optional[TemplatePackage]:
+        """根据目录获取模板包（目录名可以与包名不同），未注册时直接打开该目录"""
+        package_dir = Path(package_dir).resolve()
+        for package in list(self.packages.values()):
+            if package.path.resolve() == package_dir:
+                return package
+        return self._open_package(package_dir)
+    
     def validate_package(self, package_path: str) -> Dict[str, Any]:
         """验证模板包"""
         errors = []
@@ -184,12 +429,18 @@ class TemplateManager:
                 for key in required_keys:
                     if key not in config:
                         errors.append(f"配置文件缺少必要节: {key}")
+                errors.extend(check_output_dialects(config))
                 
                 # 检查模板文件
                 template_files = package.get_template_files()
                 if not template_files:
                     warnings.append("模板包中没有任何模板文件")
                 
+                # 检查依赖
+                for dependency in package.dependencies:
+                    if dependency not in self.packages:
+                        warnings.append(f"依赖的模板包未安装: {dependency}")
+                
             except Exception as e:
                 errors.append(f"配置文件解析失败: {str(e)}")
         
@@ -221,6 +472,31 @@ def get_templates():
             'message': '获取模板包列表失败'
         }), 500
 
+@template_bp.route('/stats/memory', methods=['GET'])
+def get_template_memory_stats():
+    """获取模板包元数据各层内存占用"""
+    try:
+        return jsonify({
+            'success': True,
+            'data': template_manager.get_memory_usage(),
+            'timestamp': datetime.now().isoformat()
+        })
+    except Exception as e:
+        logger.error(f"Failed to get template memory stats: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e),
+            'message': '获取内存统计失败'
+        }), 500
+
+def _safe_load_order(package: TemplatePackage) -> Optional[List[str]]:
+    """获取加载顺序，依赖有问题时返回None（详情接口不因此失败）"""
+    try:
+        return template_manager.get_load_order(package)
+    except DependencyError as e:
+        logger.warning(f"Failed to resolve dependencies for {package.name}: {e}")
+        return None
+
 @template_bp.route('/<package_name>', methods=['GET'])
 def get_template(package_name: str):
     """获取指定模板包详情"""
@@ -246,7 +522,9 @@ def get_template(package_name: str):
                 'icon': package.icon,
                 'color': package.color,
                 'config': package.config,
-                'templateFiles': package.get_template_files()
+                'templateFiles': package.get_template_files(),
+                'dependencies': package.dependencies,
+                'loadOrder': _safe_load_order(package)
             },
             'timestamp': datetime.now().isoformat()
         })
@@ -299,25 +577,9 @@ def import_template():
                 'message': '只支持.zip格式的模板包文件'
             }), 400
         
-        # 创建临时目录
-        import tempfile
-        import shutil
-        
-        temp_dir = tempfile.mkdtemp()
-        extract_path = os.path.join(temp_dir, 'extracted')
-        os.makedirs(extract_path)
-        
-        try:
-            # 保存上传的文件到临时路径
-            temp_file_path = os.path.join(temp_dir, file.filename)
-            file.save(temp_file_path)
-            
-            # 解压文件
-            with zipfile.ZipFile(temp_file_path, 'r') as zip_ref:
-                zip_ref.extractall(extract_path)
-            
-            # 验证模板包
-            validation = template_manager.validate_package(extract_path)
+        # 直接从上传流读取zip中央目录，不落盘、不预先解压
+        with PackageArchive(file.stream) as archive:
+            validation = archive.validate()
             
             if not validation['valid']:
                 return jsonify({
@@ -327,40 +589,30 @@ def import_template():
                     'validation': validation
                 }), 400
             
-            # 获取包名并复制到packages目录
-            package_config_path = os.path.join(extract_path, 'package.yaml')
-            with open(package_config_path, 'r', encoding='utf-8') as f:
-                config = yaml.safe_load(f)
-                package_name = config['package']['name']
-            
-            target_path = template_manager.packages_dir / package_name
-            
-            if target_path.exists():
-                # 如果已存在，先删除
-                shutil.rmtree(target_path)
-            
-            # 复制到packages目录
-            shutil.copytree(extract_path, target_path)
-            
-            # 重新扫描
-            template_manager._scan_packages()
-            
-            logger.info(f'✅ 成功导入模板包: {package_name}')
-            
-            return jsonify({
-                'success': True,
-                'data': {
-                    'name': package_name,
-                    'displayName': config['package']['displayName']
-                },
-                'message': f'模板包 {config["package"]["displayName"]} 导入成功',
-                'timestamp': datetime.now().isoformat()
-            })
-            
-        finally:
-            # 清理临时文件
-            shutil.rmtree(temp_dir, ignore_errors=True)
+            config = archive.config
+            package_name = archive.package_name
             
+            # 解压到暂存目录并原子发布，只刷新该包
+            template_manager.install_archive(archive)
+        
+        logger.info(f'✅ 成功导入模板包: {package_name}')
+        
+        return jsonify({
+            'success': True,
+            'data': {
+                'name': package_name,
+                'displayName': config['package']['displayName']
+            },
+            'message': f'模板包 {config["package"]["displayName"]} 导入成功',
+            'timestamp': datetime.now().isoformat()
+        })
+    
+    except zipfile.BadZipFile as e:
+        return jsonify({
+            'success': False,
+            'error': str(e),
+            'message': '无效的zip文件'
+        }), 400
     except Exception as e:
         logger.error(f'Failed to import template: {e}')
         return jsonify({
@@ -369,6 +621,78 @@ def import_template():
             'message': '模板包导入失败'
         }), 500
 
+@template_bp.route('/bulk-import', methods=['POST'])
+def bulk_import_templates():
+    """批量导入模板包（多个zip文件或服务器目录）"""
+    try:
+        sources = []
+        
+        for file in request.files.getlist('files') + request.files.getlist('file'):
+            if not file.filename or not file.filename.endswith('.zip'):
+                return jsonify({
+                    'success': False,
+                    'error': 'Invalid file type',
+                    'message': f'只支持.zip格式的模板包文件: {file.filename}'
+                }), 400
+            sources.append((file.filename, file.stream))
+        
+        data = request.get_json(silent=True) or {}
+        directory = data.get('directory') or request.form.get('directory')
+        if directory:
+            from .file_controller import file_manager
+            source_dir = file_manager._validate_path(directory)
+            if not source_dir.is_dir():
+                return jsonify({
+                    'success': False,
+                    'error': 'Directory not found',
+                    'message': f'目录不存在: {directory}'
+                }), 404
+            for zip_path in sorted(source_dir.glob('*.zip')):
+                sources.append((str(zip_path.relative_to(file_manager.workspace_root)), str(zip_path)))
+        
+        if not sources:
+            return jsonify({
+                'success': False,
+                'error': 'No file provided',
+                'message': '请上传zip文件或指定包含zip文件的目录'
+            }), 400
+        
+        start = time.perf_counter()
+        max_workers = stage_worker_count(data.get('maxWorkers') or request.form.get('maxWorkers'))
+        results = template_manager.install_archives(sources, max_workers)
+        elapsed = time.perf_counter() - start
+        
+        imported = sum(1 for r in results if r['success'])
+        logger.info(f'✅ 批量导入模板包: {imported}/{len(results)}, 耗时 {elapsed:.2f}s')
+        
+        return jsonify({
+            'success': True,
+            'data': {
+                'results': results,
+                'total': len(results),
+                'imported': imported,
+                'failed': len(results) - imported,
+                'elapsed': round(elapsed, 4),
+                'packagesPerSecond': round(len(results) / elapsed, 2) if elapsed > 0 else None
+            },
+            'message': f'批量导入完成: 成功 {imported} 个，失败 {len(results) - imported} 个',
+            'timestamp': datetime.now().isoformat()
+        })
+        
+    except PermissionError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e),
+            'message': '无权限访问指定目录'
+        }), 403
+    except Exception as e:
+        logger.error(f'Failed to bulk import templates: {e}')
+        return jsonify({
+            'success': False,
+            'error': str(e),
+            'message': '批量导入模板包失败'
+        }), 500
+
 @template_bp.route('/<package_name>', methods=['DELETE'])
 def delete_template(package_name: str):
     """删除模板包"""
@@ -390,7 +714,7 @@ def delete_template(package_name: str):
         shutil.rmtree(package.path)
         
         # 从管理器中移除
-        del template_manager.packages[package_name]
+        template_manager.remove_package(package_name)
         
         logger.info(f'✅ 成功删除模板包: {package_name}')
         
@@ -433,6 +757,9 @@ def export_template(package_name: str):
             with zipfile.ZipFile(temp_file.name, 'w', zipfile.ZIP_DEFLATED) as zip_ref:
                 for root, dirs, files in os.walk(package.path):
                     for file in files:
+                        # 编译包与Python/Jinja2版本相关，不随模板包导出
+                        if file == BUNDLE_FILENAME:
+                            continue
                         file_path = os.path.join(root, file)
                         arcname = os.path.relpath(file_path, package.path.parent)
                         zip_ref.write(file_path, arcname)
@@ -686,15 +1013,12 @@ M30
         with open(package_config_path, 'w', encoding='utf-8') as f:
             yaml.dump(package_config, f, allow_unicode=True, sort_keys=False)
         
-        # 重新扫描并返回新创建的模板包
-        template_manager._scan_packages()
-        package = template_manager.get_package_by_name(package_name)
-        
         logger.info(f'✅ 成功创建模板包: {package_name}')
         
-        # 重新扫描并获取新创建的模板包
-        template_manager._scan_packages()
-        new_package = template_manager.get_package_by_name(package_name)
+        # 加载新创建的模板包
+        new_package = template_manager.load_package(package_path)
+        if new_package:
+            template_manager.snapshot_package(new_package, 'create', '创建模板包')
         
         if not new_package:
             return jsonify({
@@ -760,12 +1084,15 @@ def duplicate_template(package_name: str):
                 'message': f'模板包 {new_name} 已存在'
             }), 400
         
-        import shutil
-        
-        # 复制目录
+        # 写时复制：模板文件通过reflink/硬链接共享内容，package.yaml随后会被改写，直接复制
         source_path = source_package.path
         target_path = template_manager.packages_dir / new_name
-        shutil.copytree(source_path, target_path)
+        source_config = source_path / 'package.yaml'
+        clone_stats = clone_tree(
+            source_path,
+            target_path,
+            copy_filter=lambda file_path: file_path == source_config
+        )
         
         # 更新package.yaml中的名称
         config_path = target_path / 'package.yaml'
@@ -778,10 +1105,9 @@ def duplicate_template(package_name: str):
         with open(config_path, 'w', encoding='utf-8') as f:
             yaml.dump(config, f, allow_unicode=True, sort_keys=False)
         
-        # 重新扫描
-        template_manager._scan_packages()
-        
-        new_package = template_manager.get_package_by_name(new_name)
+        new_package = template_manager.load_package(target_path)
+        if new_package:
+            template_manager.snapshot_package(new_package, 'duplicate', f'复制自 {package_name}')
         
         if not new_package:
             return jsonify({
@@ -793,14 +1119,15 @@ def duplicate_template(package_name: str):
                 }
             })
         
-        logger.info(f'✅ 成功复制模板包: {package_name} -> {new_name}')
+        logger.info(f'✅ 成功复制模板包: {package_name} -> {new_name} {clone_stats}')
         
         return jsonify({
             'success': True,
             'data': {
                 'name': new_package.name,
                 'displayName': new_package.display_name,
-                'version': new_package.version
+                'version': new_package.version,
+                'cloneStats': clone_stats
             },
             'message': f'模板包 {new_display_name} 复制成功',
             'timestamp': datetime.now().isoformat()
@@ -827,32 +1154,15 @@ def preview_template(package_name: str):
                 'message': f'模板包 {package_name} 不存在'
             }), 404
         
-        # 获取默认参数
-        config = package.config
-        default_params = {}
-        
-        if 'variables' in config and 'groups' in config['variables']:
-            for group_name, group_data in config['variables']['groups'].items():
-                if 'parameters' in group_data:
-                    for param_name, param_data in group_data['parameters'].items():
-                        if 'default' in param_data:
-                             default_params[param_name] = param_data['default']
-        
-        # 渲染模板
-        render_engine = RenderEngine(str(package.path))
-        
-        preview_content = ''
-        try:
-            main_template = config['templates']['main']
-            preview_content = render_engine.render_template(main_template, default_params)
-        except Exception as e:
-            preview_content = f'; 预览失败: {str(e)}\n; 请检查模板配置和参数定义'
+        # 默认参数和默认渲染结果在模板包加载时预计算，这里只做内存查找
+        preview = template_manager.get_default_preview(package)
         
         return jsonify({
             'success': True,
             'data': {
-                'content': preview_content,
-                'parameters': default_params
+                'content': preview['content'],
+                'parameters': preview['parameters'],
+                'renderedAt': preview['renderedAt']
             },
             'message': '预览生成成功',
             'timestamp': datetime.now().isoformat()
@@ -879,14 +1189,11 @@ def get_template_versions(package_name: str):
                 'message': f'模板包 {package_name} 不存在'
             }), 404
         
-        # 模拟版本历史（实际应从版本控制系统中获取）
-        versions = [
-            {
-                'version': package.version,
-                'createdAt': datetime.now().isoformat(),
-                'description': '当前版本'
-            }
-        ]
+        versions = template_manager.versions.list_snapshots(package_name)
+        if not versions:
+            # 尚无历史的模板包（如手动放入packages目录）建立初始快照
+            template_manager.snapshot_package(package, 'initial', '初始版本')
+            versions = template_manager.versions.list_snapshots(package_name)
         
         return jsonify({
             'success': True,
@@ -902,3 +1209,136 @@ def get_template_versions(package_name: str):
             'error': str(e),
             'message': f'获取版本历史失败'
         }), 500
+
+@template_bp.route('/<package_name>/versions', methods=['POST'])
+def create_template_version(package_name: str):
+    """手动创建版本快照"""
+    try:
+        package = template_manager.get_package_by_name(package_name)
+        
+        if not package:
+            return jsonify({
+                'success': False,
+                'error': 'Package not found',
+                'message': f'模板包 {package_name} 不存在'
+            }), 404
+        
+        data = request.get_json(silent=True) or {}
+        snapshot = template_manager.versions.snapshot(
+            package_name, package.path, source='manual',
+            description=data.get('description', ''), version=package.version
+        )
+        
+        return jsonify({
+            'success': True,
+            'data': snapshot,
+            'message': '版本快照已创建' if snapshot['created'] else '内容未变化，沿用最新版本',
+            'timestamp': datetime.now().isoformat()
+        })
+        
+    except Exception as e:
+        logger.error(f'Failed to create version for template {package_name}: {e}')
+        return jsonify({
+            'success': False,
+            'error': str(e),
+            'message': f'创建版本快照失败'
+        }), 500
+
+@template_bp.route('/<package_name>/versions/<version_id>', methods=['GET'])
+def get_template_version(package_name: str, version_id: str):
+    """获取版本快照清单"""
+    try:
+        manifest = template_manager.versions.get_snapshot(package_name, version_id)
+        return jsonify({
+            'success': True,
+            'data': manifest,
+            'timestamp': datetime.now().isoformat()
+        })
+    except VersionNotFoundError as e:
+        return jsonify({
+            'success': False,
+            'error': 'Version not found',
+            'message': str(e)
+        }), 404
+    except Exception as e:
+        logger.error(f'Failed to get version {version_id} for template {package_name}: {e}')
+        return jsonify({
+            'success': False,
+            'error': str(e),
+            'message': f'获取版本快照失败'
+        }), 500
+
+@template_bp.route('/<package_name>/versions/<version_id>/diff', methods=['GET'])
+def diff_template_versions(package_name: str, version_id: str):
+    """对比两个版本（against默认为父版本）"""
+    try:
+        versions = template_manager.versions
+        base_id = request.args.get('against') or versions.get_snapshot(package_name, version_id).get('parent')
+        if not base_id:
+            return jsonify({
+                'success': False,
+                'error': 'No base version',
+                'message': '该版本没有父版本，请通过against参数指定对比版本'
+            }), 400
+        
+        include_content = request.args.get('content', 'true').lower() != 'false'
+        result = versions.diff(package_name, base_id, version_id, include_content)
+        
+        return jsonify({
+            'success': True,
+            'data': result,
+            'timestamp': datetime.now().isoformat()
+        })
+    except VersionNotFoundError as e:
+        return jsonify({
+            'success': False,
+            'error': 'Version not found',
+            'message': str(e)
+        }), 404
+    except Exception as e:
+        logger.error(f'Failed to diff version {version_id} for template {package_name}: {e}')
+        return jsonify({
+            'success': False,
+            'error': str(e),
+            'message': f'版本对比失败'
+        }), 500
+
+@template_bp.route('/<package_name>/versions/<version_id>/checkout', methods=['POST'])
+def checkout_template_version(package_name: str, version_id: str):
+    """将模板包恢复到指定版本"""
+    try:
+        package = template_manager.get_package_by_name(package_name)
+        
+        if not package:
+            return jsonify({
+                'success': False,
+                'error': 'Package not found',
+                'message': f'模板包 {package_name} 不存在'
+            }), 404
+        
+        # 恢复前先记录当前状态，避免未快照的修改丢失
+        template_manager.snapshot_package(package, 'save', '恢复前自动保存')
+        snapshot = template_manager.versions.checkout(package_name, version_id, package.path)
+        template_manager.load_package(package.path)
+        
+        logger.info(f'✅ 模板包 {package_name} 已恢复到版本 {version_id}')
+        
+        return jsonify({
+            'success': True,
+            'data': snapshot,
+            'message': f'已恢复到版本 {version_id}',
+            'timestamp': datetime.now().isoformat()
+        })
+    except VersionNotFoundError as e:
+        return jsonify({
+            'success': False,
+            'error': 'Version not found',
+            'message': str(e)
+        }), 404
+    except Exception as e:
+        logger.error(f'Failed to checkout version {version_id} for template {package_name}: {e}')
+        return jsonify({
+            'success': False,
+            'error': str(e),
+            'message': f'恢复版本失败'
+        }), 500
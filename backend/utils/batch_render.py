@@ -0,0 +1,135 @@
+"""
+批量渲染
+
+严格遵循PROJECT_REQUIREMENTS.md文档约束
+
+功能：
+- 请求规范化（参数按键排序序列化）后合并完全相同的渲染请求
+- 在与主机CPU数相当的受限渲染进程池中并行渲染
+- 结果按完成顺序逐条产出，同时在途的任务数有上限，
+  大批量请求不会一次性提交或在内存中缓存全部结果
+"""
+
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Executor, wait
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from .render_sandbox import (
+    DEFAULT_MAX_TASKS_PER_WORKER, DEFAULT_MAX_WORKER_MEMORY_MB, RenderLimits, RenderWorkerPool
+)
+
+logger = logging.getLogger(__name__)
+
+MAX_BATCH_SIZE = 5000
+
+
+def default_worker_count() -> int:
+    """与主机CPU数相当的工作进程数"""
+    return max(1, os.cpu_count() or 1)
+
+
+def canonical_request_key(package_name: str, parameters: Dict[str, Any]) -> str:
+    """
+    计算渲染请求的规范化键
+
+    参数按键排序、去除多余空白后序列化，键顺序不同的相同请求得到同一个键。
+    """
+    payload = json.dumps(
+        [package_name, parameters], sort_keys=True, separators=(',', ':'), ensure_ascii=False, default=str
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def dedupe_requests(requests: List[Dict[str, Any]]) -> Tuple[Dict[str, Dict[str, Any]], Dict[str, List[int]]]:
+    """
+    合并相同的渲染请求
+
+    Args:
+        requests: [{'templateName': ..., 'parameters': {...}}, ...]
+
+    Returns:
+        (键 -> 首个请求, 键 -> 所有请求下标)，两者都保持首次出现的顺序
+    """
+    unique: Dict[str, Dict[str, Any]] = {}
+    indices: Dict[str, List[int]] = {}
+    for index, item in enumerate(requests):
+        key = canonical_request_key(item['templateName'], item.get('parameters') or {})
+        if key not in unique:
+            unique[key] = item
+            indices[key] = []
+        indices[key].append(index)
+    return unique, indices
+
+
+def run_batch(
+    executor: Executor,
+    tasks: Iterator[Tuple[str, Callable, tuple]],
+    max_in_flight: int
+) -> Iterator[Tuple[str, Any, Optional[BaseException], float]]:
+    """
+    在执行器中运行任务并按完成顺序产出结果
+
+    Args:
+        executor: 线程池或进程池
+        tasks: (任务键, 函数, 参数) 迭代器，按需读取
+        max_in_flight: 同时提交到执行器的任务数上限
+
+    Yields:
+        (任务键, 返回值, 异常, 耗时秒)
+    """
+    in_flight: Dict[Any, Tuple[str, float]] = {}
+    tasks = iter(tasks)
+    exhausted = False
+
+    while in_flight or not exhausted:
+        while not exhausted and len(in_flight) < max_in_flight:
+            try:
+                key, func, args = next(tasks)
+            except StopIteration:
+                exhausted = True
+                break
+            try:
+                in_flight[executor.submit(func, *args)] = (key, time.perf_counter())
+            except Exception as e:
+                # 执行器已关闭或进程池损坏时，该任务直接以失败返回
+                yield key, None, e, 0.0
+
+        if not in_flight:
+            break
+
+        done, _ = wait(list(in_flight), return_when=FIRST_COMPLETED)
+        for future in done:
+            key, started = in_flight.pop(future)
+            error = future.exception()
+            yield key, None if error else future.result(), error, time.perf_counter() - started
+
+
+_executor: Optional[RenderWorkerPool] = None
+_executor_lock = threading.Lock()
+
+
+def get_render_executor() -> RenderWorkerPool:
+    """
+    获取全局渲染进程池（首次使用时创建）
+
+    使用spawn方式启动工作进程，避免在多线程的Web进程中fork。
+    渲染限制见RenderLimits.from_env()；工作进程回收阈值由环境变量
+    RENDER_WORKER_MAX_TASKS、RENDER_WORKER_MAX_MEMORY_MB设置。
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = RenderWorkerPool(
+                max_workers=default_worker_count(),
+                limits=RenderLimits.from_env(),
+                max_tasks_per_worker=int(os.environ.get('RENDER_WORKER_MAX_TASKS', DEFAULT_MAX_TASKS_PER_WORKER)),
+                max_memory_mb=float(os.environ.get('RENDER_WORKER_MAX_MEMORY_MB', DEFAULT_MAX_WORKER_MEMORY_MB)),
+                mp_context=multiprocessing.get_context('spawn')
+            )
+        return _executor
@@ -0,0 +1,163 @@
+"""
+写时复制（Copy-on-Write）目录克隆
+
+严格遵循PROJECT_REQUIREMENTS.md文档约束
+
+功能：
+- 优先使用reflink（btrfs/xfs等文件系统的FICLONE）共享文件数据块
+- 不支持reflink时使用硬链接，写入前通过break_link断开共享
+- 两者都不可用时回退为普通复制
+
+使用硬链接时，所有写入包内文件的代码都必须先调用break_link，
+否则会同时修改共享该文件的其他模板包。
+"""
+
+import errno
+import logging
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Dict, Union, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+# linux/fs.h: _IOW(0x94, 9, int)
+FICLONE = 0x40049409
+
+# 表示"此文件系统不支持该操作"的错误码，遇到后本次克隆不再尝试
+_UNSUPPORTED_ERRNOS = {
+    errno.EOPNOTSUPP, errno.ENOTTY, errno.EXDEV, errno.EINVAL, errno.ENOSYS, errno.EPERM
+}
+
+
+def reflink_file(src: Union[str, Path], dst: Union[str, Path]) -> bool:
+    """
+    通过FICLONE创建reflink副本
+
+    Returns:
+        成功返回True；平台或文件系统不支持时返回False且不留下目标文件
+    """
+    try:
+        import fcntl
+    except ImportError:
+        return False
+
+    src_fd = os.open(str(src), os.O_RDONLY)
+    try:
+        dst_fd = os.open(str(dst), os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644)
+        try:
+            fcntl.ioctl(dst_fd, FICLONE, src_fd)
+        except OSError:
+            os.close(dst_fd)
+            os.unlink(str(dst))
+            return False
+        os.close(dst_fd)
+    finally:
+        os.close(src_fd)
+
+    shutil.copystat(str(src), str(dst))
+    return True
+
+
+def clone_tree(
+    src: Union[str, Path],
+    dst: Union[str, Path],
+    use_reflink: bool = True,
+    use_hardlink: bool = True,
+    copy_filter: Optional[Callable[[Path], bool]] = None
+) -> Dict[str, int]:
+    """
+    克隆目录树，文件内容尽可能共享
+
+    目录结构逐个创建，文件按 reflink → 硬链接 → 复制 的顺序尝试，
+    某种方式第一次因文件系统不支持而失败后，本次克隆不再尝试该方式。
+
+    Args:
+        src: 源目录
+        dst: 目标目录（不能已存在）
+        use_reflink: 是否尝试reflink
+        use_hardlink: 是否尝试硬链接
+        copy_filter: 返回True的文件强制普通复制（如随后会被改写的文件）
+
+    Returns:
+        统计信息: reflinked/linked/copied/directories
+    """
+    src = Path(src)
+    dst = Path(dst)
+    stats = {'reflinked': 0, 'linked': 0, 'copied': 0, 'directories': 0}
+
+    dst.mkdir(parents=True, exist_ok=False)
+    stats['directories'] += 1
+
+    for root, dirs, files in os.walk(src):
+        root_path = Path(root)
+        target_root = dst / root_path.relative_to(src)
+
+        for dir_name in dirs:
+            (target_root / dir_name).mkdir(exist_ok=True)
+            stats['directories'] += 1
+
+        for file_name in files:
+            source_file = root_path / file_name
+            target_file = target_root / file_name
+
+            if source_file.is_symlink() or (copy_filter and copy_filter(source_file)):
+                shutil.copy2(str(source_file), str(target_file))
+                stats['copied'] += 1
+                continue
+
+            if use_reflink:
+                try:
+                    if reflink_file(source_file, target_file):
+                        stats['reflinked'] += 1
+                        continue
+                except OSError as e:
+                    logger.debug(f"reflink失败: {source_file}: {e}")
+                use_reflink = False
+
+            if use_hardlink:
+                try:
+                    os.link(str(source_file), str(target_file))
+                    stats['linked'] += 1
+                    continue
+                except OSError as e:
+                    if e.errno not in _UNSUPPORTED_ERRNOS:
+                        raise
+                    use_hardlink = False
+
+            shutil.copy2(str(source_file), str(target_file))
+            stats['copied'] += 1
+
+    return stats
+
+
+def break_link(path: Union[str, Path]) -> bool:
+    """
+    写入前断开硬链接共享
+
+    若文件有多个硬链接，在同目录复制一份并原子替换当前路径，
+    其他链接仍指向原内容。
+
+    Returns:
+        是否执行了断开操作
+    """
+    path = Path(path)
+    try:
+        st = path.stat()
+    except FileNotFoundError:
+        return False
+
+    if st.st_nlink <= 1:
+        return False
+
+    fd, temp_path = tempfile.mkstemp(prefix=f'.{path.name}.', dir=str(path.parent))
+    os.close(fd)
+    try:
+        shutil.copy2(str(path), temp_path)
+        os.replace(temp_path, str(path))
+    except Exception:
+        if os.path.exists(temp_path):
+            os.unlink(temp_path)
+        raise
+    return True
@@ -0,0 +1,541 @@
+"""
+DNC在线传输（边传边加工）
+
+严格遵循PROJECT_REQUIREMENTS.md文档约束
+
+功能：
+- 把程序逐行发送到数控系统的TCP端口（串口服务器或网口DNC），按波特率限速
+- XON/XOFF流控：收到XOFF（DC3）暂停发送，收到XON（DC1）继续；也可通过接口暂停、继续和取消
+- 断点续传：从第N个程序段或顺序号（如N120）开始；之前的程序段只经G代码分析器恢复模态，
+  在续传位置之前插入单位、平面、坐标方式、刀具、主轴和进给
+- 程序由调用方以行迭代器提供（模板惰性生成或落盘结果逐行读取），不在内存中保留完整程序
+- ControllerSimulator：数控系统的本地TCP替身，按设定速度"执行"收到的程序，缓冲区将满时发送XOFF
+
+只允许连接DNC_ALLOWED_HOSTS（主机名、IP地址或网段，逗号分隔）中的数控系统，未配置时拒绝所有传输；
+连接使用检查时解析出的地址，不再重新解析主机名。
+"""
+
+import ipaddress
+import logging
+import os
+import re
+import select
+import socket
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Union
+
+from .gcode_analyzer import GcodeAnalyzer
+
+logger = logging.getLogger(__name__)
+
+XON = 0x11
+XOFF = 0x13
+
+DEFAULT_BAUD = 9600
+# 8N1：起始位 + 8个数据位 + 停止位
+BITS_PER_CHAR = 10
+LINE_ENDINGS = {'crlf': '\r\n', 'lf': '\n', 'cr': '\r'}
+# 每次发送的最大字节数（与串口服务器的缓冲区相当，流控的延迟不超过一块）
+MAX_CHUNK = 256
+# 限速的时间片（秒）：最多预支这段时间的发送量，暂停和取消在这段时间内生效
+SEND_INTERVAL = 0.05
+CONNECT_TIMEOUT = 5.0
+DEFAULT_MAX_SESSIONS = 8
+# 结束的会话保留时间（秒）
+SESSION_TTL = 3600
+
+SESSION_STATES = ('pending', 'running', 'paused', 'completed', 'failed', 'cancelled')
+FINISHED_STATES = ('completed', 'failed', 'cancelled')
+
+_SEQUENCE = re.compile(r'\s*/?\s*N(\d+)', re.IGNORECASE)
+
+
+class DncError(ValueError):
+    """DNC传输参数或续传位置无效"""
+
+
+class DncBusyError(DncError):
+    """数控系统正在接收其他程序，或同时进行的传输已达上限"""
+
+
+class SessionNotFoundError(LookupError):
+    """DNC会话不存在"""
+
+
+class _Cancelled(Exception):
+    pass
+
+
+def _restart_preamble(analyzer: GcodeAnalyzer, label: str) -> List[str]:
+    """恢复模态的程序段（续传位置之前的状态）"""
+    if analyzer.motion not in (None, 0, 1, 2, 3):
+        raise DncError(f'续传位置 {label} 在固定循环中，请从循环指令所在的程序段开始')
+    position = ' '.join(
+        f'{axis}{value / analyzer.scale:g}' for axis, value in analyzer.position.items() if value is not None
+    )
+    lines = [f'(RESTART AT {label}{" FROM " + position if position else ""})']
+    lines.append(' '.join((
+        'G21' if analyzer.scale == 1.0 else 'G20',
+        f'G{analyzer.plane}',
+        'G90' if analyzer.absolute else 'G91',
+        f'G{analyzer.feed_mode}'
+    )))
+    if analyzer.tool is not None:
+        lines.append(f'T{analyzer.tool} M06')
+    if analyzer.spindle_on and analyzer.spindle_speed:
+        lines.append(f'S{analyzer.spindle_speed:g} M0{analyzer.spindle_direction}')
+    if analyzer.feed:
+        lines.append(f'F{analyzer.feed:g}')
+    if analyzer.motion is not None:
+        lines.append(f'G0{analyzer.motion}')
+    return lines
+
+
+def restart_lines(lines: Iterable[str], restart_from: Union[int, str], preamble: bool = True) -> Iterator[str]:
+    """
+    从续传位置开始产生程序行
+
+    Args:
+        lines: 程序行
+        restart_from: 第N个程序段（从1开始，不计空行、注释和%）或顺序号（'N120'）
+        preamble: 是否在续传位置之前插入恢复模态的程序段
+
+    续传位置的格式在调用时检查；程序以%开头时续传的内容同样以%开头。
+    找不到续传位置时迭代抛出DncError（此时没有产生任何行）。
+    """
+    if isinstance(restart_from, str):
+        match = re.fullmatch(r'\s*N?(\d+)\s*', restart_from, re.IGNORECASE)
+        if not match:
+            raise DncError(f'无效的续传位置: {restart_from}')
+        sequence, block, label = int(match.group(1)), None, f'N{int(match.group(1))}'
+    else:
+        if isinstance(restart_from, bool) or not isinstance(restart_from, int) or restart_from < 1:
+            raise DncError(f'无效的续传位置: {restart_from}')
+        sequence, block, label = None, restart_from, f'BLOCK {restart_from}'
+    return _restart(lines, sequence, block, label, preamble)
+
+
+def _restart(
+    lines: Iterable[str], sequence: Optional[int], block: Optional[int], label: str, preamble: bool
+) -> Iterator[str]:
+    analyzer = GcodeAnalyzer()
+    iterator = iter(lines)
+    leader = False
+    for line in iterator:
+        if not leader and analyzer.blocks == 0 and line.strip().startswith('%'):
+            leader = True
+        if sequence is not None:
+            match = _SEQUENCE.match(line)
+            candidate = match is not None and int(match.group(1)) == sequence
+        else:
+            candidate = analyzer.blocks == block - 1
+        # 模态取该行执行之前的状态；按程序段计数时，执行后计数增加才是续传位置
+        head: Union[List[str], DncError] = []
+        if candidate and preamble:
+            try:
+                head = _restart_preamble(analyzer, label)
+            except DncError as e:
+                head = e
+        analyzer.feed_line(line)
+        if candidate and (sequence is not None or analyzer.blocks == block):
+            if isinstance(head, DncError):
+                raise head
+            if leader:
+                yield '%'
+            yield from head
+            yield line
+            yield from iterator
+            return
+    raise DncError(f'程序中没有续传位置 {label}')
+
+
+class DncSession:
+    """
+    一次DNC传输
+
+    在后台线程中连接数控系统并逐行发送；pause/resume/cancel可在任意线程调用。
+    """
+
+    def __init__(
+        self,
+        lines: Iterable[str],
+        host: str,
+        port: int,
+        baud: int = DEFAULT_BAUD,
+        line_ending: str = 'crlf',
+        name: str = '',
+        restart_from: Union[int, str, None] = None,
+        connect_timeout: float = CONNECT_TIMEOUT,
+        address: Optional[str] = None
+    ):
+        """
+        Args:
+            lines: 程序行（惰性迭代器，在传输线程中消费）
+            host, port: 数控系统（或串口服务器）的地址
+            address: 已检查的IP地址，连接时使用（不再解析host）；None时连接host
+            baud: 波特率，按每字符10位限速；0为不限速（只按流控）
+            line_ending: 行结束符 crlf/lf/cr
+            name: 程序名（显示用）
+            restart_from: 续传位置（见restart_lines），None为从头发送
+        """
+        if line_ending not in LINE_ENDINGS:
+            raise DncError(f'不支持的行结束符: {line_ending}')
+        if isinstance(baud, bool) or not isinstance(baud, (int, float)) or baud < 0:
+            raise DncError(f'无效的波特率: {baud}')
+        self.id = uuid.uuid4().hex
+        self.host = host
+        self.port = port
+        self.address = address or host
+        self.baud = baud
+        self.name = name
+        self.restart_from = restart_from
+        self.line_ending = LINE_ENDINGS[line_ending]
+        self.connect_timeout = connect_timeout
+        self.rate = baud / BITS_PER_CHAR
+        self.lines = restart_lines(lines, restart_from) if restart_from is not None else lines
+
+        self.state = 'pending'
+        self.error: Optional[str] = None
+        self.paused_by = set()
+        self.bytes_sent = 0
+        self.lines_sent = 0
+        self.xoff_count = 0
+        self.created = time.time()
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+        self._cond = threading.Condition()
+        self._cancel = False
+        self._tokens = 0.0
+        self._last = 0.0
+        self._thread: Optional[threading.Thread] = None
+
+    # ---- 控制 ----
+
+    def start(self) -> 'DncSession':
+        self._thread = threading.Thread(target=self._run, name=f'dnc-{self.id[:8]}', daemon=True)
+        self._thread.start()
+        return self
+
+    @property
+    def done(self) -> bool:
+        return self.state in FINISHED_STATES
+
+    def pause(self) -> bool:
+        with self._cond:
+            if self.done:
+                return False
+            self.paused_by.add('api')
+            return True
+
+    def resume(self) -> bool:
+        with self._cond:
+            if self.done:
+                return False
+            self.paused_by.discard('api')
+            self._cond.notify_all()
+            return True
+
+    def cancel(self) -> bool:
+        with self._cond:
+            if self.done:
+                return False
+            self._cancel = True
+            self._cond.notify_all()
+            return True
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """等待传输结束"""
+        if self._thread is not None:
+            self._thread.join(timeout)
+        return self.done
+
+    # ---- 传输 ----
+
+    def _run(self) -> None:
+        try:
+            with socket.create_connection((self.address, self.port), timeout=self.connect_timeout) as sock:
+                self.started = time.time()
+                self.state = 'running'
+                self._last = time.monotonic()
+                for line in self.lines:
+                    self._send(sock, (line.rstrip('\r\n') + self.line_ending).encode('ascii', errors='replace'))
+                    self.lines_sent += 1
+            self._finish('completed')
+        except _Cancelled:
+            self._finish('cancelled')
+        except Exception as e:
+            logger.warning(f'DNC传输失败: {self.host}:{self.port}, 错误: {e}')
+            self._finish('failed', str(e))
+        finally:
+            close = getattr(self.lines, 'close', None)
+            if close is not None:
+                close()
+
+    def _finish(self, state: str, error: Optional[str] = None) -> None:
+        with self._cond:
+            self.state = state
+            self.error = error
+            self.finished = time.time()
+            self.paused_by.clear()
+            self._cond.notify_all()
+
+    def _send(self, sock: socket.socket, data: bytes) -> None:
+        view = memoryview(data)
+        offset = 0
+        while offset < len(data):
+            self._wait_ready(sock)
+            size = min(len(data) - offset, MAX_CHUNK)
+            if self.rate:
+                now = time.monotonic()
+                self._tokens = min(self._tokens + (now - self._last) * self.rate, self.rate * SEND_INTERVAL)
+                self._last = now
+                if self._tokens < 1:
+                    with self._cond:
+                        self._cond.wait(min(SEND_INTERVAL, (1 - self._tokens) / self.rate))
+                    continue
+                size = min(size, int(self._tokens))
+                self._tokens -= size
+            sock.sendall(view[offset:offset + size])
+            offset += size
+            self.bytes_sent += size
+
+    def _wait_ready(self, sock: socket.socket) -> None:
+        """处理数控系统发来的XON/XOFF；暂停时等待，取消时中止"""
+        while True:
+            self._poll(sock, 0)
+            with self._cond:
+                if self._cancel:
+                    raise _Cancelled()
+                if not self.paused_by:
+                    return
+                self.state = 'paused'
+                self._cond.wait(SEND_INTERVAL)
+                if not self.paused_by and not self._cancel:
+                    self.state = 'running'
+                    # 暂停期间不积攒发送量
+                    self._tokens = 0.0
+                    self._last = time.monotonic()
+
+    def _poll(self, sock: socket.socket, timeout: float) -> None:
+        readable, _, _ = select.select([sock], [], [], timeout)
+        if not readable:
+            return
+        data = sock.recv(1024)
+        if not data:
+            raise ConnectionError('数控系统断开了连接')
+        for byte in data:
+            with self._cond:
+                if byte == XOFF:
+                    if 'xoff' not in self.paused_by:
+                        self.xoff_count += 1
+                    self.paused_by.add('xoff')
+                elif byte == XON:
+                    self.paused_by.discard('xoff')
+                    self._cond.notify_all()
+
+    def to_dict(self) -> Dict[str, Any]:
+        def timestamp(value):
+            return datetime.fromtimestamp(value).isoformat() if value else None
+
+        end = self.finished or time.time()
+        return {
+            'id': self.id,
+            'name': self.name,
+            'host': self.host,
+            'address': self.address,
+            'port': self.port,
+            'baud': self.baud,
+            'restartFrom': self.restart_from,
+            'state': self.state,
+            'pausedBy': sorted(self.paused_by),
+            'bytesSent': self.bytes_sent,
+            'linesSent': self.lines_sent,
+            'xoffCount': self.xoff_count,
+            'elapsed': round(end - self.started, 2) if self.started else 0,
+            'error': self.error,
+            'createdAt': timestamp(self.created),
+            'startedAt': timestamp(self.started),
+            'finishedAt': timestamp(self.finished)
+        }
+
+
+class DncSessionManager:
+    """DNC会话管理：目标地址检查、同一数控系统只允许一个传输、结束的会话保留一段时间"""
+
+    def __init__(self, max_sessions: int = DEFAULT_MAX_SESSIONS, allowed_hosts: Optional[Iterable[str]] = None):
+        """
+        Args:
+            max_sessions: 同时进行的传输数上限
+            allowed_hosts: 允许连接的主机名、IP地址或网段（如192.168.10.0/24）；为空时拒绝所有传输
+        """
+        self.max_sessions = max_sessions
+        self.allowed_hosts = set()
+        self.allowed_networks = []
+        for entry in allowed_hosts or ():
+            try:
+                self.allowed_networks.append(ipaddress.ip_network(entry, strict=False))
+            except ValueError:
+                self.allowed_hosts.add(entry.lower())
+        self._sessions: 'OrderedDict[str, DncSession]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def check_target(self, host: str, port: Any) -> str:
+        """
+        检查目标是否允许连接
+
+        Returns:
+            解析出的IP地址（传输连接该地址，避免检查后主机名被重新解析到其他地址）
+        """
+        if not host or not isinstance(host, str):
+            raise DncError('请提供数控系统的主机地址')
+        if isinstance(port, bool) or not isinstance(port, int) or not 0 < port < 65536:
+            raise DncError(f'无效的端口: {port}')
+        if not self.allowed_hosts and not self.allowed_networks:
+            raise DncError('未配置允许连接的数控系统（DNC_ALLOWED_HOSTS），DNC传输已禁用')
+        try:
+            addresses = [info[4][0] for info in socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)]
+        except OSError as e:
+            raise DncError(f'无法解析主机 {host}: {e}')
+        if host.lower() in self.allowed_hosts:
+            return addresses[0]
+        for address in addresses:
+            ip = ipaddress.ip_address(address.split('%')[0])
+            if any(ip in network for network in self.allowed_networks):
+                return address
+        raise DncError(f'不允许连接 {host}（DNC_ALLOWED_HOSTS）')
+
+    def start(self, lines: Iterable[str], host: str, port: int, **options) -> DncSession:
+        """检查目标后开始传输（options见DncSession）"""
+        address = self.check_target(host, port)
+        with self._lock:
+            self._cleanup()
+            active = [session for session in self._sessions.values() if not session.done]
+            if any(session.address == address and session.port == port for session in active):
+                raise DncBusyError(f'{host}:{port} 正在接收其他程序')
+            if len(active) >= self.max_sessions:
+                raise DncBusyError(f'同时进行的DNC传输已达上限 {self.max_sessions}')
+            session = DncSession(lines, host, port, address=address, **options)
+            self._sessions[session.id] = session
+        return session.start()
+
+    def get(self, session_id: str) -> DncSession:
+        session = self._sessions.get(session_id)
+        if session is None:
+            raise SessionNotFoundError(f'DNC会话 {session_id} 不存在')
+        return session
+
+    def list(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            self._cleanup()
+            return [session.to_dict() for session in self._sessions.values()]
+
+    def _cleanup(self) -> None:
+        now = time.time()
+        for session_id in [
+            session_id for session_id, session in self._sessions.items()
+            if session.done and now - session.finished > SESSION_TTL
+        ]:
+            del self._sessions[session_id]
+
+
+_manager: Optional[DncSessionManager] = None
+_manager_lock = threading.Lock()
+
+
+def get_dnc_manager() -> DncSessionManager:
+    """获取全局DNC会话管理器（DNC_ALLOWED_HOSTS逗号分隔，未配置时拒绝所有传输；DNC_MAX_SESSIONS为传输数上限）"""
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            hosts = os.environ.get('DNC_ALLOWED_HOSTS', '')
+            _manager = DncSessionManager(
+                int(os.environ.get('DNC_MAX_SESSIONS', DEFAULT_MAX_SESSIONS)),
+                [host.strip() for host in hosts.split(',') if host.strip()]
+            )
+        return _manager
+
+
+class ControllerSimulator:
+    """
+    数控系统的本地TCP替身（测试和调试用）
+
+    接收的字节进入容量为buffer_size的缓冲区，按execute_rate（字符/秒，0为立即执行）消耗；
+    缓冲区达到高水位时发送XOFF，降到低水位时发送XON。只接受一个连接，连接关闭后结束。
+    """
+
+    def __init__(
+        self,
+        buffer_size: int = 4096,
+        execute_rate: float = 0,
+        high_water: float = 0.75,
+        low_water: float = 0.25,
+        host: str = '127.0.0.1'
+    ):
+        self.buffer_size = buffer_size
+        self.execute_rate = execute_rate
+        self.high_water = buffer_size * high_water
+        self.low_water = buffer_size * low_water
+        self.received = bytearray()
+        self.xoff_sent = 0
+        self.peak = 0.0
+        self._server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._server.bind((host, 0))
+        self._server.listen(1)
+        self.address = self._server.getsockname()
+        self._done = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> 'ControllerSimulator':
+        self._thread = threading.Thread(target=self._serve, name='dnc-simulator', daemon=True)
+        self._thread.start()
+        return self
+
+    def _serve(self) -> None:
+        try:
+            conn, _ = self._server.accept()
+        except OSError:
+            self._done.set()
+            return
+        with conn:
+            buffered = 0.0
+            paused = False
+            last = time.monotonic()
+            while True:
+                now = time.monotonic()
+                buffered = max(0.0, buffered - (now - last) * self.execute_rate) if self.execute_rate else 0.0
+                last = now
+                if paused and buffered <= self.low_water:
+                    conn.sendall(bytes([XON]))
+                    paused = False
+                readable, _, _ = select.select([conn], [], [], 0.01)
+                if not readable:
+                    continue
+                try:
+                    chunk = conn.recv(4096)
+                except OSError:
+                    break
+                if not chunk:
+                    break
+                self.received += chunk
+                buffered += len(chunk)
+                self.peak = max(self.peak, buffered)
+                if not paused and buffered >= self.high_water:
+                    conn.sendall(bytes([XOFF]))
+                    paused = True
+                    self.xoff_sent += 1
+        self._done.set()
+
+    @property
+    def text(self) -> str:
+        return self.received.decode('ascii', errors='replace')
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """等待连接关闭"""
+        return self._done.wait(timeout)
+
+    def close(self) -> None:
+        self._server.close()
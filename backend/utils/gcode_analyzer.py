@@ -0,0 +1,575 @@
+"""
+G代码流式分析
+
+严格遵循PROJECT_REQUIREMENTS.md文档约束
+
+功能：
+- 逐行分析G代码（渲染输出或工作区中的程序文件），只保留模态状态和累计值，内存占用与程序长度无关
+- 快速移动/切削距离，按机床快移速度（可按轴设置）、进给方式、暂停和换刀时间估算加工时间
+- 使用的刀具（换刀次数、切削距离和时间）、主轴转速范围、进给范围、各轴坐标范围
+- 行程范围检查：超出机床行程的坐标计数并保留前几个样例
+
+支持ISO G代码（Fanuc、西门子840D的G/M代码部分）；宏程序、西门子循环调用等无法解析的程序段跳过并计数。
+固定循环（G73/G81~G89）按每个孔的定位、进给和退回估算；G83的排屑退回按每次进给深度近似。
+行程检查使用程序坐标（未计入工件坐标系偏置）。
+"""
+
+import math
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Union
+
+from .gcode_postprocess import CYCLE_CODES, G_CODES, parse_words, split_comment
+
+# 默认快移速度（mm/min）
+DEFAULT_RAPID_RATE = 10000.0
+# 每种问题保留的样例数
+MAX_SAMPLES = 20
+
+AXES = ('X', 'Y', 'Z')
+# 圆弧平面 -> (第一轴, 第二轴, 第三轴, 第一轴圆心字, 第二轴圆心字)
+PLANES = {
+    17: ('X', 'Y', 'Z', 'I', 'J'),
+    18: ('Z', 'X', 'Y', 'K', 'I'),
+    19: ('Y', 'Z', 'X', 'J', 'K')
+}
+# 孔底进给退回的循环（镗孔、攻丝）
+FEED_RETRACT_CYCLES = {74, 84, 85, 89}
+DWELL_CYCLES = {82, 89}
+
+
+class MachineProfile:
+    """机床参数（快移速度、换刀时间、最大进给、行程和主轴转速范围）"""
+
+    def __init__(
+        self,
+        name: str = 'default',
+        rapid_rate: Union[float, Dict[str, float]] = DEFAULT_RAPID_RATE,
+        tool_change_time: float = 0.0,
+        max_feed: Optional[float] = None,
+        envelope: Optional[Dict[str, List[float]]] = None,
+        spindle_range: Optional[List[float]] = None
+    ):
+        """
+        Args:
+            name: 机床名称
+            rapid_rate: 快移速度（mm/min），可按轴给出 {'x': .., 'y': .., 'z': ..}
+            tool_change_time: 每次换刀时间（秒）
+            max_feed: 最大切削进给（mm/min），超过时按该值计算
+            envelope: 行程范围 {'x': [最小, 最大], ...}（程序坐标，mm）
+            spindle_range: 主轴转速范围 [最小, 最大]（rpm）
+        """
+        rates = rapid_rate if isinstance(rapid_rate, dict) else dict.fromkeys(AXES, rapid_rate)
+        rates = {str(axis).upper(): value for axis, value in rates.items()}
+        self.name = str(name)
+        self.rapid_rate = {axis: float(rates.get(axis, DEFAULT_RAPID_RATE)) for axis in AXES}
+        if any(rate <= 0 for rate in self.rapid_rate.values()):
+            raise ValueError('快移速度必须大于0')
+        self.tool_change_time = float(tool_change_time or 0.0)
+        self.max_feed = float(max_feed) if max_feed else None
+        self.envelope = {}
+        for axis, limits in (envelope or {}).items():
+            low, high = (float(v) for v in limits)
+            if low > high:
+                raise ValueError(f'{axis} 轴行程范围无效: {limits}')
+            self.envelope[str(axis).upper()] = (low, high)
+        self.spindle_range = tuple(float(v) for v in spindle_range) if spindle_range else None
+
+    @classmethod
+    def from_config(cls, config: Optional[Dict[str, Any]]) -> 'MachineProfile':
+        """由配置字典创建（未知的键忽略）"""
+        config = config or {}
+        return cls(**{
+            key: config[key]
+            for key in ('name', 'rapid_rate', 'tool_change_time', 'max_feed', 'envelope', 'spindle_range')
+            if config.get(key) is not None
+        })
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'name': self.name,
+            'rapidRate': self.rapid_rate,
+            'toolChangeTime': self.tool_change_time,
+            'maxFeed': self.max_feed,
+            'envelope': {axis: list(limits) for axis, limits in self.envelope.items()},
+            'spindleRange': list(self.spindle_range) if self.spindle_range else None
+        }
+
+
+class _Range:
+    __slots__ = ('low', 'high')
+
+    def __init__(self):
+        self.low = self.high = None
+
+    def add(self, value: float) -> None:
+        if self.low is None or value < self.low:
+            self.low = value
+        if self.high is None or value > self.high:
+            self.high = value
+
+    def to_list(self) -> Optional[List[float]]:
+        return [round(self.low, 4), round(self.high, 4)] if self.low is not None else None
+
+
+class GcodeAnalyzer:
+    """
+    流式G代码分析器
+
+    用法：
+        analyzer = GcodeAnalyzer(MachineProfile(rapid_rate=30000))
+        analyzer.feed_lines(lines)        # 或 pieces = analyzer.observe(pieces) 边输出边分析
+        report = analyzer.report()
+    """
+
+    def __init__(self, machine: Optional[MachineProfile] = None):
+        self.machine = machine or MachineProfile()
+        # 模态状态（长度统一为mm，未知位置为None）
+        self.position: Dict[str, Optional[float]] = dict.fromkeys(AXES)
+        self.motion: Optional[int] = None
+        self.absolute = True
+        self.scale = 1.0
+        self.plane = 17
+        self.feed_mode = 94
+        self.feed: Optional[float] = None
+        self.spindle_speed: Optional[float] = None
+        self.spindle_on = False
+        self.spindle_direction = 3
+        self.tool: Optional[int] = None
+        self.next_tool: Optional[int] = None
+        self.cycle_return = 98
+        self.cycle: Dict[str, Optional[float]] = {}
+        # 累计值
+        self.lines = 0
+        self.blocks = 0
+        self.rapid_distance = 0.0
+        self.feed_distance = 0.0
+        self.rapid_minutes = 0.0
+        self.feed_minutes = 0.0
+        self.dwell_seconds = 0.0
+        self.tool_changes = 0
+        self.tools: Dict[int, Dict[str, float]] = {}
+        self.spindle = _Range()
+        self.feeds = _Range()
+        self.extents = {axis: _Range() for axis in AXES}
+        self.violations: Dict[str, int] = {}
+        self.samples: List[Dict[str, Any]] = []
+        self.warnings: Dict[str, int] = {}
+
+    # ---- 输入 ----
+
+    def feed_lines(self, lines: Iterable[str]) -> 'GcodeAnalyzer':
+        for line in lines:
+            self.feed_line(line)
+        return self
+
+    def observe(self, pieces: Iterable[str]) -> Iterator[str]:
+        """原样产生渲染片段，同时分析其中的完整行（只缓存当前未结束的一行）"""
+        pending = ''
+        for piece in pieces:
+            yield piece
+            if not piece:
+                continue
+            lines = (pending + piece).split('\n')
+            pending = lines.pop()
+            for line in lines:
+                self.feed_line(line)
+        if pending:
+            self.feed_line(pending)
+
+    def feed_line(self, line: str) -> None:
+        self.lines += 1
+        text = line.strip()
+        if not text or text[0] == '%':
+            return
+        if text[0] == '/':
+            text = text[1:]
+        if '(' in text or ';' in text:
+            text, comment = split_comment(text)
+            if comment is None:
+                self._warn('unparsedBlocks')
+                return
+            if not text.strip():
+                return
+        words = parse_words(text)
+        if words is None:
+            self._warn('unparsedBlocks')
+            return
+        self.blocks += 1
+        self._execute(words)
+
+    # ---- 程序段 ----
+
+    def _warn(self, key: str) -> None:
+        self.warnings[key] = self.warnings.get(key, 0) + 1
+
+    def _execute(self, words) -> None:
+        g_codes: List[int] = []
+        m_codes: List[int] = []
+        values: Dict[str, str] = {}
+        for letter, value in words:
+            if letter == 'G':
+                code = G_CODES.get(value)
+                if code is None:
+                    try:
+                        number = float(value)
+                    except ValueError:
+                        continue
+                    code = int(number) if number.is_integer() else None
+                if code is not None:
+                    g_codes.append(code)
+            elif letter == 'M':
+                try:
+                    m_codes.append(int(float(value)))
+                except ValueError:
+                    pass
+            else:
+                values[letter] = value
+
+        special = None
+        for code in g_codes:
+            if code in (0, 1, 2, 3) or code in CYCLE_CODES:
+                if code not in CYCLE_CODES:
+                    self.cycle = {}
+                elif self.motion not in CYCLE_CODES:
+                    # 初始平面为进入循环时的Z
+                    self.cycle = {'initial': self.position['Z']}
+                self.motion = code
+            elif code == 80:
+                self.motion = None
+                self.cycle = {}
+            elif code in PLANES:
+                self.plane = code
+            elif code in (20, 21):
+                self.scale = 25.4 if code == 20 else 1.0
+            elif code in (90, 91):
+                self.absolute = code == 90
+            elif code in (93, 94, 95):
+                self.feed_mode = code
+            elif code in (98, 99):
+                self.cycle_return = code
+            elif code in (4, 10, 28, 30, 53, 92):
+                special = code
+
+        if special == 4:
+            self._dwell(values)
+            values.pop('F', None)
+        if 'F' in values:
+            self.feed = float(values['F'])
+            self.feeds.add(self.feed * (self.scale if self.feed_mode != 93 else 1.0))
+        spindle_changed = 'S' in values
+        if spindle_changed:
+            self.spindle_speed = float(values['S'])
+        if 'T' in values:
+            try:
+                self.next_tool = int(float(values['T']))
+            except ValueError:
+                pass
+
+        for code in m_codes:
+            if code in (3, 4):
+                spindle_changed = spindle_changed or not self.spindle_on
+                self.spindle_on = True
+                self.spindle_direction = code
+            elif code == 5:
+                self.spindle_on = False
+            elif code == 6:
+                self._tool_change()
+            elif code == 98:
+                self._warn('subprogramCalls')
+        if spindle_changed and self.spindle_on:
+            self._spindle_speed()
+
+        if special in (4, 10):
+            return
+        if special == 92:
+            for axis in AXES:
+                if axis in values:
+                    self.position[axis] = float(values[axis]) * self.scale
+            return
+        if special in (28, 30, 53):
+            # 经中间点回参考点/机床坐标移动：快速移动，之后程序坐标位置未知
+            if special != 53:
+                self._move(0, self._target(values), values)
+            for axis in AXES:
+                if axis in values:
+                    self.position[axis] = None
+            return
+
+        if not any(axis in values for axis in AXES) and not (
+            self.motion in CYCLE_CODES and 'R' in values
+        ):
+            return
+        if self.motion in CYCLE_CODES:
+            self._cycle(values)
+        elif self.motion is not None:
+            self._move(self.motion, self._target(values), values)
+
+    def _target(self, values: Dict[str, str]) -> Dict[str, Optional[float]]:
+        target = dict(self.position)
+        for axis in AXES:
+            if axis in values:
+                value = float(values[axis]) * self.scale
+                if self.absolute:
+                    target[axis] = value
+                else:
+                    base = self.position[axis]
+                    target[axis] = base + value if base is not None else None
+        return target
+
+    # ---- 运动 ----
+
+    def _move(self, motion: int, target: Dict[str, Optional[float]], values: Dict[str, str]) -> None:
+        position = self.position
+        deltas = {}
+        unknown = False
+        for axis in AXES:
+            end = target[axis]
+            if end is None:
+                continue
+            start = position[axis]
+            if start is None:
+                unknown = True
+            elif end != start:
+                deltas[axis] = end - start
+        if unknown:
+            self._warn('unknownStartPosition')
+        if motion == 0:
+            self._rapid(deltas)
+        elif motion == 1:
+            if deltas:
+                self._cut(math.hypot(*deltas.values()))
+        else:
+            self._cut(self._arc_length(motion, target, values))
+        self._arrive(target)
+
+    def _rapid(self, deltas: Dict[str, float]) -> None:
+        if not deltas:
+            return
+        self.rapid_distance += math.hypot(*deltas.values())
+        # 快移各轴独立运动，时间取最慢的轴
+        self.rapid_minutes += max(abs(d) / self.machine.rapid_rate[axis] for axis, d in deltas.items())
+
+    def _cut(self, distance: float) -> None:
+        if distance <= 0:
+            return
+        minutes = self._feed_minutes(distance)
+        self.feed_distance += distance
+        self.feed_minutes += minutes
+        if self.tool is not None:
+            stats = self.tools.setdefault(self.tool, {'changes': 0, 'feedDistance': 0.0, 'cutMinutes': 0.0})
+            stats['feedDistance'] += distance
+            stats['cutMinutes'] += minutes
+
+    def _feed_minutes(self, distance: float) -> float:
+        if not self.feed:
+            self._warn('missingFeed')
+            return 0.0
+        if self.feed_mode == 93:
+            return 1.0 / self.feed
+        if self.feed_mode == 95:
+            if not self.spindle_speed:
+                self._warn('missingFeed')
+                return 0.0
+            rate = self.feed * self.scale * self.spindle_speed
+        else:
+            rate = self.feed * self.scale
+        if self.machine.max_feed and rate > self.machine.max_feed:
+            self._warn('feedClamped')
+            rate = self.machine.max_feed
+        return distance / rate
+
+    def _arc_length(self, motion: int, target: Dict[str, Optional[float]], values: Dict[str, str]) -> float:
+        arc = self._arc(motion, target, values)
+        if arc is None:
+            first, second = PLANES[self.plane][:2]
+            x0, y0 = self.position[first], self.position[second]
+            x1, y1 = target[first], target[second]
+            return math.hypot(x1 - x0, y1 - y0) if None not in (x0, y0, x1, y1) else 0.0
+        radius, sweep, height = arc[2], arc[4], arc[5]
+        return math.hypot(radius * sweep, height)
+
+    def _arc(self, motion: int, target: Dict[str, Optional[float]], values: Dict[str, str]):
+        """
+        圆弧几何（在当前平面内）
+
+        Returns:
+            (圆心第一轴, 圆心第二轴, 半径, 起始角, 扫过角（逆时针为正）, 第三轴高度差)；
+            位置未知、起止点重合的R圆弧或半径小于半弦长时返回None
+        """
+        first, second, third, first_center, second_center = PLANES[self.plane]
+        x0, y0 = self.position[first], self.position[second]
+        x1, y1 = target[first], target[second]
+        if None in (x0, y0, x1, y1):
+            return None
+        if 'R' in values:
+            radius = float(values['R']) * self.scale
+            chord = math.hypot(x1 - x0, y1 - y0)
+            if chord == 0 or abs(radius) < chord / 2 - 1e-9:
+                return None
+            sweep = 2 * math.asin(min(1.0, chord / (2 * abs(radius))))
+            # 圆心在弦的左侧（G03、R为正）或右侧，R为负时取大于180°的圆弧
+            side = (1 if motion == 3 else -1) * (1 if radius > 0 else -1)
+            if radius < 0:
+                sweep = 2 * math.pi - sweep
+            radius = abs(radius)
+            offset = math.sqrt(max(0.0, radius * radius - chord * chord / 4)) / chord
+            cx = (x0 + x1) / 2 - side * offset * (y1 - y0)
+            cy = (y0 + y1) / 2 + side * offset * (x1 - x0)
+        else:
+            cx = x0 + float(values.get(first_center, 0)) * self.scale
+            cy = y0 + float(values.get(second_center, 0)) * self.scale
+            radius = math.hypot(x0 - cx, y0 - cy)
+            start = math.atan2(y0 - cy, x0 - cx)
+            end = math.atan2(y1 - cy, x1 - cx)
+            sweep = (start - end) if motion == 2 else (end - start)
+            sweep %= 2 * math.pi
+            if sweep < 1e-9:
+                sweep = 2 * math.pi
+        height = 0.0
+        if target[third] is not None and self.position[third] is not None:
+            height = target[third] - self.position[third]
+        start = math.atan2(y0 - cy, x0 - cx)
+        return cx, cy, radius, start, sweep if motion == 3 else -sweep, height
+
+    def _arrive(self, target: Dict[str, Optional[float]]) -> None:
+        for axis in AXES:
+            value = target[axis]
+            if value is None or value == self.position[axis]:
+                self.position[axis] = value
+                continue
+            self.position[axis] = value
+            self.extents[axis].add(value)
+            limits = self.machine.envelope.get(axis)
+            if limits and not limits[0] - 1e-9 <= value <= limits[1] + 1e-9:
+                self.violations[axis] = self.violations.get(axis, 0) + 1
+                if len(self.samples) < MAX_SAMPLES:
+                    self.samples.append({
+                        'line': self.lines, 'axis': axis, 'value': round(value, 4), 'limits': list(limits)
+                    })
+
+    def _cycle(self, values: Dict[str, str]) -> None:
+        """固定循环的一个孔：定位、快速到R平面、进给到孔底、退回"""
+        cycle = self.cycle
+        for letter in ('R', 'Z', 'Q'):
+            if letter in values:
+                cycle[letter] = float(values[letter]) * self.scale
+        if 'P' in values:
+            cycle['P'] = float(values['P'])
+        if cycle.get('initial') is None:
+            cycle['initial'] = self.position['Z']
+        initial = cycle['initial']
+        r_plane, bottom = cycle.get('R'), cycle.get('Z')
+        if r_plane is None or bottom is None:
+            self._warn('incompleteCycle')
+            return
+        if not self.absolute and initial is not None:
+            r_plane = initial + r_plane
+            bottom = r_plane + cycle['Z']
+
+        position = self._target({axis: values[axis] for axis in ('X', 'Y') if axis in values})
+        self._move(0, {**position, 'Z': self.position['Z']}, {})
+        if self.position['Z'] is not None:
+            self._move(0, {**self.position, 'Z': r_plane}, {})
+        else:
+            self.position['Z'] = r_plane
+        depth = abs(r_plane - bottom)
+        self._move(1, {**self.position, 'Z': bottom}, {})
+        if self.motion in DWELL_CYCLES and cycle.get('P'):
+            self.dwell_seconds += cycle['P'] / 1000.0
+        if self.motion in FEED_RETRACT_CYCLES:
+            self._move(1, {**self.position, 'Z': r_plane}, {})
+        else:
+            self._move(0, {**self.position, 'Z': r_plane}, {})
+        if self.motion == 83 and cycle.get('Q'):
+            # 每次进给后退回R平面再快速回到上次深度
+            pecks = math.ceil(depth / cycle['Q'])
+            extra = 2 * cycle['Q'] * pecks * (pecks - 1) / 2
+            self.rapid_distance += extra
+            self.rapid_minutes += extra / self.machine.rapid_rate['Z']
+        if self.cycle_return == 98 and initial is not None:
+            self._move(0, {**self.position, 'Z': initial}, {})
+
+    # ---- 其他 ----
+
+    def _dwell(self, values: Dict[str, str]) -> None:
+        if 'X' in values:
+            seconds = float(values['X'])
+        elif 'P' in values:
+            # Fanuc P为毫秒（整数），带小数点时为秒
+            text = values['P']
+            seconds = float(text) if '.' in text else float(text) / 1000.0
+        elif 'F' in values:
+            seconds = float(values['F'])
+        else:
+            return
+        self.dwell_seconds += seconds
+
+    def _spindle_speed(self) -> None:
+        speed = self.spindle_speed
+        if speed is None:
+            return
+        self.spindle.add(speed)
+        limits = self.machine.spindle_range
+        if limits and not limits[0] <= speed <= limits[1]:
+            self._warn('spindleOutOfRange')
+
+    def _tool_change(self) -> None:
+        if self.next_tool is None:
+            return
+        self.tool = self.next_tool
+        self.tool_changes += 1
+        stats = self.tools.setdefault(self.tool, {'changes': 0, 'feedDistance': 0.0, 'cutMinutes': 0.0})
+        stats['changes'] += 1
+
+    def report(self) -> Dict[str, Any]:
+        rapid_seconds = self.rapid_minutes * 60
+        feed_seconds = self.feed_minutes * 60
+        tool_change_seconds = self.tool_changes * self.machine.tool_change_time
+        total = rapid_seconds + feed_seconds + self.dwell_seconds + tool_change_seconds
+        return {
+            'machine': self.machine.name,
+            'lines': self.lines,
+            'blocks': self.blocks,
+            'rapidDistance': round(self.rapid_distance, 3),
+            'feedDistance': round(self.feed_distance, 3),
+            'rapidTime': round(rapid_seconds, 2),
+            'feedTime': round(feed_seconds, 2),
+            'dwellTime': round(self.dwell_seconds, 2),
+            'toolChangeTime': round(tool_change_seconds, 2),
+            'cycleTime': round(total, 2),
+            'cycleTimeText': format_duration(total),
+            'tools': [
+                {
+                    'tool': tool,
+                    'changes': stats['changes'],
+                    'feedDistance': round(stats['feedDistance'], 3),
+                    'cutTime': round(stats['cutMinutes'] * 60, 2)
+                }
+                for tool, stats in sorted(self.tools.items())
+            ],
+            'spindle': self.spindle.to_list(),
+            'feed': self.feeds.to_list(),
+            'extents': {axis: extent.to_list() for axis, extent in self.extents.items()},
+            'envelope': {
+                'checked': bool(self.machine.envelope),
+                'violations': dict(self.violations),
+                'samples': list(self.samples)
+            },
+            'warnings': dict(self.warnings)
+        }
+
+
+def format_duration(seconds: float) -> str:
+    """秒 -> H:MM:SS"""
+    seconds = int(round(seconds))
+    return f'{seconds // 3600}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}'
+
+
+def analyze_lines(lines: Iterable[str], machine: Optional[MachineProfile] = None) -> Dict[str, Any]:
+    return GcodeAnalyzer(machine).feed_lines(lines).report()
+
+
+def analyze_file(path, machine: Optional[MachineProfile] = None) -> Dict[str, Any]:
+    """逐行分析程序文件（不读入整个文件）"""
+    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+        report = analyze_lines(f, machine)
+    return report
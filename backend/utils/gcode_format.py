@@ -0,0 +1,243 @@
+"""
+G代码坐标批量格式化
+
+严格遵循PROJECT_REQUIREMENTS.md文档约束
+
+功能：
+- 一次调用把整组点格式化为G代码程序段，代替模板中的逐点循环
+- 小数位数、去除末尾的0（保留小数点，如 10.）
+- 模态省略：与上一段相同的坐标字不重复输出，运动指令只在第一段输出
+- 安装了NumPy时按列向量化格式化和比较，否则使用纯Python实现，两者输出一致
+
+用法（模板中）：
+    {{ rapid_moves | gcode_block('G00') }}
+    {{ gcode_block(contour, 'G01', axes='XYZ', precision=4, feed=300) }}
+    X{{ x | coord }}
+"""
+
+import time
+from typing import Any, Dict, List, Optional, Sequence
+
+from .point_array import PointArray
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+DEFAULT_PRECISION = 3
+
+# 少于该点数时纯Python更快
+NUMPY_MIN_POINTS = 256
+
+
+def _neg_zero(precision: int, trim_zeros: bool) -> tuple:
+    """负零的格式化结果及其替换值（-0.000 -> 0.000）"""
+    fmt = f'%.{precision}f'
+    neg, zero = fmt % -0.0, fmt % 0.0
+    if trim_zeros and precision > 0:
+        neg, zero = neg.rstrip('0'), zero.rstrip('0')
+    return neg, zero
+
+
+def format_coord(value: Any, precision: int = DEFAULT_PRECISION, trim_zeros: bool = True) -> str:
+    """格式化单个坐标值（10.500 -> 10.5，10.000 -> 10.）"""
+    try:
+        text = f'%.{precision}f' % float(value)
+    except (ValueError, TypeError):
+        return value
+    if trim_zeros and precision > 0:
+        text = text.rstrip('0')
+    neg, zero = _neg_zero(precision, trim_zeros)
+    return zero if text == neg else text
+
+
+def point_columns(points: Any, axes: str) -> List[Optional[Sequence]]:
+    """
+    按轴取出坐标列
+
+    支持：PointArray、惰性点阵（to_array()）、二维数组/NumPy数组（列顺序与axes一致）、列字典 {'x': [...], 'y': [...]}、
+    点字典列表 [{'x': .., 'y': ..}]、点元组列表 [(x, y)]。缺少的轴返回None。
+    """
+    if hasattr(points, 'to_array'):
+        points = points.to_array()
+    if isinstance(points, PointArray):
+        return [points.column(axis) for axis in axes]
+    if np is not None and isinstance(points, np.ndarray):
+        if points.ndim != 2:
+            raise ValueError('坐标数组必须是二维的 (点数, 轴数)')
+        return [points[:, i] if i < points.shape[1] else None for i in range(len(axes))]
+    if isinstance(points, dict):
+        return [points.get(axis.lower(), points.get(axis)) for axis in axes]
+
+    points = points if isinstance(points, (list, tuple)) else list(points)
+    if not points:
+        return [[] for _ in axes]
+    if isinstance(points[0], dict):
+        keys = [axis.lower() for axis in axes]
+        columns = []
+        for key, axis in zip(keys, axes):
+            if key not in points[0] and axis not in points[0]:
+                columns.append(None)
+                continue
+            name = key if key in points[0] else axis
+            columns.append([point.get(name) for point in points])
+        return columns
+    width = len(points[0])
+    return [[point[i] for point in points] if i < width else None for i in range(len(axes))]
+
+
+def _format_column_py(values: Sequence, precision: int, trim_zeros: bool) -> List[Optional[str]]:
+    fmt = f'%.{precision}f'
+    values = tuple(values)
+    if None in values:
+        texts = [fmt % v if v is not None else None for v in values]
+    else:
+        # 整列一次格式化，比逐个格式化快
+        texts = ((fmt + '\n') * len(values) % values).split('\n')
+        texts.pop()
+    if trim_zeros and precision > 0:
+        texts = [t.rstrip('0') if t is not None else None for t in texts]
+    neg, zero = _neg_zero(precision, trim_zeros)
+    if neg in texts:
+        texts = [zero if t == neg else t for t in texts]
+    return texts
+
+
+def _column_words_py(texts: List[Optional[str]], axis: str, modal: bool) -> List[str]:
+    """每行的坐标字（带尾随空格），省略的为空串"""
+    if None not in texts:
+        if not modal:
+            return [axis + t + ' ' for t in texts]
+        return [axis + t + ' ' if t != p else '' for t, p in zip(texts, [None] + texts[:-1])]
+    words = []
+    last = None
+    for text in texts:
+        if text is None or (modal and text == last):
+            words.append('')
+        else:
+            words.append(axis + text + ' ')
+            last = text
+    return words
+
+
+def _assemble(lines: List[str], motion: Optional[str], modal: bool, feed_word: Optional[str]) -> str:
+    if not lines:
+        return ''
+    if motion:
+        if modal:
+            lines[0] = f'{motion} {lines[0]}'
+        else:
+            lines = [f'{motion} {line}' for line in lines]
+    if feed_word:
+        lines[0] = f'{lines[0]} {feed_word}'
+    return '\n'.join(lines)
+
+
+def _block_py(columns, axes, motion, precision, trim_zeros, modal, feed_word) -> str:
+    word_columns = [
+        _column_words_py(_format_column_py(column, precision, trim_zeros), axis, modal)
+        for axis, column in zip(axes, columns) if column is not None
+    ]
+    if not word_columns:
+        return ''
+    lines = [line[:-1] for line in map(''.join, zip(*word_columns)) if line]
+    return _assemble(lines, motion, modal, feed_word)
+
+
+def _block_np(columns, axes, motion, precision, trim_zeros, modal, feed_word) -> str:
+    fmt = f'%.{precision}f'
+    neg, zero = _neg_zero(precision, trim_zeros)
+    words = None
+    for axis, column in zip(axes, columns):
+        if column is None:
+            continue
+        texts = np.char.mod(fmt, np.asarray(column, dtype=float))
+        if trim_zeros and precision > 0:
+            texts = np.char.rstrip(texts, '0')
+        texts[texts == neg] = zero
+        changed = np.ones(len(texts), dtype=bool)
+        if modal:
+            changed[1:] = texts[1:] != texts[:-1]
+        column_words = np.where(changed, np.char.add(np.char.add(axis, texts), ' '), '')
+        words = column_words if words is None else np.char.add(words, column_words)
+    if words is None:
+        return ''
+    lines = np.char.rstrip(words)
+    return _assemble(lines[lines != ''].tolist(), motion, modal, feed_word)
+
+
+def _numeric(column) -> bool:
+    if np is not None and isinstance(column, np.ndarray):
+        return True
+    return not any(v is None for v in column)
+
+
+def gcode_block(
+    points: Any,
+    motion: Optional[str] = 'G01',
+    axes: str = 'XY',
+    precision: int = DEFAULT_PRECISION,
+    trim_zeros: bool = True,
+    modal: bool = True,
+    feed: Optional[float] = None
+) -> str:
+    """
+    把整组点格式化为G代码程序段（每点一行，不含末尾换行）
+
+    Args:
+        points: 坐标点，格式见point_columns
+        motion: 运动指令（如G00/G01），为空时不输出
+        axes: 轴字母，依次对应坐标列
+        precision: 小数位数
+        trim_zeros: 是否去除末尾的0（保留小数点）
+        modal: 是否省略与上一段相同的坐标字，运动指令只在第一段输出
+        feed: 进给速度，输出在第一段末尾
+    """
+    columns = point_columns(points, axes)
+    feed_word = f'F{format_coord(feed, precision, trim_zeros)}' if feed is not None else None
+    count = max((len(c) for c in columns if c is not None), default=0)
+    if np is not None and count >= NUMPY_MIN_POINTS and all(_numeric(c) for c in columns if c is not None):
+        return _block_np(columns, axes, motion, precision, trim_zeros, modal, feed_word)
+    return _block_py(columns, axes, motion, precision, trim_zeros, modal, feed_word)
+
+
+LOOP_TEMPLATE = (
+    "{% for move in moves %}G01 X{{ move.x | coord(3, false) }} Y{{ move.y | coord(3, false) }}\n{% endfor %}"
+)
+BLOCK_TEMPLATE = "{{ moves | gcode_block('G01', modal=False, trim_zeros=False) }}\n"
+
+
+def benchmark(points: int = 100000) -> Dict[str, Any]:
+    """
+    在渲染引擎环境中对比模板逐点循环和gcode_block的渲染耗时（输出内容相同）
+
+    命令行：python -m backend.utils.gcode_format [点数]
+    """
+    import math
+    from .jinja_renderer import RenderEngine
+
+    env = RenderEngine().env
+    env.keep_trailing_newline = True
+    moves = [{'x': 50 * math.cos(i / 100), 'y': 50 * math.sin(i / 100)} for i in range(points)]
+
+    results = {}
+    outputs = {}
+    for name, source in (('loop', LOOP_TEMPLATE), ('block', BLOCK_TEMPLATE)):
+        template = env.from_string(source)
+        start = time.perf_counter()
+        outputs[name] = template.render(moves=moves)
+        results[name] = round(time.perf_counter() - start, 4)
+    return {
+        'points': points,
+        'numpy': np is not None,
+        'loopSeconds': results['loop'],
+        'blockSeconds': results['block'],
+        'speedup': round(results['loop'] / results['block'], 1) if results['block'] else None,
+        'identical': outputs['loop'] == outputs['block']
+    }
+
+
+if __name__ == '__main__':
+    import sys
+    print(benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 100000))
@@ -0,0 +1,655 @@
+"""
+G代码后处理
+
+严格遵循PROJECT_REQUIREMENTS.md文档约束
+
+功能：
+- 渲染输出逐行流过后处理阶段，不保留完整程序（内存占用与程序长度无关）
+- 每个输出在 outputs.files.<输出>.postprocess 中配置要启用的阶段及其选项
+- compact：省略重复的模态G代码、未变化的坐标字和重复的F/S，坐标按控制器分辨率取整
+- arc_fit：把落在圆弧公差带内的连续G01直线段替换为G02/G03（I/J或R）
+- 统计后处理前后的字节数
+
+配置示例（package.yaml）：
+    outputs:
+      files:
+        main_program:
+          template: "templates/main.j2"
+          postprocess:
+            compact:
+              resolution: 0.001
+"""
+
+import math
+import re
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .gcode_format import format_coord
+
+# 输出时每批合并的行数
+OUTPUT_BATCH_LINES = 512
+
+_WORD = re.compile(r'\s*([A-Za-z])\s*([-+]?(?:\d+\.?\d*|\.\d+))')
+_WORDS = re.compile(r'(?:\s*[A-Za-z]\s*[-+]?(?:\d+\.?\d*|\.\d+))*\s*')
+
+# 坐标字（绝对坐标下可按模态省略）
+AXIS_WORDS = frozenset('XYZABCUVW')
+# 数值按分辨率取整的字
+COORD_WORDS = AXIS_WORDS | frozenset('IJKR')
+
+# 模态G代码组（只有这些组中重复的代码会被省略）
+MOTION_CODES = {0, 1, 2, 3, 73, 74, 76, 80, 81, 82, 83, 84, 85, 86, 87, 88, 89}
+CYCLE_CODES = MOTION_CODES - {0, 1, 2, 3, 80}
+MODAL_GROUPS = {
+    **{code: 'motion' for code in MOTION_CODES},
+    17: 'plane', 18: 'plane', 19: 'plane',
+    90: 'distance', 91: 'distance',
+    93: 'feed_mode', 94: 'feed_mode', 95: 'feed_mode',
+    20: 'units', 21: 'units',
+    98: 'return', 99: 'return',
+    **{code: 'wcs' for code in range(54, 60)}
+}
+# 坐标字含义不同或会改变当前位置/偏置的G代码：整行原样输出，之后坐标位置未知
+RAW_CODES = {4, 10, 11, 28, 30, 52, 53, 92}
+# 刀具补偿等：不省略该行的坐标字（补偿的建立/取消与该段的移动相关）
+KEEP_AXES_CODES = {9, 40, 41, 42, 43, 44, 49, 61, 64, 68, 69}
+# G字数值文本 -> 代码（G1/G01/G1.0 都是1）；其他数值（如G54.1）不在表中
+G_CODES = {
+    text: code
+    for code in MODAL_GROUPS.keys() | RAW_CODES | KEEP_AXES_CODES
+    for text in (str(code), f'{code:02d}', f'{code}.', f'{code:02d}.', f'{code}.0', f'{code:02d}.0')
+}
+# 取整结果缓存的条目数上限
+QUANTIZE_CACHE_SIZE = 4096
+# 之后坐标位置未知的M代码（换刀、子程序调用/返回、程序结束）
+POSITION_RESET_M = {6}
+STATE_RESET_M = {2, 30, 98, 99}
+
+
+def iter_lines(pieces: Iterable[str]) -> Iterator[str]:
+    """把渲染片段拆分为行（不含换行符）；只缓存当前未结束的一行"""
+    pending = ''
+    for piece in pieces:
+        if not piece:
+            continue
+        lines = (pending + piece).split('\n')
+        pending = lines.pop()
+        yield from lines
+    if pending:
+        yield pending
+
+
+def split_comment(line: str) -> Tuple[str, Optional[str]]:
+    """拆分为程序段和行尾注释（; 或 (...)）；注释之后还有代码时注释返回None（无法解析）"""
+    positions = [i for i in (line.find(';'), line.find('(')) if i >= 0]
+    if not positions:
+        return line, ''
+    start = min(positions)
+    if line[start] == '(':
+        end = line.find(')', start)
+        tail = line[end + 1:].strip() if end >= 0 else ''
+        if tail and not tail.startswith(('(', ';')):
+            return line, None
+    return line[:start], line[start:]
+
+
+def parse_words(code: str) -> Optional[List[Tuple[str, str]]]:
+    """解析为 [(字母, 数值文本)]；含宏变量、表达式等无法解析的内容时返回None"""
+    if not _WORDS.fullmatch(code):
+        return None
+    return [(letter.upper(), value) for letter, value in _WORD.findall(code)]
+
+
+class PostProcessor:
+    """后处理阶段：逐行处理，process()为行的生成器"""
+
+    name = ''
+
+    def __init__(self, **options):
+        self.options = options
+        self.stats: Dict[str, int] = {'linesIn': 0, 'linesOut': 0}
+
+    def process(self, lines: Iterable[str]) -> Iterator[str]:
+        raise NotImplementedError
+
+    def report(self) -> Dict[str, Any]:
+        return dict(self.stats)
+
+
+class ModalCompactor(PostProcessor):
+    """
+    模态压缩
+
+    选项：
+        resolution: 坐标分辨率（如0.001），设置后坐标字按其取整；只改写带小数点的数值，取整后保留小数点
+        separator: 字之间的分隔符，默认一个空格；''为最紧凑
+        drop_blank: 是否删除空行，默认True
+        strip_comments: 是否删除注释，默认False
+
+    为保证程序行为不变：增量坐标(G91)、圆弧段、固定循环中不省略坐标字；
+    宏程序等无法解析的行以及G28/G53/G92、换刀、子程序调用之后，跟踪的状态作废。
+    """
+
+    name = 'compact'
+
+    def __init__(self, resolution: Optional[float] = None, separator: str = ' ',
+                 drop_blank: bool = True, strip_comments: bool = False, **options):
+        super().__init__(**options)
+        self.resolution = float(resolution) if resolution else None
+        self.decimals = max(0, -int(f'{self.resolution:e}'.split('e')[1])) if self.resolution else None
+        self.separator = separator
+        self.drop_blank = drop_blank
+        self.strip_comments = strip_comments
+        self.stats.update({'wordsRemoved': 0, 'linesRemoved': 0, 'quantized': 0})
+        self.modal: Dict[str, int] = {}
+        self.axes: Dict[str, str] = {}
+        self.words: Dict[str, float] = {}
+        self._quantized: Dict[str, str] = {}
+
+    def reset(self, positions_only: bool = False) -> None:
+        self.axes.clear()
+        if not positions_only:
+            self.modal.clear()
+            self.words.clear()
+
+    def quantize(self, value: str) -> str:
+        if self.resolution is None or '.' not in value:
+            return value
+        quantized = self._quantized.get(value)
+        if quantized is None:
+            if len(self._quantized) >= QUANTIZE_CACHE_SIZE:
+                self._quantized.clear()
+            quantized = format_coord(round(float(value) / self.resolution) * self.resolution, self.decimals)
+            # 分辨率>=1时也保留小数点：不带小数点的数值会按最小输入单位解释（X10 -> 0.010）
+            if '.' not in quantized:
+                quantized += '.'
+            self._quantized[value] = quantized
+        if quantized != value:
+            self.stats['quantized'] += 1
+        return quantized
+
+    def process(self, lines: Iterable[str]) -> Iterator[str]:
+        stats = self.stats
+        for line in lines:
+            stats['linesIn'] += 1
+            result = self.compact_line(line)
+            if result is None:
+                stats['linesRemoved'] += 1
+                continue
+            stats['linesOut'] += 1
+            yield result
+
+    def compact_line(self, line: str) -> Optional[str]:
+        """压缩一行，返回None表示删除该行"""
+        stripped = line.strip()
+        if not stripped:
+            return None if self.drop_blank else line
+        code, comment = split_comment(stripped)
+        words = parse_words(code) if comment is not None else None
+        if words is None or stripped.startswith('/'):
+            # 无法解析或可跳过的程序段：原样输出，之后的状态未知
+            self.reset()
+            return line
+        if self.strip_comments:
+            comment = ''
+        if not words:
+            return stripped if comment else None
+
+        kept = self._compact_words(words)
+        if kept is None:
+            return line
+        text = self.separator.join(letter + value for letter, value in kept)
+        if comment:
+            text = f'{text} {comment}' if text else comment
+        elif not kept:
+            return None
+        return text
+
+    def _compact_words(self, words: List[Tuple[str, str]]) -> Optional[List[Tuple[str, str]]]:
+        modal = self.modal
+        changes = {}
+        m_codes = []
+        keep_axes = False
+        has_arc_words = False
+        for letter, value in words:
+            if letter == 'G':
+                code = G_CODES.get(value)
+                if code is None or code in RAW_CODES:
+                    # 未知的G代码无法判断其影响，G04/G28等的坐标字含义不同：原样输出
+                    self._pass_raw(words, known=code is not None)
+                    return None
+                group = MODAL_GROUPS.get(code)
+                if group is not None:
+                    changes[group] = code
+                else:
+                    keep_axes = True
+            elif letter == 'M':
+                m_codes.append(float(value))
+            elif letter in 'IJKR':
+                has_arc_words = True
+        if words[0][0] == 'O':
+            # 新程序开始
+            self.reset()
+
+        motion = changes.get('motion', modal.get('motion'))
+        distance = changes.get('distance', modal.get('distance'))
+        in_cycle = motion in CYCLE_CODES
+        keep_axes = keep_axes or in_cycle or distance == 91 or (motion in (2, 3) and has_arc_words)
+        inverse_time = changes.get('feed_mode', modal.get('feed_mode')) == 93
+
+        axes = self.axes
+        kept = []
+        removed = 0
+        for letter, value in words:
+            if letter == 'G':
+                code = G_CODES[value]
+                if modal.get(MODAL_GROUPS.get(code)) == code:
+                    removed += 1
+                    continue
+            elif letter in COORD_WORDS:
+                value = self.quantize(value)
+                if letter in AXIS_WORDS:
+                    if not keep_axes and axes.get(letter) == value:
+                        removed += 1
+                        continue
+                    axes[letter] = value
+            elif letter == 'F' or letter == 'S':
+                number = float(value)
+                if not inverse_time and self.words.get(letter) == number:
+                    removed += 1
+                    continue
+                self.words[letter] = number
+            kept.append((letter, value))
+
+        if changes:
+            modal.update(changes)
+        if in_cycle or distance == 91:
+            # 固定循环结束时刀具停在R点或初始平面；增量坐标下不跟踪位置
+            axes.clear()
+        for code in m_codes:
+            if code in STATE_RESET_M:
+                self.reset()
+            elif code in POSITION_RESET_M:
+                self.reset(positions_only=True)
+        self.stats['wordsRemoved'] += removed
+        return kept
+
+    def _pass_raw(self, words: List[Tuple[str, str]], known: bool) -> None:
+        """原样输出的行：位置作废，同一行的模态改变（如G91 G28 Z0.中的G91）和F/S仍然生效"""
+        if not known:
+            self.reset()
+            return
+        self.reset(positions_only=True)
+        for letter, value in words:
+            if letter == 'G':
+                code = G_CODES.get(value)
+                if code is None:
+                    self.reset()
+                    return
+                group = MODAL_GROUPS.get(code)
+                if group is not None:
+                    self.modal[group] = code
+            elif letter == 'F' or letter == 'S':
+                self.words[letter] = float(value)
+            elif letter == 'M' and float(value) in STATE_RESET_M:
+                self.reset()
+                return
+
+def _circle_center(p0: Tuple[float, float], p1: Tuple[float, float], p2: Tuple[float, float]):
+    """过三点的圆心，三点共线时返回None"""
+    ax, ay = p0
+    bx, by = p1[0] - ax, p1[1] - ay
+    cx, cy = p2[0] - ax, p2[1] - ay
+    d = 2 * (bx * cy - by * cx)
+    if abs(d) < 1e-12:
+        return None
+    b2, c2 = bx * bx + by * by, cx * cx + cy * cy
+    return ax + (cy * b2 - by * c2) / d, ay + (bx * c2 - cx * b2) / d
+
+
+class ArcFitter(PostProcessor):
+    """
+    圆弧拟合：把落在同一圆弧公差带内的连续G01直线段替换为一段G02/G03
+
+    选项：
+        tolerance: 拟合公差（点到圆弧、直线段到圆弧的最大偏差），默认0.005
+        min_segments: 至少替换的直线段数，默认3
+        max_points: 拟合缓冲的最大点数（决定内存上限），默认500
+        min_radius / max_radius: 圆弧半径范围，默认0.05 ~ 5000（近似共线的点保持直线）
+        arc_format: 'ij'（圆心相对起点）或 'r'（半径，超过180度时为负），默认'ij'
+        precision: I/J/R的小数位数，默认3
+
+    只在G17平面、绝对坐标、Z不变的G01段上拟合；带注释、程序段号或其他字的行不参与拟合。
+    """
+
+    name = 'arc_fit'
+
+    def __init__(self, tolerance: float = 0.005, min_segments: int = 3, max_points: int = 500,
+                 min_radius: float = 0.05, max_radius: float = 5000.0, arc_format: str = 'ij',
+                 precision: int = 3, separator: str = ' ', **options):
+        super().__init__(**options)
+        if arc_format not in ('ij', 'r'):
+            raise ValueError("arc_format必须是 'ij' 或 'r'")
+        self.tolerance = float(tolerance)
+        self.min_segments = max(2, int(min_segments))
+        self.max_points = max(self.min_segments, int(max_points))
+        self.min_radius = float(min_radius)
+        self.max_radius = float(max_radius)
+        self.arc_format = arc_format
+        self.precision = int(precision)
+        self.separator = separator
+        self.stats.update({'arcs': 0, 'segmentsReplaced': 0})
+        # 输入程序的状态
+        self.motion: Optional[int] = None
+        self.absolute = True
+        self.xy_plane = True
+        self.position: Dict[str, float] = {}
+        self.feed: Optional[str] = None
+        # 输出中实际生效的运动指令（插入圆弧后与输入不同）
+        self.out_motion: Optional[int] = None
+        # 缓冲的直线段：起点和 (x, y, X字, Y字, F字, 原行)
+        self.run_start: Optional[Tuple[float, float]] = None
+        self.run: List[Tuple[float, float, str, str, Optional[str], str]] = []
+
+    def process(self, lines: Iterable[str]) -> Iterator[str]:
+        stats = self.stats
+        for line in lines:
+            stats['linesIn'] += 1
+            segment = self._segment(line)
+            if segment is not None:
+                if not self.run:
+                    self.run_start = (self.position['X'], self.position['Y'])
+                self.run.append(segment)
+                self.position['X'], self.position['Y'] = segment[0], segment[1]
+                if len(self.run) >= self.max_points:
+                    yield from self._flush()
+                continue
+            yield from self._flush()
+            yield from self._pass(line)
+        yield from self._flush()
+
+    def _emit(self, text: str) -> str:
+        self.stats['linesOut'] += 1
+        return text
+
+    def _segment(self, line: str):
+        """可参与拟合的G01直线段，返回 (x, y, X字, Y字, F字, 原行)，否则返回None"""
+        if (self.motion != 1 and 'G' not in line and 'g' not in line) or not self.absolute or not self.xy_plane:
+            return None
+        if 'X' not in self.position or 'Y' not in self.position:
+            return None
+        code, comment = split_comment(line.strip())
+        if comment:
+            return None
+        words = parse_words(code)
+        if not words:
+            return None
+        x_word = y_word = feed = None
+        for letter, value in words:
+            if letter == 'X':
+                x_word = value
+            elif letter == 'Y':
+                y_word = value
+            elif letter == 'G':
+                if G_CODES.get(value) != 1:
+                    return None
+            elif letter == 'F':
+                feed = value
+            elif letter == 'Z':
+                if self.position.get('Z') != float(value):
+                    return None
+            else:
+                return None
+        if self.motion != 1 and not any(letter == 'G' for letter, _ in words):
+            return None
+        if x_word is None and y_word is None:
+            return None
+        if feed is not None and self.run and feed != self.feed:
+            # 进给变化处断开
+            return None
+        self.motion = 1
+        if feed is not None:
+            self.feed = feed
+        x = float(x_word) if x_word is not None else self.position['X']
+        y = float(y_word) if y_word is not None else self.position['Y']
+        return x, y, x_word, y_word, feed, line
+
+    def _pass(self, line: str) -> Iterator[str]:
+        """原样输出不参与拟合的行并更新状态；依赖模态运动指令的行在圆弧之后补上运动指令"""
+        code, comment = split_comment(line.strip())
+        words = parse_words(code) if comment is not None else None
+        if words is None or line.lstrip().startswith('/'):
+            self.position.clear()
+            self.motion = self.out_motion = None
+            yield self._emit(line)
+            return
+
+        motion = None
+        for letter, value in words:
+            if letter == 'G':
+                code_value = G_CODES.get(value)
+                if code_value is None or code_value in RAW_CODES:
+                    self.position.clear()
+                    if code_value is None:
+                        self.motion = self.out_motion = None
+                elif MODAL_GROUPS.get(code_value) == 'motion':
+                    motion = code_value
+                elif code_value in (90, 91):
+                    self.absolute = code_value == 90
+                elif code_value in (17, 18, 19):
+                    self.xy_plane = code_value == 17
+            elif letter == 'F':
+                self.feed = value
+            elif letter == 'M' and float(value) in STATE_RESET_M | POSITION_RESET_M:
+                self.position.clear()
+
+        has_axes = any(letter in AXIS_WORDS for letter, _ in words)
+        if motion is not None:
+            self.motion = self.out_motion = motion
+        elif has_axes and self.motion is not None and self.out_motion != self.motion:
+            line = f'G{self.motion:02d}{self.separator}{line.lstrip()}'
+            self.out_motion = self.motion
+
+        if not self.absolute or self.motion in CYCLE_CODES:
+            self.position.clear()
+        elif has_axes:
+            for letter, value in words:
+                if letter in AXIS_WORDS:
+                    self.position[letter] = float(value)
+        yield self._emit(line)
+
+    def _fits(self, start: Tuple[float, float], points: List[Tuple[float, float]]):
+        """points能否用过起点的一段圆弧表示，能时返回 (圆心, 半径, 方向, 圆心角)"""
+        end = points[-1]
+        center = _circle_center(start, points[len(points) // 2], end)
+        if center is None:
+            return None
+        cx, cy = center
+        radius = math.hypot(start[0] - cx, start[1] - cy)
+        if not self.min_radius <= radius <= self.max_radius:
+            return None
+        tolerance = self.tolerance
+        direction = 0
+        sweep = 0.0
+        px, py = start[0] - cx, start[1] - cy
+        for x, y in points:
+            qx, qy = x - cx, y - cy
+            if abs(math.hypot(qx, qy) - radius) > tolerance:
+                return None
+            # 直线段中点到圆弧的距离（弦高）
+            if radius - math.hypot((px + qx) / 2, (py + qy) / 2) > tolerance:
+                return None
+            step = math.atan2(px * qy - py * qx, px * qx + py * qy)
+            sign = 1 if step > 0 else -1
+            if step == 0 or (direction and sign != direction):
+                return None
+            direction = sign
+            sweep += abs(step)
+            px, py = qx, qy
+        if sweep >= 2 * math.pi - 1e-6:
+            return None
+        return center, radius, direction, sweep
+
+    def _flush(self) -> Iterator[str]:
+        """拟合缓冲的直线段：贪心地取最长的可拟合区间，其余原样输出"""
+        run, self.run = self.run, []
+        if not run:
+            return
+        points = [(segment[0], segment[1]) for segment in run]
+        start = self.run_start
+        i = 0
+        while i < len(run):
+            best = self._longest_fit(start, points, i)
+            if best is None:
+                yield self._segment_line(run[i])
+                start = (run[i][0], run[i][1])
+                i += 1
+                continue
+            j, fit = best
+            yield self._arc_line(start, run[i:j + 1], *fit)
+            start = (run[j][0], run[j][1])
+            i = j + 1
+
+    def _longest_fit(self, start, points: List[Tuple[float, float]], i: int):
+        """从下标i开始可拟合为一段圆弧的最长区间，返回 (结束下标, 拟合结果)；先倍增再二分查找"""
+        shortest = i + self.min_segments - 1
+        if shortest >= len(points):
+            return None
+        fit = self._fits(start, points[i:shortest + 1])
+        if fit is None:
+            return None
+        best = (shortest, fit)
+        low, step = shortest, 1
+        high = None
+        while high is None:
+            j = min(low + step, len(points) - 1)
+            if j == low:
+                return best
+            fit = self._fits(start, points[i:j + 1])
+            if fit is None:
+                high = j
+            else:
+                best, low = (j, fit), j
+                step *= 2
+        while high - low > 1:
+            j = (low + high) // 2
+            fit = self._fits(start, points[i:j + 1])
+            if fit is None:
+                high = j
+            else:
+                best, low = (j, fit), j
+        return best
+
+    def _segment_line(self, segment) -> str:
+        line = segment[5]
+        if self.out_motion != 1:
+            code, _ = split_comment(line.strip())
+            if not any(letter == 'G' for letter, _ in parse_words(code)):
+                line = f'G01{self.separator}{line.lstrip()}'
+            self.out_motion = 1
+        return self._emit(line)
+
+    def _arc_line(self, start, segments, center, radius, direction, sweep) -> str:
+        end = segments[-1]
+        motion = 3 if direction > 0 else 2
+        precision = self.precision
+        words = [f'G{motion:02d}']
+        words.append(f'X{end[2] if end[2] is not None else format_coord(end[0], precision)}')
+        words.append(f'Y{end[3] if end[3] is not None else format_coord(end[1], precision)}')
+        if self.arc_format == 'r':
+            words.append(f'R{format_coord(-radius if sweep > math.pi else radius, precision)}')
+        else:
+            words.append(f'I{format_coord(center[0] - start[0], precision)}')
+            words.append(f'J{format_coord(center[1] - start[1], precision)}')
+        feed = next((segment[4] for segment in segments if segment[4] is not None), None)
+        if feed is not None:
+            words.append(f'F{feed}')
+        self.out_motion = motion
+        self.stats['arcs'] += 1
+        self.stats['segmentsReplaced'] += len(segments)
+        return self._emit(self.separator.join(words))
+
+
+POSTPROCESSORS = {
+    ModalCompactor.name: ModalCompactor,
+    ArcFitter.name: ArcFitter
+}
+
+
+class PostProcessPipeline:
+    """按配置顺序串联的后处理阶段"""
+
+    def __init__(self, config: Dict[str, Any]):
+        """
+        Args:
+            config: 阶段名 -> 选项字典（true表示使用默认选项，false表示不启用）
+        """
+        self.stages: List[PostProcessor] = []
+        for name, options in (config or {}).items():
+            if options is False or options is None:
+                continue
+            stage_class = POSTPROCESSORS.get(name)
+            if stage_class is None:
+                raise ValueError(f'未知的后处理阶段: {name}')
+            self.stages.append(stage_class(**(options if isinstance(options, dict) else {})))
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.eol = '\n'
+
+    def __bool__(self) -> bool:
+        return bool(self.stages)
+
+    def _count_input(self, pieces: Iterable[str]) -> Iterator[str]:
+        for piece in pieces:
+            self.bytes_in += len(piece.encode('utf-8'))
+            yield piece
+
+    def _source_lines(self, pieces: Iterable[str]) -> Iterator[str]:
+        first = True
+        for line in iter_lines(self._count_input(pieces)):
+            if line.endswith('\r'):
+                if first:
+                    self.eol = '\r\n'
+                line = line[:-1]
+            first = False
+            yield line
+
+    def run(self, pieces: Iterable[str]) -> Iterator[str]:
+        """处理渲染片段，按批输出处理后的文本"""
+        lines = self._source_lines(pieces)
+        for stage in self.stages:
+            lines = stage.process(lines)
+        batch = []
+        for line in lines:
+            batch.append(line)
+            if len(batch) >= OUTPUT_BATCH_LINES:
+                yield self._emit(batch)
+                batch = []
+        if batch:
+            yield self._emit(batch)
+
+    def _emit(self, batch: List[str]) -> str:
+        text = self.eol.join(batch) + self.eol
+        self.bytes_out += len(text.encode('utf-8'))
+        return text
+
+    def report(self) -> Dict[str, Any]:
+        """后处理统计：总字节数、节省的字节数和各阶段统计"""
+        saved = self.bytes_in - self.bytes_out
+        return {
+            'bytesIn': self.bytes_in,
+            'bytesOut': self.bytes_out,
+            'bytesSaved': saved,
+            'savedPercent': round(saved * 100 / self.bytes_in, 1) if self.bytes_in else 0.0,
+            'stages': {stage.name: stage.report() for stage in self.stages}
+        }
+
+
+def create_pipeline(config: Optional[Dict[str, Any]]) -> Optional[PostProcessPipeline]:
+    """按输出配置的postprocess创建后处理流水线，未配置或没有启用的阶段时返回None"""
+    if not config:
+        return None
+    if not isinstance(config, dict):
+        raise ValueError('postprocess配置必须是 阶段名 -> 选项 的字典')
+    pipeline = PostProcessPipeline(config)
+    return pipeline if pipeline else None
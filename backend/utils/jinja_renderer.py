@@ -10,9 +10,14 @@ Jinja2模板渲染引擎
 """
 
 import logging
-from jinja2 import Environment, FileSystemLoader, BaseLoader, TemplateSyntaxError
+from jinja2 import BaseLoader, TemplateSyntaxError
 from pathlib import Path
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, List, Tuple
+
+from .gcode_format import format_coord, gcode_block
+from .package_loader import create_dependency_loader
+from .render_sandbox import create_sandboxed_environment, guarded_range, limit_output
+from .toolpath_patterns import PATTERN_FILTERS, PATTERN_GLOBALS
 
 logger = logging.getLogger(__name__)
 
@@ -20,16 +25,17 @@ logger = logging.getLogger(__name__)
 class RenderEngine:
     """模板渲染引擎"""
     
-    def __init__(self, template_path: str = "."):
+    def __init__(self, template_path: str = ".", dependencies: Optional[List[Tuple[str, Path]]] = None):
         """
         初始化渲染引擎
         
         Args:
             template_path: 模板根目录路径
+            dependencies: 依赖包 (包名, 目录) 列表，按查找优先级排列
         """
         self.template_path = Path(template_path)
-        self.env = Environment(
-            loader=FileSystemLoader(str(self.template_path)),
+        self.env = create_sandboxed_environment(
+            loader=create_dependency_loader(self.template_path, dependencies),
             extensions=['jinja2.ext.do', 'jinja2.ext.loopcontrols'],
             autoescape=False,
             trim_blocks=True,
@@ -45,6 +51,9 @@ class RenderEngine:
         self.env.filters['abs'] = abs
         self.env.filters['min'] = min
         self.env.filters['max'] = max
+        self.env.filters['coord'] = format_coord
+        self.env.filters['gcode_block'] = gcode_block
+        self.env.filters.update(PATTERN_FILTERS)
         
         try:
             import math
@@ -68,12 +77,14 @@ class RenderEngine:
             self.env.globals['abs'] = abs
             self.env.globals['min'] = min
             self.env.globals['max'] = max
-            self.env.globals['range'] = range
+            self.env.globals['range'] = guarded_range
             self.env.globals['len'] = len
             self.env.globals['int'] = int
             self.env.globals['float'] = float
             self.env.globals['str'] = str
             self.env.globals['bool'] = bool
+            self.env.globals['gcode_block'] = gcode_block
+            self.env.globals.update(PATTERN_GLOBALS)
         except ImportError:
             pass
     
@@ -90,7 +101,7 @@ class RenderEngine:
         """
         try:
             template = self.env.get_template(template_path)
-            return template.render(**parameters)
+            return ''.join(limit_output(template.generate(**parameters)))
         except Exception as e:
             logger.error(f"Failed to render template {template_path}: {e}")
             raise
@@ -108,7 +119,7 @@ class RenderEngine:
         """
         try:
             template = self.env.from_string(template_content)
-            return template.render(**parameters)
+            return ''.join(limit_output(template.generate(**parameters)))
         except Exception as e:
             logger.error(f"Failed to render template string: {e}")
             raise
@@ -0,0 +1,396 @@
+"""
+模板包压缩文件处理
+
+严格遵循PROJECT_REQUIREMENTS.md文档约束
+
+功能：
+- 直接读取zip中央目录验证模板包（无需解压）
+- 防zip炸弹：条目数量、解压后大小、压缩比限制
+- 解压到packages目录旁的暂存目录，覆盖已有模板包时原子交换（renameat2 RENAME_EXCHANGE）发布
+"""
+
+import ctypes
+import errno
+import logging
+import os
+import re
+import shutil
+import stat
+import tempfile
+import uuid
+import zipfile
+from pathlib import Path, PurePosixPath
+from typing import Dict, Any, List, Optional, Tuple, Union, BinaryIO
+
+import yaml
+
+from .toolpath_ir import check_output_dialects
+
+logger = logging.getLogger(__name__)
+
+# 单个模板包大小不超过10MB（PROJECT_REQUIREMENTS.md 性能约束）
+MAX_ARCHIVE_SIZE = 10 * 1024 * 1024
+MAX_ARCHIVE_ENTRIES = 2000
+MAX_COMPRESSION_RATIO = 100
+# 批量导入时并行解压的线程数上限
+MAX_STAGE_WORKERS = 8
+
+REQUIRED_SECTIONS = ['package', 'variables', 'outputs']
+PACKAGE_NAME_PATTERN = re.compile(r'^[a-zA-Z][a-zA-Z0-9_-]*$')
+
+# 暂存/回收目录以"."开头，扫描模板包时会被跳过
+STAGING_PREFIX = '.staging-'
+TRASH_PREFIX = '.trash-'
+
+_COPY_CHUNK_SIZE = 64 * 1024
+
+# linux/fcntl.h, linux/fs.h
+_AT_FDCWD = -100
+_RENAME_EXCHANGE = 2
+# 表示"平台或文件系统不支持交换"的错误码，遇到后不再尝试
+_EXCHANGE_UNSUPPORTED_ERRNOS = {errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP}
+_exchange_supported = True
+
+
+def exchange_paths(a: Union[str, Path], b: Union[str, Path]) -> bool:
+    """
+    通过renameat2(RENAME_EXCHANGE)原子交换两个路径，两者始终都存在
+
+    Returns:
+        成功返回True；平台或文件系统不支持时返回False，两个路径保持不变
+    """
+    global _exchange_supported
+    if not _exchange_supported:
+        return False
+    try:
+        renameat2 = ctypes.CDLL(None, use_errno=True).renameat2
+    except (AttributeError, OSError):
+        _exchange_supported = False
+        return False
+
+    result = renameat2(_AT_FDCWD, os.fsencode(str(a)), _AT_FDCWD, os.fsencode(str(b)), _RENAME_EXCHANGE)
+    if result == 0:
+        return True
+    code = ctypes.get_errno()
+    if code in _EXCHANGE_UNSUPPORTED_ERRNOS:
+        _exchange_supported = False
+        return False
+    raise OSError(code, os.strerror(code), str(a))
+
+
+class ArchiveLimitError(ValueError):
+    """压缩包超出安全限制"""
+
+
+class PackageArchive:
+    """模板包zip文件"""
+
+    def __init__(
+        self,
+        source: Union[str, Path, BinaryIO],
+        max_size: int = MAX_ARCHIVE_SIZE,
+        max_entries: int = MAX_ARCHIVE_ENTRIES,
+        max_ratio: int = MAX_COMPRESSION_RATIO
+    ):
+        """
+        Args:
+            source: zip文件路径或可seek的文件对象（如上传文件流）
+            max_size: 解压后总大小上限（字节）
+            max_entries: 条目数量上限
+            max_ratio: 单个条目压缩比上限
+        """
+        self.zip = zipfile.ZipFile(source, 'r')
+        self.max_size = max_size
+        self.max_entries = max_entries
+        self.max_ratio = max_ratio
+        self.root = ''
+        self.members: List[Tuple[zipfile.ZipInfo, str]] = []
+        self.config: Optional[Dict[str, Any]] = None
+        self._validation: Optional[Dict[str, Any]] = None
+
+    def __enter__(self) -> 'PackageArchive':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self.zip.close()
+
+    @property
+    def package_name(self) -> str:
+        """包名（需先通过验证）"""
+        return self.config['package']['name']
+
+    @property
+    def total_size(self) -> int:
+        """解压后总大小"""
+        return sum(info.file_size for info, _ in self.members)
+
+    def validate(self) -> Dict[str, Any]:
+        """
+        仅通过中央目录和package.yaml验证模板包
+
+        Returns:
+            与TemplateManager.validate_package相同格式的验证结果
+        """
+        if self._validation is not None:
+            return self._validation
+
+        errors = []
+        warnings = []
+
+        infos = self.zip.infolist()
+        if len(infos) > self.max_entries:
+            errors.append(f"压缩包条目过多: {len(infos)} > {self.max_entries}")
+            return self._finish(errors, warnings)
+
+        names = set()
+        total_size = 0
+        for info in infos:
+            name = info.filename
+            if not self._is_safe_member(info):
+                errors.append(f"不安全的压缩包条目: {name}")
+                continue
+            names.add(name.rstrip('/'))
+            if info.is_dir():
+                continue
+            total_size += info.file_size
+            if info.file_size > 1024 * 1024 and info.file_size > self.max_ratio * max(info.compress_size, 1):
+                errors.append(f"压缩比异常，疑似zip炸弹: {name}")
+
+        if total_size > self.max_size:
+            errors.append(f"解压后大小超出限制: {total_size} > {self.max_size} 字节")
+        if errors:
+            return self._finish(errors, warnings)
+
+        self.root = self._detect_root(names)
+        if self.root is None:
+            self.root = ''
+            errors.append("缺少package.yaml配置文件")
+            return self._finish(errors, warnings)
+
+        self.members = [
+            (info, info.filename[len(self.root):])
+            for info in infos
+            if info.filename.startswith(self.root) and info.filename[len(self.root):].strip('/')
+        ]
+        relpaths = {rel.rstrip('/') for _, rel in self.members}
+
+        if not any(rel == 'templates' or rel.startswith('templates/') for rel in relpaths):
+            errors.append("缺少templates目录")
+
+        try:
+            config = yaml.safe_load(self.zip.read(self.root + 'package.yaml'))
+        except Exception as e:
+            errors.append(f"配置文件解析失败: {str(e)}")
+            return self._finish(errors, warnings)
+
+        if not isinstance(config, dict):
+            errors.append("配置文件格式错误")
+            return self._finish(errors, warnings)
+
+        for key in REQUIRED_SECTIONS:
+            if key not in config:
+                errors.append(f"配置文件缺少必要节: {key}")
+
+        package_name = (config.get('package') or {}).get('name')
+        if not isinstance(package_name, str) or not PACKAGE_NAME_PATTERN.match(package_name):
+            errors.append("package.name 无效，必须以字母开头，只能包含字母、数字、下划线和横线")
+
+        template_files = [rel for rel in relpaths if rel.startswith('templates/') and rel.endswith('.j2')]
+        if not template_files:
+            warnings.append("模板包中没有任何模板文件")
+
+        main_template = (config.get('templates') or {}).get('main')
+        if main_template and main_template not in relpaths:
+            warnings.append(f"主模板文件不存在: {main_template}")
+
+        errors.extend(check_output_dialects(config))
+
+        self.config = config
+        return self._finish(errors, warnings)
+
+    def stage(self, packages_dir: Union[str, Path]) -> Path:
+        """
+        解压到packages目录下的暂存目录
+
+        暂存目录与目标目录位于同一文件系统，以便随后原子重命名。
+
+        Returns:
+            暂存目录路径
+        """
+        validation = self.validate()
+        if not validation['valid']:
+            raise ValueError(f"模板包验证失败: {'; '.join(validation['errors'])}")
+
+        packages_dir = Path(packages_dir)
+        packages_dir.mkdir(parents=True, exist_ok=True)
+        staging = Path(tempfile.mkdtemp(prefix=f'{STAGING_PREFIX}{self.package_name}-', dir=str(packages_dir)))
+
+        try:
+            os.chmod(staging, 0o755)
+            written_total = 0
+            for info, rel in self.members:
+                dest = staging.joinpath(*PurePosixPath(rel).parts)
+                if info.is_dir():
+                    dest.mkdir(parents=True, exist_ok=True)
+                    continue
+                dest.parent.mkdir(parents=True, exist_ok=True)
+                written_total += self._extract_member(info, dest, self.max_size - written_total)
+            return staging
+        except Exception:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+
+    @staticmethod
+    def publish(staging: Union[str, Path], target: Union[str, Path]) -> None:
+        """
+        发布暂存目录
+
+        目标不存在时直接重命名；已存在时与暂存目录原子交换，packages/<包名>始终存在，
+        并发的渲染和加载看到的是完整的旧包或新包，交换后删除换出的旧目录。
+        平台不支持交换时退回两次rename（先移走旧目录再重命名暂存目录），
+        两次rename之间目标短暂不存在，失败时回滚旧目录。
+        """
+        staging = Path(staging)
+        target = Path(target)
+
+        if not target.exists():
+            os.rename(staging, target)
+            return
+
+        if exchange_paths(staging, target):
+            shutil.rmtree(staging, ignore_errors=True)
+            return
+
+        trash = target.with_name(f'{TRASH_PREFIX}{target.name}-{uuid.uuid4().hex[:8]}')
+        os.rename(target, trash)
+        try:
+            os.rename(staging, target)
+        except Exception:
+            os.rename(trash, target)
+            raise
+        shutil.rmtree(trash, ignore_errors=True)
+
+    def install(self, packages_dir: Union[str, Path]) -> Path:
+        """验证、解压并发布到 packages_dir/<包名>"""
+        staging = self.stage(packages_dir)
+        target = Path(packages_dir) / self.package_name
+        try:
+            self.publish(staging, target)
+        except Exception:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+        return target
+
+    def _finish(self, errors: List[str], warnings: List[str]) -> Dict[str, Any]:
+        self._validation = {
+            'valid': len(errors) == 0,
+            'errors': errors,
+            'warnings': warnings
+        }
+        return self._validation
+
+    def _detect_root(self, names: set) -> Optional[str]:
+        """定位package.yaml所在目录（根目录或唯一的顶层目录）"""
+        if 'package.yaml' in names:
+            return ''
+
+        top_levels = {name.split('/', 1)[0] for name in names}
+        if len(top_levels) == 1:
+            top = next(iter(top_levels))
+            if f'{top}/package.yaml' in names:
+                return f'{top}/'
+        return None
+
+    @staticmethod
+    def _is_safe_member(info: zipfile.ZipInfo) -> bool:
+        """检查条目路径，拒绝绝对路径、路径遍历和符号链接"""
+        name = info.filename
+        if not name or '\\' in name or name.startswith('/') or re.match(r'^[a-zA-Z]:', name):
+            return False
+        if any(part == '..' for part in name.split('/')):
+            return False
+        mode = info.external_attr >> 16
+        if mode and stat.S_ISLNK(mode):
+            return False
+        return True
+
+    def _extract_member(self, info: zipfile.ZipInfo, dest: Path, budget: int) -> int:
+        """流式解压单个条目，实际字节数超出声明值或剩余额度时中止"""
+        limit = min(info.file_size, budget)
+        written = 0
+        with self.zip.open(info) as src, open(dest, 'wb') as dst:
+            while True:
+                chunk = src.read(_COPY_CHUNK_SIZE)
+                if not chunk:
+                    break
+                written += len(chunk)
+                if written > limit:
+                    raise ArchiveLimitError(f"条目解压大小超出限制: {info.filename}")
+                dst.write(chunk)
+        return written
+
+
+def stage_worker_count(requested: Any = None) -> int:
+    """批量导入的解压线程数：限制在 1~min(8, CPU核数) 之间，未指定或无效时取上限"""
+    limit = min(MAX_STAGE_WORKERS, os.cpu_count() or 1)
+    if requested is None or isinstance(requested, bool):
+        return limit
+    try:
+        requested = int(requested)
+    except (TypeError, ValueError, OverflowError):
+        return limit
+    return max(1, min(requested, limit))
+
+
+def stage_archives(
+    sources: List[Tuple[str, Union[str, Path, BinaryIO]]],
+    packages_dir: Union[str, Path],
+    max_workers: Optional[int] = None
+) -> List[Dict[str, Any]]:
+    """
+    并行验证并解压多个模板包到暂存目录（不发布）
+
+    zlib解压和文件写入会释放GIL，因此使用有界线程池即可获得并行度，
+    同时上传的文件流无需序列化到子进程。
+
+    Args:
+        sources: (来源标识, zip路径或文件对象) 列表
+        packages_dir: 模板包根目录
+        max_workers: 线程池大小，限制在1~min(8, CPU核数)之间，默认取上限
+
+    Returns:
+        与sources顺序一致的结果列表，成功项包含name/config/staging
+    """
+    from concurrent.futures import ThreadPoolExecutor
+    import time
+
+    max_workers = stage_worker_count(max_workers)
+
+    def _stage(item: Tuple[str, Union[str, Path, BinaryIO]]) -> Dict[str, Any]:
+        label, source = item
+        start = time.perf_counter()
+        result: Dict[str, Any] = {'source': label, 'success': False}
+        try:
+            with PackageArchive(source) as archive:
+                validation = archive.validate()
+                result['validation'] = validation
+                if not validation['valid']:
+                    result['error'] = '模板包验证失败'
+                else:
+                    result['name'] = archive.package_name
+                    result['config'] = archive.config
+                    result['staging'] = archive.stage(packages_dir)
+                    result['success'] = True
+        except zipfile.BadZipFile as e:
+            result['error'] = f'无效的zip文件: {e}'
+        except Exception as e:
+            logger.warning(f"Failed to stage archive {label}: {e}")
+            result['error'] = str(e)
+        result['elapsed'] = round(time.perf_counter() - start, 4)
+        return result
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(_stage, sources))
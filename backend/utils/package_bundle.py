@@ -0,0 +1,303 @@
+"""
+模板包编译包（单文件bundle）
+
+严格遵循PROJECT_REQUIREMENTS.md文档约束
+
+功能：
+- 导入时将预解析的配置、Jinja2预编译代码和源文件清单写入单个文件
+- 加载时mmap映射，按需切片反序列化
+- 源文件比bundle新（stat不一致）时自动回退到源文件
+
+文件格式：
+    MAGIC(8字节) + 头长度(uint32 LE) + 头(JSON) + 数据区
+    头中记录各段在数据区中的 [偏移, 长度]：
+    - config: marshal编码的完整配置
+    - sources: 模板源码（utf-8）
+    - code: 按环境指纹分组的marshal编码代码对象
+"""
+
+import hashlib
+import importlib.util
+import json
+import logging
+import marshal
+import mmap
+import os
+import struct
+import tempfile
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+import jinja2
+from jinja2 import BaseLoader, FileSystemLoader
+
+logger = logging.getLogger(__name__)
+
+BUNDLE_FILENAME = '.package.bundle'
+BUNDLE_MAGIC = b'NCPKGB01'
+BUNDLE_FORMAT_VERSION = 1
+
+_HEADER_STRUCT = struct.Struct('<I')
+
+
+def environment_fingerprint(environment: jinja2.Environment) -> str:
+    """
+    计算影响模板编译结果的环境配置指纹
+
+    预编译代码只能被指纹相同的环境复用。
+    """
+    autoescape = environment.autoescape if isinstance(environment.autoescape, bool) else 'callable'
+    parts = [
+        type(environment).__name__,
+        environment.block_start_string, environment.block_end_string,
+        environment.variable_start_string, environment.variable_end_string,
+        environment.comment_start_string, environment.comment_end_string,
+        environment.line_statement_prefix, environment.line_comment_prefix,
+        environment.trim_blocks, environment.lstrip_blocks,
+        environment.newline_sequence, environment.keep_trailing_newline,
+        environment.optimized, environment.is_async, autoescape,
+        sorted(environment.extensions),
+        sorted(environment.filters), sorted(environment.tests),
+        jinja2.__version__, importlib.util.MAGIC_NUMBER.hex()
+    ]
+    return hashlib.sha256(repr(parts).encode()).hexdigest()[:16]
+
+
+def source_manifest(package_path: Union[str, Path]) -> List[List[Any]]:
+    """源文件清单：package.yaml和templates下所有文件的 [相对路径, 大小, 修改时间]"""
+    package_path = Path(package_path)
+    manifest = []
+    config_file = package_path / 'package.yaml'
+    if config_file.exists():
+        st = config_file.stat()
+        manifest.append(['package.yaml', st.st_size, st.st_mtime_ns])
+
+    templates_dir = package_path / 'templates'
+    if templates_dir.exists():
+        for root, _, files in os.walk(templates_dir):
+            for file_name in files:
+                file_path = Path(root) / file_name
+                st = file_path.stat()
+                manifest.append([file_path.relative_to(package_path).as_posix(), st.st_size, st.st_mtime_ns])
+
+    manifest.sort()
+    return manifest
+
+
+def build_bundle(
+    package_path: Union[str, Path],
+    environments: List[jinja2.Environment]
+) -> Optional[Path]:
+    """
+    为模板包生成编译包
+
+    Args:
+        package_path: 模板包目录
+        environments: 需要预编译代码的Jinja2环境（按指纹去重）
+
+    Returns:
+        bundle路径；配置含marshal不支持的类型等情况返回None
+    """
+    import yaml
+
+    package_path = Path(package_path)
+    manifest = source_manifest(package_path)
+    config_bytes = (package_path / 'package.yaml').read_bytes()
+    config = yaml.safe_load(config_bytes)
+
+    try:
+        config_data = marshal.dumps(config)
+    except ValueError as e:
+        logger.info(f"配置无法编码为bundle，跳过: {package_path}: {e}")
+        return None
+
+    chunks: List[bytes] = []
+    offset = 0
+
+    def _add(data: bytes) -> List[int]:
+        nonlocal offset
+        chunks.append(data)
+        span = [offset, len(data)]
+        offset += len(data)
+        return span
+
+    sections: Dict[str, Any] = {'config': _add(config_data), 'sources': {}, 'code': {}}
+
+    sources = {}
+    for rel, _, _ in manifest:
+        if rel.endswith('.j2'):
+            source = (package_path / rel).read_text(encoding='utf-8')
+            sources[rel] = source
+            sections['sources'][rel] = _add(source.encode('utf-8'))
+
+    for environment in environments:
+        fingerprint = environment_fingerprint(environment)
+        if fingerprint in sections['code']:
+            continue
+        compiled = {}
+        for rel, source in sources.items():
+            try:
+                code = environment.compile(source, rel, str(package_path / rel))
+            except jinja2.TemplateSyntaxError as e:
+                # 有语法错误的模板不预编译，加载时回退到源文件以便报告错误
+                logger.info(f"模板预编译失败，保留源文件加载: {rel}: {e}")
+                continue
+            compiled[rel] = _add(marshal.dumps(code))
+        sections['code'][fingerprint] = compiled
+
+    header = json.dumps({
+        'formatVersion': BUNDLE_FORMAT_VERSION,
+        'createdAt': datetime.now().isoformat(),
+        'digest': hashlib.sha256(config_bytes).hexdigest(),
+        'summary': config.get('package', {}),
+        'manifest': manifest,
+        'sections': sections
+    }, ensure_ascii=False, default=str).encode('utf-8')
+
+    bundle_path = package_path / BUNDLE_FILENAME
+    fd, temp_path = tempfile.mkstemp(prefix=f'{BUNDLE_FILENAME}.', dir=str(package_path))
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(BUNDLE_MAGIC)
+            f.write(_HEADER_STRUCT.pack(len(header)))
+            f.write(header)
+            for chunk in chunks:
+                f.write(chunk)
+        os.replace(temp_path, bundle_path)
+    except Exception:
+        if os.path.exists(temp_path):
+            os.unlink(temp_path)
+        raise
+
+    return bundle_path
+
+
+class PackageBundle:
+    """mmap映射的编译包"""
+
+    def __init__(self, bundle_path: Union[str, Path]):
+        self.path = Path(bundle_path)
+        with open(self.path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if self._mmap[:len(BUNDLE_MAGIC)] != BUNDLE_MAGIC:
+            raise ValueError(f"不是有效的bundle文件: {self.path}")
+
+        pos = len(BUNDLE_MAGIC)
+        (header_len,) = _HEADER_STRUCT.unpack(self._mmap[pos:pos + _HEADER_STRUCT.size])
+        pos += _HEADER_STRUCT.size
+        self.header = json.loads(self._mmap[pos:pos + header_len].decode('utf-8'))
+        self._data_start = pos + header_len
+
+        if self.header.get('formatVersion') != BUNDLE_FORMAT_VERSION:
+            raise ValueError(f"不支持的bundle格式版本: {self.header.get('formatVersion')}")
+
+        self.sections = self.header['sections']
+        self._code_cache: Dict[Tuple[str, str], Any] = {}
+        self._stamps = {entry[0]: entry[1:] for entry in self.header['manifest']}
+
+    def is_fresh(self, package_path: Union[str, Path]) -> bool:
+        """源文件的stat信息与bundle清单完全一致"""
+        try:
+            return source_manifest(package_path) == self.header['manifest']
+        except OSError:
+            return False
+
+    def source_stamp(self, name: str) -> Optional[Tuple[int, int]]:
+        """编译时源文件的 (大小, 修改时间)，清单中没有时返回None"""
+        stamp = self._stamps.get(name)
+        return tuple(stamp) if stamp else None
+
+    def load_config(self) -> Dict[str, Any]:
+        """反序列化完整配置"""
+        return marshal.loads(self._slice(self.sections['config']))
+
+    def get_source(self, name: str) -> Optional[str]:
+        span = self.sections['sources'].get(name)
+        return self._slice(span).decode('utf-8') if span else None
+
+    def get_code(self, fingerprint: str, name: str) -> Optional[Any]:
+        """获取预编译代码对象（同一进程内只反序列化一次）"""
+        key = (fingerprint, name)
+        code = self._code_cache.get(key)
+        if code is None:
+            span = self.sections['code'].get(fingerprint, {}).get(name)
+            if not span:
+                return None
+            code = marshal.loads(self._slice(span))
+            self._code_cache[key] = code
+        return code
+
+    def _slice(self, span: List[int]) -> bytes:
+        start = self._data_start + span[0]
+        return self._mmap[start:start + span[1]]
+
+
+_bundles: Dict[str, Tuple[int, PackageBundle]] = {}
+_bundles_lock = threading.Lock()
+
+
+def open_bundle(package_path: Union[str, Path]) -> Optional[PackageBundle]:
+    """
+    打开模板包的编译包
+
+    Returns:
+        bundle存在、格式正确且比源文件新时返回PackageBundle，否则返回None
+    """
+    bundle_path = Path(package_path) / BUNDLE_FILENAME
+    try:
+        mtime = bundle_path.stat().st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+    key = str(bundle_path)
+    with _bundles_lock:
+        cached = _bundles.get(key)
+    if cached and cached[0] == mtime:
+        bundle = cached[1]
+    else:
+        try:
+            bundle = PackageBundle(bundle_path)
+        except Exception as e:
+            logger.warning(f"Failed to open bundle {bundle_path}: {e}")
+            return None
+        with _bundles_lock:
+            _bundles[key] = (mtime, bundle)
+
+    return bundle if bundle.is_fresh(package_path) else None
+
+
+class BundleLoader(BaseLoader):
+    """优先使用编译包中预编译代码的模板加载器"""
+
+    def __init__(self, bundle: PackageBundle, fallback: BaseLoader):
+        self.bundle = bundle
+        self.fallback = fallback
+
+    def get_source(self, environment, template):
+        source = self.bundle.get_source(template)
+        if source is None:
+            return self.fallback.get_source(environment, template)
+        return source, None, lambda: True
+
+    def list_templates(self):
+        return self.fallback.list_templates()
+
+    def load(self, environment, name, globals=None):
+        code = self.bundle.get_code(environment_fingerprint(environment), name)
+        if code is None:
+            return self.fallback.load(environment, name, globals)
+        return environment.template_class.from_code(
+            environment, code, environment.make_globals(globals), lambda: True
+        )
+
+
+def create_package_loader(package_path: Union[str, Path]) -> BaseLoader:
+    """创建模板包加载器：编译包新鲜时使用BundleLoader，否则使用文件系统"""
+    fallback = FileSystemLoader(str(package_path))
+    bundle = open_bundle(package_path)
+    if bundle is None:
+        return fallback
+    return BundleLoader(bundle, fallback)
@@ -0,0 +1,190 @@
+"""
+模板包依赖加载
+
+严格遵循PROJECT_REQUIREMENTS.md文档约束
+
+功能：
+- 解析package.yaml的dependencies节，计算拓扑加载顺序
+- 组合加载器链，使 {% import %}/{% extends %} 可以访问依赖包中的模板
+- 依赖包模板的编译结果进程内共享，每个环境配置只编译一次
+
+依赖包模板的引用方式：
+    {% import 'shop_macros/templates/macros.j2' as m %}   以包名为前缀
+    {% import 'templates/macros.j2' as m %}               本包没有时按加载顺序查找依赖包
+"""
+
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+from jinja2 import BaseLoader, ChoiceLoader, FileSystemLoader, PrefixLoader
+
+from .package_bundle import create_package_loader, environment_fingerprint, open_bundle
+
+logger = logging.getLogger(__name__)
+
+
+class DependencyError(ValueError):
+    """依赖缺失或存在循环依赖"""
+
+
+def parse_dependencies(config: Dict[str, Any]) -> List[str]:
+    """
+    读取dependencies节
+
+    支持包名字符串或 {name: 包名, version: ...} 两种写法。
+    """
+    names = []
+    for entry in (config or {}).get('dependencies') or []:
+        name = entry.get('name') if isinstance(entry, dict) else entry
+        if not isinstance(name, str) or not name:
+            raise DependencyError(f"无效的依赖声明: {entry!r}")
+        if name not in names:
+            names.append(name)
+    return names
+
+
+def resolve_load_order(package_name: str, get_dependencies: Callable[[str], Optional[List[str]]]) -> List[str]:
+    """
+    计算模板包的拓扑加载顺序
+
+    Args:
+        package_name: 模板包名
+        get_dependencies: 返回指定包的直接依赖，包不存在时返回None
+
+    Returns:
+        依赖在前、自身在最后的包名列表
+
+    Raises:
+        DependencyError: 依赖包不存在或存在循环依赖
+    """
+    order: List[str] = []
+    done = set()
+    visiting: List[str] = []
+
+    def visit(name: str, parent: Optional[str]) -> None:
+        if name in done:
+            return
+        if name in visiting:
+            cycle = visiting[visiting.index(name):] + [name]
+            raise DependencyError(f"循环依赖: {' -> '.join(cycle)}")
+
+        dependencies = get_dependencies(name)
+        if dependencies is None:
+            raise DependencyError(f"模板包 {parent} 依赖的 {name} 不存在")
+
+        visiting.append(name)
+        for dependency in dependencies:
+            visit(dependency, name)
+        visiting.pop()
+        done.add(name)
+        order.append(name)
+
+    visit(package_name, None)
+    return order
+
+
+class SharedCodeCache:
+    """按（环境指纹, 模板文件, 修改时间）共享的编译代码缓存"""
+
+    def __init__(self):
+        self.entries: Dict[Tuple[str, str], Tuple[Tuple[int, int], Any]] = {}
+        self.lock = threading.Lock()
+        self.stats = {'hits': 0, 'compiles': 0}
+
+    def get_code(self, environment, filename: str, source: str, name: str, stamp: Tuple[int, int]):
+        key = (environment_fingerprint(environment), filename)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry and entry[0] == stamp:
+                self.stats['hits'] += 1
+                return entry[1]
+
+        code = environment.compile(source, name, filename)
+        with self.lock:
+            self.entries[key] = (stamp, code)
+            self.stats['compiles'] += 1
+        return code
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self.lock:
+            return {**self.stats, 'size': len(self.entries)}
+
+
+_shared_code = SharedCodeCache()
+
+
+def get_shared_code_cache() -> SharedCodeCache:
+    """获取全局共享编译代码缓存"""
+    return _shared_code
+
+
+def _stamp_uptodate(path: Path, stamp: Tuple[int, int]) -> Callable[[], bool]:
+    """源文件的 (大小, 修改时间) 仍与编译时一致"""
+    def uptodate() -> bool:
+        try:
+            st = os.stat(path)
+        except OSError:
+            return False
+        return (st.st_size, st.st_mtime_ns) == stamp
+    return uptodate
+
+
+class SharedPackageLoader(FileSystemLoader):
+    """
+    依赖包模板加载器
+
+    编译包新鲜时使用其中的预编译代码，否则编译结果放入共享缓存，
+    所有依赖该包的模板包环境复用同一份代码对象。
+    两种情况下模板都在源文件变化后过期，环境缓存的模板会重新加载。
+    """
+
+    def __init__(self, package_path: Union[str, Path]):
+        super().__init__(str(package_path))
+        self.package_path = Path(package_path)
+
+    def load(self, environment, name, globals=None):
+        globals = environment.make_globals(globals)
+
+        bundle = open_bundle(self.package_path)
+        if bundle:
+            code = bundle.get_code(environment_fingerprint(environment), name)
+            stamp = bundle.source_stamp(name)
+            if code is not None and stamp is not None:
+                return environment.template_class.from_code(
+                    environment, code, globals, _stamp_uptodate(self.package_path / name, stamp)
+                )
+
+        source, filename, uptodate = self.get_source(environment, name)
+        st = os.stat(filename)
+        code = _shared_code.get_code(environment, filename, source, name, (st.st_size, st.st_mtime_ns))
+        return environment.template_class.from_code(environment, code, globals, uptodate)
+
+
+def create_dependency_loader(
+    package_path: Union[str, Path],
+    dependencies: Optional[Sequence[Tuple[str, Union[str, Path]]]] = None
+) -> BaseLoader:
+    """
+    创建带依赖的模板包加载器
+
+    Args:
+        package_path: 模板包目录
+        dependencies: (包名, 目录) 列表，按查找优先级排列（直接依赖在前）
+
+    Returns:
+        没有依赖时与create_package_loader相同；否则依次查找本包、
+        "包名/"前缀路径、各依赖包
+    """
+    own_loader = create_package_loader(package_path)
+    if not dependencies:
+        return own_loader
+
+    dependency_loaders = [(name, SharedPackageLoader(path)) for name, path in dependencies]
+    return ChoiceLoader([
+        own_loader,
+        PrefixLoader(dict(dependency_loaders)),
+        *(loader for _, loader in dependency_loaders)
+    ])
@@ -0,0 +1,197 @@
+"""
+模板包元数据分层加载
+
+严格遵循PROJECT_REQUIREMENTS.md文档约束
+
+功能：
+- 摘要层：只解析package.yaml的package节，常驻内存，结构紧凑
+- 完整配置层：按需解析，保存在有界LRU缓存中
+- 按层统计内存占用
+"""
+
+import hashlib
+import logging
+import sys
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Tuple, Union
+
+import yaml
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONFIG_CACHE_SIZE = 128
+
+
+@dataclass(frozen=True)
+class PackageSummary:
+    """模板包摘要（列表展示所需的最小信息）"""
+    __slots__ = (
+        'name', 'display_name', 'version', 'description', 'category',
+        'tags', 'author', 'icon', 'color', 'digest'
+    )
+
+    name: str
+    display_name: str
+    version: str
+    description: str
+    category: str
+    tags: Tuple[str, ...]
+    author: str
+    icon: str
+    color: str
+    digest: str
+
+    @classmethod
+    def from_section(cls, section: Dict[str, Any], digest: str) -> 'PackageSummary':
+        """由package节构建摘要"""
+        return cls(
+            name=section['name'],
+            display_name=section['displayName'],
+            version=str(section['version']),
+            description=section['description'],
+            category=section['category'],
+            tags=tuple(section.get('tags') or ()),
+            author=section.get('author', ''),
+            icon=section.get('icon', '📦'),
+            color=section.get('color', '#2196F3'),
+            digest=digest
+        )
+
+
+def load_package_section(data: bytes) -> Dict[str, Any]:
+    """
+    只构造package.yaml顶层的package节
+
+    其他顶层节只做事件级组合（不构造Python对象），package节通常位于
+    文件开头，找到后立即停止解析，大型variables/presets节不会被读取。
+    """
+    loader = yaml.SafeLoader(data)
+    try:
+        loader.get_event()  # StreamStart
+        if not loader.check_event(yaml.DocumentStartEvent):
+            return {}
+        loader.get_event()
+        if not loader.check_event(yaml.MappingStartEvent):
+            return {}
+        loader.get_event()
+
+        while not loader.check_event(yaml.MappingEndEvent):
+            key_node = loader.compose_node(None, None)
+            if isinstance(key_node, yaml.ScalarNode) and key_node.value == 'package':
+                value_node = loader.compose_node(None, None)
+                section = loader.construct_object(value_node, deep=True)
+                return section if isinstance(section, dict) else {}
+            loader.compose_node(None, None)
+        return {}
+    finally:
+        loader.dispose()
+
+
+def load_summary(config_file: Union[str, Path]) -> PackageSummary:
+    """读取package.yaml并构建摘要"""
+    data = Path(config_file).read_bytes()
+    digest = hashlib.sha256(data).hexdigest()
+
+    try:
+        section = load_package_section(data)
+    except yaml.YAMLError:
+        section = {}
+    if not section:
+        # 非常规结构（如package节使用了跨节锚点）时回退为完整解析
+        section = (yaml.safe_load(data) or {})['package']
+
+    return PackageSummary.from_section(section, digest)
+
+
+def deep_sizeof(obj: Any, seen: Optional[set] = None) -> int:
+    """递归估算对象占用的内存（字节）"""
+    if seen is None:
+        seen = set()
+    obj_id = id(obj)
+    if obj_id in seen:
+        return 0
+    seen.add(obj_id)
+
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(deep_sizeof(k, seen) + deep_sizeof(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(deep_sizeof(item, seen) for item in obj)
+    elif hasattr(obj, '__slots__'):
+        size += sum(deep_sizeof(getattr(obj, slot), seen) for slot in obj.__slots__ if hasattr(obj, slot))
+    return size
+
+
+class ConfigCache:
+    """完整配置的有界LRU缓存"""
+
+    def __init__(self, max_entries: int = DEFAULT_CONFIG_CACHE_SIZE):
+        self.max_entries = max_entries
+        self.entries: 'OrderedDict[str, Tuple[str, Dict[str, Any], int]]' = OrderedDict()
+        self.lock = threading.RLock()
+        self.stats = {
+            'hits': 0,
+            'misses': 0,
+            'evictions': 0
+        }
+
+    def get(self, path: Union[str, Path], digest: str, loader: Callable[[], Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        获取完整配置
+
+        Args:
+            path: package.yaml路径
+            digest: 摘要层记录的文件哈希，不一致时视为过期
+            loader: 缓存未命中时的加载函数
+        """
+        key = str(path)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry and entry[0] == digest:
+                self.entries.move_to_end(key)
+                self.stats['hits'] += 1
+                return entry[1]
+            self.stats['misses'] += 1
+
+        config = loader()
+        size = deep_sizeof(config)
+
+        with self.lock:
+            self.entries[key] = (digest, config, size)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.stats['evictions'] += 1
+        return config
+
+    def invalidate(self, path: Optional[Union[str, Path]] = None) -> None:
+        """失效缓存"""
+        with self.lock:
+            if path is None:
+                self.entries.clear()
+            else:
+                self.entries.pop(str(path), None)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取缓存统计信息"""
+        with self.lock:
+            total_requests = self.stats['hits'] + self.stats['misses']
+            return {
+                **self.stats,
+                'size': len(self.entries),
+                'maxEntries': self.max_entries,
+                'bytes': sum(entry[2] for entry in self.entries.values()),
+                'hitRate': round(self.stats['hits'] / total_requests * 100, 2) if total_requests else 0
+            }
+
+
+# 全局配置缓存实例
+_config_cache = ConfigCache()
+
+
+def get_config_cache() -> ConfigCache:
+    """获取全局配置缓存实例"""
+    return _config_cache
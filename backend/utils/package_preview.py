@@ -0,0 +1,168 @@
+"""
+模板包默认预览缓存
+
+严格遵循PROJECT_REQUIREMENTS.md文档约束
+
+功能：
+- 每个模板包的默认参数渲染结果常驻内存
+- 模板包加载或变更时后台刷新
+- 读取时按间隔在后台检查文件签名（stale-while-revalidate），
+  预览接口始终只做一次内存查找
+"""
+
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RECHECK_INTERVAL = 5.0
+
+
+def package_signature(package_path: Path) -> Tuple:
+    """
+    计算模板包文件签名
+
+    只使用stat信息（路径、大小、修改时间），不读取文件内容。
+    """
+    package_path = Path(package_path)
+    entries = []
+    config_file = package_path / 'package.yaml'
+    if config_file.exists():
+        st = config_file.stat()
+        entries.append(('package.yaml', st.st_size, st.st_mtime_ns))
+
+    templates_dir = package_path / 'templates'
+    if templates_dir.exists():
+        for root, _, files in os.walk(templates_dir):
+            for file_name in files:
+                file_path = Path(root) / file_name
+                st = file_path.stat()
+                entries.append((str(file_path.relative_to(package_path)), st.st_size, st.st_mtime_ns))
+
+    entries.sort()
+    return tuple(entries)
+
+
+class DefaultPreviewCache:
+    """默认预览缓存"""
+
+    def __init__(
+        self,
+        render_func: Callable[[Any], str],
+        max_workers: int = 2,
+        recheck_interval: float = DEFAULT_RECHECK_INTERVAL
+    ):
+        """
+        Args:
+            render_func: 接收TemplatePackage，返回默认参数渲染结果
+            max_workers: 后台刷新线程数
+            recheck_interval: 读取时触发后台签名检查的最小间隔（秒）
+        """
+        self.render_func = render_func
+        self.recheck_interval = recheck_interval
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self.lock = threading.RLock()
+        self._pending = set()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='preview')
+        self.stats = {
+            'hits': 0,
+            'misses': 0,
+            'renders': 0,
+            'refreshes': 0
+        }
+
+    def get(self, package) -> Dict[str, Any]:
+        """
+        获取模板包的默认预览
+
+        已缓存时直接返回，并在超过检查间隔时安排后台刷新；
+        尚未缓存（如后台刷新还没轮到）时同步渲染一次。
+        """
+        with self.lock:
+            entry = self.entries.get(package.name)
+
+        if entry and entry['path'] == str(package.path):
+            with self.lock:
+                self.stats['hits'] += 1
+            if time.time() - entry['checkedAt'] > self.recheck_interval:
+                self.schedule(package)
+            return entry
+
+        with self.lock:
+            self.stats['misses'] += 1
+        return self.refresh(package)
+
+    def schedule(self, package) -> None:
+        """安排后台刷新（同一模板包的刷新任务不重复排队）"""
+        with self.lock:
+            if package.name in self._pending:
+                return
+            self._pending.add(package.name)
+        self._executor.submit(self._background_refresh, package)
+
+    def refresh(self, package) -> Dict[str, Any]:
+        """文件签名变化时重新渲染，否则只更新检查时间"""
+        signature = package_signature(package.path)
+
+        with self.lock:
+            entry = self.entries.get(package.name)
+            if entry and entry['path'] == str(package.path) and entry['signature'] == signature:
+                entry['checkedAt'] = time.time()
+                return entry
+
+        # 文件已变化，丢弃模板包对象上缓存的配置和默认参数
+        if entry:
+            package.reload()
+
+        start = time.perf_counter()
+        content = self.render_func(package)
+        render_time = time.perf_counter() - start
+
+        entry = {
+            'name': package.name,
+            'path': str(package.path),
+            'content': content,
+            'parameters': package.default_parameters,
+            'signature': signature,
+            'renderTime': round(render_time, 4),
+            'renderedAt': datetime.now().isoformat(),
+            'checkedAt': time.time()
+        }
+        with self.lock:
+            self.entries[package.name] = entry
+            self.stats['renders'] += 1
+        return entry
+
+    def invalidate(self, package_name: Optional[str] = None) -> None:
+        """失效缓存"""
+        with self.lock:
+            if package_name is None:
+                self.entries.clear()
+            else:
+                self.entries.pop(package_name, None)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取缓存统计信息"""
+        with self.lock:
+            return {
+                **self.stats,
+                'size': len(self.entries),
+                'pending': len(self._pending)
+            }
+
+    def _background_refresh(self, package) -> None:
+        try:
+            self.refresh(package)
+            with self.lock:
+                self.stats['refreshes'] += 1
+        except Exception as e:
+            logger.warning(f"Failed to refresh preview for {package.name}: {e}")
+        finally:
+            with self.lock:
+                self._pending.discard(package.name)
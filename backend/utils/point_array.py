@@ -0,0 +1,370 @@
+"""
+列式坐标点数组
+
+严格遵循PROJECT_REQUIREMENTS.md文档约束
+
+功能：
+- points类型参数的存储：每个轴一列 array('d')，100万个二维点约16MB
+- 从JSON点列表、CSV和.npy文件构造（.npy直接解析，不依赖NumPy）
+- 上传的点数组按内容哈希保存在arrays目录，渲染参数中用 {"$array": id} 引用，
+  渲染工作进程按引用读取，请求和进程间不传递大列表
+- 模板中可逐点迭代（每次生成一个 {'x': .., 'y': ..}），也可整列交给gcode_block
+"""
+
+import ast
+import csv
+import hashlib
+import json
+import os
+import struct
+import sys
+import threading
+from array import array
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Union
+
+ARRAY_REF_KEY = '$array'
+DEFAULT_AXES = 'xyzabc'
+MAX_CACHED_ARRAYS = 8
+MAX_UPLOAD_BYTES = int(os.environ.get('ARRAY_MAX_UPLOAD_BYTES', 64 * 1024 * 1024))
+MAX_UPLOAD_POINTS = int(os.environ.get('ARRAY_MAX_UPLOAD_POINTS', 2_000_000))
+
+_STORE_MAGIC = b'NCPTS001'
+_NPY_MAGIC = b'\x93NUMPY'
+_NPY_TYPECODES = {('f', 8): 'd', ('f', 4): 'f', ('i', 8): 'q', ('i', 4): 'i', ('i', 2): 'h', ('u', 4): 'I', ('u', 2): 'H'}
+
+
+class PointArray:
+    """列式坐标点数组（只读）"""
+
+    __slots__ = ('axes', '_columns', '_length')
+
+    def __init__(self, columns: Dict[str, array]):
+        """
+        Args:
+            columns: 轴名（小写） -> array('d')，各列长度必须相同
+        """
+        lengths = {len(column) for column in columns.values()}
+        if len(lengths) > 1:
+            raise ValueError('点数组各列长度不一致')
+        self.axes = tuple(columns)
+        self._columns = {axis: column if column.typecode == 'd' else array('d', column)
+                         for axis, column in columns.items()}
+        self._length = lengths.pop() if lengths else 0
+
+    @classmethod
+    def from_points(cls, points: List[Any], axes: Optional[str] = None) -> 'PointArray':
+        """从点字典列表 [{'x': .., 'y': ..}] 或点序列列表 [(x, y)] 构造"""
+        if not points:
+            return cls({axis: array('d') for axis in (axes or 'xy').lower()})
+        first = points[0]
+        try:
+            if isinstance(first, dict):
+                names = list(axes.lower()) if axes else [key.lower() for key in first]
+                keys = {name: name if name in first else name.upper() for name in names}
+                return cls({name: array('d', (float(point[key]) for point in points)) for name, key in keys.items()})
+            names = list((axes or DEFAULT_AXES[:len(first)]).lower())
+            return cls({name: array('d', (float(point[i]) for point in points)) for i, name in enumerate(names)})
+        except (KeyError, IndexError, TypeError, ValueError) as e:
+            raise ValueError(f'点数据格式错误: {e}')
+
+    @classmethod
+    def from_columns(cls, columns: Dict[str, Any]) -> 'PointArray':
+        """从列字典 {'x': [...], 'y': [...]} 构造"""
+        try:
+            return cls({axis.lower(): array('d', map(float, values)) for axis, values in columns.items()})
+        except (TypeError, ValueError) as e:
+            raise ValueError(f'点数据格式错误: {e}')
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __iter__(self) -> Iterator[Dict[str, float]]:
+        axes = self.axes
+        for row in zip(*(self._columns[axis] for axis in axes)):
+            yield dict(zip(axes, row))
+
+    def __getitem__(self, index: int) -> Dict[str, float]:
+        return {axis: self._columns[axis][index] for axis in self.axes}
+
+    def __eq__(self, other: Any) -> bool:
+        return isinstance(other, PointArray) and self.axes == other.axes and self._columns == other._columns
+
+    def __repr__(self) -> str:
+        return f"PointArray(axes={''.join(self.axes)!r}, length={self._length})"
+
+    def column(self, axis: str) -> Optional[array]:
+        """取出一列（不存在时返回None）"""
+        return self._columns.get(axis.lower())
+
+    @property
+    def nbytes(self) -> int:
+        return sum(column.itemsize * len(column) for column in self._columns.values())
+
+    def bounds(self) -> Dict[str, List[float]]:
+        """各轴的 [最小值, 最大值]"""
+        return {axis: [min(column), max(column)] for axis, column in self._columns.items() if column}
+
+    def digest(self) -> str:
+        """内容哈希（轴名和各列数据）"""
+        sha = hashlib.sha256(','.join(self.axes).encode())
+        for axis in self.axes:
+            sha.update(_little_endian(self._columns[axis]))
+        return sha.hexdigest()
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            'axes': ''.join(self.axes),
+            'length': self._length,
+            'bytes': self.nbytes,
+            'bounds': self.bounds()
+        }
+
+    def to_list(self) -> List[Dict[str, float]]:
+        return list(self)
+
+    def to_bytes(self) -> bytes:
+        header = json.dumps({'axes': list(self.axes), 'length': self._length}).encode()
+        parts = [_STORE_MAGIC, struct.pack('<I', len(header)), header]
+        parts.extend(_little_endian(self._columns[axis]) for axis in self.axes)
+        return b''.join(parts)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> 'PointArray':
+        if data[:8] != _STORE_MAGIC:
+            raise ValueError('不是点数组文件')
+        (header_length,) = struct.unpack_from('<I', data, 8)
+        header = json.loads(data[12:12 + header_length])
+        offset = 12 + header_length
+        size = header['length'] * 8
+        columns = {}
+        for axis in header['axes']:
+            column = array('d')
+            column.frombytes(data[offset:offset + size])
+            if sys.byteorder == 'big':
+                column.byteswap()
+            columns[axis] = column
+            offset += size
+        return cls(columns)
+
+
+def _little_endian(column: array) -> bytes:
+    if sys.byteorder == 'big':
+        column = array(column.typecode, column)
+        column.byteswap()
+    return column.tobytes()
+
+
+def _check_point_count(count: int, max_points: Optional[int]) -> None:
+    if max_points is not None and count > max_points:
+        raise ValueError(f'点数 {count} 超过上限 {max_points}')
+
+
+def parse_csv(data: Union[bytes, str], axes: Optional[str] = None, max_points: Optional[int] = None) -> PointArray:
+    """
+    解析CSV点文件
+
+    分隔符可以是逗号、分号、制表符或空白；第一行不是数字时作为列名（轴名）。
+    指定max_points时先按行数检查点数，超过上限不再逐行解析。
+    """
+    text = data.decode('utf-8-sig') if isinstance(data, bytes) else data
+    lines = [line for line in text.splitlines() if line.strip() and not line.lstrip().startswith('#')]
+    if not lines:
+        raise ValueError('CSV文件为空')
+    delimiter = next((d for d in (',', ';', '\t') if d in lines[0]), None)
+    if delimiter:
+        rows = csv.reader(lines, delimiter=delimiter)
+    else:
+        rows = (line.split() for line in lines)
+
+    rows = iter(rows)
+    first = [cell.strip() for cell in next(rows)]
+    try:
+        first_values = [float(cell) for cell in first]
+        names = list((axes or DEFAULT_AXES[:len(first)]).lower())
+    except ValueError:
+        first_values = None
+        names = [cell.lower() for cell in first]
+        if axes:
+            names = list(axes.lower())
+    _check_point_count(len(lines) - (first_values is None), max_points)
+    if len(names) > len(first):
+        raise ValueError(f'CSV列数 {len(first)} 少于轴数 {len(names)}')
+
+    columns = [array('d') for _ in names]
+    if first_values is not None:
+        for column, value in zip(columns, first_values):
+            column.append(value)
+    for number, row in enumerate(rows, start=2):
+        try:
+            for column, cell in zip(columns, row):
+                column.append(float(cell))
+        except ValueError:
+            raise ValueError(f'CSV第 {number} 行不是数字: {row}')
+        if len(row) < len(columns):
+            raise ValueError(f'CSV第 {number} 行列数不足')
+    return PointArray(dict(zip(names, columns)))
+
+
+def parse_npy(data: bytes, axes: Optional[str] = None, max_points: Optional[int] = None) -> PointArray:
+    """
+    解析.npy文件（一维/二维数值数组或字段类型相同的结构化数组）
+
+    二维数组的每一列对应一个轴；结构化数组的字段名作为轴名。
+    指定max_points时按文件头中的形状检查点数，超过上限不读取数据。
+    """
+    if data[:6] != _NPY_MAGIC:
+        raise ValueError('不是.npy文件')
+    major = data[6]
+    if major == 1:
+        (header_length,) = struct.unpack_from('<H', data, 8)
+        offset = 10
+    else:
+        (header_length,) = struct.unpack_from('<I', data, 8)
+        offset = 12
+    header = ast.literal_eval(data[offset:offset + header_length].decode('latin1'))
+    offset += header_length
+    descr, fortran, shape = header['descr'], header['fortran_order'], tuple(header['shape'])
+
+    structured = isinstance(descr, list)
+    if structured:
+        field_types = {field[1] for field in descr}
+        if len(field_types) != 1 or len(shape) != 1:
+            raise ValueError('结构化数组的字段类型必须相同')
+        names = [field[0].lower() for field in descr]
+        descr = field_types.pop()
+        count, width = shape[0], len(names)
+    else:
+        if len(shape) == 1:
+            shape = (shape[0], 1)
+        if len(shape) != 2:
+            raise ValueError('点数组必须是一维或二维的')
+        count, width = shape
+        names = None
+    _check_point_count(count, max_points)
+
+    typecode = _NPY_TYPECODES.get((descr[1], int(descr[2:])))
+    if typecode is None:
+        raise ValueError(f'不支持的数据类型: {descr}')
+    flat = array(typecode)
+    itemsize = flat.itemsize
+    flat.frombytes(data[offset:offset + count * width * itemsize])
+    if len(flat) != count * width:
+        raise ValueError('.npy文件数据不完整')
+    if (descr[0] == '>') != (sys.byteorder == 'big') and descr[0] != '|' and itemsize > 1:
+        flat.byteswap()
+
+    names = names or list((axes or DEFAULT_AXES[:width]).lower())
+    if len(names) > width:
+        raise ValueError(f'数组列数 {width} 少于轴数 {len(names)}')
+    if fortran and not structured:
+        columns = [flat[i * count:(i + 1) * count] for i in range(len(names))]
+    else:
+        columns = [flat[i::width] for i in range(len(names))]
+    return PointArray({name: array('d', column) for name, column in zip(names, columns)})
+
+
+def is_array_ref(value: Any) -> bool:
+    return isinstance(value, dict) and isinstance(value.get(ARRAY_REF_KEY), str) and len(value) == 1
+
+
+class PointArrayStore:
+    """上传的点数组（按内容哈希保存）"""
+
+    def __init__(self, root: Union[str, Path] = "arrays"):
+        self.root = Path(root)
+        self._cache: 'OrderedDict[str, PointArray]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _path(self, array_id: str) -> Path:
+        if not array_id.isalnum():
+            raise KeyError(array_id)
+        return self.root / f"{array_id}.pts"
+
+    def save(self, points: PointArray) -> Dict[str, Any]:
+        """保存点数组，返回引用和摘要信息"""
+        array_id = points.digest()[:32]
+        path = self._path(array_id)
+        if not path.exists():
+            self.root.mkdir(parents=True, exist_ok=True)
+            temp_path = path.with_suffix(f'.{os.getpid()}.tmp')
+            temp_path.write_bytes(points.to_bytes())
+            os.replace(temp_path, path)
+        return {'ref': {ARRAY_REF_KEY: array_id}, 'id': array_id, **points.describe()}
+
+    def load(self, array_id: str) -> PointArray:
+        with self._lock:
+            cached = self._cache.get(array_id)
+            if cached is not None:
+                self._cache.move_to_end(array_id)
+                return cached
+        try:
+            points = PointArray.from_bytes(self._path(array_id).read_bytes())
+        except (KeyError, OSError):
+            raise ValueError(f'点数组 {array_id} 不存在')
+        with self._lock:
+            self._cache[array_id] = points
+            while len(self._cache) > MAX_CACHED_ARRAYS:
+                self._cache.popitem(last=False)
+        return points
+
+    def exists(self, array_id: str) -> bool:
+        try:
+            return self._path(array_id).exists()
+        except KeyError:
+            return False
+
+
+def points_parameters(variables: Dict[str, Any]) -> Dict[str, Optional[str]]:
+    """
+    模板包中points类型的参数
+
+    Returns:
+        参数名（同时包含 name 和 group.name 两种写法） -> 轴名（未配置时为None）
+    """
+    names = {}
+    for group_name, group in ((variables or {}).get('groups') or {}).items():
+        for name, config in (group.get('parameters') or {}).items():
+            if config.get('type') == 'points':
+                names[name] = names[f'{group_name}.{name}'] = config.get('axes')
+    return names
+
+
+def to_point_array(value: Any, axes: Optional[str] = None, store: Optional[PointArrayStore] = None) -> PointArray:
+    """把参数值（点数组引用、点列表或列字典）转换为PointArray"""
+    if isinstance(value, PointArray):
+        return value
+    if is_array_ref(value):
+        return (store or get_array_store()).load(value[ARRAY_REF_KEY])
+    if isinstance(value, dict):
+        return PointArray.from_columns(value)
+    if isinstance(value, (list, tuple)):
+        return PointArray.from_points(list(value), axes)
+    raise ValueError('points参数必须是点列表、列字典或点数组引用')
+
+
+def prepare_parameters(
+    parameters: Dict[str, Any],
+    point_names: Dict[str, Optional[str]],
+    store: Optional[PointArrayStore] = None
+) -> Dict[str, Any]:
+    """渲染前转换参数：points类型参数和点数组引用转换为PointArray"""
+    prepared = None
+    for name, value in parameters.items():
+        if is_array_ref(value) or (name in point_names and isinstance(value, (list, tuple, dict))):
+            if prepared is None:
+                prepared = dict(parameters)
+            prepared[name] = to_point_array(value, point_names.get(name), store)
+    return prepared if prepared is not None else parameters
+
+
+_array_store: Optional[PointArrayStore] = None
+
+
+def get_array_store() -> PointArrayStore:
+    """获取全局点数组目录"""
+    global _array_store
+    if _array_store is None:
+        _array_store = PointArrayStore()
+    return _array_store
@@ -0,0 +1,294 @@
+"""
+程序拆分
+
+严格遵循PROJECT_REQUIREMENTS.md文档约束
+
+功能：
+- 超过字节数或程序段数上限的输出拆分为一个主程序和若干编号的子程序，供程序存储容量有限的控制器使用
+- 一次流式处理：子程序边生成边写入输出缓冲区（可落盘），内存中最多保留一个子程序的内容
+- 按方言生成子程序头尾和调用：Fanuc（O号/M99/M98 P）、西门子840D（SPF/M17/按名调用）、
+  海德汉（BEGIN PGM/END PGM/CALL PGM）
+- 未超过上限的程序原样输出
+
+拆分只发生在程序的顶层：循环（WHILE/DO、FOR、REPEAT、LOOP）和IF块内部不拆分；
+跨文件的跳转（GOTO、标记）无法保持，使用跳转的程序不应配置拆分。
+"""
+
+import re
+from pathlib import PurePath
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+# 子程序头尾和调用语句占用的字节数余量
+PART_OVERHEAD = 64
+
+_PERCENT = '%'
+_FANUC_NUMBER = re.compile(r'^\s*O(\d+)', re.IGNORECASE)
+_PROGRAM_END = {
+    'fanuc': re.compile(r'(?<![A-Z0-9.])M0*(2|30|99)(?![0-9.])'),
+    'siemens': re.compile(r'(?<![A-Z0-9.])(M0*(2|30|17)(?![0-9.])|RET\b)'),
+    'heidenhain': re.compile(r'\bEND\s+PGM\b|(?<![A-Z0-9.])M0*(2|30)(?![0-9.])')
+}
+# 块结构的开始和结束（单行的 REPEAT 标记、IF ... GOTO、CALL LBL 不算）
+_BLOCK_OPEN = re.compile(r'\b(WHILE|FOR|LOOP|DO\d+)\b|^\s*(N\d+\s*)?REPEAT\s*$')
+_BLOCK_CLOSE = re.compile(r'\b(ENDWHILE|ENDFOR|UNTIL|ENDLOOP|ENDIF|END\d+)\b')
+_SIEMENS_IF = re.compile(r'^\s*(N\d+\s*)?IF\b(?!.*\bGOTO[FBC]?\b)')
+_HEIDENHAIN_LBL = re.compile(r'(?<!CALL )\bLBL\s+(?!0\b)')
+_HEIDENHAIN_LBL_END = re.compile(r'(?<!CALL )\bLBL\s+0\b')
+_HEIDENHAIN_NUMBER = re.compile(r'^\s*\d+\s*')
+
+DIALECTS = ('fanuc', 'siemens', 'heidenhain')
+
+
+def _code_part(line: str) -> str:
+    """去掉注释后的大写程序段"""
+    for mark in (';', '('):
+        index = line.find(mark)
+        if index >= 0:
+            line = line[:index]
+    return line.upper()
+
+
+class ProgramSplitter:
+    """
+    按字节数/程序段数把程序拆分为主程序和子程序
+
+    用法：
+        splitter = ProgramSplitter('fanuc', max_bytes=200 * 1024)
+        main_lines = splitter.split(lines, 'O1000.nc', open_part)
+    open_part() 返回带 write(text) / finish(filename) / abort() 的输出缓冲区（如SpooledOutput）。
+    """
+
+    def __init__(
+        self,
+        dialect: str = 'fanuc',
+        max_bytes: Optional[int] = None,
+        max_blocks: Optional[int] = None,
+        first_number: Optional[int] = None
+    ):
+        """
+        Args:
+            dialect: fanuc / siemens / heidenhain
+            max_bytes: 每个程序的字节数上限（UTF-8，包括子程序头尾）
+            max_blocks: 每个程序的程序段数上限
+            first_number: Fanuc第一个子程序号，默认为主程序号+1（没有主程序号时为1001）
+        """
+        if dialect not in DIALECTS:
+            raise ValueError(f'未知的程序拆分方言: {dialect}')
+        if not max_bytes and not max_blocks:
+            raise ValueError('程序拆分需要设置max_bytes或max_blocks')
+        if max_bytes and max_bytes <= PART_OVERHEAD * 2:
+            raise ValueError(f'max_bytes必须大于 {PART_OVERHEAD * 2}')
+        self.dialect = dialect
+        self.max_bytes = int(max_bytes) - PART_OVERHEAD if max_bytes else None
+        self.max_blocks = int(max_blocks) if max_blocks else None
+        self.first_number = int(first_number) if first_number else None
+        self.parts: List[Dict[str, Any]] = []
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> 'ProgramSplitter':
+        """由输出配置的split创建"""
+        return cls(
+            dialect=config.get('dialect', 'fanuc'),
+            max_bytes=config.get('max_bytes'),
+            max_blocks=config.get('max_blocks'),
+            first_number=config.get('first_number')
+        )
+
+    def split(self, lines: Iterable[str], filename: str, open_part: Callable[[], Any]) -> List[str]:
+        """
+        拆分程序
+
+        Args:
+            lines: 程序的行（不含换行符）
+            filename: 主程序文件名（子程序名和扩展名由此得出）
+            open_part: 创建子程序输出缓冲区
+
+        Returns:
+            主程序的行；子程序的结果（finish()的返回值）在self.parts中
+        """
+        self._filename = filename
+        self._open_part = open_part
+        self._percent = False
+        self._header: Optional[str] = None
+        self._footer: List[str] = []
+        self._pending: Optional[List[str]] = []
+        self._output = None
+        self._part_bytes = 0
+        self._part_blocks = 0
+        self.parts = []
+
+        program_end = _PROGRAM_END[self.dialect]
+        depth = 0
+        started = False
+        try:
+            for line in lines:
+                stripped = line.strip()
+                if stripped == _PERCENT:
+                    self._percent = True
+                    continue
+                if self._footer:
+                    self._footer.append(line)
+                    continue
+                if not started and stripped:
+                    started = True
+                    if self._is_header(stripped):
+                        self._header = line
+                        continue
+                code = _code_part(stripped)
+                if depth == 0 and program_end.search(code):
+                    self._footer.append(line)
+                    continue
+                if depth == 0 and stripped and self._full(len(line.encode('utf-8')) + 1):
+                    self._next_part()
+                self._write(line)
+                depth += self._block_change(code)
+                depth = max(depth, 0)
+        except BaseException:
+            if self._output is not None:
+                self._output.abort()
+            raise
+
+        if self._pending is not None:
+            # 未超过上限：原样输出
+            main = ([_PERCENT] if self._percent else []) + ([self._header] if self._header is not None else [])
+            main += self._pending + self._footer
+            return main + ([_PERCENT] if self._percent else [])
+        self._close_part()
+        return self._main_program()
+
+    def _block_change(self, code: str) -> int:
+        """该行使块结构深度的变化（+1/-1/0）"""
+        if self.dialect == 'heidenhain':
+            opened, closed = _HEIDENHAIN_LBL.search(code), _HEIDENHAIN_LBL_END.search(code)
+        else:
+            opened = _BLOCK_OPEN.search(code) or (self.dialect == 'siemens' and _SIEMENS_IF.search(code))
+            closed = _BLOCK_CLOSE.search(code)
+        return (1 if opened else 0) - (1 if closed else 0)
+
+    def _is_header(self, line: str) -> bool:
+        if self.dialect == 'fanuc':
+            return bool(_FANUC_NUMBER.match(line))
+        if self.dialect == 'heidenhain':
+            return 'BEGIN PGM' in line.upper()
+        return False
+
+    def _full(self, size: int) -> bool:
+        if self._part_blocks == 0:
+            return False
+        if self.max_blocks and self._part_blocks >= self.max_blocks:
+            return True
+        return bool(self.max_bytes) and self._part_bytes + size > self.max_bytes
+
+    def _write(self, line: str) -> None:
+        if self.dialect == 'heidenhain' and self._pending is None:
+            line = self._renumber(line)
+        if self._pending is not None:
+            self._pending.append(line)
+        else:
+            self._output.write(line + '\n')
+        self._part_bytes += len(line.encode('utf-8')) + 1
+        if line.strip():
+            self._part_blocks += 1
+
+    def _renumber(self, line: str) -> str:
+        self._block_number += 1
+        return f'{self._block_number} {_HEIDENHAIN_NUMBER.sub("", line, count=1)}'
+
+    def _next_part(self) -> None:
+        """结束当前子程序，开始下一个；第一次拆分时先把缓存的内容写成第一个子程序"""
+        if self._pending is not None:
+            pending, self._pending = self._pending, None
+            self._open_next()
+            for line in pending:
+                self._write(line)
+        self._close_part()
+        self._open_next()
+
+    def _open_next(self) -> None:
+        self._output = self._open_part()
+        self._block_number = 0
+        self._part_bytes = 0
+        self._part_blocks = 0
+        name = self._part_name(len(self.parts) + 1)
+        self.parts.append({'name': name, 'filename': self._part_filename(name)})
+        if self._percent:
+            self._output.write(_PERCENT + '\n')
+        for line in self._part_begin(name):
+            self._output.write(line + '\n')
+
+    def _close_part(self) -> None:
+        part = self.parts[-1]
+        for line in self._part_end(part['name']):
+            self._output.write(line + '\n')
+        if self._percent:
+            self._output.write(_PERCENT + '\n')
+        part.update(self._output.finish(part['filename']))
+        self._output = None
+
+    def _stem(self) -> str:
+        stem = re.sub(r'[^A-Za-z0-9_]', '_', PurePath(self._filename).stem).upper()
+        return stem or 'PROGRAM'
+
+    def _part_name(self, index: int) -> str:
+        if self.dialect == 'fanuc':
+            return f'O{self._fanuc_number(index):04d}'
+        return f'{self._stem()}_{index}'
+
+    def _fanuc_number(self, index: int) -> int:
+        if self.first_number:
+            return self.first_number + index - 1
+        match = _FANUC_NUMBER.match(self._header or '')
+        return (int(match.group(1)) if match else 1000) + index
+
+    def _part_filename(self, name: str) -> str:
+        if self.dialect == 'siemens':
+            return f'{name}.SPF'
+        if self.dialect == 'heidenhain':
+            return f'{name}.H'
+        return name + (PurePath(self._filename).suffix or '.nc')
+
+    def _part_begin(self, name: str) -> List[str]:
+        if self.dialect == 'fanuc':
+            return [name]
+        if self.dialect == 'heidenhain':
+            return [f'0 BEGIN PGM {name} MM']
+        return [f'; {name}']
+
+    def _part_end(self, name: str) -> List[str]:
+        if self.dialect == 'fanuc':
+            return ['M99']
+        if self.dialect == 'heidenhain':
+            return [f'{self._block_number + 1} END PGM {name} MM']
+        return ['M17']
+
+    def _call(self, name: str) -> str:
+        if self.dialect == 'fanuc':
+            return f'M98 P{name[1:]}'
+        if self.dialect == 'heidenhain':
+            return f'CALL PGM {name}'
+        return name
+
+    def _main_program(self) -> List[str]:
+        calls = [self._call(part['name']) for part in self.parts]
+        lines = [_PERCENT] if self._percent else []
+        if self.dialect == 'heidenhain':
+            name = PurePath(self._filename).stem
+            header = self._header if self._header is not None else f'0 BEGIN PGM {name} MM'
+            body = calls + [line for line in self._footer if 'END PGM' not in line.upper()]
+            lines.append(f'0 {_HEIDENHAIN_NUMBER.sub("", header, count=1)}')
+            lines += [f'{number} {_HEIDENHAIN_NUMBER.sub("", line, count=1)}' for number, line in enumerate(body, 1)]
+            lines.append(f'{len(body) + 1} END PGM {name} MM')
+        else:
+            if self._header is not None:
+                lines.append(self._header)
+            lines += calls + self._footer
+        if self._percent:
+            lines.append(_PERCENT)
+        return lines
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            'dialect': self.dialect,
+            'parts': len(self.parts),
+            'subprograms': [part['filename'] for part in self.parts]
+        }
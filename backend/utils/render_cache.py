@@ -62,6 +62,7 @@ class RenderCache:
             'validate': 600,    # 10分钟
             'variables': 1200,   # 20分钟
             'preview': 60,      # 1分钟
+            'geometry': 3600,   # 1小时（按内容哈希，内容不变结果不变）
             'syntax': 300        # 5分钟
         }
     
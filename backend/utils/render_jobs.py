@@ -0,0 +1,442 @@
+"""
+异步渲染任务队列
+
+严格遵循PROJECT_REQUIREMENTS.md文档约束
+
+功能：
+- 提交后立即返回任务ID，渲染在请求线程之外执行
+- 进度（完成数/总数）和预计剩余时间
+- 取消在条目之间生效（已提交的条目完成后停止）
+- 任务状态和每个条目的结果保存在本地SQLite中：
+  进程重启后，心跳超时的任务被重新认领，已完成的条目不再重复渲染
+"""
+
+import json
+import logging
+import multiprocessing
+import os
+import queue
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+from .batch_render import canonical_request_key, default_worker_count, run_batch
+
+logger = logging.getLogger(__name__)
+
+JOB_STATUSES = ('pending', 'running', 'completed', 'failed', 'cancelled')
+FINISHED_STATUSES = ('completed', 'failed', 'cancelled')
+
+DEFAULT_HEARTBEAT_TIMEOUT = 30.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    user TEXT,
+    status TEXT NOT NULL,
+    total INTEGER NOT NULL,
+    completed INTEGER NOT NULL DEFAULT 0,
+    failed INTEGER NOT NULL DEFAULT 0,
+    base_completed INTEGER NOT NULL DEFAULT 0,
+    current TEXT,
+    message TEXT,
+    requests TEXT NOT NULL,
+    cancel_requested INTEGER NOT NULL DEFAULT 0,
+    owner TEXT,
+    heartbeat REAL,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL
+);
+CREATE TABLE IF NOT EXISTS job_results (
+    job_id TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    key TEXT NOT NULL,
+    success INTEGER NOT NULL,
+    result TEXT,
+    error TEXT,
+    elapsed REAL,
+    PRIMARY KEY (job_id, idx)
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status);
+"""
+
+
+class JobNotFoundError(LookupError):
+    """渲染任务不存在"""
+
+
+class RenderJobStore:
+    """基于SQLite的渲染任务存储"""
+
+    def __init__(self, path: Union[str, Path] = "jobs/render_jobs.db"):
+        self.path = Path(path)
+        self._local = threading.local()
+        self._init_lock = threading.Lock()
+        self._initialized = False
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            with self._init_lock:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                conn = sqlite3.connect(str(self.path), timeout=30, isolation_level=None)
+                conn.row_factory = sqlite3.Row
+                conn.execute('PRAGMA journal_mode=WAL')
+                conn.execute('PRAGMA synchronous=NORMAL')
+                if not self._initialized:
+                    conn.executescript(_SCHEMA)
+                    self._initialized = True
+            self._local.conn = conn
+        return conn
+
+    def create(self, requests: List[Dict[str, Any]], kind: str = 'batch', user: Optional[str] = None) -> Dict[str, Any]:
+        """创建任务"""
+        job_id = uuid.uuid4().hex
+        self._conn().execute(
+            'INSERT INTO jobs (id, kind, user, status, total, requests, created_at) VALUES (?, ?, ?, ?, ?, ?, ?)',
+            (job_id, kind, user, 'pending', len(requests), json.dumps(requests, ensure_ascii=False), time.time())
+        )
+        return self.get(job_id)
+
+    def get(self, job_id: str) -> Dict[str, Any]:
+        """获取任务状态（不含请求内容）"""
+        row = self._conn().execute(
+            'SELECT id, kind, user, status, total, completed, failed, base_completed, current, message, '
+            'cancel_requested, owner, heartbeat, created_at, started_at, finished_at FROM jobs WHERE id = ?',
+            (job_id,)
+        ).fetchone()
+        if row is None:
+            raise JobNotFoundError(f"渲染任务不存在: {job_id}")
+        return dict(row)
+
+    def get_requests(self, job_id: str) -> List[Dict[str, Any]]:
+        row = self._conn().execute('SELECT requests FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        if row is None:
+            raise JobNotFoundError(f"渲染任务不存在: {job_id}")
+        return json.loads(row['requests'])
+
+    def claim(self, job_id: str, owner: str, heartbeat_timeout: float = DEFAULT_HEARTBEAT_TIMEOUT) -> bool:
+        """
+        认领任务
+
+        只能认领等待中的任务，或心跳超时（原执行进程已退出）的运行中任务。
+        """
+        now = time.time()
+        conn = self._conn()
+        done = conn.execute('SELECT COUNT(*) FROM job_results WHERE job_id = ?', (job_id,)).fetchone()[0]
+        cursor = conn.execute(
+            "UPDATE jobs SET status = 'running', owner = ?, heartbeat = ?, started_at = ?, base_completed = ? "
+            "WHERE id = ? AND (status = 'pending' OR (status = 'running' AND heartbeat < ?))",
+            (owner, now, now, done, job_id, now - heartbeat_timeout)
+        )
+        return cursor.rowcount == 1
+
+    def record(
+        self,
+        job_id: str,
+        indices: List[int],
+        key: str,
+        success: bool,
+        result: Any,
+        error: Optional[str],
+        elapsed: float,
+        current: Optional[str] = None
+    ) -> None:
+        """记录一个（去重后可能对应多个下标的）条目结果并更新进度和心跳"""
+        conn = self._conn()
+        payload = json.dumps(result, ensure_ascii=False) if result is not None else None
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            inserted = 0
+            for index in indices:
+                cursor = conn.execute(
+                    'INSERT OR IGNORE INTO job_results (job_id, idx, key, success, result, error, elapsed) '
+                    'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                    (job_id, index, key, int(success), payload, error, elapsed)
+                )
+                inserted += cursor.rowcount
+            conn.execute(
+                'UPDATE jobs SET completed = completed + ?, failed = failed + ?, current = ?, heartbeat = ? '
+                'WHERE id = ?',
+                (inserted, 0 if success else inserted, current, time.time(), job_id)
+            )
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+    def heartbeat(self, job_id: str) -> None:
+        self._conn().execute('UPDATE jobs SET heartbeat = ? WHERE id = ?', (time.time(), job_id))
+
+    def finish(self, job_id: str, status: str, message: Optional[str] = None) -> None:
+        self._conn().execute(
+            'UPDATE jobs SET status = ?, message = ?, finished_at = ?, current = NULL WHERE id = ?',
+            (status, message, time.time(), job_id)
+        )
+
+    def request_cancel(self, job_id: str) -> bool:
+        """
+        请求取消任务
+
+        等待中的任务直接标记为已取消；运行中的任务由执行线程在下一个条目前停止。
+
+        Returns:
+            任务尚未结束、取消请求已记录时返回True
+        """
+        self.get(job_id)
+        conn = self._conn()
+        now = time.time()
+        cursor = conn.execute(
+            "UPDATE jobs SET status = 'cancelled', cancel_requested = 1, finished_at = ?, message = ? "
+            "WHERE id = ? AND status = 'pending'",
+            (now, '任务已取消', job_id)
+        )
+        if cursor.rowcount:
+            return True
+        cursor = conn.execute(
+            "UPDATE jobs SET cancel_requested = 1 WHERE id = ? AND status = 'running'", (job_id,)
+        )
+        return cursor.rowcount == 1
+
+    def is_cancel_requested(self, job_id: str) -> bool:
+        row = self._conn().execute('SELECT cancel_requested FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        return bool(row and row['cancel_requested'])
+
+    def done_indices(self, job_id: str) -> set:
+        rows = self._conn().execute('SELECT idx FROM job_results WHERE job_id = ?', (job_id,))
+        return {row['idx'] for row in rows}
+
+    def results(self, job_id: str, offset: int = 0, limit: int = 100) -> List[Dict[str, Any]]:
+        """按请求下标分页读取条目结果"""
+        rows = self._conn().execute(
+            'SELECT idx, key, success, result, error, elapsed FROM job_results WHERE job_id = ? '
+            'ORDER BY idx LIMIT ? OFFSET ?',
+            (job_id, limit, offset)
+        )
+        return [{
+            'index': row['idx'],
+            'key': row['key'],
+            'success': bool(row['success']),
+            'data': json.loads(row['result']) if row['result'] else None,
+            'error': row['error'],
+            'elapsed': row['elapsed']
+        } for row in rows]
+
+    def resumable_jobs(self, heartbeat_timeout: float = DEFAULT_HEARTBEAT_TIMEOUT) -> List[str]:
+        """等待中或心跳超时的运行中任务（按创建时间排序）"""
+        rows = self._conn().execute(
+            "SELECT id FROM jobs WHERE status = 'pending' OR (status = 'running' AND heartbeat < ?) "
+            "ORDER BY created_at",
+            (time.time() - heartbeat_timeout,)
+        )
+        return [row['id'] for row in rows]
+
+
+class RenderJobQueue:
+    """渲染任务队列"""
+
+    def __init__(
+        self,
+        store: RenderJobStore,
+        task_factory: Callable[[Dict[str, Any]], Tuple[Callable, tuple]],
+        executor_factory: Callable[[Dict[str, Any]], Any],
+        max_concurrent_jobs: int = 2,
+        heartbeat_timeout: float = DEFAULT_HEARTBEAT_TIMEOUT
+    ):
+        """
+        Args:
+            store: 任务存储
+            task_factory: 将单个请求解析为 (函数, 参数)，失败时抛出异常（该条目记为失败）
+            executor_factory: 接收任务状态，返回执行该任务条目的执行器
+            max_concurrent_jobs: 同时执行的任务数
+            heartbeat_timeout: 超过该时间没有心跳的运行中任务视为执行进程已退出
+        """
+        self.store = store
+        self.task_factory = task_factory
+        self.executor_factory = executor_factory
+        self.max_concurrent_jobs = max_concurrent_jobs
+        self.heartbeat_timeout = heartbeat_timeout
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._queue: 'queue.Queue[str]' = queue.Queue()
+        self._threads: List[threading.Thread] = []
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        """启动调度线程并恢复未完成的任务（渲染工作进程中不启动）"""
+        if multiprocessing.parent_process() is not None:
+            return
+        with self._lock:
+            if self._threads:
+                return
+            for i in range(self.max_concurrent_jobs):
+                thread = threading.Thread(target=self._worker, name=f'render-job-{i}', daemon=True)
+                thread.start()
+                self._threads.append(thread)
+        self.recover()
+
+    def submit(self, requests: List[Dict[str, Any]], kind: str = 'batch', user: Optional[str] = None) -> Dict[str, Any]:
+        """提交任务，立即返回任务状态"""
+        self.start()
+        job = self.store.create(requests, kind=kind, user=user)
+        self._queue.put(job['id'])
+        return self.progress(job['id'])
+
+    def cancel(self, job_id: str) -> bool:
+        """请求取消任务"""
+        return self.store.request_cancel(job_id)
+
+    def recover(self) -> int:
+        """将等待中和心跳超时的任务放入本进程队列"""
+        job_ids = self.store.resumable_jobs(self.heartbeat_timeout)
+        for job_id in job_ids:
+            self._queue.put(job_id)
+        if job_ids:
+            logger.info(f"恢复 {len(job_ids)} 个未完成的渲染任务")
+        return len(job_ids)
+
+    def progress(self, job_id: str) -> Dict[str, Any]:
+        """任务进度（含预计剩余时间）"""
+        job = self.store.get(job_id)
+        total = job['total']
+        completed = job['completed']
+        now = time.time()
+
+        eta = None
+        elapsed = None
+        if job['started_at']:
+            elapsed = (job['finished_at'] or now) - job['started_at']
+            done_this_run = completed - job['base_completed']
+            if job['status'] == 'running' and done_this_run > 0:
+                eta = round(elapsed / done_this_run * (total - completed), 2)
+            elif job['status'] in FINISHED_STATUSES:
+                eta = 0
+
+        message = job['message']
+        if not message and job['status'] == 'running' and job['cancel_requested']:
+            message = '正在取消'
+
+        return {
+            'jobId': job['id'],
+            'kind': job['kind'],
+            'status': job['status'],
+            'progress': round(completed / total * 100, 1) if total else 100.0,
+            'completed_files': completed,
+            'total_files': total,
+            'failed_files': job['failed'],
+            'current_file': job['current'],
+            'message': message,
+            'eta': eta,
+            'elapsed': round(elapsed, 2) if elapsed is not None else None,
+            'createdAt': datetime.fromtimestamp(job['created_at']).isoformat(),
+            'startedAt': datetime.fromtimestamp(job['started_at']).isoformat() if job['started_at'] else None,
+            'finishedAt': datetime.fromtimestamp(job['finished_at']).isoformat() if job['finished_at'] else None
+        }
+
+    def results(self, job_id: str, offset: int = 0, limit: int = 100) -> List[Dict[str, Any]]:
+        self.store.get(job_id)
+        return self.store.results(job_id, offset, limit)
+
+    def _heartbeat_loop(self, job_id: str, stop: threading.Event) -> None:
+        while not stop.wait(self.heartbeat_timeout / 3):
+            try:
+                self.store.heartbeat(job_id)
+            except Exception as e:
+                logger.warning(f"Failed to update heartbeat for render job {job_id}: {e}")
+
+    def _worker(self) -> None:
+        while True:
+            try:
+                job_id = self._queue.get(timeout=self.heartbeat_timeout)
+            except queue.Empty:
+                # 空闲时接管其他进程遗留的任务
+                try:
+                    self.recover()
+                except Exception as e:
+                    logger.warning(f"Failed to recover render jobs: {e}")
+                continue
+            try:
+                self.run(job_id)
+            except Exception as e:
+                logger.error(f"渲染任务执行失败: {job_id}, 错误: {e}")
+                try:
+                    self.store.finish(job_id, 'failed', str(e))
+                except Exception:
+                    pass
+
+    def run(self, job_id: str) -> Optional[str]:
+        """
+        执行任务（已被其他进程认领或已结束时直接返回None）
+
+        Returns:
+            任务最终状态
+        """
+        if not self.store.claim(job_id, self.owner, self.heartbeat_timeout):
+            return None
+
+        job = self.store.get(job_id)
+        requests = self.store.get_requests(job_id)
+        done = self.store.done_indices(job_id)
+
+        unique: Dict[str, Dict[str, Any]] = {}
+        indices: Dict[str, List[int]] = {}
+        for index, item in enumerate(requests):
+            if index in done:
+                continue
+            key = canonical_request_key(item['templateName'], item.get('parameters') or {})
+            if key not in unique:
+                unique[key] = item
+                indices[key] = []
+            indices[key].append(index)
+
+        cancelled = threading.Event()
+
+        def tasks():
+            for key, item in unique.items():
+                # 取消在条目之间生效
+                if self.store.is_cancel_requested(job_id):
+                    cancelled.set()
+                    return
+                try:
+                    func, args = self.task_factory(item)
+                except Exception as e:
+                    self.store.record(job_id, indices[key], key, False, None, str(e), 0.0, item['templateName'])
+                    continue
+                yield key, func, args
+
+        # 单个条目耗时较长时也保持心跳，避免被其他进程误认领
+        stop_heartbeat = threading.Event()
+        heartbeat = threading.Thread(
+            target=self._heartbeat_loop, args=(job_id, stop_heartbeat), name='render-job-heartbeat', daemon=True
+        )
+        heartbeat.start()
+        try:
+            for key, result, error, elapsed in run_batch(self.executor_factory(job), tasks(), default_worker_count()):
+                item = unique[key]
+                if error is not None:
+                    self.store.record(job_id, indices[key], key, False, None, str(error), elapsed,
+                                      item['templateName'])
+                else:
+                    success = bool(result.get('success')) if isinstance(result, dict) else True
+                    error_message = None if success else result.get('error', '渲染失败')
+                    self.store.record(job_id, indices[key], key, success, result, error_message, elapsed,
+                                      item['templateName'])
+        finally:
+            stop_heartbeat.set()
+
+        job = self.store.get(job_id)
+        if job['completed'] < job['total'] and (cancelled.is_set() or job['cancel_requested']):
+            status, message = 'cancelled', f"任务已取消（完成 {job['completed']}/{job['total']}）"
+        elif job['total'] and job['failed'] == job['total']:
+            status, message = 'failed', '所有条目渲染失败'
+        else:
+            status, message = 'completed', f"完成 {job['completed'] - job['failed']}/{job['total']}，失败 {job['failed']}"
+        self.store.finish(job_id, status, message)
+        logger.info(f"渲染任务 {job_id} 结束: {status}")
+        return status
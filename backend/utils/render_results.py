@@ -0,0 +1,223 @@
+"""
+渲染结果落盘
+
+严格遵循PROJECT_REQUIREMENTS.md文档约束
+
+功能：
+- 渲染输出在生成过程中写入缓冲区，超过阈值后转写到结果目录
+- 小输出仍直接内联返回，大输出返回下载句柄（大小、行数、SHA-256）
+- 句柄按ID下载，过期结果自动清理
+"""
+
+import json
+import logging
+import os
+import re
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Union
+
+from .render_stream import StreamStats
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SPILL_THRESHOLD = 1024 * 1024
+DEFAULT_RESULT_TTL = 24 * 3600
+CLEANUP_INTERVAL = 600
+
+_RESULT_ID = re.compile(r'^[0-9a-f]{32}$')
+
+
+class SpooledOutput:
+    """
+    单个渲染输出的缓冲区
+
+    内容先保存在内存中，累计超过阈值后把已有内容和后续内容写入临时文件。
+    """
+
+    def __init__(self, store: 'RenderResultStore'):
+        self.store = store
+        self.stats = StreamStats()
+        self.result_id = uuid.uuid4().hex
+        self._buffer: List[str] = []
+        self._file = None
+        self._temp_path: Optional[Path] = None
+
+    @property
+    def spilled(self) -> bool:
+        return self._file is not None
+
+    def write(self, chunk: str) -> None:
+        if not chunk:
+            return
+        self.stats.update(chunk)
+        if self._file is not None:
+            self._file.write(chunk)
+            return
+        self._buffer.append(chunk)
+        if self.stats.bytes > self.store.spill_threshold:
+            self._spill()
+
+    def _spill(self) -> None:
+        self.store.root.mkdir(parents=True, exist_ok=True)
+        self._temp_path = self.store.root / f".{self.result_id}.tmp"
+        self._file = open(self._temp_path, 'w', encoding='utf-8', newline='')
+        self._file.writelines(self._buffer)
+        self._buffer = []
+
+    def finish(self, filename: str) -> Dict[str, Any]:
+        """
+        结束写入
+
+        Returns:
+            内联时为 {'content', 'size', 'lines', 'sha256'}，
+            落盘时为 {'content': '', 'spilled': True, 'handle': {...}, ...}
+        """
+        stats = self.stats.to_dict()
+        summary = {'size': stats['bytes'], 'lines': stats['lines'], 'sha256': stats['sha256']}
+        if self._file is None:
+            return {'content': ''.join(self._buffer), **summary}
+
+        self._file.close()
+        handle = self.store._publish(self.result_id, self._temp_path, filename, summary)
+        return {'content': '', 'spilled': True, 'handle': handle, **summary}
+
+    def abort(self) -> None:
+        """放弃输出（渲染失败时删除临时文件）"""
+        self._buffer = []
+        if self._file is not None:
+            self._file.close()
+            self._temp_path.unlink(missing_ok=True)
+            self._file = None
+
+
+class RenderResultStore:
+    """渲染结果目录"""
+
+    def __init__(
+        self,
+        root: Union[str, Path] = "results",
+        spill_threshold: int = DEFAULT_SPILL_THRESHOLD,
+        ttl: float = DEFAULT_RESULT_TTL
+    ):
+        """
+        Args:
+            root: 结果目录
+            spill_threshold: 超过该字节数（UTF-8）的输出落盘
+            ttl: 落盘结果保留时间（秒）
+        """
+        self.root = Path(root)
+        self.spill_threshold = spill_threshold
+        self.ttl = ttl
+        self._last_cleanup = 0.0
+        self._lock = threading.Lock()
+
+    def spool(self) -> SpooledOutput:
+        return SpooledOutput(self)
+
+    def render_to(self, pieces: Iterable[str], filename: str) -> Dict[str, Any]:
+        """将Template.generate()产生的片段写入缓冲区，返回内联内容或下载句柄"""
+        output = self.spool()
+        try:
+            for piece in pieces:
+                output.write(piece)
+        except BaseException:
+            output.abort()
+            raise
+        return output.finish(filename)
+
+    def _publish(self, result_id: str, temp_path: Path, filename: str, summary: Dict[str, Any]) -> Dict[str, Any]:
+        meta = {
+            'id': result_id,
+            'filename': filename,
+            'created': time.time(),
+            **summary
+        }
+        os.replace(temp_path, self._data_path(result_id))
+        meta_path = self._meta_path(result_id)
+        temp_meta = meta_path.with_name(f".{result_id}.json.tmp")
+        temp_meta.write_text(json.dumps(meta, ensure_ascii=False), encoding='utf-8')
+        os.replace(temp_meta, meta_path)
+        self._maybe_cleanup()
+        return {
+            'id': result_id,
+            'filename': filename,
+            'size': summary['size'],
+            'lines': summary['lines'],
+            'sha256': summary['sha256'],
+            'url': f"/api/render/results/{result_id}"
+        }
+
+    def _data_path(self, result_id: str) -> Path:
+        return self.root / f"{result_id}.out"
+
+    def _meta_path(self, result_id: str) -> Path:
+        return self.root / f"{result_id}.json"
+
+    def get(self, result_id: str) -> Optional[Dict[str, Any]]:
+        """获取结果元数据，不存在或已过期时返回None"""
+        if not _RESULT_ID.match(result_id or ''):
+            return None
+        try:
+            meta = json.loads(self._meta_path(result_id).read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            return None
+        if time.time() - meta.get('created', 0) > self.ttl or not self._data_path(result_id).exists():
+            return None
+        return meta
+
+    def path(self, result_id: str) -> Path:
+        """结果内容文件路径（调用前先用get检查）"""
+        return self._data_path(result_id)
+
+    def delete(self, result_id: str) -> None:
+        if not _RESULT_ID.match(result_id or ''):
+            return
+        self._meta_path(result_id).unlink(missing_ok=True)
+        self._data_path(result_id).unlink(missing_ok=True)
+
+    def cleanup(self) -> int:
+        """删除过期结果和遗留的临时文件，返回删除的结果数"""
+        if not self.root.exists():
+            return 0
+        now = time.time()
+        removed = 0
+        for entry in os.scandir(self.root):
+            name = entry.name
+            try:
+                if name.endswith('.tmp'):
+                    # 超过保留时间仍未完成的临时文件视为写入进程已退出
+                    if now - entry.stat().st_mtime > self.ttl:
+                        os.unlink(entry.path)
+                elif name.endswith('.json') and now - entry.stat().st_mtime > self.ttl:
+                    self.delete(name[:-len('.json')])
+                    removed += 1
+            except OSError:
+                continue
+        return removed
+
+    def _maybe_cleanup(self) -> None:
+        with self._lock:
+            if time.time() - self._last_cleanup < CLEANUP_INTERVAL:
+                return
+            self._last_cleanup = time.time()
+        try:
+            removed = self.cleanup()
+            if removed:
+                logger.info(f"清理过期渲染结果: {removed} 个")
+        except Exception as e:
+            logger.warning(f"清理渲染结果失败: {str(e)}")
+
+
+_result_store: Optional[RenderResultStore] = None
+
+
+def get_result_store() -> RenderResultStore:
+    """获取全局渲染结果目录（阈值可由RENDER_SPILL_THRESHOLD环境变量设置，单位字节）"""
+    global _result_store
+    if _result_store is None:
+        threshold = int(os.environ.get('RENDER_SPILL_THRESHOLD', DEFAULT_SPILL_THRESHOLD))
+        _result_store = RenderResultStore(spill_threshold=threshold)
+    return _result_store
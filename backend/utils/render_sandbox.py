@@ -0,0 +1,375 @@
+"""
+渲染沙箱与受限渲染进程池
+
+严格遵循PROJECT_REQUIREMENTS.md文档约束
+
+功能：
+- 模板在Jinja2沙箱环境中执行，range()按循环次数预算计数
+- 单次渲染的耗时、输出大小和循环次数上限
+- 渲染进程池：每个工作进程独立管理，超时的渲染只终止它所在的进程，
+  不影响其他进程上的渲染
+- 工作进程渲染一定次数或内存超过阈值后回收重建
+"""
+
+import logging
+import multiprocessing
+import os
+import queue
+import signal
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import contextmanager
+from dataclasses import dataclass, replace
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional
+
+from jinja2.sandbox import SandboxedEnvironment
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RENDER_TIMEOUT = 60.0
+DEFAULT_MAX_OUTPUT_CHARS = 128 * 1024 * 1024
+DEFAULT_MAX_LOOP_ITERATIONS = 10_000_000
+DEFAULT_MAX_TASKS_PER_WORKER = 500
+DEFAULT_MAX_WORKER_MEMORY_MB = 1024
+
+# 工作进程未响应超时信号时，额外等待的时间（秒）后强制终止
+KILL_GRACE = 2.0
+
+
+class RenderLimitError(RuntimeError):
+    """渲染超出资源限制"""
+
+
+class RenderTimeoutError(RenderLimitError):
+    """渲染超时"""
+
+
+class WorkerCrashedError(RuntimeError):
+    """渲染工作进程异常退出"""
+
+
+@dataclass
+class RenderLimits:
+    """单次渲染的资源限制"""
+    timeout: float = DEFAULT_RENDER_TIMEOUT
+    max_output_chars: int = DEFAULT_MAX_OUTPUT_CHARS
+    max_loop_iterations: int = DEFAULT_MAX_LOOP_ITERATIONS
+
+    @classmethod
+    def from_env(cls) -> 'RenderLimits':
+        """从环境变量RENDER_TIMEOUT、RENDER_MAX_OUTPUT_CHARS、RENDER_MAX_LOOP_ITERATIONS读取"""
+        return cls(
+            timeout=float(os.environ.get('RENDER_TIMEOUT', DEFAULT_RENDER_TIMEOUT)),
+            max_output_chars=int(os.environ.get('RENDER_MAX_OUTPUT_CHARS', DEFAULT_MAX_OUTPUT_CHARS)),
+            max_loop_iterations=int(os.environ.get('RENDER_MAX_LOOP_ITERATIONS', DEFAULT_MAX_LOOP_ITERATIONS))
+        )
+
+
+class _Guard:
+    __slots__ = ('limits', 'deadline', 'output', 'iterations')
+
+    def __init__(self, limits: RenderLimits):
+        self.limits = limits
+        self.deadline = time.monotonic() + limits.timeout if limits.timeout else None
+        self.output = 0
+        self.iterations = 0
+
+
+_local = threading.local()
+
+
+def _current_guard() -> Optional[_Guard]:
+    return getattr(_local, 'guard', None)
+
+
+def _raise_timeout(signum, frame):
+    raise RenderTimeoutError('渲染超时')
+
+
+@contextmanager
+def guarded(limits: RenderLimits):
+    """
+    在限制下执行渲染
+
+    主线程中（渲染工作进程）用SIGALRM中断超时的渲染；
+    其他线程中在产生输出和调用range()时检查耗时。
+    """
+    previous = _current_guard()
+    _local.guard = _Guard(limits)
+    use_alarm = (
+        limits.timeout and hasattr(signal, 'setitimer')
+        and threading.current_thread() is threading.main_thread()
+    )
+    if use_alarm:
+        old_handler = signal.signal(signal.SIGALRM, _raise_timeout)
+        signal.setitimer(signal.ITIMER_REAL, limits.timeout)
+    try:
+        yield _local.guard
+    finally:
+        if use_alarm:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, old_handler)
+        _local.guard = previous
+
+
+def guarded_range(*args) -> range:
+    """计入循环次数预算并检查耗时的range()；不在受限渲染中时只限制单次调用的长度"""
+    result = range(*args)
+    guard = _current_guard()
+    limit = guard.limits.max_loop_iterations if guard else DEFAULT_MAX_LOOP_ITERATIONS
+    count = len(result)
+    if guard:
+        guard.iterations += count
+        count = guard.iterations
+        if guard.deadline is not None and time.monotonic() > guard.deadline:
+            raise RenderTimeoutError('渲染超时')
+    if count > limit:
+        raise RenderLimitError(f'循环次数超过上限 {limit}')
+    return result
+
+
+def limit_output(pieces: Iterable[str]) -> Iterator[str]:
+    """统计Template.generate()的输出，超过大小上限或超时时中止渲染"""
+    guard = _current_guard()
+    if guard is None:
+        yield from pieces
+        return
+    max_output = guard.limits.max_output_chars
+    for piece in pieces:
+        guard.output += len(piece)
+        if guard.output > max_output:
+            raise RenderLimitError(f'输出超过上限 {max_output} 字符')
+        if guard.deadline is not None and time.monotonic() > guard.deadline:
+            raise RenderTimeoutError('渲染超时')
+        yield piece
+
+
+def guarded_lazy(pieces: Iterable[str], limits: RenderLimits) -> Iterator[str]:
+    """
+    在限制下惰性渲染（消费方按自己的进度取片段，如DNC传输）
+
+    超时只计算生成片段所用的时间，消费方处理片段和等待的时间不计入；
+    不使用SIGALRM，超时在产生输出时检查。
+    """
+    iterator = iter(pieces)
+    remaining = limits.timeout or None
+    with guarded(replace(limits, timeout=0)) as guard:
+        while True:
+            started = time.monotonic()
+            if remaining is not None:
+                guard.deadline = started + remaining
+            try:
+                piece = next(iterator)
+            except StopIteration:
+                return
+            if remaining is not None:
+                remaining -= time.monotonic() - started
+                guard.deadline = None
+            yield piece
+
+
+class RenderSandboxEnvironment(SandboxedEnvironment):
+    """渲染沙箱：另外限制字符串/列表重复和大整数幂运算的结果大小"""
+
+    intercepted_binops = frozenset(['*', '**'])
+
+    def call_binop(self, context, operator: str, left: Any, right: Any) -> Any:
+        guard = _current_guard()
+        max_output = guard.limits.max_output_chars if guard else DEFAULT_MAX_OUTPUT_CHARS
+        if operator == '*':
+            for sequence, count in ((left, right), (right, left)):
+                if isinstance(sequence, (str, list, tuple)) and isinstance(count, int) \
+                        and len(sequence) * count > max_output:
+                    raise RenderLimitError(f'重复结果超过上限 {max_output}')
+        elif operator == '**' and isinstance(left, int) and isinstance(right, int) \
+                and abs(left) > 1 and right * abs(left).bit_length() > 65536:
+            raise RenderLimitError('幂运算结果过大')
+        return super().call_binop(context, operator, left, right)
+
+
+def create_sandboxed_environment(**options) -> SandboxedEnvironment:
+    """创建沙箱环境：模板不能访问下划线属性和不安全的方法，range()计入循环预算"""
+    env = RenderSandboxEnvironment(**options)
+    env.globals['range'] = guarded_range
+    return env
+
+
+def _peak_memory_mb() -> float:
+    if resource is None:
+        return 0.0
+    # Linux上ru_maxrss单位为KB
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _worker_main(conn, limits: RenderLimits) -> None:
+    """渲染工作进程主循环：接收 (函数, 参数)，返回 (成功, 结果或异常, 峰值内存MB)"""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    while True:
+        try:
+            message = conn.recv()
+        except (EOFError, OSError):
+            return
+        if message is None:
+            return
+        func, args = message
+        try:
+            with guarded(limits):
+                reply = (True, func(*args))
+        except BaseException as e:
+            reply = (False, e)
+        try:
+            conn.send((*reply, _peak_memory_mb()))
+        except Exception as e:
+            # 结果或异常无法序列化
+            conn.send((False, RuntimeError(f'{type(e).__name__}: {e}'), _peak_memory_mb()))
+
+
+class _Worker:
+    """父进程一侧的工作进程句柄"""
+
+    def __init__(self, context, limits: RenderLimits):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=_worker_main, args=(child_conn, limits), daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.tasks = 0
+
+    def stop(self, kill: bool = False) -> None:
+        if not kill:
+            try:
+                self.conn.send(None)
+            except (OSError, ValueError):
+                kill = True
+        if kill:
+            self.process.kill()
+        self.process.join(timeout=5)
+        self.conn.close()
+
+
+class RenderWorkerPool:
+    """
+    受限渲染进程池（submit接口与Executor一致）
+
+    每个工作进程由一个调度线程独占管理：
+    超时未返回的渲染会终止该进程并以RenderTimeoutError结束，
+    进程渲染满max_tasks_per_worker次或峰值内存超过max_memory_mb后回收，下次使用时重建。
+    """
+
+    def __init__(
+        self,
+        max_workers: int,
+        limits: Optional[RenderLimits] = None,
+        max_tasks_per_worker: int = DEFAULT_MAX_TASKS_PER_WORKER,
+        max_memory_mb: float = DEFAULT_MAX_WORKER_MEMORY_MB,
+        mp_context=None
+    ):
+        self.max_workers = max(1, max_workers)
+        self.limits = limits or RenderLimits()
+        self.max_tasks_per_worker = max_tasks_per_worker
+        self.max_memory_mb = max_memory_mb
+        self.context = mp_context or multiprocessing.get_context('spawn')
+        self.tasks: 'queue.Queue' = queue.Queue()
+        self.stats = {'completed': 0, 'failed': 0, 'timeouts': 0, 'crashes': 0, 'recycled': 0, 'started': 0}
+        self._stats_lock = threading.Lock()
+        self._shutdown = False
+        self._threads = [
+            threading.Thread(target=self._run_slot, name=f'render-worker-{i}', daemon=True)
+            for i in range(self.max_workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, func: Callable, *args) -> Future:
+        if self._shutdown:
+            raise RuntimeError('渲染进程池已关闭')
+        future: Future = Future()
+        self.tasks.put((future, func, args))
+        return future
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._shutdown = True
+        for _ in self._threads:
+            self.tasks.put(None)
+        if wait:
+            for thread in self._threads:
+                thread.join()
+
+    def _count(self, key: str) -> None:
+        with self._stats_lock:
+            self.stats[key] += 1
+
+    def _run_slot(self) -> None:
+        worker: Optional[_Worker] = None
+        try:
+            while True:
+                task = self.tasks.get()
+                if task is None:
+                    return
+                future, func, args = task
+                if not future.set_running_or_notify_cancel():
+                    continue
+                if worker is None:
+                    worker = _Worker(self.context, self.limits)
+                    self._count('started')
+                worker = self._execute(worker, future, func, args)
+        finally:
+            if worker is not None:
+                worker.stop()
+
+    def _execute(self, worker: _Worker, future: Future, func: Callable, args: tuple) -> Optional[_Worker]:
+        """在工作进程中执行一个渲染，返回仍可继续使用的工作进程（或None）"""
+        try:
+            worker.conn.send((func, args))
+            wait_time = self.limits.timeout + KILL_GRACE if self.limits.timeout else None
+            if not worker.conn.poll(wait_time):
+                # 渲染卡在无法被信号中断的位置：终止该进程
+                worker.stop(kill=True)
+                self._count('timeouts')
+                future.set_exception(RenderTimeoutError(f'渲染超时（{self.limits.timeout}秒），已终止渲染进程'))
+                return None
+            ok, payload, memory_mb = worker.conn.recv()
+        except (EOFError, OSError) as e:
+            worker.stop(kill=True)
+            self._count('crashes')
+            future.set_exception(WorkerCrashedError(f'渲染进程异常退出: {e}'))
+            return None
+        except Exception as e:
+            # 任务无法序列化，工作进程不受影响
+            future.set_exception(e)
+            return worker
+
+        if ok:
+            self._count('completed')
+            future.set_result(payload)
+        else:
+            self._count('timeouts' if isinstance(payload, RenderTimeoutError) else 'failed')
+            future.set_exception(payload)
+
+        worker.tasks += 1
+        if worker.tasks >= self.max_tasks_per_worker or (self.max_memory_mb and memory_mb > self.max_memory_mb):
+            logger.info(f"回收渲染进程: 已渲染 {worker.tasks} 次, 峰值内存 {memory_mb:.0f}MB")
+            worker.stop()
+            self._count('recycled')
+            return None
+        return worker
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            return {
+                'maxWorkers': self.max_workers,
+                'queued': self.tasks.qsize(),
+                'limits': {
+                    'timeout': self.limits.timeout,
+                    'maxOutputChars': self.limits.max_output_chars,
+                    'maxLoopIterations': self.limits.max_loop_iterations
+                },
+                'maxTasksPerWorker': self.max_tasks_per_worker,
+                'maxMemoryMb': self.max_memory_mb,
+                **self.stats
+            }
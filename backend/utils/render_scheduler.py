@@ -0,0 +1,229 @@
+"""
+渲染优先级调度
+
+严格遵循PROJECT_REQUIREMENTS.md文档约束
+
+功能：
+- 三个优先级：interactive（实时预览） > single（单次渲染） > batch（批量渲染）
+- 同一优先级内按用户轮转，每个用户每次只取一个条目（公平分配）
+- 调度粒度为单个条目：批量任务不长期占用工作进程，
+  空出的工作进程总是先分给更高优先级的条目（在条目边界抢占）
+- 工作进程多于一个时保留一个只给interactive使用，批量渲染占满其余工作进程
+- 按优先级统计排队等待时间
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from concurrent.futures import Future
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+from .batch_render import default_worker_count, get_render_executor
+
+logger = logging.getLogger(__name__)
+
+PRIORITY_CLASSES = ('interactive', 'single', 'batch')
+
+WAIT_SAMPLE_SIZE = 2000
+
+
+class _Item:
+    __slots__ = ('future', 'func', 'args', 'priority', 'submitted')
+
+    def __init__(self, future: Future, func: Callable, args: tuple, priority: str):
+        self.future = future
+        self.func = func
+        self.args = args
+        self.priority = priority
+        self.submitted = time.perf_counter()
+
+
+class RenderScheduler:
+    """按优先级和用户公平分配工作进程的渲染调度器"""
+
+    def __init__(
+        self,
+        executor_factory: Callable[[], Any],
+        max_workers: int,
+        interactive_reserve: Optional[int] = None
+    ):
+        """
+        Args:
+            executor_factory: 返回实际执行渲染的执行器（进程池）
+            max_workers: 同时执行的条目数（与执行器工作进程数一致）
+            interactive_reserve: 只给interactive使用的工作进程数，默认工作进程多于一个时保留1个
+        """
+        self.executor_factory = executor_factory
+        self.max_workers = max(1, max_workers)
+        if interactive_reserve is None:
+            interactive_reserve = 1 if self.max_workers > 1 else 0
+        self.interactive_reserve = min(interactive_reserve, self.max_workers - 1)
+
+        # 执行器中已完成的任务会在add_done_callback内同步回调，需要可重入锁
+        self.lock = threading.RLock()
+        # 优先级 -> 用户 -> 条目队列；OrderedDict的顺序即轮转顺序
+        self.queues: Dict[str, 'OrderedDict[str, Deque[_Item]]'] = {
+            priority: OrderedDict() for priority in PRIORITY_CLASSES
+        }
+        self.running = {priority: 0 for priority in PRIORITY_CLASSES}
+        self.waits: Dict[str, Deque[float]] = {
+            priority: deque(maxlen=WAIT_SAMPLE_SIZE) for priority in PRIORITY_CLASSES
+        }
+        self.counters = {priority: {'submitted': 0, 'completed': 0} for priority in PRIORITY_CLASSES}
+
+    def submit(self, priority: str, user: Optional[str], func: Callable, *args) -> Future:
+        """提交一个条目，返回其Future"""
+        if priority not in PRIORITY_CLASSES:
+            raise ValueError(f"未知的优先级: {priority}")
+
+        future: Future = Future()
+        item = _Item(future, func, args, priority)
+        with self.lock:
+            user_queue = self.queues[priority].get(user or '')
+            if user_queue is None:
+                user_queue = self.queues[priority][user or ''] = deque()
+            user_queue.append(item)
+            self.counters[priority]['submitted'] += 1
+            self._dispatch()
+        return future
+
+    @contextmanager
+    def slot(self, priority: str, user: Optional[str] = None, timeout: Optional[float] = None):
+        """
+        占用一个工作进程名额，在调用线程中执行渲染（如流式输出）
+
+        与普通条目一起按优先级和用户轮转排队，退出上下文时释放。
+        """
+        future = self.submit(priority, user, None)
+        try:
+            future.result(timeout=timeout)
+        except BaseException:
+            # 超时或中断：仍在排队则撤销，已分配则立即归还
+            if not future.cancel():
+                self._release(priority)
+            raise
+        try:
+            yield
+        finally:
+            self._release(priority)
+
+    def _release(self, priority: str) -> None:
+        with self.lock:
+            self.running[priority] -= 1
+            self.counters[priority]['completed'] += 1
+            self._dispatch()
+
+    def executor(self, priority: str, user: Optional[str] = None) -> 'ScheduledExecutor':
+        """返回按指定优先级和用户提交的执行器视图（可用于run_batch）"""
+        return ScheduledExecutor(self, priority, user)
+
+    def _next_item(self) -> Optional[_Item]:
+        """按优先级、用户轮转取下一个条目（调用方持有锁）"""
+        busy = sum(self.running.values())
+        for priority in PRIORITY_CLASSES:
+            limit = self.max_workers if priority == 'interactive' else self.max_workers - self.interactive_reserve
+            if busy >= limit:
+                continue
+            users = self.queues[priority]
+            while users:
+                user, user_queue = next(iter(users.items()))
+                item = user_queue.popleft()
+                if user_queue:
+                    users.move_to_end(user)
+                else:
+                    del users[user]
+                # 排队期间被调用方取消的条目直接丢弃
+                if item.future.set_running_or_notify_cancel():
+                    return item
+        return None
+
+    def _dispatch(self) -> None:
+        """在有空闲工作进程时分发条目（调用方持有锁）"""
+        while sum(self.running.values()) < self.max_workers:
+            item = self._next_item()
+            if item is None:
+                return
+            self.running[item.priority] += 1
+            self.waits[item.priority].append(time.perf_counter() - item.submitted)
+            if item.func is None:
+                # slot()占位条目：名额交给调用线程
+                item.future.set_result(None)
+                continue
+            try:
+                inner = self.executor_factory().submit(item.func, *item.args)
+            except Exception as e:
+                self.running[item.priority] -= 1
+                item.future.set_exception(e)
+                continue
+            inner.add_done_callback(lambda f, item=item: self._on_done(item, f))
+
+    def _on_done(self, item: _Item, inner: Future) -> None:
+        error = inner.exception()
+        if error is not None:
+            item.future.set_exception(error)
+        else:
+            item.future.set_result(inner.result())
+        self._release(item.priority)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """各优先级的排队、运行和等待时间统计（毫秒）"""
+        with self.lock:
+            classes = {}
+            for priority in PRIORITY_CLASSES:
+                waits = sorted(self.waits[priority])
+                classes[priority] = {
+                    **self.counters[priority],
+                    'queued': sum(len(q) for q in self.queues[priority].values()),
+                    'users': len(self.queues[priority]),
+                    'running': self.running[priority],
+                    'wait': _wait_stats(waits)
+                }
+            return {
+                'maxWorkers': self.max_workers,
+                'interactiveReserve': self.interactive_reserve,
+                'classes': classes
+            }
+
+
+def _wait_stats(waits: List[float]) -> Dict[str, Any]:
+    if not waits:
+        return {'samples': 0}
+
+    def percentile(p: float) -> float:
+        return round(waits[min(len(waits) - 1, int(len(waits) * p))] * 1000, 2)
+
+    return {
+        'samples': len(waits),
+        'meanMs': round(sum(waits) / len(waits) * 1000, 2),
+        'p50Ms': percentile(0.50),
+        'p95Ms': percentile(0.95),
+        'p99Ms': percentile(0.99),
+        'maxMs': round(waits[-1] * 1000, 2)
+    }
+
+
+class ScheduledExecutor:
+    """以固定优先级和用户向调度器提交任务的执行器视图"""
+
+    def __init__(self, scheduler: RenderScheduler, priority: str, user: Optional[str]):
+        self.scheduler = scheduler
+        self.priority = priority
+        self.user = user
+
+    def submit(self, func: Callable, *args) -> Future:
+        return self.scheduler.submit(self.priority, self.user, func, *args)
+
+
+_scheduler: Optional[RenderScheduler] = None
+_scheduler_lock = threading.Lock()
+
+
+def get_render_scheduler() -> RenderScheduler:
+    """获取全局渲染调度器（与全局渲染进程池配套）"""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = RenderScheduler(get_render_executor, default_worker_count())
+        return _scheduler
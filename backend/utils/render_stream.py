@@ -0,0 +1,129 @@
+"""
+流式渲染输出
+
+严格遵循PROJECT_REQUIREMENTS.md文档约束
+
+功能：
+- 将Template.generate()产生的细碎片段合并为适合网络写出的块
+- 第一个块尽早发出（首字节时间为毫秒级），之后按固定大小写出
+- 边写出边统计字节数、行数和SHA-256，不保留完整内容
+- 纯文本或NDJSON帧两种输出格式
+"""
+
+import hashlib
+import json
+import time
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional
+
+DEFAULT_CHUNK_SIZE = 64 * 1024
+FIRST_CHUNK_SIZE = 1024
+
+
+class StreamStats:
+    """流式输出的增量统计"""
+
+    __slots__ = ('bytes', 'lines', 'chunks', '_hash', '_last', 'started', 'first_chunk_at')
+
+    def __init__(self):
+        self.bytes = 0
+        self.lines = 0
+        self.chunks = 0
+        self._hash = hashlib.sha256()
+        self._last = ''
+        self.started = time.perf_counter()
+        self.first_chunk_at: Optional[float] = None
+
+    def update(self, chunk: str) -> None:
+        data = chunk.encode('utf-8')
+        self.bytes += len(data)
+        self.lines += chunk.count('\n')
+        self.chunks += 1
+        self._hash.update(data)
+        self._last = chunk[-1:] or self._last
+        if self.first_chunk_at is None:
+            self.first_chunk_at = time.perf_counter()
+
+    def to_dict(self) -> Dict[str, Any]:
+        """统计结果（最后一行没有换行符时也计为一行）"""
+        lines = self.lines + (1 if self._last and self._last != '\n' else 0)
+        now = time.perf_counter()
+        return {
+            'bytes': self.bytes,
+            'lines': lines,
+            'chunks': self.chunks,
+            'sha256': self._hash.hexdigest(),
+            'firstChunkMs': round((self.first_chunk_at - self.started) * 1000, 2) if self.first_chunk_at else None,
+            'elapsed': round(now - self.started, 4)
+        }
+
+
+def coalesce_chunks(
+    pieces: Iterable[str],
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    first_chunk_size: int = FIRST_CHUNK_SIZE
+) -> Iterator[str]:
+    """
+    合并细碎片段
+
+    Args:
+        pieces: 字符串片段（如Template.generate()）
+        chunk_size: 常规块大小（字符数）
+        first_chunk_size: 第一个块的大小，较小以便客户端尽快收到数据
+    """
+    buffer = []
+    size = 0
+    threshold = first_chunk_size
+    for piece in pieces:
+        if not piece:
+            continue
+        buffer.append(piece)
+        size += len(piece)
+        if size >= threshold:
+            yield ''.join(buffer)
+            buffer = []
+            size = 0
+            threshold = chunk_size
+    if buffer:
+        yield ''.join(buffer)
+
+
+def stream_text(
+    chunks: Iterable[str],
+    stats: Optional[StreamStats] = None,
+    on_error: Optional[Callable[[Exception], str]] = None
+) -> Iterator[str]:
+    """
+    纯文本流
+
+    渲染中途出错时响应头已经发出，由on_error生成追加在末尾的错误说明（如G代码注释）。
+    """
+    stats = stats or StreamStats()
+    try:
+        for chunk in chunks:
+            stats.update(chunk)
+            yield chunk
+    except Exception as e:
+        if on_error is None:
+            raise
+        yield on_error(e)
+
+
+def stream_ndjson(chunks: Iterable[str], meta: Optional[Dict[str, Any]] = None) -> Iterator[str]:
+    """
+    NDJSON帧流
+
+    帧类型：start（元数据）、chunk（seq递增的内容块）、
+    end（字节数/行数/哈希/耗时）或error（渲染中途出错）。
+    """
+    stats = StreamStats()
+    yield json.dumps({'type': 'start', **(meta or {})}, ensure_ascii=False) + '\n'
+    seq = 0
+    try:
+        for chunk in chunks:
+            stats.update(chunk)
+            yield json.dumps({'type': 'chunk', 'seq': seq, 'data': chunk}, ensure_ascii=False) + '\n'
+            seq += 1
+    except Exception as e:
+        yield json.dumps({'type': 'error', 'error': str(e), **stats.to_dict()}, ensure_ascii=False) + '\n'
+        return
+    yield json.dumps({'type': 'end', **stats.to_dict()}, ensure_ascii=False) + '\n'
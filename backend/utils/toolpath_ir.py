@@ -0,0 +1,626 @@
+"""
+方言无关的刀路中间表示
+
+严格遵循PROJECT_REQUIREMENTS.md文档约束
+
+功能：
+- 模板输出与控制器无关的刀路指令（RAPID/LINE/ARC/DRILL等），渲染一次
+- 各方言的输出器（Fanuc、西门子840D、海德汉对话式）逐条翻译为对应的程序，
+  一次解析同时写出多个方言，内存占用与程序长度无关
+- 输出器按名称注册在EMITTERS中，可扩展
+
+刀路指令（每行一条，数值字为字母+数值，与G代码相同）：
+    PROGRAM O1000 POCKET       程序开始（O号和名称可选）
+    UNITS MM                   单位（MM/INCH）
+    TOOL T3                    换刀
+    SPINDLE S12000 CW          主轴（CW/CCW/OFF）
+    COOLANT ON                 冷却（ON/OFF）
+    RAPID X0 Y0 Z5             快速移动
+    LINE X10 Y0 F300           直线插补
+    ARC CW X20 Y0 I5 J0 F300   圆弧插补（CW/CCW，I/J为圆心相对起点）
+    DRILL Z-10 R2 F150 Q3 P0.5 钻孔循环（Z孔底、R安全平面，Q每次进给深度、P孔底暂停秒数可选）
+    DWELL P1.5                 暂停（秒）
+    COMMENT 文本 / ; 文本       注释
+    END                        程序结束
+只有坐标字的行沿用上一条运动指令（RAPID/LINE/ARC）或钻孔循环的孔位，
+因此 {{ points | gcode_block('LINE') }} 可以直接输出刀路。行尾可带 ; 注释。
+"""
+
+import re
+from decimal import Decimal
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+from .gcode_format import format_coord
+from .gcode_postprocess import OUTPUT_BATCH_LINES
+
+_WORD = re.compile(r'([A-Z])([-+]?(?:\d+\.?\d*|\.\d+)(?:E[-+]?\d+)?)$')
+
+OPS = frozenset((
+    'PROGRAM', 'UNITS', 'TOOL', 'SPINDLE', 'COOLANT', 'RAPID', 'LINE', 'ARC',
+    'DRILL', 'DWELL', 'COMMENT', 'END'
+))
+# 后续只有坐标字的行沿用的指令
+MODAL_OPS = frozenset(('RAPID', 'LINE', 'ARC', 'DRILL'))
+AXES = ('X', 'Y', 'Z')
+# 定义钻孔循环的字（孔位X/Y之外）
+CYCLE_WORDS = ('Z', 'R', 'F', 'Q', 'P')
+# 只接受数值字的指令（ARC另可带一个CW/CCW），其余文本报错而不是忽略
+WORD_ONLY_OPS = frozenset(('RAPID', 'LINE', 'ARC', 'DRILL', 'DWELL'))
+ARC_DIRECTIONS = ('CW', 'CCW')
+
+
+class ToolpathError(ValueError):
+    """刀路指令无法解析或无法翻译"""
+
+    def __init__(self, message: str, line_number: Optional[int] = None):
+        if line_number is not None:
+            message = f'刀路第{line_number}行: {message}'
+        super().__init__(message)
+        self.line_number = line_number
+
+
+class ToolpathOp:
+    """一条刀路指令"""
+
+    __slots__ = ('kind', 'args', 'words', 'text', 'comment', 'line_number')
+
+    def __init__(self, kind: str, args: List[str], words: Dict[str, str],
+                 comment: Optional[str] = None, line_number: int = 0, text: Optional[str] = None):
+        self.kind = kind
+        self.args = args
+        self.words = words
+        # 数值字按原顺序的文本（输出器可直接沿用）
+        self.text = text if text is not None else ' '.join(k + v for k, v in words.items())
+        self.comment = comment
+        self.line_number = line_number
+
+    def number(self, letter: str) -> Optional[float]:
+        text = self.words.get(letter)
+        return float(text) if text is not None else None
+
+    def __repr__(self) -> str:
+        return f'ToolpathOp({self.kind}, {self.args}, {self.words})'
+
+
+def _fixed(value: str) -> str:
+    """指数形式的数值换成定点形式（Jinja输出的1e-05 -> 0.00001），整数值保留小数点"""
+    text = format(Decimal(value), 'f')
+    return text if '.' in text else text + '.'
+
+
+def parse_toolpath(lines: Iterable[str]) -> Iterator[ToolpathOp]:
+    """逐行解析刀路指令（空行忽略）"""
+    modal: Optional[ToolpathOp] = None
+    for number, line in enumerate(lines, 1):
+        text = line.strip()
+        if not text:
+            continue
+        if text[0] in ';(':
+            yield ToolpathOp('COMMENT', [], {}, text[1:].rstrip(')').strip(), number)
+            continue
+        comment = None
+        if ';' in text:
+            text, comment = text.split(';', 1)
+            comment = comment.strip()
+        tokens = text.upper().split()
+        if tokens[0] == 'COMMENT':
+            yield ToolpathOp('COMMENT', [], {}, line.strip()[7:].strip(), number)
+            continue
+        explicit = tokens[0] in OPS
+        if explicit:
+            kind, args, tokens = tokens[0], [], tokens[1:]
+        elif modal is not None and _WORD.match(tokens[0]):
+            kind, args = modal.kind, list(modal.args)
+        else:
+            raise ToolpathError(f'无法识别的指令: {line.strip()}', number)
+        words = {}
+        word_tokens = []
+        for token in tokens:
+            match = _WORD.match(token)
+            if match:
+                letter, value = match.groups()
+                if 'E' in value:
+                    value = _fixed(value)
+                words[letter] = value
+                word_tokens.append(letter + value)
+            elif kind in WORD_ONLY_OPS and not (
+                    kind == 'ARC' and explicit and token in ARC_DIRECTIONS and not args):
+                raise ToolpathError(f'{kind} 指令中无法识别的内容: {token}', number)
+            else:
+                args.append(token)
+        op = ToolpathOp(kind, args, words, comment, number, ' '.join(word_tokens))
+        modal = op if kind in MODAL_OPS else None
+        yield op
+
+
+def _signed(text: str) -> str:
+    """海德汉数值：带符号，不带末尾的小数点（10. -> +10）"""
+    if text.endswith('.'):
+        text = text[:-1]
+    return text if text[0] in '+-' else '+' + text
+
+
+class DialectEmitter:
+    """
+    方言输出器基类
+
+    emit(op)返回该指令翻译后的行，finish()返回程序末尾需要补充的行。
+    子类按指令实现 _program/_units/_tool/...，钻孔循环实现 _cycle_begin/_cycle_point/_cycle_end。
+    """
+
+    name = ''
+    extension = '.nc'
+
+    def __init__(self, program_name: Optional[str] = None, precision: int = 3):
+        """
+        Args:
+            program_name: 程序名（海德汉的程序名必须与文件名一致，给出时忽略PROGRAM中的名称）
+            precision: 换算出的数值（暂停毫秒数、圆心坐标等）的小数位数
+        """
+        self.program_name = program_name
+        self.precision = precision
+        # 当前位置（数值字文本，用到时再换算）
+        self.position: Dict[str, Optional[str]] = dict.fromkeys(AXES)
+        self.motion: Optional[str] = None
+        self.cycle: Optional[Dict[str, str]] = None
+        self.ended = False
+        self._handlers = {kind: getattr(self, '_' + kind.lower()) for kind in OPS}
+
+    def number(self, value: float) -> str:
+        return format_coord(value, self.precision)
+
+    def emit(self, op: ToolpathOp) -> List[str]:
+        if self.ended:
+            raise ToolpathError('END之后不能再有指令', op.line_number)
+        lines = []
+        if self.cycle is not None and op.kind not in ('DRILL', 'COMMENT'):
+            lines += self._cycle_end()
+            self.cycle = None
+            self.motion = None
+        try:
+            lines += self._handlers[op.kind](op)
+        except ToolpathError:
+            raise
+        except KeyError as e:
+            raise ToolpathError(f'{op.kind} 缺少 {e.args[0]}', op.line_number)
+        except (IndexError, ValueError, TypeError) as e:
+            raise ToolpathError(f'{op.kind} 指令参数无效: {e}', op.line_number)
+        if op.kind in MODAL_OPS:
+            self._update_position(op)
+        if op.comment and op.kind != 'COMMENT':
+            if lines:
+                lines[-1] += ' ' + self.comment(op.comment)
+            else:
+                lines.append(self.comment(op.comment))
+        return lines
+
+    def _update_position(self, op: ToolpathOp) -> None:
+        words = op.words
+        for axis in AXES:
+            if axis in words:
+                self.position[axis] = words[axis]
+        if op.kind == 'DRILL':
+            # 钻孔后退回R平面
+            self.position['Z'] = self.cycle['R']
+
+    def finish(self) -> List[str]:
+        """输入结束：没有END时补齐程序结尾"""
+        if self.ended:
+            return []
+        lines = []
+        if self.cycle is not None:
+            lines += self._cycle_end()
+            self.cycle = None
+        return lines + self._close()
+
+    def comment(self, text: str) -> str:
+        return f'; {text}'
+
+    def _comment(self, op: ToolpathOp) -> List[str]:
+        return [self.comment(op.comment or '')]
+
+    def _end(self, op: ToolpathOp) -> List[str]:
+        return self._close(op)
+
+    def _close(self, op: Optional[ToolpathOp] = None) -> List[str]:
+        self.ended = True
+        return []
+
+    def _words(self, op: ToolpathOp, letters: str) -> str:
+        return ' '.join([letter + op.words[letter] for letter in letters if letter in op.words])
+
+    def _motion(self, code: str, op: ToolpathOp, letters: Optional[str] = None) -> List[str]:
+        """运动程序段：运动指令只在变化时输出；letters为空时按原样沿用全部数值字（含附加轴）"""
+        words = self._words(op, letters) if letters else op.text
+        if code != self.motion:
+            self.motion = code
+            return [f'{code} {words}'.rstrip()]
+        return [words] if words else []
+
+    def _drill(self, op: ToolpathOp) -> List[str]:
+        lines = []
+        params = {letter: op.words[letter] for letter in CYCLE_WORDS if letter in op.words}
+        if params and params != self.cycle:
+            if 'Z' not in params or 'R' not in params:
+                raise ToolpathError('DRILL需要Z（孔底）和R（安全平面）', op.line_number)
+            if self.cycle is not None:
+                lines += self._cycle_end()
+            self.cycle = params
+            lines += self._cycle_begin(params)
+        elif self.cycle is None:
+            raise ToolpathError('孔位之前没有定义钻孔循环', op.line_number)
+        if 'X' in op.words or 'Y' in op.words:
+            lines += self._cycle_point(op)
+        return lines
+
+    @staticmethod
+    def _cycle_kind(cycle: Dict[str, str]) -> str:
+        if 'Q' in cycle:
+            return 'peck'
+        return 'dwell' if 'P' in cycle else 'drill'
+
+
+class FanucEmitter(DialectEmitter):
+    """Fanuc（ISO G代码）"""
+
+    name = 'fanuc'
+    extension = '.nc'
+    CYCLE_CODES = {'drill': 'G81', 'dwell': 'G82', 'peck': 'G83'}
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.percent = False
+        self._pending_cycle: Optional[str] = None
+
+    def comment(self, text: str) -> str:
+        return '(' + text.replace('(', '').replace(')', '') + ')'
+
+    def _program(self, op: ToolpathOp) -> List[str]:
+        self.percent = True
+        header = f"O{int(float(op.words['O'])):04d}" if 'O' in op.words else ''
+        if op.args:
+            header = f"{header} {self.comment(' '.join(op.args))}".strip()
+        return ['%'] + ([header] if header else [])
+
+    def _units(self, op: ToolpathOp) -> List[str]:
+        return ['G20' if op.args[0] == 'INCH' else 'G21']
+
+    def _tool(self, op: ToolpathOp) -> List[str]:
+        self.motion = None
+        return [f"T{op.words['T']} M06"]
+
+    def _spindle(self, op: ToolpathOp) -> List[str]:
+        direction = op.args[0] if op.args else 'CW'
+        if direction == 'OFF':
+            return ['M05']
+        return [f"S{op.words['S']} {'M04' if direction == 'CCW' else 'M03'}"]
+
+    def _coolant(self, op: ToolpathOp) -> List[str]:
+        return ['M09' if op.args and op.args[0] == 'OFF' else 'M08']
+
+    def _rapid(self, op: ToolpathOp) -> List[str]:
+        return self._motion('G00', op)
+
+    def _line(self, op: ToolpathOp) -> List[str]:
+        return self._motion('G01', op)
+
+    def _arc(self, op: ToolpathOp) -> List[str]:
+        return self._motion('G03' if op.args and op.args[0] == 'CCW' else 'G02', op)
+
+    def _dwell(self, op: ToolpathOp) -> List[str]:
+        return [f"G04 X{op.words['P']}"]
+
+    def _close(self, op: Optional[ToolpathOp] = None) -> List[str]:
+        self.ended = True
+        return ['M30'] + (['%'] if self.percent else [])
+
+    def _cycle_begin(self, cycle: Dict[str, str]) -> List[str]:
+        # 孔位在第一个孔的程序段中给出（没有孔位的循环段会在当前位置钻孔）
+        words = [self.CYCLE_CODES[self._cycle_kind(cycle)], None, f"Z{cycle['Z']}", f"R{cycle['R']}"]
+        if 'Q' in cycle:
+            words.append(f"Q{cycle['Q']}")
+        if 'P' in cycle:
+            words.append(f"P{round(float(cycle['P']) * 1000)}")
+        if 'F' in cycle:
+            words.append(f"F{cycle['F']}")
+        self._pending_cycle = words
+        return []
+
+    def _cycle_point(self, op: ToolpathOp) -> List[str]:
+        position = self._words(op, 'XY')
+        if self._pending_cycle is None:
+            return [position]
+        words, self._pending_cycle = self._pending_cycle, None
+        words[1] = position
+        return ['G99 ' + ' '.join(words)]
+
+    def _cycle_end(self) -> List[str]:
+        if self._pending_cycle is not None:
+            self._pending_cycle = None
+            return []
+        return ['G80']
+
+
+class SiemensEmitter(DialectEmitter):
+    """西门子 840D"""
+
+    name = 'siemens'
+    extension = '.mpf'
+
+    def _program(self, op: ToolpathOp) -> List[str]:
+        name = ' '.join(op.args) or self.program_name
+        return [self.comment(name)] if name else []
+
+    def _units(self, op: ToolpathOp) -> List[str]:
+        return ['G70' if op.args[0] == 'INCH' else 'G71']
+
+    def _tool(self, op: ToolpathOp) -> List[str]:
+        self.motion = None
+        return [f"T{op.words['T']} M6", 'D1']
+
+    def _spindle(self, op: ToolpathOp) -> List[str]:
+        direction = op.args[0] if op.args else 'CW'
+        if direction == 'OFF':
+            return ['M5']
+        return [f"S{op.words['S']} {'M4' if direction == 'CCW' else 'M3'}"]
+
+    def _coolant(self, op: ToolpathOp) -> List[str]:
+        return ['M9' if op.args and op.args[0] == 'OFF' else 'M8']
+
+    def _rapid(self, op: ToolpathOp) -> List[str]:
+        return self._motion('G0', op)
+
+    def _line(self, op: ToolpathOp) -> List[str]:
+        return self._motion('G1', op)
+
+    def _arc(self, op: ToolpathOp) -> List[str]:
+        return self._motion('G3' if op.args and op.args[0] == 'CCW' else 'G2', op)
+
+    def _dwell(self, op: ToolpathOp) -> List[str]:
+        return [f"G4 F{op.words['P']}"]
+
+    def _close(self, op: Optional[ToolpathOp] = None) -> List[str]:
+        self.ended = True
+        return ['M30']
+
+    def _cycle_begin(self, cycle: Dict[str, str]) -> List[str]:
+        # 参考平面取R平面、安全距离为0：与Fanuc G99一样从R平面开始进给并退回R平面
+        plane, depth = cycle['R'], cycle['Z']
+        kind = self._cycle_kind(cycle)
+        if kind == 'peck':
+            call = f"CYCLE83({plane},{plane},0,{depth},,,{cycle['Q']},0,{cycle.get('P', '0')},0,1,1)"
+        elif kind == 'dwell':
+            call = f"CYCLE82({plane},{plane},0,{depth},,{cycle['P']})"
+        else:
+            call = f"CYCLE81({plane},{plane},0,{depth})"
+        lines = [f"F{cycle['F']}"] if 'F' in cycle else []
+        self.motion = None
+        return lines + [f'MCALL {call}']
+
+    def _cycle_point(self, op: ToolpathOp) -> List[str]:
+        return self._motion('G0', op, 'XY')
+
+    def _cycle_end(self) -> List[str]:
+        return ['MCALL']
+
+
+class HeidenhainEmitter(DialectEmitter):
+    """海德汉对话式（程序段自动编号）"""
+
+    name = 'heidenhain'
+    extension = '.h'
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.block = -1
+        self.units = 'MM'
+        self.header = False
+        self.pending_m: List[str] = []
+
+    def emit(self, op: ToolpathOp) -> List[str]:
+        lines = []
+        if not self.header and op.kind not in ('PROGRAM', 'UNITS'):
+            lines += self._begin()
+        return self._numbered(lines + super().emit(op))
+
+    def finish(self) -> List[str]:
+        lines = [] if self.header or self.ended else self._begin()
+        return self._numbered(lines + super().finish())
+
+    def _numbered(self, lines: List[str]) -> List[str]:
+        numbered = []
+        for line in lines:
+            self.block += 1
+            numbered.append(f'{self.block} {line}')
+        return numbered
+
+    def _begin(self) -> List[str]:
+        self.header = True
+        self.program_name = self.program_name or 'PROGRAM'
+        return [f'BEGIN PGM {self.program_name} {self.units}']
+
+    def _flush_m(self) -> List[str]:
+        lines, self.pending_m = self.pending_m, []
+        return lines
+
+    def _program(self, op: ToolpathOp) -> List[str]:
+        if self.program_name is None and op.args:
+            self.program_name = op.args[0]
+        elif self.program_name is None and 'O' in op.words:
+            self.program_name = str(int(float(op.words['O'])))
+        return []
+
+    def _units(self, op: ToolpathOp) -> List[str]:
+        if self.header:
+            raise ToolpathError('海德汉程序的UNITS必须在其他指令之前', op.line_number)
+        self.units = 'INCH' if op.args[0] == 'INCH' else 'MM'
+        return []
+
+    def _tool(self, op: ToolpathOp) -> List[str]:
+        return self._flush_m() + [f"TOOL CALL {op.words['T']} Z"]
+
+    def _spindle(self, op: ToolpathOp) -> List[str]:
+        direction = op.args[0] if op.args else 'CW'
+        if direction == 'OFF':
+            self.pending_m.append('M5')
+            return []
+        self.pending_m.append('M4' if direction == 'CCW' else 'M3')
+        return [f"TOOL CALL Z S{op.words['S']}"]
+
+    def _coolant(self, op: ToolpathOp) -> List[str]:
+        self.pending_m.append('M9' if op.args and op.args[0] == 'OFF' else 'M8')
+        return []
+
+    @staticmethod
+    def _coords(op: ToolpathOp) -> str:
+        # 坐标字（含附加轴），进给和圆心不属于坐标
+        return ' '.join([letter + _signed(value) for letter, value in op.words.items() if letter not in 'FIJK'])
+
+    @staticmethod
+    def _feed(op: ToolpathOp) -> str:
+        # 进给不带末尾的小数点（F300. -> F300）
+        return f"F{op.words['F'].rstrip('.')}" if 'F' in op.words else ''
+
+    def _position(self, op: ToolpathOp, feed: str) -> str:
+        coords = self._coords(op)
+        return ' '.join(part for part in ('L', coords, 'R0', feed, *self._flush_m()) if part)
+
+    def _rapid(self, op: ToolpathOp) -> List[str]:
+        return [self._position(op, 'FMAX')]
+
+    def _line(self, op: ToolpathOp) -> List[str]:
+        return [self._position(op, self._feed(op))]
+
+    def _arc(self, op: ToolpathOp) -> List[str]:
+        if self.position['X'] is None or self.position['Y'] is None:
+            raise ToolpathError('圆弧起点未知（之前没有X/Y位置）', op.line_number)
+        x, y = float(self.position['X']), float(self.position['Y'])
+        center_x = self.number(x + (op.number('I') or 0.0))
+        center_y = self.number(y + (op.number('J') or 0.0))
+        coords = self._coords(op)
+        direction = 'DR+' if op.args and op.args[0] == 'CCW' else 'DR-'
+        arc = ' '.join(part for part in ('C', coords, direction, self._feed(op), *self._flush_m()) if part)
+        return [f'CC X{_signed(center_x)} Y{_signed(center_y)}', arc]
+
+    def _dwell(self, op: ToolpathOp) -> List[str]:
+        return self._flush_m() + ['CYCL DEF 9.0 DWELL TIME', f"CYCL DEF 9.1 DWELL {op.words['P']}"]
+
+    def _close(self, op: Optional[ToolpathOp] = None) -> List[str]:
+        self.ended = True
+        return self._flush_m() + ['M30', f'END PGM {self.program_name} {self.units}']
+
+    def _cycle_begin(self, cycle: Dict[str, str]) -> List[str]:
+        # 表面坐标取R平面，孔深为相对R平面的增量
+        plane, depth = float(cycle['R']), float(cycle['Z'])
+        peck = float(cycle['Q']) if 'Q' in cycle else abs(depth - plane)
+        params = [
+            'Q200=+0', f'Q201={_signed(self.number(depth - plane))}',
+            f"Q206={_signed(cycle['F']) if 'F' in cycle else 'FAUTO'}", f'Q202={_signed(self.number(peck))}',
+            'Q210=+0', f"Q203={_signed(cycle['R'])}", 'Q204=+0', f"Q211={_signed(cycle.get('P', '0'))}"
+        ]
+        return self._flush_m() + ['CYCL DEF 200 DRILLING ' + ' '.join(params)]
+
+    def _cycle_point(self, op: ToolpathOp) -> List[str]:
+        coords = ' '.join(letter + _signed(op.words[letter]) for letter in 'XY' if letter in op.words)
+        return [f'L {coords} R0 FMAX M99']
+
+    def _cycle_end(self) -> List[str]:
+        return []
+
+
+EMITTERS = {
+    FanucEmitter.name: FanucEmitter,
+    SiemensEmitter.name: SiemensEmitter,
+    HeidenhainEmitter.name: HeidenhainEmitter
+}
+
+
+# 只适用于G代码的输出配置项，不能与dialects同时配置
+DIALECT_EXCLUSIVE_OPTIONS = ('postprocess', 'split', 'analyze')
+
+
+def output_dialects(output_config: Dict[str, Any]) -> Optional[List[str]]:
+    """
+    读取输出配置的dialects（字符串或列表），未配置时返回None
+
+    Raises:
+        ValueError: 方言未知，或与postprocess/split/analyze同时配置
+    """
+    dialects = (output_config or {}).get('dialects')
+    if not dialects:
+        return None
+    dialects = [dialects] if isinstance(dialects, str) else list(dialects)
+    for dialect in dialects:
+        if dialect not in EMITTERS:
+            raise ValueError(f'未知的刀路输出方言: {dialect}（可用: {", ".join(EMITTERS)}）')
+    exclusive = [key for key in DIALECT_EXCLUSIVE_OPTIONS if output_config.get(key)]
+    if exclusive:
+        raise ValueError(f'刀路输出（dialects）不支持 {"/".join(exclusive)}')
+    return dialects
+
+
+def check_output_dialects(package_config: Dict[str, Any]) -> List[str]:
+    """检查模板包各输出的dialects配置（加载和导入模板包时），返回错误信息列表"""
+    errors = []
+    files = ((package_config or {}).get('outputs') or {}).get('files') or {}
+    for name, output_config in files.items():
+        if not isinstance(output_config, dict):
+            continue
+        try:
+            output_dialects(output_config)
+        except ValueError as e:
+            errors.append(f'输出 {name}: {e}')
+    return errors
+
+
+def create_emitter(dialect: str, **options) -> DialectEmitter:
+    if dialect not in EMITTERS:
+        raise ValueError(f'未知的刀路输出方言: {dialect}')
+    return EMITTERS[dialect](**options)
+
+
+def translate(lines: Iterable[str], dialect: str, **options) -> Iterator[str]:
+    """把刀路指令翻译为一个方言的程序，按批产生文本（用于流式输出）"""
+    emitter = create_emitter(dialect, **options)
+    batch: List[str] = []
+    for op in parse_toolpath(lines):
+        batch += emitter.emit(op)
+        if len(batch) >= OUTPUT_BATCH_LINES:
+            yield '\n'.join(batch) + '\n'
+            batch = []
+    batch += emitter.finish()
+    if batch:
+        yield '\n'.join(batch) + '\n'
+
+
+def translate_many(
+    lines: Iterable[str],
+    emitters: Dict[str, DialectEmitter],
+    writers: Dict[str, Callable[[str], Any]]
+) -> Dict[str, Any]:
+    """
+    一次解析刀路指令，同时写出多个方言
+
+    Args:
+        lines: 刀路指令行
+        emitters: 方言 -> 输出器
+        writers: 方言 -> 写入函数（如SpooledOutput.write）
+
+    Returns:
+        {'ops': 指令数, 'dialects': [...]}
+    """
+    batches: Dict[str, List[str]] = {dialect: [] for dialect in emitters}
+    ops = 0
+    for op in parse_toolpath(lines):
+        ops += 1
+        for dialect, emitter in emitters.items():
+            batch = batches[dialect]
+            batch += emitter.emit(op)
+            if len(batch) >= OUTPUT_BATCH_LINES:
+                writers[dialect]('\n'.join(batch) + '\n')
+                batch.clear()
+    for dialect, emitter in emitters.items():
+        batch = batches[dialect] + emitter.finish()
+        if batch:
+            writers[dialect]('\n'.join(batch) + '\n')
+    return {'ops': ops, 'dialects': list(emitters)}
@@ -0,0 +1,369 @@
+"""
+刀路点阵生成
+
+严格遵循PROJECT_REQUIREMENTS.md文档约束
+
+功能：
+- 常用点阵：螺栓孔圆周（bolt_circle）、矩形型腔螺旋（pocket_spiral）、孔阵（peck_grid）
+- 点阵是惰性的：按块计算坐标列（安装NumPy时向量化），逐点迭代时不保存整组点
+- 配套格式化：drill_cycle 输出整组钻孔循环，cut_pass 输出一次切削走刀
+- 模板中所有函数都可用 prefix 从渲染参数（模板包variables）取值：
+  bolt_circle(prefix='bolt') 读取 bolt_radius、bolt_count、bolt_center_x ...，显式传入的参数优先
+
+用法（模板中）：
+    {{ bolt_circle(40, 6, start_angle=30) | drill_cycle(z=-12, r=2, cycle='G83', q=3, feed=120) }}
+    {{ pocket_spiral(prefix='pocket') | cut_pass(z=-2, feed=800, safe_z=5) }}
+    {% for block in peck_grid(200, 200, 5, 5).gcode_blocks(None) %}{{ block }}
+    {% endfor %}
+"""
+
+import inspect
+import math
+from array import array
+from typing import Any, Callable, Dict, Iterator, Optional
+
+from jinja2 import pass_context
+from jinja2.runtime import missing
+
+from .gcode_format import DEFAULT_PRECISION, format_coord, gcode_block
+from .point_array import PointArray
+from .render_sandbox import guarded_range
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# 惰性点阵每块的点数
+CHUNK_SIZE = 65536
+
+# 矩形一圈的角点顺序（从右下角开始逆时针，回到起点）
+_LOOP_SX = (1, 1, -1, -1, 1)
+_LOOP_SY = (-1, 1, 1, -1, -1)
+
+
+def _to_array(values) -> array:
+    column = array('d')
+    column.frombytes(np.ascontiguousarray(values, dtype=np.float64).tobytes())
+    return column
+
+
+class PointPattern:
+    """
+    惰性点阵
+
+    只保存生成参数，按块计算坐标。可逐点迭代、按块取PointArray（chunks），
+    也可整体转换为PointArray（to_array，gcode_block会自动转换）。
+    """
+
+    def __init__(self, name: str, length: int, chunk: Callable[[int, int], Dict[str, array]]):
+        """
+        Args:
+            name: 点阵名称
+            length: 点数（计入渲染的循环次数预算）
+            chunk: (起始下标, 结束下标) -> 轴名 -> 坐标列
+        """
+        guarded_range(length)
+        self.name = name
+        self._length = length
+        self._chunk = chunk
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __iter__(self) -> Iterator[Dict[str, float]]:
+        for points in self.chunks():
+            yield from points
+
+    def __getitem__(self, index: int) -> Dict[str, float]:
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError('点阵下标超出范围')
+        return PointArray(self._chunk(index, index + 1))[0]
+
+    def __repr__(self) -> str:
+        return f"PointPattern({self.name!r}, length={self._length})"
+
+    def chunks(self, size: int = CHUNK_SIZE) -> Iterator[PointArray]:
+        """按块生成PointArray"""
+        for start in range(0, self._length, size):
+            yield PointArray(self._chunk(start, min(start + size, self._length)))
+
+    def to_array(self) -> PointArray:
+        return PointArray(self._chunk(0, self._length))
+
+    def gcode_blocks(self, motion: Optional[str] = 'G01', size: int = CHUNK_SIZE, **options) -> Iterator[str]:
+        """
+        按块输出G代码程序段（大点阵在模板循环中逐块输出，不生成整段文本）
+
+        运动指令只在第一块输出；每块第一段输出完整坐标。
+        """
+        for index, points in enumerate(self.chunks(size)):
+            yield gcode_block(points, motion if index == 0 or not options.get('modal', True) else None, **options)
+
+
+def bolt_circle(
+    radius: float,
+    count: int,
+    center_x: float = 0.0,
+    center_y: float = 0.0,
+    start_angle: float = 0.0,
+    span: float = 360.0
+) -> PointPattern:
+    """
+    螺栓孔圆周
+
+    Args:
+        radius: 分布圆半径
+        count: 孔数
+        center_x, center_y: 圆心
+        start_angle: 第一个孔的角度（度，X正向为0，逆时针）
+        span: 分布角度；360时均布整圈，否则第一个和最后一个孔分别在两端
+    """
+    radius, count, span = float(radius), int(count), float(span)
+    center_x, center_y = float(center_x), float(center_y)
+    if count < 1 or radius < 0:
+        raise ValueError('孔数必须大于0，半径不能为负')
+    first = math.radians(float(start_angle))
+    if abs(span) >= 360 or count == 1:
+        step = math.radians(span) / count
+    else:
+        step = math.radians(span) / (count - 1)
+
+    def chunk(start: int, stop: int) -> Dict[str, array]:
+        if np is not None:
+            angles = first + step * np.arange(start, stop)
+            return {'x': _to_array(center_x + radius * np.cos(angles)),
+                    'y': _to_array(center_y + radius * np.sin(angles))}
+        angles = [first + step * i for i in range(start, stop)]
+        return {'x': array('d', [center_x + radius * math.cos(a) for a in angles]),
+                'y': array('d', [center_y + radius * math.sin(a) for a in angles])}
+
+    return PointPattern('bolt_circle', count, chunk)
+
+
+def peck_grid(
+    width: float,
+    height: float,
+    columns: int,
+    rows: int,
+    origin_x: float = 0.0,
+    origin_y: float = 0.0,
+    serpentine: bool = True
+) -> PointPattern:
+    """
+    矩形孔阵
+
+    Args:
+        width, height: 第一个孔到最后一列/最后一行孔的距离
+        columns, rows: 列数、行数
+        origin_x, origin_y: 第一个孔（左下角）
+        serpentine: 奇数行反向（蛇形顺序，减少空行程）
+    """
+    columns, rows = int(columns), int(rows)
+    if columns < 1 or rows < 1:
+        raise ValueError('行数和列数必须大于0')
+    pitch_x = float(width) / (columns - 1) if columns > 1 else 0.0
+    pitch_y = float(height) / (rows - 1) if rows > 1 else 0.0
+    origin_x, origin_y = float(origin_x), float(origin_y)
+
+    def chunk(start: int, stop: int) -> Dict[str, array]:
+        if np is not None:
+            index = np.arange(start, stop)
+            row, col = np.divmod(index, columns)
+            if serpentine:
+                col = np.where(row % 2 == 1, columns - 1 - col, col)
+            return {'x': _to_array(origin_x + col * pitch_x), 'y': _to_array(origin_y + row * pitch_y)}
+        xs, ys = array('d'), array('d')
+        for index in range(start, stop):
+            row, col = divmod(index, columns)
+            if serpentine and row % 2:
+                col = columns - 1 - col
+            xs.append(origin_x + col * pitch_x)
+            ys.append(origin_y + row * pitch_y)
+        return {'x': xs, 'y': ys}
+
+    return PointPattern('peck_grid', columns * rows, chunk)
+
+
+def pocket_spiral(
+    width: float,
+    height: float,
+    stepover: float,
+    center_x: float = 0.0,
+    center_y: float = 0.0,
+    tool_diameter: float = 0.0
+) -> PointPattern:
+    """
+    矩形型腔由内向外的螺旋走刀
+
+    从型腔中心开始，每圈外扩stepover，最后一圈刀具中心距型腔边界为刀具半径。
+
+    Args:
+        width, height: 型腔尺寸
+        stepover: 行距
+        center_x, center_y: 型腔中心
+        tool_diameter: 刀具直径
+    """
+    stepover = float(stepover)
+    half_x = float(width) / 2 - float(tool_diameter) / 2
+    half_y = float(height) / 2 - float(tool_diameter) / 2
+    if stepover <= 0:
+        raise ValueError('行距必须大于0')
+    if half_x < 0 or half_y < 0:
+        raise ValueError('型腔尺寸小于刀具直径')
+    center_x, center_y = float(center_x), float(center_y)
+    loops = int(min(half_x, half_y) / stepover) + 1
+
+    def chunk(start: int, stop: int) -> Dict[str, array]:
+        if np is not None:
+            index = np.arange(max(start, 1), stop) - 1
+            loop, corner = np.divmod(index, 5)
+            shrink = (loops - 1 - loop) * stepover
+            xs = center_x + np.take(_LOOP_SX, corner) * (half_x - shrink)
+            ys = center_y + np.take(_LOOP_SY, corner) * (half_y - shrink)
+            if start == 0:
+                xs, ys = np.concatenate(([center_x], xs)), np.concatenate(([center_y], ys))
+            return {'x': _to_array(xs), 'y': _to_array(ys)}
+        xs, ys = array('d'), array('d')
+        for index in range(start, stop):
+            if index == 0:
+                xs.append(center_x)
+                ys.append(center_y)
+                continue
+            loop, corner = divmod(index - 1, 5)
+            shrink = (loops - 1 - loop) * stepover
+            xs.append(center_x + _LOOP_SX[corner] * (half_x - shrink))
+            ys.append(center_y + _LOOP_SY[corner] * (half_y - shrink))
+        return {'x': xs, 'y': ys}
+
+    return PointPattern('pocket_spiral', 1 + loops * 5, chunk)
+
+
+def _coordinate_lines(points: Any, axes: str, precision: int) -> str:
+    """整组点的坐标程序段（不含运动指令）；惰性点阵按块输出"""
+    if isinstance(points, PointPattern):
+        return '\n'.join(block for block in points.gcode_blocks(None, axes=axes, precision=precision) if block)
+    return gcode_block(points, None, axes=axes, precision=precision)
+
+
+def drill_cycle(
+    points: Any,
+    z: float,
+    r: float,
+    cycle: str = 'G81',
+    q: Optional[float] = None,
+    p: Optional[float] = None,
+    feed: Optional[float] = None,
+    retract: str = 'G98',
+    axes: str = 'XY',
+    precision: int = DEFAULT_PRECISION
+) -> str:
+    """
+    整组孔的钻孔固定循环
+
+    第一孔输出 G98 G81 X.. Y.. Z.. R.. [Q..] [P..] [F..]，其余孔只输出变化的坐标，最后输出G80。
+
+    Args:
+        points: 孔位（点阵、PointArray或点列表）
+        z: 孔底
+        r: R点
+        cycle: 固定循环（G81钻孔、G82带暂停、G83深孔啄钻、G73高速啄钻等）
+        q: 每次啄钻深度（G83/G73）
+        p: 孔底暂停（G82等，毫秒）
+        feed: 进给速度
+        retract: 返回平面（G98初始平面 / G99 R点平面）
+    """
+    lines = _coordinate_lines(points, axes, precision)
+    if not lines:
+        return ''
+    words = [f'Z{format_coord(z, precision)}', f'R{format_coord(r, precision)}']
+    if q is not None:
+        words.append(f'Q{format_coord(q, precision)}')
+    if p is not None:
+        words.append(f'P{int(p)}')
+    if feed is not None:
+        words.append(f'F{format_coord(feed, precision)}')
+    first, _, rest = lines.partition('\n')
+    head = ' '.join(word for word in (retract, cycle, first, *words) if word)
+    return '\n'.join(part for part in (head, rest, 'G80') if part)
+
+
+def cut_pass(
+    points: Any,
+    z: float,
+    feed: float,
+    safe_z: float = 5.0,
+    plunge_feed: Optional[float] = None,
+    axes: str = 'XY',
+    precision: int = DEFAULT_PRECISION
+) -> str:
+    """
+    一次切削走刀：快速定位到起点上方、下刀、沿整组点切削、抬刀到安全高度
+
+    Args:
+        points: 走刀路径（点阵、PointArray或点列表）
+        z: 切削深度
+        feed: 切削进给
+        safe_z: 安全高度
+        plunge_feed: 下刀进给，默认为切削进给的一半
+    """
+    lines = _coordinate_lines(points, axes, precision)
+    if not lines:
+        return ''
+    first, _, rest = lines.partition('\n')
+    second, _, rest = rest.partition('\n')
+    plunge_feed = float(feed) / 2 if plunge_feed is None else plunge_feed
+    parts = [
+        f'G00 Z{format_coord(safe_z, precision)}',
+        f'G00 {first}',
+        f'G01 Z{format_coord(z, precision)} F{format_coord(plunge_feed, precision)}',
+        f'{second} F{format_coord(feed, precision)}' if second else '',
+        rest,
+        f'G00 Z{format_coord(safe_z, precision)}'
+    ]
+    return '\n'.join(part for part in parts if part)
+
+
+def with_variables(func: Callable) -> Callable:
+    """
+    包装为模板函数：支持 prefix 参数从渲染参数取值
+
+    prefix为字符串时，未显式传入的参数从渲染参数 <prefix>_<参数名> 读取；
+    prefix也可以直接是参数字典。
+    """
+    names = list(inspect.signature(func).parameters)
+
+    @pass_context
+    def wrapper(context, *args, prefix: Any = None, **kwargs):
+        if prefix:
+            for name in names[len(args):]:
+                if name in kwargs:
+                    continue
+                if isinstance(prefix, dict):
+                    value = prefix.get(name, missing)
+                else:
+                    value = context.resolve_or_missing(f'{prefix}_{name}')
+                # 跳过同名的模板函数（如 drill_cycle）
+                if value is not missing and value is not None and not callable(value):
+                    kwargs[name] = value
+        return func(*args, **kwargs)
+
+    wrapper.__name__ = func.__name__
+    wrapper.__doc__ = func.__doc__
+    return wrapper
+
+
+PATTERN_GLOBALS = {
+    'bolt_circle': with_variables(bolt_circle),
+    'peck_grid': with_variables(peck_grid),
+    'pocket_spiral': with_variables(pocket_spiral),
+    'drill_cycle': with_variables(drill_cycle),
+    'cut_pass': with_variables(cut_pass)
+}
+
+PATTERN_FILTERS = {
+    'drill_cycle': PATTERN_GLOBALS['drill_cycle'],
+    'cut_pass': PATTERN_GLOBALS['cut_pass']
+}
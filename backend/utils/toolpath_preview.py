@@ -0,0 +1,453 @@
+"""
+刀路预览几何
+
+严格遵循PROJECT_REQUIREMENTS.md文档约束
+
+功能：
+- 复用G代码分析器逐行解释程序（坐标模式、单位、平面、圆弧、固定循环与分析结果一致），生成刀具中心轨迹
+- 流式抽稀：按距离容差合并近似共线的点，保留的点超过预算两倍时加大容差重新抽稀，内存占用与程序长度无关
+- 结束时用Douglas–Peucker算法压缩到顶点预算以内；快速移动、切削和断开（位置未知、坐标系改变）的分界点始终保留
+- 分界点本身超出预算时（如密集钻孔）逐级降级：先合并快速移动和切削的分界（fallback = 'merged'），
+  仍超出时按固定间隔抽样（fallback = 'sampled'），保证在预算以内结束
+- 结果按内容SHA256（加预算和机床参数）缓存，同一程序再次预览直接返回
+- 输出JSON（扁平坐标数组 + 每个顶点的类型）或紧凑二进制格式
+
+顶点类型：0 = 断开（移到该点，不画线），1 = 快速移动，2 = 切削；第i个顶点的类型表示从第i-1个顶点到它的线段。
+
+二进制格式（小端）：
+    'TPV1' | uint32 顶点数 | float32 × 6 包围盒(minX, minY, minZ, maxX, maxY, maxZ)
+    | float32 × 3n 坐标 | uint8 × n 顶点类型
+"""
+
+import hashlib
+import math
+import struct
+import sys
+from array import array
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from .gcode_analyzer import AXES, PLANES, GcodeAnalyzer, MachineProfile
+from .render_cache import get_render_cache
+
+KIND_JUMP = 0
+KIND_RAPID = 1
+KIND_FEED = 2
+
+DEFAULT_BUDGET = 20000
+MIN_BUDGET = 2
+MAX_BUDGET = 200000
+# 圆弧离散的角度步长（弧度）
+ARC_STEP = math.radians(5)
+# 起始抽稀容差（mm，低于数控系统的最小输入单位）
+MIN_TOLERANCE = 1e-4
+# 每次抽稀最多加大容差的次数
+MAX_TOLERANCE_STEPS = 64
+# 缓存格式版本，输出结构变化时递增
+GEOMETRY_VERSION = 2
+BINARY_MAGIC = b'TPV1'
+
+Point = Tuple[float, float, float, int]
+
+
+def _farthest(points: List[Point], first: int, last: int) -> Tuple[int, float]:
+    """first和last之间离线段first-last最远的点（内联计算，Douglas–Peucker的主要耗时）"""
+    ax, ay, az = points[first][:3]
+    dx, dy, dz = points[last][0] - ax, points[last][1] - ay, points[last][2] - az
+    length = dx * dx + dy * dy + dz * dz
+    farthest, distance = first, -1.0
+    for index in range(first + 1, last):
+        x, y, z, _ = points[index]
+        px, py, pz = x - ax, y - ay, z - az
+        t = (px * dx + py * dy + pz * dz) / length if length > 0 else 0.0
+        if t >= 1:
+            px, py, pz = px - dx, py - dy, pz - dz
+        elif t > 0:
+            px, py, pz = px - t * dx, py - t * dy, pz - t * dz
+        d = px * px + py * py + pz * pz
+        if d > distance:
+            farthest, distance = index, d
+    return farthest, math.sqrt(distance) if distance > 0 else distance
+
+
+def douglas_peucker(points: List[Point], tolerance: float, merge: bool = False) -> List[Point]:
+    """
+    Douglas–Peucker抽稀
+
+    按顶点类型分段处理：类型改变处和断开点都是分段端点，始终保留。
+    merge为True时只在断开点分段，快速移动和切削合并处理，保留点的类型取被合并线段中最高的类型。
+    """
+    count = len(points)
+    if count <= 2:
+        return list(points)
+    keep = [False] * count
+    keep[0] = keep[-1] = True
+    start = 0
+    for index in range(1, count):
+        if index < count - 1 and points[index + 1][3] != KIND_JUMP and (
+            merge or points[index + 1][3] == points[index][3]
+        ):
+            continue
+        keep[index] = True
+        stack = [(start, index)]
+        while stack:
+            first, last = stack.pop()
+            if last - first < 2:
+                continue
+            farthest, distance = _farthest(points, first, last)
+            if distance > tolerance:
+                keep[farthest] = True
+                stack.append((first, farthest))
+                stack.append((farthest, last))
+        start = index
+    if not merge:
+        return [point for point, kept in zip(points, keep) if kept]
+    return _merge_kinds(points, keep)
+
+
+def _merge_kinds(points: List[Point], keep: List[bool]) -> List[Point]:
+    """保留keep标记的点；被跳过的线段含断开时标为断开，否则取其中最高的类型"""
+    result: List[Point] = []
+    jump = False
+    span = KIND_JUMP
+    for point, kept in zip(points, keep):
+        jump = jump or point[3] == KIND_JUMP
+        span = max(span, point[3])
+        if kept:
+            result.append(point[:3] + (KIND_JUMP if jump else span,))
+            jump = False
+            span = KIND_JUMP
+    return result
+
+
+def sample_points(points: List[Point], limit: int) -> List[Point]:
+    """按固定间隔抽样到limit个点以内（保留首尾点）"""
+    count = len(points)
+    if count <= limit:
+        return list(points)
+    stride = math.ceil((count - 1) / (max(limit, 2) - 1))
+    keep = [index % stride == 0 for index in range(count)]
+    keep[-1] = True
+    return _merge_kinds(points, keep)
+
+
+class PolylineDecimator:
+    """
+    流式折线抽稀
+
+    候选段以上一个保留点为起点、以第一个候选点确定方向；新点沿该方向前进且到方向线的距离在容差内时
+    只延长候选段（每个点O(1)），否则保留最后一个候选点并开始新的候选段。
+    容差从MIN_TOLERANCE开始，保留的点超过预算两倍时加大容差并重新抽稀到预算以内；结束时用Douglas–Peucker压缩到预算。
+    容差超过包围盒尺寸后仍超出预算说明剩下的都是分界点，此时按fallback逐级降级（见模块说明）。
+    """
+
+    def __init__(self, budget: int = DEFAULT_BUDGET):
+        self.budget = budget
+        self.tolerance = MIN_TOLERANCE
+        # 降级方式：None、'merged'（合并快速移动和切削）、'sampled'（按间隔抽样）
+        self.fallback: Optional[str] = None
+        self.kept: List[Point] = []
+        self.source = 0
+        self.low = [math.inf] * 3
+        self.high = [-math.inf] * 3
+        # 当前候选段：最后一个候选点、单位方向、最后一个候选点在方向上的投影
+        self.tail: Optional[Point] = None
+        self.direction: Tuple[float, float, float] = (0.0, 0.0, 0.0)
+        self.along = 0.0
+
+    def add(self, x: float, y: float, z: float, kind: int) -> None:
+        self.source += 1
+        low, high = self.low, self.high
+        for axis, value in enumerate((x, y, z)):
+            if value < low[axis]:
+                low[axis] = value
+            if value > high[axis]:
+                high[axis] = value
+        point = (x, y, z, kind)
+        if kind == KIND_JUMP or not self.kept:
+            self._flush()
+            self.kept.append(point)
+            return
+        anchor = self.kept[-1]
+        px, py, pz = x - anchor[0], y - anchor[1], z - anchor[2]
+        tail = self.tail
+        if tail is not None:
+            if tail[3] == kind or self.fallback:
+                ux, uy, uz = self.direction
+                along = px * ux + py * uy + pz * uz
+                if along >= self.along and px * px + py * py + pz * pz - along * along <= self.tolerance ** 2:
+                    self.tail = point if kind >= tail[3] else point[:3] + (tail[3],)
+                    self.along = along
+                    return
+            self._flush()
+            anchor = self.kept[-1]
+            px, py, pz = x - anchor[0], y - anchor[1], z - anchor[2]
+        length = math.sqrt(px * px + py * py + pz * pz)
+        if length == 0:
+            return
+        self.tail = point
+        self.direction = (px / length, py / length, pz / length)
+        self.along = length
+
+    def _flush(self) -> None:
+        if self.tail is None:
+            return
+        self.kept.append(self.tail)
+        self.tail = None
+        if len(self.kept) > 2 * self.budget:
+            self._compact(self.budget)
+
+    def _compact(self, limit: int) -> None:
+        """按新容差重新流式抽稀已保留的点"""
+        self._reduce(limit, self._replay)
+
+    def _replay(self, points: List[Point]) -> List[Point]:
+        replay = PolylineDecimator(sys.maxsize)
+        replay.tolerance = self.tolerance
+        replay.fallback = self.fallback
+        for point in points:
+            replay.add(*point)
+        replay._flush()
+        return replay.kept
+
+    def _reduce(self, limit: int, simplify: Callable[[List[Point]], List[Point]]) -> None:
+        """
+        加大容差重新抽稀，直到不超过limit
+
+        容差超过包围盒尺寸（或加大次数达到MAX_TOLERANCE_STEPS）后再加大也不会减少顶点，
+        先合并快速移动和切削的分界再抽稀一次，仍超出时按间隔抽样，保证循环结束。
+        """
+        steps = 0
+        while len(self.kept) > limit:
+            if steps < MAX_TOLERANCE_STEPS and self.tolerance <= self._size():
+                self._raise_tolerance()
+                steps += 1
+            elif self.fallback is None:
+                self.fallback = 'merged'
+            else:
+                self.fallback = 'sampled'
+                self.kept = sample_points(self.kept, limit)
+                return
+            self.kept = simplify(self.kept)
+
+    def _size(self) -> float:
+        return max(high - low for low, high in zip(self.low, self.high))
+
+    def _raise_tolerance(self) -> None:
+        self.tolerance = max(self.tolerance * 2, self._size() * 1e-5)
+
+    def finish(self) -> List[Point]:
+        """结束输入，用Douglas–Peucker压缩到预算以内"""
+        self._flush()
+        self._reduce(
+            self.budget, lambda points: douglas_peucker(points, self.tolerance, merge=self.fallback is not None)
+        )
+        return self.kept
+
+    def bounds(self) -> Optional[Dict[str, List[float]]]:
+        if not self.source:
+            return None
+        return {
+            'min': [round(value, 4) for value in self.low],
+            'max': [round(value, 4) for value in self.high]
+        }
+
+
+class PreviewBuilder(GcodeAnalyzer):
+    """
+    预览几何生成器（G代码分析器子类，在每次运动后记录轨迹）
+
+    用法：
+        builder = PreviewBuilder(budget=20000)
+        builder.feed_lines(lines)
+        geometry = builder.geometry()
+    """
+
+    def __init__(self, budget: int = DEFAULT_BUDGET, machine: Optional[MachineProfile] = None):
+        super().__init__(machine)
+        self.decimator = PolylineDecimator(budget)
+        self.last: Optional[Tuple[float, float, float]] = None
+
+    def _move(self, motion: int, target: Dict[str, Optional[float]], values: Dict[str, str]) -> None:
+        start = (self.position['X'], self.position['Y'], self.position['Z'])
+        arc = self._arc(motion, target, values) if motion in (2, 3) else None
+        super()._move(motion, target, values)
+        self._trace(start, target, motion, arc)
+
+    def _trace(self, start, target: Dict[str, Optional[float]], motion: int, arc) -> None:
+        end = (target['X'], target['Y'], target['Z'])
+        if None in end:
+            return
+        add = self.decimator.add
+        if None in start:
+            add(*end, KIND_JUMP)
+            self.last = end
+            return
+        if start != self.last:
+            # 起点与上一个顶点不同（G92、回参考点后）：从起点重新开始
+            add(*start, KIND_JUMP)
+        if end == start and arc is None:
+            self.last = end
+            return
+        if arc is not None:
+            self._tessellate(start, arc)
+        add(*end, KIND_RAPID if motion == 0 else KIND_FEED)
+        self.last = end
+
+    def _tessellate(self, start, arc) -> None:
+        """圆弧按角度步长离散为中间点（不含终点）"""
+        cx, cy, radius, angle, sweep, height = arc
+        first, second, third = PLANES[self.plane][:3]
+        steps = max(1, math.ceil(abs(sweep) / ARC_STEP - 1e-9))
+        origin = dict(zip(AXES, start))
+        base = origin[third]
+        for step in range(1, steps):
+            t = step / steps
+            theta = angle + sweep * t
+            point = {
+                first: cx + radius * math.cos(theta),
+                second: cy + radius * math.sin(theta),
+                third: base + height * t
+            }
+            self.decimator.add(point['X'], point['Y'], point['Z'], KIND_FEED)
+
+    def geometry(self) -> Dict[str, Any]:
+        points = self.decimator.finish()
+        vertices: List[float] = []
+        for x, y, z, _ in points:
+            vertices.extend((round(x, 4), round(y, 4), round(z, 4)))
+        return {
+            'version': GEOMETRY_VERSION,
+            'vertexCount': len(points),
+            'sourceVertices': self.decimator.source,
+            'budget': self.decimator.budget,
+            'tolerance': round(self.decimator.tolerance, 6),
+            'fallback': self.decimator.fallback,
+            'bounds': self.decimator.bounds(),
+            'vertices': vertices,
+            'kinds': [point[3] for point in points],
+            'analysis': self.report()
+        }
+
+
+def parse_budget(value: Any) -> int:
+    """校验顶点预算（None取默认值）"""
+    if value is None or value == '':
+        return DEFAULT_BUDGET
+    try:
+        budget = int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f'顶点预算必须是整数: {value}')
+    if not MIN_BUDGET <= budget <= MAX_BUDGET:
+        raise ValueError(f'顶点预算必须在 {MIN_BUDGET}~{MAX_BUDGET} 之间')
+    return budget
+
+
+def preview_lines(
+    lines: Iterable[str], budget: int = DEFAULT_BUDGET, machine: Optional[MachineProfile] = None
+) -> Dict[str, Any]:
+    builder = PreviewBuilder(budget, machine)
+    builder.feed_lines(lines)
+    return builder.geometry()
+
+
+def cached_preview(
+    content_hash: str,
+    open_lines: Callable[[], Iterable[str]],
+    budget: int = DEFAULT_BUDGET,
+    machine: Optional[MachineProfile] = None
+) -> Tuple[Dict[str, Any], bool]:
+    """
+    按内容哈希缓存的预览几何
+
+    Args:
+        content_hash: 程序内容的SHA256
+        open_lines: 未命中缓存时调用，返回程序的行迭代器
+
+    Returns:
+        (几何数据, 是否命中缓存)
+    """
+    machine = machine or MachineProfile()
+    cache = get_render_cache()
+    key = {
+        'sha256': content_hash,
+        'budget': budget,
+        'machine': machine.to_dict(),
+        'version': GEOMETRY_VERSION
+    }
+    geometry = cache.get('geometry', key)
+    if geometry is not None:
+        return geometry, True
+    geometry = preview_lines(open_lines(), budget, machine)
+    geometry['sha256'] = content_hash
+    cache.set('geometry', key, geometry)
+    return geometry, False
+
+
+def file_sha256(path) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def preview_file(
+    path,
+    budget: int = DEFAULT_BUDGET,
+    machine: Optional[MachineProfile] = None,
+    content_hash: Optional[str] = None
+) -> Tuple[Dict[str, Any], bool]:
+    """逐行读取程序文件生成预览几何（已知内容哈希时不再计算）"""
+    def open_lines():
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+            yield from f
+
+    return cached_preview(content_hash or file_sha256(path), open_lines, budget, machine)
+
+
+def preview_content(
+    content: str, budget: int = DEFAULT_BUDGET, machine: Optional[MachineProfile] = None
+) -> Tuple[Dict[str, Any], bool]:
+    content_hash = hashlib.sha256(content.encode('utf-8')).hexdigest()
+    return cached_preview(content_hash, lambda: iter(content.splitlines()), budget, machine)
+
+
+def encode_binary(geometry: Dict[str, Any]) -> bytes:
+    """几何数据 -> 紧凑二进制格式（见模块说明）"""
+    bounds = geometry.get('bounds') or {'min': [0.0] * 3, 'max': [0.0] * 3}
+    coords = array('f', geometry['vertices'])
+    if sys.byteorder != 'little':
+        coords.byteswap()
+    header = struct.pack(
+        '<4sI6f', BINARY_MAGIC, geometry['vertexCount'], *bounds['min'], *bounds['max']
+    )
+    return header + coords.tobytes() + bytes(geometry['kinds'])
+
+
+def decode_binary(data: bytes) -> Dict[str, Any]:
+    """紧凑二进制格式 -> {vertexCount, bounds, vertices, kinds}"""
+    magic, count, *box = struct.unpack_from('<4sI6f', data)
+    if magic != BINARY_MAGIC:
+        raise ValueError('不是刀路预览数据')
+    offset = struct.calcsize('<4sI6f')
+    coords = array('f')
+    coords.frombytes(data[offset:offset + 12 * count])
+    if sys.byteorder != 'little':
+        coords.byteswap()
+    return {
+        'vertexCount': count,
+        'bounds': {'min': box[:3], 'max': box[3:]},
+        'vertices': coords.tolist(),
+        'kinds': list(data[offset + 12 * count:offset + 13 * count])
+    }
+
+
+def geometry_headers(geometry: Dict[str, Any], cached: bool) -> Dict[str, str]:
+    """二进制响应附带的元数据（二进制格式中不含分析结果）"""
+    return {
+        'X-Content-SHA256': geometry.get('sha256', ''),
+        'X-Geometry-Cache': 'hit' if cached else 'miss',
+        'X-Geometry-Source-Vertices': str(geometry['sourceVertices']),
+        'X-Geometry-Tolerance': str(geometry['tolerance']),
+        'X-Geometry-Fallback': geometry.get('fallback') or ''
+    }
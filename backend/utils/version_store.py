@@ -0,0 +1,356 @@
+"""
+模板包版本历史存储
+
+严格遵循PROJECT_REQUIREMENTS.md文档约束
+
+功能：
+- 模板包保存、导入、复制时生成快照
+- 文件内容按SHA-256寻址存储，跨版本、跨模板包去重
+- 通过stat索引只对变化的文件计算哈希，快照开销与变更文件数成正比
+- 版本对比、检出只读取涉及的对象
+
+存储布局：
+    versions/objects/ab/cdef...                 zlib压缩的文件内容
+    versions/packages/<包名>/index.json          上次快照的stat索引
+    versions/packages/<包名>/snapshots/<id>.json 快照清单
+"""
+
+import difflib
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import zlib
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+
+import yaml
+
+from .package_archive import PackageArchive, STAGING_PREFIX
+
+logger = logging.getLogger(__name__)
+
+
+class VersionNotFoundError(FileNotFoundError):
+    """版本快照不存在"""
+
+
+class PackageVersionStore:
+    """内容寻址的模板包版本存储"""
+
+    def __init__(self, root: Union[str, Path] = "versions"):
+        self.root = Path(root)
+        self.objects_dir = self.root / "objects"
+        self.packages_dir = self.root / "packages"
+        self.lock = threading.RLock()
+
+    def snapshot(
+        self,
+        package_name: str,
+        package_path: Union[str, Path],
+        source: str = 'manual',
+        description: str = '',
+        version: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        为模板包创建快照
+
+        内容与最新快照相同时不创建新快照。
+
+        Args:
+            package_name: 包名
+            package_path: 模板包目录
+            source: 触发来源（save/import/duplicate/create/checkout/manual）
+            description: 版本说明
+            version: 版本号，默认读取package.yaml
+
+        Returns:
+            快照摘要，created字段表示是否创建了新快照
+        """
+        package_path = Path(package_path)
+
+        with self.lock:
+            index = self._load_index(package_name)
+            files = {}
+            new_index = {}
+            hashed = 0
+
+            for rel, file_path in self._iter_package_files(package_path):
+                st = file_path.stat()
+                cached = index.get(rel)
+                if cached and cached[0] == st.st_size and cached[1] == st.st_mtime_ns:
+                    digest = cached[2]
+                else:
+                    digest = self._store_file(file_path)
+                    hashed += 1
+                files[rel] = {'hash': digest, 'size': st.st_size}
+                new_index[rel] = [st.st_size, st.st_mtime_ns, digest]
+
+            latest = self._latest_manifest(package_name)
+            if latest and latest['files'] == files:
+                self._save_index(package_name, new_index)
+                return {**self._summary(latest), 'created': False}
+
+            if version is None:
+                version = self._read_version(package_path)
+
+            tree_hash = hashlib.sha256(json.dumps(files, sort_keys=True).encode()).hexdigest()
+            now = datetime.now()
+            manifest = {
+                'id': f"{now.strftime('%Y%m%d%H%M%S%f')}-{tree_hash[:8]}",
+                'package': package_name,
+                'version': version,
+                'description': description,
+                'source': source,
+                'createdAt': now.isoformat(),
+                'parent': latest['id'] if latest else None,
+                'tree': tree_hash,
+                'files': files
+            }
+
+            snapshots_dir = self._snapshots_dir(package_name)
+            snapshots_dir.mkdir(parents=True, exist_ok=True)
+            self._write_json(snapshots_dir / f"{manifest['id']}.json", manifest)
+            self._save_index(package_name, new_index)
+
+        logger.info(f"版本快照: {package_name} {manifest['id']} ({source}, 重新哈希 {hashed} 个文件)")
+        return {**self._summary(manifest), 'created': True}
+
+    def list_snapshots(self, package_name: str) -> List[Dict[str, Any]]:
+        """列出快照摘要（最新在前）"""
+        snapshots_dir = self._snapshots_dir(package_name)
+        if not snapshots_dir.exists():
+            return []
+
+        summaries = []
+        for manifest_file in sorted(snapshots_dir.glob('*.json'), reverse=True):
+            try:
+                summaries.append(self._summary(self._read_json(manifest_file)))
+            except Exception as e:
+                logger.warning(f"Failed to read snapshot {manifest_file}: {e}")
+        return summaries
+
+    def get_snapshot(self, package_name: str, snapshot_id: str) -> Dict[str, Any]:
+        """获取快照清单"""
+        manifest_file = self._snapshots_dir(package_name) / f"{snapshot_id}.json"
+        if not self._is_safe_id(snapshot_id) or not manifest_file.exists():
+            raise VersionNotFoundError(f"版本不存在: {package_name}@{snapshot_id}")
+        return self._read_json(manifest_file)
+
+    def read_blob(self, digest: str) -> bytes:
+        """读取对象内容"""
+        object_file = self._object_path(digest)
+        if not object_file.exists():
+            raise VersionNotFoundError(f"对象不存在: {digest}")
+        return zlib.decompress(object_file.read_bytes())
+
+    def diff(
+        self,
+        package_name: str,
+        base_id: str,
+        target_id: str,
+        include_content: bool = True
+    ) -> Dict[str, Any]:
+        """
+        对比两个快照
+
+        只比较清单中的哈希，仅为内容不同的文件读取对象生成文本差异。
+        """
+        base = self.get_snapshot(package_name, base_id)
+        target = self.get_snapshot(package_name, target_id)
+        base_files = base['files']
+        target_files = target['files']
+
+        added = sorted(set(target_files) - set(base_files))
+        removed = sorted(set(base_files) - set(target_files))
+        modified = []
+        unchanged = 0
+
+        for rel in sorted(set(base_files) & set(target_files)):
+            if base_files[rel]['hash'] == target_files[rel]['hash']:
+                unchanged += 1
+                continue
+            entry: Dict[str, Any] = {'path': rel}
+            if include_content:
+                entry['diff'] = self._text_diff(
+                    rel, base_files[rel]['hash'], target_files[rel]['hash'], base_id, target_id
+                )
+            modified.append(entry)
+
+        return {
+            'base': base_id,
+            'target': target_id,
+            'added': added,
+            'removed': removed,
+            'modified': modified,
+            'unchanged': unchanged
+        }
+
+    def checkout(
+        self,
+        package_name: str,
+        snapshot_id: str,
+        package_path: Union[str, Path]
+    ) -> Dict[str, Any]:
+        """
+        将模板包恢复到指定快照
+
+        在packages目录下的暂存目录中还原文件，然后原子替换模板包目录，
+        并为恢复后的状态生成一个checkout快照。
+        """
+        manifest = self.get_snapshot(package_name, snapshot_id)
+        package_path = Path(package_path)
+        package_path.parent.mkdir(parents=True, exist_ok=True)
+        staging = Path(tempfile.mkdtemp(prefix=f'{STAGING_PREFIX}{package_name}-', dir=str(package_path.parent)))
+
+        try:
+            os.chmod(staging, 0o755)
+            for rel, info in manifest['files'].items():
+                target = staging.joinpath(*rel.split('/'))
+                target.parent.mkdir(parents=True, exist_ok=True)
+                target.write_bytes(self.read_blob(info['hash']))
+            PackageArchive.publish(staging, package_path)
+        except Exception:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+
+        return self.snapshot(
+            package_name,
+            package_path,
+            source='checkout',
+            description=f'恢复到版本 {snapshot_id}'
+        )
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取存储统计信息"""
+        object_count = 0
+        object_bytes = 0
+        if self.objects_dir.exists():
+            for object_file in self.objects_dir.rglob('*'):
+                if object_file.is_file():
+                    object_count += 1
+                    object_bytes += object_file.stat().st_size
+        return {
+            'objects': object_count,
+            'objectBytes': object_bytes,
+            'packages': len(list(self.packages_dir.iterdir())) if self.packages_dir.exists() else 0
+        }
+
+    def _iter_package_files(self, package_path: Path):
+        """遍历模板包文件（跳过隐藏文件和目录）"""
+        for root, dirs, files in os.walk(package_path):
+            dirs[:] = sorted(d for d in dirs if not d.startswith('.') and d != '__pycache__')
+            for file_name in sorted(files):
+                if file_name.startswith('.'):
+                    continue
+                file_path = Path(root) / file_name
+                yield file_path.relative_to(package_path).as_posix(), file_path
+
+    def _store_file(self, file_path: Path) -> str:
+        """计算文件哈希，对象不存在时写入（哈希与存储使用同一次读取的内容）"""
+        data = file_path.read_bytes()
+        digest = hashlib.sha256(data).hexdigest()
+
+        object_file = self._object_path(digest)
+        if not object_file.exists():
+            object_file.parent.mkdir(parents=True, exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(dir=str(object_file.parent))
+            with os.fdopen(fd, 'wb') as f:
+                f.write(zlib.compress(data))
+            os.replace(temp_path, object_file)
+        return digest
+
+    def _text_diff(self, rel: str, base_hash: str, target_hash: str, base_id: str, target_id: str) -> Optional[str]:
+        try:
+            base_text = self.read_blob(base_hash).decode('utf-8')
+            target_text = self.read_blob(target_hash).decode('utf-8')
+        except UnicodeDecodeError:
+            return None
+        return ''.join(difflib.unified_diff(
+            base_text.splitlines(keepends=True),
+            target_text.splitlines(keepends=True),
+            fromfile=f'{base_id}/{rel}',
+            tofile=f'{target_id}/{rel}'
+        ))
+
+    def _latest_manifest(self, package_name: str) -> Optional[Dict[str, Any]]:
+        snapshots_dir = self._snapshots_dir(package_name)
+        if not snapshots_dir.exists():
+            return None
+        manifest_files = sorted(snapshots_dir.glob('*.json'))
+        if not manifest_files:
+            return None
+        return self._read_json(manifest_files[-1])
+
+    def _load_index(self, package_name: str) -> Dict[str, List[Any]]:
+        index_file = self.packages_dir / package_name / 'index.json'
+        try:
+            return self._read_json(index_file)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def _save_index(self, package_name: str, index: Dict[str, List[Any]]) -> None:
+        index_file = self.packages_dir / package_name / 'index.json'
+        index_file.parent.mkdir(parents=True, exist_ok=True)
+        self._write_json(index_file, index)
+
+    def _snapshots_dir(self, package_name: str) -> Path:
+        return self.packages_dir / package_name / 'snapshots'
+
+    def _object_path(self, digest: str) -> Path:
+        return self.objects_dir / digest[:2] / digest[2:]
+
+    @staticmethod
+    def _summary(manifest: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            'id': manifest['id'],
+            'version': manifest.get('version'),
+            'description': manifest.get('description', ''),
+            'source': manifest.get('source'),
+            'createdAt': manifest.get('createdAt'),
+            'parent': manifest.get('parent'),
+            'fileCount': len(manifest.get('files', {})),
+            'size': sum(f['size'] for f in manifest.get('files', {}).values())
+        }
+
+    @staticmethod
+    def _read_version(package_path: Path) -> Optional[str]:
+        try:
+            with open(package_path / 'package.yaml', 'r', encoding='utf-8') as f:
+                return str(yaml.safe_load(f)['package']['version'])
+        except Exception:
+            return None
+
+    @staticmethod
+    def _is_safe_id(snapshot_id: str) -> bool:
+        return bool(snapshot_id) and '/' not in snapshot_id and '\\' not in snapshot_id and '..' not in snapshot_id
+
+    @staticmethod
+    def _read_json(path: Path) -> Any:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    @staticmethod
+    def _write_json(path: Path, data: Any) -> None:
+        fd, temp_path = tempfile.mkstemp(dir=str(path.parent), suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(temp_path, path)
+
+
+# 全局版本存储实例（首次使用时创建）
+_version_store: Optional[PackageVersionStore] = None
+_version_store_lock = threading.Lock()
+
+
+def get_version_store() -> PackageVersionStore:
+    """获取全局版本存储实例"""
+    global _version_store
+    with _version_store_lock:
+        if _version_store is None:
+            _version_store = PackageVersionStore()
+        return _version_store
@@ -179,6 +179,26 @@ export const parameterApi = {
   deletePreset: (packageName: string, presetName: string) => {
     return api.delete(`/parameters/${packageName}/presets/${presetName}`);
   },
+
+  // 上传点数组（.npy或CSV），返回的ref可作为points参数的值
+  uploadPointArray: (file: File, axes?: string) => {
+    const formData = new FormData();
+    formData.append("file", file);
+    if (axes) {
+      formData.append("axes", axes);
+    }
+
+    return api.post("/parameters/arrays", formData, {
+      headers: {
+        "Content-Type": "multipart/form-data",
+      },
+    });
+  },
+
+  // 获取点数组摘要
+  getPointArray: (arrayId: string) => {
+    return api.get(`/parameters/arrays/${arrayId}`);
+  },
 };
 
 // 渲染API
@@ -241,6 +261,49 @@ export const renderApi = {
   getOutputs: (packageName: string) => {
     return api.get(`/render/templates/${packageName}/outputs`);
   },
+
+  // DNC在线传输：边渲染边发送到数控系统
+  startDnc: (
+    packageName: string,
+    parameters: Record<string, any>,
+    target: DncTarget,
+    output?: string,
+  ) => {
+    return api.post(`/render/templates/${packageName}/dnc`, {
+      parameters,
+      output,
+      ...target,
+    });
+  },
+
+  // DNC在线传输：发送落盘的渲染结果
+  startResultDnc: (resultId: string, target: DncTarget) => {
+    return api.post(`/render/results/${resultId}/dnc`, target);
+  },
+
+  // DNC传输状态
+  getDncSession: (sessionId: string) => {
+    return api.get(`/render/dnc/${sessionId}`);
+  },
+
+  // 暂停/继续/取消DNC传输
+  controlDnc: (sessionId: string, action: "pause" | "resume" | "cancel") => {
+    return api.post(`/render/dnc/${sessionId}/${action}`);
+  },
+
+  // 渲染结果的预览几何（落盘结果传resultId，否则传content）
+  getGeometry: (
+    source: { resultId: string } | { content: string },
+    budget?: number,
+    machine?: MachineProfile,
+  ) => {
+    return api.post("/render/geometry", {
+      result_id: "resultId" in source ? source.resultId : undefined,
+      content: "content" in source ? source.content : undefined,
+      budget,
+      machine,
+    });
+  },
 };
 
 // 系统API
@@ -350,6 +413,23 @@ export const fileApi = {
     });
   },
 
+  // 分析G代码程序
+  analyzeProgram: (path: string, machine?: MachineProfile) => {
+    return api.post("/files/analyze", {
+      path,
+      machine,
+    });
+  },
+
+  // G代码程序的预览几何
+  getProgramGeometry: (path: string, budget?: number, machine?: MachineProfile) => {
+    return api.post("/files/geometry", {
+      path,
+      budget,
+      machine,
+    });
+  },
+
   // 下载文件
   downloadFile: async (path: string): Promise<Blob> => {
     // 确保路径以 / 开头
@@ -436,11 +516,136 @@ export interface ValidationResult {
  */
 
 // 单个渲染文件
+// 落盘的大输出下载句柄
+export interface RenderResultHandle {
+  id: string;
+  filename: string;
+  size: number;
+  lines: number;
+  sha256: string;
+  url: string;
+}
+
+// 输出后处理统计
+export interface PostProcessReport {
+  bytesIn: number;
+  bytesOut: number;
+  bytesSaved: number;
+  savedPercent: number;
+  stages: Record<string, Record<string, number>>;
+}
+
+// 程序拆分信息
+export interface ProgramSplitReport {
+  dialect: 'fanuc' | 'siemens' | 'heidenhain';
+  parts: number;
+  subprograms: string[];
+}
+
+// 刀路中间表示的输出信息
+export interface ToolpathReport {
+  ops: number;
+  dialects: Array<'fanuc' | 'siemens' | 'heidenhain'>;
+}
+
+// G代码分析结果
+export interface GcodeAnalysis {
+  machine: string;
+  lines: number;
+  blocks: number;
+  rapidDistance: number;
+  feedDistance: number;
+  rapidTime: number;
+  feedTime: number;
+  dwellTime: number;
+  toolChangeTime: number;
+  cycleTime: number;
+  cycleTimeText: string;
+  tools: Array<{ tool: number; changes: number; feedDistance: number; cutTime: number }>;
+  spindle: [number, number] | null;
+  feed: [number, number] | null;
+  extents: Record<"X" | "Y" | "Z", [number, number] | null>;
+  envelope: {
+    checked: boolean;
+    violations: Record<string, number>;
+    samples: Array<{ line: number; axis: string; value: number; limits: [number, number] }>;
+  };
+  warnings: Record<string, number>;
+}
+
+// 刀路预览几何（顶点类型：0 断开、1 快速移动、2 切削）
+export interface ToolpathGeometry {
+  version: number;
+  vertexCount: number;
+  sourceVertices: number;
+  budget: number;
+  tolerance: number;
+  bounds: { min: [number, number, number]; max: [number, number, number] } | null;
+  vertices: number[];
+  kinds: Array<0 | 1 | 2>;
+  analysis: GcodeAnalysis;
+  sha256: string;
+}
+
+// DNC传输目标
+export interface DncTarget {
+  host: string;
+  port: number;
+  baud?: number;
+  line_ending?: "crlf" | "lf" | "cr";
+  restart_from?: number | string;
+}
+
+// DNC传输状态
+export interface DncSession {
+  id: string;
+  name: string;
+  host: string;
+  port: number;
+  baud: number;
+  restartFrom: number | string | null;
+  state: "pending" | "running" | "paused" | "completed" | "failed" | "cancelled";
+  pausedBy: Array<"api" | "xoff">;
+  bytesSent: number;
+  linesSent: number;
+  xoffCount: number;
+  elapsed: number;
+  error: string | null;
+  createdAt: string;
+  startedAt: string | null;
+  finishedAt: string | null;
+}
+
+// 分析使用的机床参数
+export interface MachineProfile {
+  name?: string;
+  rapid_rate?: number | Record<string, number>;
+  tool_change_time?: number;
+  max_feed?: number;
+  envelope?: Record<string, [number, number]>;
+  spindle_range?: [number, number];
+}
+
 export interface RenderFile {
   filename: string;
   content: string;
   encoding?: string;
   errors?: string[];
+  size?: number;
+  lines?: number;
+  sha256?: string;
+  spilled?: boolean;
+  handle?: RenderResultHandle;
+  postprocess?: PostProcessReport;
+  split?: ProgramSplitReport;
+  subprograms?: string[];
+  toolpath?: ToolpathReport;
+  variants?: string[];
+  analysis?: GcodeAnalysis;
+  parent?: string;
+  success?: boolean;
+  error?: string;
+  elapsed?: number;
 }
 
 // 渲染结果（后端返回的完整响应）
@@ -448,7 +653,10 @@ export interface RenderResult {
   success: boolean;
   package_path?: string;
   results?: Record<string, RenderFile>;
+  order?: string[];
   total?: number;
+  failed?: number;
+  timings?: Record<string, number>;
   render_time: string;
   errors?: string[];
   logs?: Array<{
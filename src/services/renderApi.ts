@@ -11,6 +11,17 @@ import type {
   RenderHistoryItem 
 } from '@/stores/renderStore'
 
+export interface BatchRenderItem {
+  type: 'result' | 'summary'
+  index: number
+  templateName: string
+  key: string
+  success: boolean
+  data?: any
+  error?: string
+  elapsed: number
+}
+
 export class RenderApiService {
   private baseUrl = '/api'
 
@@ -98,15 +109,18 @@ export class RenderApiService {
 
   /**
    * 批量渲染模板
+   *
+   * 服务端以NDJSON流返回，每完成一项回调一次onResult，结果按请求顺序返回
    */
   async batchRender(
     requests: Array<{
       templateName: string
       parameters: Record<string, any>
       settings?: Partial<RenderSettings>
-    }>
+    }>,
+    onResult?: (item: BatchRenderItem) => void
   ): Promise<Array<RenderResult | { error: string; templateName: string }>> {
-    const response = await fetch(`${this.baseUrl}/templates/batch-render`, {
+    const response = await fetch(`${this.baseUrl}/render/templates/batch-render`, {
       method: 'POST',
       headers: {
         'Content-Type': 'application/json'
@@ -114,12 +128,76 @@ export class RenderApiService {
       body: JSON.stringify({ requests })
     })
 
-    if (!response.ok) {
+    if (!response.ok || !response.body) {
       const errorData = await response.json().catch(() => ({}))
-      throw new Error(errorData.message || `HTTP ${response.status}: ${response.statusText}`)
+      throw new Error(errorData.error || errorData.message || `HTTP ${response.status}: ${response.statusText}`)
     }
 
-    return response.json()
+    const results: Array<RenderResult | { error: string; templateName: string }> = new Array(requests.length)
+    const reader = response.body.getReader()
+    const decoder = new TextDecoder()
+    let buffer = ''
+
+    const handleLine = (line: string) => {
+      if (!line.trim()) return
+      const item = JSON.parse(line) as BatchRenderItem
+      if (item.type !== 'result') return
+      results[item.index] = item.success
+        ? item.data
+        : { error: item.error || '渲染失败', templateName: item.templateName }
+      onResult?.(item)
+    }
+
+    while (true) {
+      const { done, value } = await reader.read()
+      if (done) break
+      buffer += decoder.decode(value, { stream: true })
+      const lines = buffer.split('\n')
+      buffer = lines.pop() || ''
+      lines.forEach(handleLine)
+    }
+    handleLine(buffer + decoder.decode())
+
+    return results
+  }
+
+  /**
+   * 流式渲染模板
+   *
+   * 每收到一块内容回调一次onChunk，返回完整内容
+   */
+  async streamRender(
+    packageName: string,
+    parameters: Record<string, any>,
+    onChunk?: (chunk: string) => void,
+    templateName?: string
+  ): Promise<string> {
+    const response = await fetch(`${this.baseUrl}/render/templates/${packageName}/stream`, {
+      method: 'POST',
+      headers: {
+        'Content-Type': 'application/json'
+      },
+      body: JSON.stringify({ parameters, template_name: templateName, format: 'text' })
+    })
+
+    if (!response.ok || !response.body) {
+      const errorData = await response.json().catch(() => ({}))
+      throw new Error(errorData.error || errorData.message || `HTTP ${response.status}: ${response.statusText}`)
+    }
+
+    const reader = response.body.getReader()
+    const decoder = new TextDecoder()
+    const chunks: string[] = []
+    while (true) {
+      const { done, value } = await reader.read()
+      if (done) break
+      const chunk = decoder.decode(value, { stream: true })
+      chunks.push(chunk)
+      onChunk?.(chunk)
+    }
+    chunks.push(decoder.decode())
+
+    return chunks.join('')
   }
 
   /**
@@ -353,6 +431,32 @@ export class RenderApiService {
     return response.json()
   }
 
+  /**
+   * 提交异步渲染任务，返回任务ID，通过getRenderProgress轮询进度
+   */
+  async submitRenderJob(
+    requests: Array<{
+      templateName: string
+      parameters: Record<string, any>
+    }>
+  ): Promise<{ jobId: string; status: string; total_files: number }> {
+    const response = await fetch(`${this.baseUrl}/render/render`, {
+      method: 'POST',
+      headers: {
+        'Content-Type': 'application/json'
+      },
+      body: JSON.stringify({ requests })
+    })
+
+    if (!response.ok) {
+      const errorData = await response.json().catch(() => ({}))
+      throw new Error(errorData.error || errorData.message || `HTTP ${response.status}: ${response.statusText}`)
+    }
+
+    const result = await response.json()
+    return result.data
+  }
+
   /**
    * 取消正在进行的渲染
    */
@@ -360,7 +464,7 @@ export class RenderApiService {
     cancelled: boolean
     message: string
   }> {
-    const response = await fetch(`${this.baseUrl}/render/${renderId}/cancel`, {
+    const response = await fetch(`${this.baseUrl}/render/render/${renderId}/cancel`, {
       method: 'POST',
       headers: {
         'Content-Type': 'application/json'
@@ -385,8 +489,10 @@ export class RenderApiService {
     current_file?: string
     completed_files?: number
     total_files?: number
+    failed_files?: number
+    eta?: number | null
   }> {
-    const response = await fetch(`${this.baseUrl}/render/${renderId}/progress`, {
+    const response = await fetch(`${this.baseUrl}/render/render/${renderId}/progress`, {
       method: 'GET',
       headers: {
         'Content-Type': 'application/json'
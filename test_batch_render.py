@@ -0,0 +1,69 @@
+"""
+批量渲染测试
+
+严格遵循PROJECT_REQUIREMENTS.md文档约束
+
+测试请求规范化去重和按完成顺序产出结果
+"""
+
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from backend.utils.batch_render import canonical_request_key, dedupe_requests, run_batch
+
+
+class TestBatchRender:
+    """批量渲染测试类"""
+
+    def test_dedupe_canonical_requests(self):
+        """测试参数顺序不同的相同请求被合并"""
+        requests = [
+            {'templateName': 'a', 'parameters': {'x': 1, 'y': 2}},
+            {'templateName': 'a', 'parameters': {'y': 2, 'x': 1}},
+            {'templateName': 'b', 'parameters': {'x': 1, 'y': 2}},
+            {'templateName': 'a', 'parameters': {'x': 1.5, 'y': 2}},
+            {'templateName': 'a'},
+            {'templateName': 'a', 'parameters': {}}
+        ]
+        unique, indices = dedupe_requests(requests)
+        assert len(unique) == 4
+        assert indices[canonical_request_key('a', {'x': 1, 'y': 2})] == [0, 1]
+        assert indices[canonical_request_key('a', {})] == [4, 5]
+
+    def test_run_batch_streams_with_bounded_in_flight(self):
+        """测试结果按完成顺序产出，在途任务数不超过上限，异常单独返回"""
+        running = []
+        peak = []
+        lock = threading.Lock()
+        release = threading.Event()
+
+        def work(value):
+            with lock:
+                running.append(value)
+                peak.append(len(running))
+            if value == 0:
+                release.wait(5)
+            try:
+                if value == 3:
+                    raise ValueError('bad item')
+                return value * 10
+            finally:
+                with lock:
+                    running.remove(value)
+
+        tasks = ((f'k{i}', work, (i,)) for i in range(8))
+        results = {}
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            for key, result, error, elapsed in run_batch(executor, tasks, max_in_flight=2):
+                results[key] = error or result
+                if len(results) == 7:
+                    release.set()
+
+        assert max(peak) <= 2
+        assert list(results)[-1] == 'k0'
+        assert isinstance(results['k3'], ValueError)
+        assert results['k7'] == 70
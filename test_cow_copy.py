@@ -0,0 +1,65 @@
+"""
+写时复制测试
+
+严格遵循PROJECT_REQUIREMENTS.md文档约束
+
+测试模板包复制时的内容共享和写入隔离
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from backend.utils.cow_copy import clone_tree, break_link
+
+
+class TestCowCopy:
+    """写时复制测试类"""
+
+    def setup_method(self):
+        """测试前设置"""
+        self.temp_dir = Path(tempfile.mkdtemp())
+        self.source = self.temp_dir / 'source'
+        (self.source / 'templates').mkdir(parents=True)
+        (self.source / 'package.yaml').write_text('package:\n  name: source\n')
+        (self.source / 'templates' / 'main.j2').write_text('G00 X0 Y0\n')
+
+    def teardown_method(self):
+        """测试后清理"""
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_clone_shares_content(self):
+        """测试克隆结果与源目录内容一致且未整体复制"""
+        target = self.temp_dir / 'target'
+        stats = clone_tree(self.source, target)
+
+        assert (target / 'templates' / 'main.j2').read_text() == 'G00 X0 Y0\n'
+        assert stats['reflinked'] + stats['linked'] + stats['copied'] == 2
+        assert stats['directories'] == 2
+
+    def test_copy_filter_forces_copy(self):
+        """测试指定文件强制复制"""
+        target = self.temp_dir / 'target'
+        clone_tree(self.source, target, use_reflink=False,
+                   copy_filter=lambda p: p.name == 'package.yaml')
+
+        assert os.stat(target / 'package.yaml').st_nlink == 1
+
+    def test_break_link_isolates_writes(self):
+        """测试写入前断开硬链接不影响源文件"""
+        target = self.temp_dir / 'target'
+        stats = clone_tree(self.source, target, use_reflink=False)
+        template = target / 'templates' / 'main.j2'
+
+        if stats['linked']:
+            assert os.stat(template).st_nlink == 2
+            assert break_link(template) is True
+        assert os.stat(template).st_nlink == 1
+
+        template.write_text('G01 X10\n')
+        assert (self.source / 'templates' / 'main.j2').read_text() == 'G00 X0 Y0\n'
+        assert break_link(template) is False
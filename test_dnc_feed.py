@@ -0,0 +1,208 @@
+"""
+DNC在线传输测试
+
+严格遵循PROJECT_REQUIREMENTS.md文档约束
+
+测试断点续传、按波特率限速、XON/XOFF流控、暂停/继续/取消、目标地址白名单和模板惰性生成的传输
+（数控系统由本地TCP替身ControllerSimulator代替）
+"""
+
+import os
+import shutil
+import socket
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from backend.controllers.render_controller import JinjaRenderer
+from backend.utils.dnc_feed import (
+    ControllerSimulator, DncBusyError, DncError, DncSession, DncSessionManager,
+    SessionNotFoundError, restart_lines
+)
+from backend.utils.gcode_postprocess import iter_lines
+
+PROGRAM = """%
+O1000 (POCKET)
+G90 G21 G17
+T2 M06
+S9000 M04
+G00 X0 Y0 Z5
+N100 G01 Z-1 F250
+X10
+N120 G02 X20 Y10 I10 J0
+Y20
+G81 X5 Y5 Z-3 R1 F100
+N200 X6
+G80
+M30
+%""".splitlines()
+
+
+def program(count: int) -> list:
+    return [f"N{i} G01 X{i} Y{i % 7} F300" for i in range(1, count + 1)]
+
+
+def sent(lines: list) -> str:
+    return ''.join(line + '\r\n' for line in lines)
+
+
+class TestDncFeed:
+    """DNC在线传输测试类"""
+
+    def setup_method(self):
+        """测试前准备"""
+        self.temp_dir = Path(tempfile.mkdtemp())
+        self.simulators = []
+
+    def teardown_method(self):
+        """测试后清理"""
+        for simulator in self.simulators:
+            simulator.close()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def simulator(self, **options) -> ControllerSimulator:
+        simulator = ControllerSimulator(**options).start()
+        self.simulators.append(simulator)
+        return simulator
+
+    def test_restart(self):
+        """测试按顺序号和程序段序号续传，恢复模态"""
+        assert list(restart_lines(PROGRAM, 'N120')) == [
+            '%', '(RESTART AT N120 FROM X10 Y0 Z-1)', 'G21 G17 G90 G94', 'T2 M06', 'S9000 M04', 'F250', 'G01',
+            'N120 G02 X20 Y10 I10 J0', 'Y20', 'G81 X5 Y5 Z-3 R1 F100', 'N200 X6', 'G80', 'M30', '%'
+        ]
+        # 第9个程序段（O1000也计入）：Y20（圆弧之后）
+        lines = list(restart_lines(PROGRAM, 9))
+        assert lines[1] == '(RESTART AT BLOCK 9 FROM X20 Y10 Z-1)'
+        assert lines[6:8] == ['G02', 'Y20']
+        assert list(restart_lines(PROGRAM, 'n100', preamble=False))[:2] == ['%', 'N100 G01 Z-1 F250']
+
+    def test_restart_errors(self):
+        """测试无效的续传位置、固定循环中续传和找不到续传位置"""
+        for value in ('X10', 0, True):
+            with pytest.raises(DncError):
+                restart_lines(PROGRAM, value)
+        with pytest.raises(DncError, match='固定循环'):
+            list(restart_lines(PROGRAM, 'N200'))
+        with pytest.raises(DncError, match='没有续传位置'):
+            list(restart_lines(PROGRAM, 'N999'))
+
+    def test_paced(self):
+        """测试按波特率限速发送完整程序"""
+        lines = program(60)
+        simulator = self.simulator()
+        started = time.monotonic()
+        session = DncSession(iter(lines), *simulator.address, baud=20000, line_ending='crlf').start()
+        assert session.wait(10) and simulator.wait(5)
+        elapsed = time.monotonic() - started
+        assert session.state == 'completed'
+        assert simulator.text == sent(lines)
+        assert session.to_dict()['linesSent'] == 60
+        # 2000字符/秒，首个时间片可预支100字符
+        assert elapsed >= (len(simulator.received) - 100) / 2000 * 0.9
+
+    def test_xon_xoff(self):
+        """测试数控系统缓冲区将满时XOFF暂停、XON继续"""
+        lines = program(150)
+        simulator = self.simulator(buffer_size=1024, execute_rate=4000, high_water=0.5, low_water=0.25)
+        started = time.monotonic()
+        session = DncSession(iter(lines), *simulator.address, baud=96000).start()
+        assert session.wait(20) and simulator.wait(5)
+        assert session.state == 'completed'
+        assert simulator.text == sent(lines)
+        assert simulator.xoff_sent >= 1
+        assert session.xoff_count >= 1
+        # 发送速度受数控系统执行速度限制，缓冲区不会溢出太多
+        assert simulator.peak <= 1024 * 1.5
+        assert time.monotonic() - started >= (len(simulator.received) - 1024) / 4000 * 0.9
+
+    def test_pause_resume_cancel(self):
+        """测试接口暂停、继续和取消"""
+        simulator = self.simulator()
+        session = DncSession(iter(program(400)), *simulator.address, baud=9600).start()
+        time.sleep(0.2)
+        assert session.pause()
+        time.sleep(0.15)
+        assert session.to_dict()['state'] == 'paused'
+        assert session.to_dict()['pausedBy'] == ['api']
+        paused_at = session.bytes_sent
+        time.sleep(0.2)
+        assert session.bytes_sent == paused_at
+        assert session.resume()
+        time.sleep(0.2)
+        assert session.bytes_sent > paused_at
+        assert session.cancel()
+        assert session.wait(5)
+        assert session.state == 'cancelled'
+        assert not session.resume()
+        assert simulator.wait(5)
+        assert len(simulator.received) == session.bytes_sent
+
+    def test_connection_refused(self):
+        """测试连接失败"""
+        with socket.socket() as probe:
+            probe.bind(('127.0.0.1', 0))
+            port = probe.getsockname()[1]
+        session = DncSession(iter(program(3)), '127.0.0.1', port, connect_timeout=1).start()
+        assert session.wait(5)
+        assert session.state == 'failed'
+        assert session.error
+
+    def test_manager(self):
+        """测试目标地址检查、同一数控系统只允许一个传输和会话查询"""
+        with pytest.raises(DncError, match='DNC_ALLOWED_HOSTS'):
+            DncSessionManager().check_target('127.0.0.1', 23)
+        manager = DncSessionManager(max_sessions=2, allowed_hosts=['127.0.0.0/8', 'localhost'])
+        with pytest.raises(DncError, match='不允许'):
+            manager.check_target('8.8.8.8', 23)
+        with pytest.raises(DncError):
+            manager.check_target('127.0.0.1', 70000)
+        with pytest.raises(DncError):
+            DncSessionManager(allowed_hosts=['cnc-1']).check_target('127.0.0.1', 23)
+        assert manager.check_target('127.0.0.5', 23) == '127.0.0.5'
+        # 主机名按解析出的地址连接
+        assert manager.check_target('LOCALHOST', 23) in ('127.0.0.1', '::1')
+
+        simulator = self.simulator()
+        session = manager.start(iter(program(200)), *simulator.address, baud=9600)
+        with pytest.raises(DncBusyError):
+            manager.start(iter(program(1)), *simulator.address)
+        assert manager.get(session.id) is session
+        assert session.to_dict()['address'] == '127.0.0.1'
+        assert [item['id'] for item in manager.list()] == [session.id]
+        with pytest.raises(SessionNotFoundError):
+            manager.get('missing')
+        session.cancel()
+        assert session.wait(5)
+
+    def test_template_source(self):
+        """测试模板边生成边发送，从顺序号续传"""
+        templates = self.temp_dir / 'templates'
+        templates.mkdir()
+        (templates / 'main.j2').write_text(
+            "%\nG90 G21\n{% for i in range(count) %}N{{ i + 1 }} G01 X{{ i }} F300\n{% endfor %}M30\n%\n",
+            encoding='utf-8'
+        )
+        renderer = JinjaRenderer(str(self.temp_dir))
+        rendered = []
+
+        def lines():
+            for line in iter_lines(renderer.generate_template('templates/main.j2', {'count': 200})):
+                rendered.append(line)
+                yield line
+
+        simulator = self.simulator()
+        session = DncSession(lines(), *simulator.address, baud=0, line_ending='lf', restart_from='N150').start()
+        assert session.wait(10) and simulator.wait(5)
+        received = simulator.text.splitlines()
+        assert received[0] == '%'
+        assert received[1] == '(RESTART AT N150 FROM X148)'
+        assert received[4:7] == ['G01', 'N150 G01 X149 F300', 'N151 G01 X150 F300']
+        assert received[-2:] == ['M30', '%']
+        assert '\r' not in simulator.text
+        assert len(rendered) == 204
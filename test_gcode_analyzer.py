@@ -0,0 +1,152 @@
+"""
+G代码分析测试
+
+严格遵循PROJECT_REQUIREMENTS.md文档约束
+
+测试距离和加工时间估算、圆弧和固定循环、刀具与主轴统计、行程检查、文件分析和模板包输出配置
+"""
+
+import math
+import os
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+import yaml
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from backend.controllers.render_controller import JinjaRenderer
+from backend.utils.gcode_analyzer import GcodeAnalyzer, MachineProfile, analyze_file, analyze_lines
+
+
+def analyze(text: str, **machine) -> dict:
+    return analyze_lines(text.splitlines(), MachineProfile(**machine) if machine else None)
+
+
+class TestGcodeAnalyzer:
+    """G代码分析测试类"""
+
+    def setup_method(self):
+        """测试前准备"""
+        self.temp_dir = Path(tempfile.mkdtemp())
+
+    def teardown_method(self):
+        """测试后清理"""
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_linear_moves(self):
+        """测试快速移动和切削的距离与时间"""
+        report = analyze(
+            "G90 G21\nG00 X0 Y0 Z0\nX300 Y400\nG01 X0 Y0 F1000\n",
+            rapid_rate={'x': 30000, 'y': 20000, 'z': 10000}
+        )
+        assert report['rapidDistance'] == 500
+        # 快移取最慢的轴：Y 400mm / 20000mm/min
+        assert report['rapidTime'] == pytest.approx(1.2)
+        assert report['feedDistance'] == 500
+        assert report['feedTime'] == pytest.approx(30)
+        assert report['cycleTime'] == pytest.approx(31.2)
+        assert report['cycleTimeText'] == '0:00:31'
+
+    def test_modes(self):
+        """测试英制单位、增量坐标和每转进给"""
+        report = analyze("G20\nG90 G00 X0 Y0 Z0\nG91 G01 X1 F10\nX1\n")
+        assert report['feedDistance'] == pytest.approx(50.8)
+        assert report['extents']['X'] == [0, 50.8]
+        report = analyze("G90 G95\nG00 X0 Y0 Z0\nS1000 M03\nG01 X10 F0.1\n")
+        assert report['feedTime'] == pytest.approx(6)
+
+    def test_arcs(self):
+        """测试I/J和R圆弧的弧长"""
+        report = analyze("G17 G90\nG00 X10 Y0 Z0\nG03 X-10 Y0 I-10 J0 F600\nG02 X10 Y0 R-10\n")
+        assert report['feedDistance'] == pytest.approx(20 * math.pi, abs=1e-3)
+        full = analyze("G00 X10 Y0 Z0\nG02 X10 Y0 I-10 J0 F600\n")
+        assert full['feedDistance'] == pytest.approx(20 * math.pi, abs=1e-3)
+
+    def test_canned_cycle(self):
+        """测试固定循环按孔估算"""
+        report = analyze(
+            "G90\nG00 X0 Y0 Z10\nG98 G81 X10 Y0 Z-5 R2 F300\nX20\nG80\n",
+            rapid_rate=60000
+        )
+        # 每个孔进给 7mm（R2 -> Z-5）
+        assert report['feedDistance'] == pytest.approx(14)
+        assert report['feedTime'] == pytest.approx(2.8)
+        # 定位 10+10，下降 8+8，退回R 7+7，回初始平面 8+8
+        assert report['rapidDistance'] == pytest.approx(66)
+
+    def test_tools_spindle_dwell(self):
+        """测试刀具、主轴转速范围、暂停和换刀时间"""
+        report = analyze(
+            "T1 M06\nS8000 M03\nG00 X0 Y0 Z0\nG01 X10 F600\nG04 P500\n"
+            "T2 M06\nS20000 M03\nG01 X20\nG04 X1.5\nM05\nM30\n",
+            tool_change_time=4, spindle_range=[0, 15000]
+        )
+        assert [(t['tool'], t['changes'], t['feedDistance']) for t in report['tools']] == [(1, 1, 10), (2, 1, 10)]
+        assert report['spindle'] == [8000, 20000]
+        assert report['dwellTime'] == pytest.approx(2)
+        assert report['toolChangeTime'] == 8
+        assert report['warnings']['spindleOutOfRange'] == 1
+
+    def test_envelope(self):
+        """测试超出行程的坐标计数和样例"""
+        report = analyze(
+            "G00 X0 Y0 Z0\nX900\nG01 Y-10 F100\nX100\n",
+            envelope={'x': [0, 850], 'y': [0, 500]}
+        )
+        assert report['envelope']['violations'] == {'X': 1, 'Y': 1}
+        assert report['envelope']['samples'][0] == {'line': 2, 'axis': 'X', 'value': 900, 'limits': [0, 850]}
+
+    def test_unparsed_blocks(self):
+        """测试注释、宏程序和无法解析的程序段"""
+        report = analyze("%\nO1000 (TEST)\n#1=10\nCYCLE81(2,0,1,-5)\nG00 X0 Y0 Z0 ; start\nM30\n%\n")
+        assert report['warnings']['unparsedBlocks'] == 2
+        assert report['blocks'] == 3
+
+    def test_observe_and_file(self):
+        """测试边输出边分析与文件分析的结果一致"""
+        program = "G00 X0 Y0 Z5\r\nG01 Z-1 F100\r\n" + ''.join(f"X{i} Y{i % 7}\r\n" for i in range(1000))
+        analyzer = GcodeAnalyzer()
+        pieces = [program[i:i + 97] for i in range(0, len(program), 97)]
+        assert ''.join(analyzer.observe(pieces)) == program
+        path = self.temp_dir / 'part.nc'
+        path.write_text(program, encoding='utf-8', newline='')
+        assert analyzer.report() == analyze_file(path)
+
+    def test_invalid_machine(self):
+        """测试无效的机床参数"""
+        with pytest.raises(ValueError):
+            MachineProfile(rapid_rate=0)
+        with pytest.raises(ValueError):
+            MachineProfile.from_config({'envelope': {'x': [10, 0]}})
+
+    def test_package_output(self):
+        """测试模板包输出按配置附带分析结果"""
+        templates = self.temp_dir / 'templates'
+        templates.mkdir()
+        (templates / 'main.j2').write_text(
+            "G00 X0 Y0 Z5\nG01 Z0 F{{ feed }}\nX{{ length }}\n", encoding='utf-8'
+        )
+        config = {
+            'package': {'name': 'an', 'displayName': '分析', 'version': '1.0.0', 'description': '', 'category': '测试'},
+            'templates': {'main': 'templates/main.j2'},
+            'outputs': {'files': {
+                'plain': {'template': 'templates/main.j2', 'filename_pattern': 'PLAIN'},
+                'main': {'template': 'templates/main.j2', 'filename_pattern': 'MAIN',
+                         'analyze': {'name': 'VMC', 'envelope': {'x': [0, 100]}}}
+            }}
+        }
+        (self.temp_dir / 'package.yaml').write_text(yaml.safe_dump(config, sort_keys=False), encoding='utf-8')
+
+        results = JinjaRenderer(str(self.temp_dir)).render_package(
+            str(self.temp_dir), {'feed': 500, 'length': 250}
+        )['results']
+        assert 'analysis' not in results['plain']
+        analysis = results['main']['analysis']
+        assert analysis['machine'] == 'VMC'
+        assert analysis['feedDistance'] == 255
+        assert analysis['feedTime'] == pytest.approx(30.6)
+        assert analysis['envelope']['violations'] == {'X': 1}
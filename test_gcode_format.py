@@ -0,0 +1,70 @@
+"""
+G代码坐标批量格式化测试
+
+严格遵循PROJECT_REQUIREMENTS.md文档约束
+
+测试小数位数、去除末尾0、模态省略、输入格式和模板中的用法
+"""
+
+import math
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from backend.utils import gcode_format
+from backend.utils.gcode_format import format_coord, gcode_block
+from backend.utils.jinja_renderer import RenderEngine
+
+
+class TestGcodeFormat:
+    """坐标格式化测试类"""
+
+    def test_format_coord(self):
+        """测试单个坐标的小数位数、末尾0和负零"""
+        assert format_coord(10.5) == '10.5'
+        assert format_coord(10) == '10.'
+        assert format_coord(-0.0001) == '0.'
+        assert format_coord(1.23456, 4) == '1.2346'
+        assert format_coord(2.5, 3, False) == '2.500'
+        assert format_coord(-0.0001, 3, False) == '0.000'
+
+    def test_modal_block(self):
+        """测试模态省略：运动指令只输出一次，未变化的坐标字和重复点被省略"""
+        points = [{'x': 0, 'y': 0}, {'x': 10, 'y': 0}, {'x': 10, 'y': 0}, {'x': 10, 'y': 5.25}]
+        assert gcode_block(points, 'G01', feed=300) == 'G01 X0. Y0. F300.\nX10.\nY5.25'
+        assert gcode_block(points, 'G00', modal=False, trim_zeros=False) == (
+            'G00 X0.000 Y0.000\nG00 X10.000 Y0.000\nG00 X10.000 Y0.000\nG00 X10.000 Y5.250'
+        )
+
+    def test_input_shapes(self):
+        """测试点字典列表、点元组列表和列字典得到相同结果，缺少的轴被跳过"""
+        expected = 'G01 X1. Y2. Z-1.\nX3. Y4.'
+        assert gcode_block([{'x': 1, 'y': 2, 'z': -1}, {'x': 3, 'y': 4, 'z': -1}], axes='XYZ') == expected
+        assert gcode_block([(1, 2, -1), (3, 4, -1)], axes='XYZ') == expected
+        assert gcode_block({'x': [1, 3], 'y': [2, 4], 'z': [-1, -1]}, axes='XYZ') == expected
+        assert gcode_block([{'x': 1}, {'x': 2}], axes='XY') == 'G01 X1.\nX2.'
+        assert gcode_block([], 'G01') == ''
+
+    def test_template_usage(self):
+        """测试模板中的过滤器和全局函数与逐点循环输出一致"""
+        env = RenderEngine().env
+        moves = [{'x': 50 * math.cos(i / 10), 'y': 50 * math.sin(i / 10)} for i in range(500)]
+        loop = env.from_string(
+            "{% for m in moves %}{{ 'G00' if loop.first else '' }}"
+            "{{ ' ' if loop.first else '' }}X{{ m.x | coord }} Y{{ m.y | coord }}\n{% endfor %}"
+        ).render(moves=moves)
+        block = env.from_string("{{ gcode_block(moves, 'G00') }}").render(moves=moves)
+        assert block == loop.rstrip('\n')
+        assert env.from_string("{{ moves | gcode_block('G00') }}").render(moves=moves) == block
+
+    def test_numpy_matches_python(self):
+        """测试NumPy实现与纯Python实现输出一致"""
+        np = pytest.importorskip('numpy')
+        points = np.column_stack([np.round(np.linspace(-1, 1, 1000), 2), np.zeros(1000)])
+        columns = gcode_format.point_columns(points, 'XY')
+        for modal in (True, False):
+            args = (columns, 'XY', 'G01', 3, True, modal, 'F100.')
+            assert gcode_format._block_np(*args) == gcode_format._block_py(*args)
@@ -0,0 +1,171 @@
+"""
+G代码后处理测试
+
+严格遵循PROJECT_REQUIREMENTS.md文档约束
+
+测试模态压缩的省略规则、坐标取整、不可省略的情形、圆弧拟合和模板包输出配置
+"""
+
+import math
+import os
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+import yaml
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from backend.controllers.render_controller import JinjaRenderer
+from backend.utils.gcode_postprocess import create_pipeline, iter_lines
+
+
+def compact(text: str, **options) -> str:
+    pipeline = create_pipeline({'compact': options or True})
+    return ''.join(pipeline.run([text]))
+
+
+class TestGcodePostprocess:
+    """后处理测试类"""
+
+    def setup_method(self):
+        """测试前准备"""
+        self.temp_dir = Path(tempfile.mkdtemp())
+
+    def teardown_method(self):
+        """测试后清理"""
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_iter_lines(self):
+        """测试跨片段拆分行"""
+        assert list(iter_lines(['G0', '1 X1\nG01', ' X2\n', 'M30'])) == ['G01 X1', 'G01 X2', 'M30']
+
+    def test_modal_words(self):
+        """测试省略重复的运动指令、未变化的坐标和F，删除无内容的行"""
+        source = 'G90 G21\nG01 X10. Y0. Z-1. F200\nG01 X10. Y5. Z-1. F200\n\nG01 X10. Y5. F200\nG00 Z5.\n'
+        assert compact(source) == 'G90 G21\nG01 X10. Y0. Z-1. F200\nY5.\nG00 Z5.\n'
+
+    def test_quantize(self):
+        """测试坐标按分辨率取整，不带小数点的数值保持不变"""
+        assert compact('G01 X1.00049 Y2.5 Z10\nG01 X1.0001 Y2.5004\n', resolution=0.001) == 'G01 X1. Y2.5 Z10\n'
+        assert compact('G01 X0.0004\n', resolution=0.001, separator='') == 'G01X0.\n'
+        # 分辨率>=1时仍保留小数点，避免按最小输入单位解释
+        assert compact('G01 X10.4 Y-0.3 Z25.\n', resolution=1) == 'G01 X10. Y0. Z25.\n'
+        assert compact('G01 X12.4 Y3\n', resolution=5) == 'G01 X10. Y3\n'
+
+    def test_preserved_blocks(self):
+        """测试圆弧、固定循环、增量坐标、刀补和宏程序行不省略坐标字"""
+        source = (
+            'G90 G01 X10. Y5.\n'
+            'G02 X10. Y5. I-5. J0.\n'
+            'G43 H1 Z50.\n'
+            'G81 X1. Y1. Z-5. R1.\n'
+            'X1. Y1.\n'
+            'G80\n'
+            'G91 G01 X1.\n'
+            'X1.\n'
+            'G90\n'
+            '#100=5\n'
+            'G01 X10.\n'
+        )
+        assert compact(source) == source
+
+    def test_state_reset(self):
+        """测试换刀、G28和注释后代码行之后重新输出坐标"""
+        source = 'G00 X10. Y5.\nM06 T2\nG00 X10. Y5.\nG28 X0.\nG00 X10. Y5. (back) G01\nG00 X10. Y5.\n'
+        assert compact(source) == (
+            'G00 X10. Y5.\nM06 T2\nX10. Y5.\nG28 X0.\nG00 X10. Y5. (back) G01\nG00 X10. Y5.\n'
+        )
+
+    def test_raw_block_modal(self):
+        """测试G28等原样输出的行上的模态改变仍然生效：G91之后不省略增量坐标"""
+        source = 'G90 G01 X0. F100\nG91 G28 Z0.\nG01 X10. F100\nX10.\nX10.\nG90 G00 X0.\nX0.\n'
+        assert compact(source) == 'G90 G01 X0. F100\nG91 G28 Z0.\nX10.\nX10.\nX10.\nG90 G00 X0.\n'
+
+    def test_comments(self):
+        """测试保留行尾注释，可选删除注释"""
+        assert compact('G00 X1. ; start\nG00 X1. (same)\n') == 'G00 X1. ; start\n(same)\n'
+        assert compact('G00 X1. ; start\n(only)\n', strip_comments=True) == 'G00 X1.\n'
+
+    def test_report(self):
+        """测试字节统计和CRLF换行"""
+        pipeline = create_pipeline({'compact': True})
+        output = ''.join(pipeline.run(['G01 X1.\r\nG01 X1.\r\nG01 X2.\r\n']))
+        assert output == 'G01 X1.\r\nX2.\r\n'
+        report = pipeline.report()
+        assert report['bytesIn'] == 27
+        assert report['bytesOut'] == len(output)
+        assert report['bytesSaved'] == 27 - len(output)
+        assert report['stages']['compact']['linesRemoved'] == 1
+
+    def test_pipeline_config(self):
+        """测试未启用和未知的后处理阶段"""
+        assert create_pipeline(None) is None
+        assert create_pipeline({'compact': False}) is None
+        with pytest.raises(ValueError):
+            create_pipeline({'unknown': True})
+
+    def test_arc_fit(self):
+        """测试圆弧上的直线段替换为G03（I/J和R两种格式），之后的直线段补上G01"""
+        lines = ['G90 G17', 'G00 X10. Y0.']
+        lines += [f'G01 X{10 * math.cos(math.radians(i * 3)):.4f} Y{10 * math.sin(math.radians(i * 3)):.4f} F300'
+                  for i in range(1, 31)]
+        lines += ['X0. Y20.', 'X0. Y30.', 'M30']
+        source = '\n'.join(lines) + '\n'
+
+        pipeline = create_pipeline({'arc_fit': {'tolerance': 0.005}})
+        output = ''.join(pipeline.run([source])).split('\n')
+        assert output[:4] == ['G90 G17', 'G00 X10. Y0.', 'G03 X0.0000 Y10.0000 I-10. J0. F300', 'G01 X0. Y20.']
+        assert output[4:] == ['X0. Y30.', 'M30', '']
+        report = pipeline.report()
+        assert report['stages']['arc_fit']['arcs'] == 1
+        assert report['stages']['arc_fit']['segmentsReplaced'] == 30
+        assert report['bytesSaved'] > 0
+
+        pipeline = create_pipeline({'arc_fit': {'arc_format': 'r'}})
+        assert 'G03 X0.0000 Y10.0000 R10. F300' in ''.join(pipeline.run([source]))
+
+        # 3度弦的弦高约0.0034，超过公差时保持直线
+        assert ''.join(create_pipeline({'arc_fit': {'tolerance': 0.001}}).run([source])) == source
+
+    def test_arc_fit_keeps_lines(self):
+        """测试直线、超出公差的折线、增量坐标和进给变化处不拟合"""
+        source = (
+            'G90 G00 X0. Y0.\nG01 X1. Y0. F100\nX2. Y0.\nX3. Y0.\nX4. Y0.\n'
+            'X5. Y1.\nX6. Y3.\nX7. Y6.\n'
+            'G91\nG01 X1. Y1.\nX1. Y0.5\nX1. Y0.\nX1. Y-0.5\n'
+        )
+        assert ''.join(create_pipeline({'arc_fit': True}).run([source])) == source
+
+        lines = ['G90 G00 X10. Y0.']
+        lines += [f'G01 X{10 * math.cos(math.radians(i * 5)):.4f} Y{10 * math.sin(math.radians(i * 5)):.4f} F{100 + i}'
+                  for i in range(1, 10)]
+        source = '\n'.join(lines) + '\n'
+        assert ''.join(create_pipeline({'arc_fit': True}).run([source])) == source
+
+    def test_package_output(self):
+        """测试模板包输出按配置后处理并返回统计"""
+        templates = self.temp_dir / 'templates'
+        templates.mkdir()
+        (templates / 'main.j2').write_text(
+            "{% for i in range(3) %}G01 X{{ i }}.0001 Y0.0000 F300\n{% endfor %}", encoding='utf-8'
+        )
+        config = {
+            'package': {'name': 'pp', 'displayName': '后处理', 'version': '1.0.0', 'description': '', 'category': '测试'},
+            'templates': {'main': 'templates/main.j2'},
+            'outputs': {'files': {
+                'raw': {'template': 'templates/main.j2', 'filename_pattern': 'RAW'},
+                'compact': {'template': 'templates/main.j2', 'filename_pattern': 'CMP',
+                            'postprocess': {'compact': {'resolution': 0.001}}}
+            }}
+        }
+        (self.temp_dir / 'package.yaml').write_text(yaml.safe_dump(config, sort_keys=False), encoding='utf-8')
+
+        results = JinjaRenderer(str(self.temp_dir)).render_package(str(self.temp_dir), {})['results']
+        assert 'postprocess' not in results['raw']
+        assert results['compact']['content'] == 'G01 X0. Y0. F300\nX1.\nX2.\n'
+        assert results['compact']['postprocess']['bytesSaved'] == (
+            len(results['raw']['content']) - len(results['compact']['content'])
+        )
@@ -0,0 +1,196 @@
+"""
+模板包压缩文件测试
+
+严格遵循PROJECT_REQUIREMENTS.md文档约束
+
+测试模板包导入的完整流程，包括：
+- 基于中央目录的验证
+- zip炸弹防护
+- 暂存目录解压与原子发布
+"""
+
+import io
+import os
+import shutil
+import sys
+import tempfile
+import zipfile
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from backend.utils import package_archive
+from backend.utils.package_archive import PackageArchive, ArchiveLimitError, stage_archives, stage_worker_count
+
+PACKAGE_YAML = """
+package:
+  name: {name}
+  displayName: 测试包
+  version: "1.0.0"
+  description: 测试
+  category: 测试
+variables:
+  groups: {{}}
+outputs:
+  files: {{}}
+templates:
+  main: templates/main.j2
+"""
+
+
+def build_zip(files, prefix=''):
+    """在内存中构建zip文件"""
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as zf:
+        for name, content in files.items():
+            zf.writestr(prefix + name, content)
+    buffer.seek(0)
+    return buffer
+
+
+class TestPackageArchive:
+    """模板包压缩文件测试类"""
+
+    def setup_method(self):
+        """测试前设置"""
+        self.packages_dir = Path(tempfile.mkdtemp())
+        self.files = {
+            'package.yaml': PACKAGE_YAML.format(name='demo'),
+            'templates/main.j2': 'O{{ program_number }}\nM30\n'
+        }
+
+    def teardown_method(self):
+        """测试后清理"""
+        shutil.rmtree(self.packages_dir, ignore_errors=True)
+
+    def test_validate_from_central_directory(self):
+        """测试无需解压即可验证"""
+        with PackageArchive(build_zip(self.files)) as archive:
+            result = archive.validate()
+            assert result['valid'] is True
+            assert archive.package_name == 'demo'
+        assert list(self.packages_dir.iterdir()) == []
+
+    def test_validate_exported_layout(self):
+        """测试导出格式（带顶层目录）也能导入"""
+        with PackageArchive(build_zip(self.files, prefix='demo/')) as archive:
+            assert archive.validate()['valid'] is True
+            target = archive.install(self.packages_dir)
+        assert (target / 'package.yaml').exists()
+        assert (target / 'templates' / 'main.j2').exists()
+
+    def test_reject_missing_sections_and_traversal(self):
+        """测试缺少配置节和路径遍历"""
+        files = {'package.yaml': 'package:\n  name: demo\n', 'templates/main.j2': ''}
+        with PackageArchive(build_zip(files)) as archive:
+            result = archive.validate()
+            assert result['valid'] is False
+            assert any('variables' in e for e in result['errors'])
+
+        files = dict(self.files)
+        files['../evil.j2'] = 'x'
+        with PackageArchive(build_zip(files)) as archive:
+            assert archive.validate()['valid'] is False
+
+    def test_reject_invalid_package_name(self):
+        """测试包名不能用于路径遍历"""
+        files = dict(self.files)
+        files['package.yaml'] = PACKAGE_YAML.format(name='../escape')
+        with PackageArchive(build_zip(files)) as archive:
+            assert archive.validate()['valid'] is False
+
+    def test_size_and_entry_limits(self):
+        """测试大小和条目数量限制"""
+        files = dict(self.files)
+        files['templates/big.j2'] = 'G01 X0\n' * 2000
+        with PackageArchive(build_zip(files), max_size=4096) as archive:
+            result = archive.validate()
+            assert result['valid'] is False
+            with pytest.raises(ValueError):
+                archive.stage(self.packages_dir)
+
+        with PackageArchive(build_zip(self.files), max_entries=1) as archive:
+            assert archive.validate()['valid'] is False
+
+    def test_lying_header_is_capped(self):
+        """测试条目头信息与实际内容不符时中止并清理暂存目录"""
+        with PackageArchive(build_zip(self.files)) as archive:
+            archive.validate()
+            info, rel = next(m for m in archive.members if m[1] == 'templates/main.j2')
+            info.file_size = 4
+            with pytest.raises((ArchiveLimitError, zipfile.BadZipFile)):
+                archive.stage(self.packages_dir)
+        assert list(self.packages_dir.iterdir()) == []
+
+    def test_atomic_replace_existing_package(self):
+        """测试覆盖安装不留下暂存或回收目录"""
+        with PackageArchive(build_zip(self.files)) as archive:
+            archive.install(self.packages_dir)
+
+        files = dict(self.files)
+        files['templates/main.j2'] = 'UPDATED\n'
+        with PackageArchive(build_zip(files)) as archive:
+            target = archive.install(self.packages_dir)
+
+        assert (target / 'templates' / 'main.j2').read_text() == 'UPDATED\n'
+        assert [p.name for p in self.packages_dir.iterdir()] == ['demo']
+
+    def test_publish_exchanges_existing_package(self, monkeypatch):
+        """测试覆盖发布时与目标原子交换，不经过目标不存在的中间状态"""
+        target = self.packages_dir / 'demo'
+        (target / 'templates').mkdir(parents=True)
+        (target / 'templates' / 'main.j2').write_text('OLD\n')
+        probe = self.packages_dir / '.probe'
+        probe.mkdir()
+        if not package_archive.exchange_paths(probe, target):
+            pytest.skip('平台或文件系统不支持RENAME_EXCHANGE')
+        package_archive.exchange_paths(probe, target)
+        probe.rmdir()
+
+        staging = self.packages_dir / '.staging-demo'
+        (staging / 'templates').mkdir(parents=True)
+        (staging / 'templates' / 'main.j2').write_text('NEW\n')
+
+        def no_rename(src, dst):
+            raise AssertionError('不应通过rename移走目标目录')
+
+        monkeypatch.setattr(package_archive.os, 'rename', no_rename)
+        PackageArchive.publish(staging, target)
+        assert (target / 'templates' / 'main.j2').read_text() == 'NEW\n'
+        assert [p.name for p in self.packages_dir.iterdir()] == ['demo']
+
+    def test_publish_without_exchange(self, monkeypatch):
+        """测试不支持交换时退回两次rename"""
+        monkeypatch.setattr(package_archive, 'exchange_paths', lambda a, b: False)
+        self.test_atomic_replace_existing_package()
+
+    def test_stage_archives_in_parallel(self):
+        """测试批量暂存保持顺序并隔离失败项"""
+        sources = [
+            (f'pkg{i}.zip', build_zip({
+                'package.yaml': PACKAGE_YAML.format(name=f'pkg{i}'),
+                'templates/main.j2': 'M30\n'
+            }))
+            for i in range(4)
+        ]
+        sources.append(('broken.zip', io.BytesIO(b'not a zip')))
+
+        results = stage_archives(sources, self.packages_dir, max_workers=10 ** 6)
+
+        assert [r['source'] for r in results] == [s[0] for s in sources]
+        assert [r['success'] for r in results] == [True] * 4 + [False]
+        for result in results[:4]:
+            assert result['staging'].name.startswith('.staging-')
+            assert (result['staging'] / 'templates' / 'main.j2').exists()
+
+    def test_stage_worker_count(self):
+        """测试请求的并行度限制在1~min(8, CPU核数)之间"""
+        limit = min(8, os.cpu_count() or 1)
+        assert stage_worker_count() == limit
+        assert stage_worker_count(10 ** 6) == limit
+        assert stage_worker_count('2') == min(2, limit)
+        assert stage_worker_count(0) == stage_worker_count(-5) == 1
+        for value in ('abc', float('inf'), True, [4]):
+            assert stage_worker_count(value) == limit
@@ -0,0 +1,75 @@
+"""
+模板包编译包测试
+
+严格遵循PROJECT_REQUIREMENTS.md文档约束
+
+测试编译包的生成、mmap加载和源文件变更后的回退
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from backend.utils.jinja_renderer import RenderEngine
+from backend.utils.package_bundle import (
+    BUNDLE_FILENAME, BundleLoader, build_bundle, open_bundle
+)
+
+
+class TestPackageBundle:
+    """模板包编译包测试类"""
+
+    def setup_method(self):
+        """测试前设置"""
+        self.temp_dir = Path(tempfile.mkdtemp())
+        self.package_dir = self.temp_dir / 'demo'
+        (self.package_dir / 'templates').mkdir(parents=True)
+        (self.package_dir / 'package.yaml').write_text(
+            'package:\n  name: demo\n  version: 1.0.0\n'
+            'variables:\n  groups: {}\ntemplates:\n  main: templates/main.j2\n',
+            encoding='utf-8'
+        )
+        (self.package_dir / 'templates' / 'main.j2').write_text(
+            '{% for i in range(count) %}G01 X{{ i }}\n{% endfor %}', encoding='utf-8'
+        )
+
+    def teardown_method(self):
+        """测试后清理"""
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_bundle_render_matches_source(self):
+        """测试编译包加载的模板与源文件渲染结果一致"""
+        expected = RenderEngine(str(self.package_dir)).render_template('templates/main.j2', {'count': 3})
+
+        engine = RenderEngine(str(self.package_dir))
+        assert build_bundle(self.package_dir, [engine.env]) == self.package_dir / BUNDLE_FILENAME
+
+        bundle = open_bundle(self.package_dir)
+        assert bundle is not None
+        assert bundle.load_config()['package']['name'] == 'demo'
+        assert bundle.header['summary']['version'] == '1.0.0'
+
+        engine = RenderEngine(str(self.package_dir))
+        assert isinstance(engine.env.loader, BundleLoader)
+        assert engine.render_template('templates/main.j2', {'count': 3}) == expected
+
+    def test_stale_bundle_falls_back(self):
+        """测试源文件变更或新增后编译包失效"""
+        build_bundle(self.package_dir, [RenderEngine(str(self.package_dir)).env])
+        assert open_bundle(self.package_dir) is not None
+
+        template = self.package_dir / 'templates' / 'main.j2'
+        template.write_text('G00 Z{{ count }}\n', encoding='utf-8')
+        assert open_bundle(self.package_dir) is None
+
+        engine = RenderEngine(str(self.package_dir))
+        assert not isinstance(engine.env.loader, BundleLoader)
+        assert engine.render_template('templates/main.j2', {'count': 5}).strip() == 'G00 Z5'
+
+        build_bundle(self.package_dir, [engine.env])
+        (self.package_dir / 'templates' / 'extra.j2').write_text('M30\n', encoding='utf-8')
+        assert open_bundle(self.package_dir) is None
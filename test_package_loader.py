@@ -0,0 +1,98 @@
+"""
+模板包依赖加载测试
+
+严格遵循PROJECT_REQUIREMENTS.md文档约束
+
+测试依赖拓扑排序、跨包import/extends、依赖模板编译结果共享和依赖包修改后过期
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from backend.controllers.render_controller import _get_worker_renderer
+from backend.utils.jinja_renderer import RenderEngine
+from backend.utils.package_bundle import build_bundle, open_bundle
+from backend.utils.package_loader import (
+    DependencyError, get_shared_code_cache, parse_dependencies, resolve_load_order
+)
+
+
+class TestPackageLoader:
+    """模板包依赖加载测试类"""
+
+    def setup_method(self):
+        """测试前设置"""
+        self.temp_dir = Path(tempfile.mkdtemp())
+
+    def teardown_method(self):
+        """测试后清理"""
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def _write(self, rel: str, content: str) -> None:
+        path = self.temp_dir / rel
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content, encoding='utf-8')
+
+    def test_resolve_load_order(self):
+        """测试拓扑顺序、循环依赖和缺失依赖"""
+        graph = {'app': ['macros', 'base'], 'macros': ['base'], 'base': []}
+        assert resolve_load_order('app', graph.get) == ['base', 'macros', 'app']
+
+        graph['base'] = ['app']
+        with pytest.raises(DependencyError, match='循环依赖'):
+            resolve_load_order('app', graph.get)
+
+        with pytest.raises(DependencyError, match='不存在'):
+            resolve_load_order('app', {'app': ['missing']}.get)
+
+        assert parse_dependencies({'dependencies': ['a', {'name': 'b', 'version': '1.0'}, 'a']}) == ['a', 'b']
+
+    def test_import_and_extends_from_dependency(self):
+        """测试依赖包模板可被import/extends，编译结果在环境间共享"""
+        self._write('shop/templates/macros.j2', '{% macro move(x) %}G01 X{{ x }}{% endmacro %}')
+        self._write('shop/templates/base.j2', 'O1000\n{% block body %}{% endblock %}\nM30\n')
+        self._write(
+            'app/templates/main.j2',
+            "{% extends 'shop/templates/base.j2' %}"
+            "{% block body %}{% import 'templates/macros.j2' as m %}{{ m.move(5) }}{% endblock %}"
+        )
+        self._write('other/templates/main.j2', "{% import 'shop/templates/macros.j2' as m %}{{ m.move(7) }}")
+
+        dependencies = [('shop', self.temp_dir / 'shop')]
+        cache = get_shared_code_cache()
+        compiles = cache.get_stats()['compiles']
+
+        content = RenderEngine(str(self.temp_dir / 'app'), dependencies).render_template('templates/main.j2', {})
+        assert content.startswith('O1000\nG01 X5')
+        assert content.rstrip().endswith('M30')
+        after_first = cache.get_stats()['compiles']
+        assert after_first - compiles == 2
+
+        content = RenderEngine(str(self.temp_dir / 'other'), dependencies).render_template('templates/main.j2', {})
+        assert content == 'G01 X7'
+        assert cache.get_stats()['compiles'] == after_first
+
+    def test_dependency_bundle_goes_stale(self):
+        """测试依赖包编译包中的模板在源文件修改后过期，工作进程的渲染引擎随依赖包重建"""
+        self._write('shop/templates/macros.j2', '{% macro move(x) %}G01 X{{ x }}{% endmacro %}')
+        self._write('shop/package.yaml', 'package:\n  name: shop\n  version: 1.0.0\n')
+        self._write('app/templates/main.j2', "{% import 'shop/templates/macros.j2' as m %}{{ m.move(5) }}")
+        build_bundle(self.temp_dir / 'shop', [RenderEngine(str(self.temp_dir / 'shop')).env])
+        assert open_bundle(self.temp_dir / 'shop') is not None
+
+        dependencies = [('shop', str(self.temp_dir / 'shop'))]
+        engine = RenderEngine(str(self.temp_dir / 'app'), dependencies)
+        assert engine.render_template('templates/main.j2', {}) == 'G01 X5'
+        worker = _get_worker_renderer(str(self.temp_dir / 'app'), dependencies)
+        assert _get_worker_renderer(str(self.temp_dir / 'app'), dependencies) is worker
+
+        self._write('shop/templates/macros.j2', '{% macro move(x) %}G00 X{{ x }} (RAPID){% endmacro %}')
+        assert engine.render_template('templates/main.j2', {}) == 'G00 X5 (RAPID)'
+        assert _get_worker_renderer(str(self.temp_dir / 'app'), dependencies) is not worker
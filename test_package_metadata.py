@@ -0,0 +1,74 @@
+"""
+模板包元数据分层测试
+
+严格遵循PROJECT_REQUIREMENTS.md文档约束
+
+测试摘要层的部分解析和完整配置LRU缓存
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from backend.utils.package_metadata import ConfigCache, load_package_section, load_summary
+
+
+class TestPackageMetadata:
+    """模板包元数据测试类"""
+
+    def setup_method(self):
+        """测试前设置"""
+        self.temp_dir = Path(tempfile.mkdtemp())
+
+    def teardown_method(self):
+        """测试后清理"""
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_package_section_stops_early(self):
+        """测试只解析package节，后续语法错误不影响摘要"""
+        data = b'package:\n  name: demo\n  tags: [a, b]\nvariables: {broken: [\n'
+        assert load_package_section(data) == {'name': 'demo', 'tags': ['a', 'b']}
+
+    def test_package_section_not_first(self):
+        """测试package节不在开头时跳过其他节"""
+        data = b'dependencies: [base]\nvariables:\n  groups: {}\npackage:\n  name: late\n'
+        assert load_package_section(data) == {'name': 'late'}
+
+    def test_summary_from_example_package(self):
+        """测试示例模板包的摘要"""
+        config_file = Path(__file__).parent / 'packages' / 'example' / 'package.yaml'
+        summary = load_summary(config_file)
+        assert summary.name == 'example'
+        assert summary.version == '1.0.0'
+        assert summary.tags == ('示例', '测试', '基础')
+        assert len(summary.digest) == 64
+
+    def test_config_cache_lru(self):
+        """测试LRU淘汰和哈希失效"""
+        cache = ConfigCache(max_entries=2)
+        loads = []
+
+        def loader(value):
+            def _load():
+                loads.append(value)
+                return {'value': value}
+            return _load
+
+        assert cache.get('a', 'd1', loader('a'))['value'] == 'a'
+        cache.get('b', 'd1', loader('b'))
+        cache.get('a', 'd1', loader('a'))
+        cache.get('c', 'd1', loader('c'))
+        assert loads == ['a', 'b', 'c']
+
+        cache.get('b', 'd1', loader('b2'))
+        cache.get('a', 'd2', loader('a2'))
+        assert loads == ['a', 'b', 'c', 'b2', 'a2']
+
+        stats = cache.get_stats()
+        assert stats['size'] == 2
+        assert stats['evictions'] == 3
+        assert stats['bytes'] > 0
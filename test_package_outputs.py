@@ -0,0 +1,135 @@
+"""
+模板包多输出渲染测试
+
+严格遵循PROJECT_REQUIREMENTS.md文档约束
+
+测试多输出模板包的声明顺序、单个输出失败隔离和耗时统计，以及各输出经调度器并行渲染
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from types import SimpleNamespace
+
+import yaml
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from backend.controllers import render_controller
+from backend.controllers.render_controller import JinjaRenderer, _render_output_worker, _render_package_scheduled
+from backend.utils.render_results import RenderResultStore
+from backend.utils.render_scheduler import RenderScheduler
+
+
+class TestPackageOutputs:
+    """多输出渲染测试类"""
+
+    def setup_method(self):
+        """测试前设置"""
+        self.temp_dir = Path(tempfile.mkdtemp())
+        templates = self.temp_dir / 'templates'
+        templates.mkdir()
+        (templates / 'main.j2').write_text("O{{ number }}\nM98 P{{ number + 1 }}\nM30\n", encoding='utf-8')
+        (templates / 'sub.j2').write_text("O{{ number + 1 }}\nG01 X10\nM99\n", encoding='utf-8')
+        (templates / 'setup.j2').write_text("{{ missing.value }}\n", encoding='utf-8')
+        config = {
+            'package': {'name': 'multi', 'displayName': '多输出', 'version': '1.0.0', 'description': '', 'category': '测试'},
+            'templates': {'main': 'templates/main.j2'},
+            'outputs': {'files': {
+                'sub_program': {'template': 'templates/sub.j2', 'filename_pattern': 'O{{ number + 1 }}'},
+                'setup_sheet': {'template': 'templates/setup.j2', 'extension': '.txt'},
+                'disabled': {'template': 'templates/sub.j2', 'enabled': False},
+                'main_program': {'template': 'templates/main.j2', 'filename_pattern': 'O{{ number }}'}
+            }}
+        }
+        (self.temp_dir / 'package.yaml').write_text(yaml.safe_dump(config, sort_keys=False), encoding='utf-8')
+        self.config = config
+        self.renderer = JinjaRenderer(str(self.temp_dir))
+        self.executor = ThreadPoolExecutor(max_workers=3)
+
+    def teardown_method(self):
+        """测试后清理"""
+        self.executor.shutdown(wait=True)
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def render_scheduled(self, monkeypatch, behaviour: dict, timeout: float = 10) -> dict:
+        """
+        经调度器渲染模板包（线程池代替渲染进程池）
+
+        behaviour: 输出名 -> 渲染前等待的秒数，或'raise'表示工作进程抛出异常
+        """
+        scheduler = RenderScheduler(lambda: self.executor, max_workers=3, interactive_reserve=0)
+        store = RenderResultStore(self.temp_dir / 'results')
+
+        def worker(package_path, dependencies, output_name, parameters):
+            action = behaviour.get(output_name, 0)
+            if action == 'raise':
+                raise RuntimeError(f'{output_name} 渲染进程异常退出')
+            time.sleep(action)
+            return _render_output_worker(package_path, dependencies, output_name, parameters)
+
+        monkeypatch.setattr(render_controller, 'get_render_scheduler', lambda: scheduler)
+        monkeypatch.setattr(render_controller, 'get_result_store', lambda: store)
+        monkeypatch.setattr(render_controller, '_package_task_args', lambda package: (str(self.temp_dir), []))
+        monkeypatch.setattr(render_controller, '_current_user', lambda: 'tester')
+        monkeypatch.setattr(render_controller, '_render_output_worker', worker)
+        package = SimpleNamespace(name='multi', path=self.temp_dir, config=self.config)
+        return _render_package_scheduled('single', package, {'number': 1000}, timeout)
+
+    def test_render_package_outputs(self):
+        """测试按声明顺序返回各输出，失败的输出不影响其他输出"""
+        result = self.renderer.render_package(str(self.temp_dir), {'number': 1000})
+
+        assert result['success'] is True
+        assert list(result['results']) == ['sub_program', 'setup_sheet', 'main_program']
+        assert result['order'] == list(result['results'])
+        assert result['total'] == 3
+        assert result['failed'] == 1
+
+        outputs = result['results']
+        assert outputs['main_program']['filename'] == 'O1000.nc'
+        assert outputs['main_program']['content'].startswith('O1000\nM98 P1001')
+        assert outputs['sub_program']['success'] is True
+        assert outputs['setup_sheet']['success'] is False
+        assert 'missing' in outputs['setup_sheet']['error']
+        assert set(result['timings']) == set(outputs)
+        assert all(t >= 0 for t in result['timings'].values())
+
+    def test_available_outputs(self):
+        """测试输出列表只包含启用的输出"""
+        outputs = self.renderer.get_available_outputs(str(self.temp_dir))
+        assert [o['name'] for o in outputs] == ['sub_program', 'setup_sheet', 'main_program']
+        assert outputs[0]['template'] == 'templates/sub.j2'
+
+    def test_scheduled_concurrent_in_order(self, monkeypatch):
+        """测试各输出并行渲染，结果按声明顺序汇总（与完成顺序无关）"""
+        started = time.monotonic()
+        result = self.render_scheduled(monkeypatch, {'sub_program': 0.4, 'setup_sheet': 0.4, 'main_program': 0.4})
+        assert time.monotonic() - started < 1.0
+        assert result['order'] == ['sub_program', 'setup_sheet', 'main_program']
+        assert result['total'] == 3 and result['failed'] == 1
+        assert result['results']['main_program']['content'].startswith('O1000\nM98 P1001')
+
+        result = self.render_scheduled(monkeypatch, {'sub_program': 0.3})
+        assert result['order'] == ['sub_program', 'setup_sheet', 'main_program']
+
+    def test_scheduled_failure_and_timeout(self, monkeypatch):
+        """测试工作进程异常和超时只影响该输出，失败条目使用生成的文件名"""
+        result = self.render_scheduled(monkeypatch, {'sub_program': 'raise'})
+        failed = result['results']['sub_program']
+        assert failed['success'] is False
+        assert '异常退出' in failed['error']
+        assert failed['filename'] == 'O1001.nc'
+        assert result['results']['main_program']['success'] is True
+
+        result = self.render_scheduled(monkeypatch, {'main_program': 1.0}, timeout=0.3)
+        timed_out = result['results']['main_program']
+        assert timed_out['success'] is False
+        assert '渲染超时' in timed_out['error']
+        assert timed_out['filename'] == 'O1000.nc'
+        assert result['results']['sub_program']['success'] is True
+        assert result['order'] == ['sub_program', 'setup_sheet', 'main_program']
@@ -0,0 +1,160 @@
+"""
+模板包默认预览缓存测试
+
+严格遵循PROJECT_REQUIREMENTS.md文档约束
+
+测试文件签名变化后重新渲染、默认参数重新加载、后台刷新去重和缓存失效
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import yaml
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from backend.utils.package_preview import DefaultPreviewCache, package_signature
+
+
+class FakePackage:
+    """只提供预览缓存用到的属性的模板包"""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.name = path.name
+        self.reloads = 0
+        self._defaults = None
+
+    @property
+    def default_parameters(self):
+        if self._defaults is None:
+            config = yaml.safe_load((self.path / 'package.yaml').read_text(encoding='utf-8'))
+            self._defaults = dict(config['defaults'])
+        return self._defaults
+
+    def reload(self):
+        self.reloads += 1
+        self._defaults = None
+
+
+def render(package) -> str:
+    """按默认参数"渲染"主模板"""
+    template = (package.path / 'templates' / 'main.j2').read_text(encoding='utf-8')
+    return template.format(**package.default_parameters)
+
+
+def wait_until(condition, timeout: float = 5.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return condition()
+
+
+class TestPackagePreview:
+    """默认预览缓存测试类"""
+
+    def setup_method(self):
+        """测试前准备"""
+        self.temp_dir = Path(tempfile.mkdtemp())
+        self.package = FakePackage(self.temp_dir / 'demo')
+        self._write('package.yaml', 'defaults:\n  depth: 5\n')
+        self._write('templates/main.j2', 'G01 Z-{depth}\n')
+        self.caches = []
+
+    def teardown_method(self):
+        """测试后清理"""
+        for cache in self.caches:
+            cache._executor.shutdown(wait=True)
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def _write(self, rel: str, content: str) -> None:
+        path = self.package.path / rel
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content, encoding='utf-8')
+
+    def cache(self, render_func=render, **options) -> DefaultPreviewCache:
+        cache = DefaultPreviewCache(render_func, **options)
+        self.caches.append(cache)
+        return cache
+
+    def test_signature_invalidation(self):
+        """测试文件未变化时只更新检查时间，模板修改或新增文件后重新渲染"""
+        cache = self.cache()
+        entry = cache.get(self.package)
+        assert entry['content'] == 'G01 Z-5\n'
+        assert entry['signature'] == package_signature(self.package.path)
+        assert cache.get(self.package) is entry
+        assert cache.refresh(self.package) is entry
+        assert cache.get_stats()['renders'] == 1
+
+        self._write('templates/main.j2', 'G00 Z-{depth} (EDITED)\n')
+        assert cache.refresh(self.package)['content'] == 'G00 Z-5 (EDITED)\n'
+        self._write('templates/sub.j2', 'M30\n')
+        cache.refresh(self.package)
+        assert cache.get_stats()['renders'] == 3
+        assert cache.get_stats()['hits'] == 1 and cache.get_stats()['misses'] == 1
+
+    def test_reload_defaults(self):
+        """测试package.yaml修改后重新加载默认参数"""
+        cache = self.cache()
+        assert cache.get(self.package)['parameters'] == {'depth': 5}
+        assert self.package.reloads == 0
+
+        self._write('package.yaml', 'defaults:\n  depth: 12\n')
+        entry = cache.refresh(self.package)
+        assert self.package.reloads == 1
+        assert entry['parameters'] == {'depth': 12}
+        assert entry['content'] == 'G01 Z-12\n'
+
+    def test_background_schedule_dedup(self):
+        """测试同一模板包的后台刷新不重复排队，检查间隔到期后读取时安排刷新"""
+        release = threading.Event()
+        calls = []
+
+        def blocking_render(package):
+            calls.append(package.name)
+            release.wait(5)
+            return render(package)
+
+        cache = self.cache(blocking_render, recheck_interval=0)
+        for _ in range(5):
+            cache.schedule(self.package)
+        assert wait_until(lambda: len(calls) == 1)
+        assert cache.get_stats()['pending'] == 1
+        release.set()
+        assert wait_until(lambda: cache.get_stats()['pending'] == 0)
+        assert cache.get_stats()['refreshes'] == 1
+        assert calls == ['demo']
+        assert cache.entries['demo']['content'] == 'G01 Z-5\n'
+
+        # 读取已缓存的预览立即返回，过期的检查在后台进行
+        self._write('templates/main.j2', 'G01 Z-{depth} F100\n')
+        assert cache.get(self.package)['content'] == 'G01 Z-5\n'
+        assert wait_until(lambda: cache.entries['demo']['content'] == 'G01 Z-5 F100\n')
+        assert wait_until(lambda: cache.get_stats()['pending'] == 0)
+
+    def test_invalidate(self):
+        """测试失效单个模板包和全部缓存后重新渲染"""
+        other = FakePackage(self.temp_dir / 'other')
+        shutil.copytree(self.package.path, other.path)
+        cache = self.cache()
+        cache.get(self.package)
+        cache.get(other)
+        assert cache.get_stats()['size'] == 2
+
+        cache.invalidate('demo')
+        assert set(cache.entries) == {'other'}
+        cache.get(self.package)
+        assert cache.get_stats()['renders'] == 3
+
+        cache.invalidate()
+        assert cache.get_stats()['size'] == 0
+        cache.get(other)
+        assert cache.get_stats()['renders'] == 4
@@ -0,0 +1,154 @@
+"""
+列式坐标点数组测试
+
+严格遵循PROJECT_REQUIREMENTS.md文档约束
+
+测试.npy/CSV解析、点数组目录、渲染参数转换和points参数验证
+"""
+
+import os
+import shutil
+import struct
+import sys
+import tempfile
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from flask import Flask
+
+from backend.controllers import parameter_controller
+from backend.controllers.parameter_controller import ParameterValidator
+from backend.utils.gcode_format import gcode_block
+from backend.utils.jinja_renderer import RenderEngine
+from backend.utils.point_array import (
+    PointArray, PointArrayStore, parse_csv, parse_npy, points_parameters, prepare_parameters
+)
+
+
+def make_npy(descr: str, shape: tuple, values: list, fortran: bool = False) -> bytes:
+    """按.npy v1.0格式构造文件内容"""
+    header = f"{{'descr': '{descr}', 'fortran_order': {fortran}, 'shape': {shape}, }}"
+    header += ' ' * (63 - (10 + len(header)) % 64) + '\n'
+    code = {'<f8': 'd', '<f4': 'f', '<i4': 'i'}[descr]
+    body = struct.pack(f'<{len(values)}{code}', *values)
+    return b'\x93NUMPY\x01\x00' + struct.pack('<H', len(header)) + header.encode() + body
+
+
+class TestPointArray:
+    """点数组测试类"""
+
+    def setup_method(self):
+        """测试前准备"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.store = PointArrayStore(os.path.join(self.temp_dir, 'arrays'))
+
+    def teardown_method(self):
+        """测试后清理"""
+        shutil.rmtree(self.temp_dir)
+
+    def test_parse_csv(self):
+        """测试CSV表头、分隔符和无表头时的默认轴名"""
+        points = parse_csv('X,Y,Z\n1,2,3\n4.5,5,6\n')
+        assert points.axes == ('x', 'y', 'z')
+        assert points.to_list() == [{'x': 1, 'y': 2, 'z': 3}, {'x': 4.5, 'y': 5, 'z': 6}]
+
+        points = parse_csv(b'1 2\n3 4\n')
+        assert points.axes == ('x', 'y')
+        assert list(points.column('y')) == [2, 4]
+
+    def test_parse_npy(self):
+        """测试二维float64、fortran顺序和int32的.npy文件"""
+        points = parse_npy(make_npy('<f8', (3, 2), [0, 1, 2, 3, 4, 5]))
+        assert list(points.column('x')) == [0, 2, 4]
+        assert list(points.column('y')) == [1, 3, 5]
+
+        points = parse_npy(make_npy('<f8', (3, 2), [0, 2, 4, 1, 3, 5], fortran=True), 'XZ')
+        assert list(points.column('z')) == [1, 3, 5]
+
+        points = parse_npy(make_npy('<i4', (2, 3), [1, 2, 3, 4, 5, 6]))
+        assert points.to_list()[1] == {'x': 4.0, 'y': 5.0, 'z': 6.0}
+
+        with pytest.raises(ValueError):
+            parse_npy(b'not a npy file')
+
+    def test_max_points(self):
+        """测试解析前按行数和.npy文件头检查点数上限"""
+        assert len(parse_csv('X,Y\n1,2\n3,4\n', max_points=2)) == 2
+        with pytest.raises(ValueError, match='超过上限'):
+            parse_csv('1,2\n3,4\n5,6\n', max_points=2)
+        assert len(parse_npy(make_npy('<f8', (3, 2), [0] * 6), max_points=3)) == 3
+        # 文件头声明的点数超过上限时不读取数据
+        with pytest.raises(ValueError, match='超过上限'):
+            parse_npy(make_npy('<f8', (1000000, 3), [])[:200], max_points=1000)
+
+    def test_upload_limits(self, monkeypatch):
+        """测试上传接口：超过字节上限返回413，超过点数上限返回400"""
+        monkeypatch.setattr(parameter_controller, 'MAX_UPLOAD_BYTES', 100)
+        monkeypatch.setattr(parameter_controller, 'MAX_UPLOAD_POINTS', 5)
+        app = Flask(__name__)
+        app.register_blueprint(parameter_controller.parameter_bp, url_prefix='/api/parameters')
+        client = app.test_client()
+
+        response = client.post('/api/parameters/arrays?format=csv', data=b'1,2\n' * 100)
+        assert response.status_code == 413
+        response = client.post('/api/parameters/arrays?format=csv', data=b'1,2\n' * 6)
+        assert response.status_code == 400
+        assert '超过上限' in response.get_json()['error']
+
+    def test_store_round_trip(self):
+        """测试按内容哈希保存和按引用读取"""
+        points = PointArray.from_points([(0, 0), (10, 5.5)])
+        saved = self.store.save(points)
+        assert saved['ref'] == {'$array': saved['id']}
+        assert saved['length'] == 2
+        assert saved['bounds'] == {'x': [0, 10], 'y': [0, 5.5]}
+        assert self.store.save(points)['id'] == saved['id']
+
+        assert PointArrayStore(self.store.root).load(saved['id']) == points
+        with pytest.raises(ValueError):
+            self.store.load('0' * 32)
+
+    def test_prepare_parameters(self):
+        """测试points参数和点数组引用在渲染前转换为PointArray"""
+        variables = {'groups': {'path': {'parameters': {
+            'contour': {'type': 'points', 'axes': 'XY'},
+            'depth': {'type': 'number'}
+        }}}}
+        names = points_parameters(variables)
+        assert names == {'contour': 'XY', 'path.contour': 'XY'}
+
+        ref = self.store.save(PointArray.from_points([(1, 2)]))['ref']
+        parameters = {'contour': [[0, 0], [5, 5]], 'extra': ref, 'depth': 3}
+        prepared = prepare_parameters(parameters, names, self.store)
+        assert isinstance(prepared['contour'], PointArray)
+        assert prepared['extra'].to_list() == [{'x': 1, 'y': 2}]
+        assert prepared['depth'] == 3
+        assert isinstance(parameters['contour'], list)
+
+        plain = {'depth': 3}
+        assert prepare_parameters(plain, names, self.store) is plain
+
+    def test_template_usage(self):
+        """测试模板中逐点迭代和gcode_block按列输出"""
+        points = PointArray.from_points([{'x': 0, 'y': 0}, {'x': 10, 'y': 0}, {'x': 10, 'y': 2.5}])
+        assert gcode_block(points, 'G01') == 'G01 X0. Y0.\nX10.\nY2.5'
+
+        env = RenderEngine().env
+        template = env.from_string('{% for p in path %}{{ p.x }},{{ p.y }};{% endfor %}{{ path | count }}')
+        assert template.render(path=points) == '0.0,0.0;10.0,0.0;10.0,2.5;3'
+
+    def test_validate_points(self):
+        """测试points参数的轴、点数上限和范围检查"""
+        config = {'type': 'points', 'axes': 'XY', 'max_points': 3, 'range': [0, 100]}
+        assert ParameterValidator.validate_points([[0, 0], [50, 50]], config) == (None, None)
+
+        error, _ = ParameterValidator.validate_points({'x': [1, 2]}, config)
+        assert '缺少坐标轴' in error
+        error, _ = ParameterValidator.validate_points([[0, 0]] * 4, config)
+        assert '超过上限' in error
+        _, warning = ParameterValidator.validate_points([[0, 0], [150, 0]], config)
+        assert 'X' in warning
+        error, _ = ParameterValidator.validate_points('abc', config)
+        assert error
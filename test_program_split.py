@@ -0,0 +1,140 @@
+"""
+程序拆分测试
+
+严格遵循PROJECT_REQUIREMENTS.md文档约束
+
+测试按程序段数拆分、子程序调用、循环不拆分、各方言的命名和模板包输出配置
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+import yaml
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from backend.controllers.render_controller import JinjaRenderer
+from backend.utils.program_split import ProgramSplitter
+from backend.utils.render_results import RenderResultStore
+
+
+def moves(count: int) -> list:
+    return [f'G01 X{i}. Y0.' for i in range(count)]
+
+
+class TestProgramSplit:
+    """程序拆分测试类"""
+
+    def setup_method(self):
+        """测试前准备"""
+        self.temp_dir = Path(tempfile.mkdtemp())
+        self.store = RenderResultStore(self.temp_dir / 'results', spill_threshold=1024 * 1024)
+
+    def teardown_method(self):
+        """测试后清理"""
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def split(self, lines, filename='O1000.nc', **options):
+        splitter = ProgramSplitter(**options)
+        main = splitter.split(lines, filename, self.store.spool)
+        return splitter, main
+
+    def test_fanuc_split(self):
+        """测试Fanuc程序拆分为M98调用的子程序"""
+        lines = ['%', 'O1000', 'G90 G54'] + moves(10) + ['M30', '%']
+        splitter, main = self.split(lines, max_blocks=5)
+
+        assert main == ['%', 'O1000', 'M98 P1001', 'M98 P1002', 'M98 P1003', 'M30', '%']
+        assert [part['filename'] for part in splitter.parts] == ['O1001.nc', 'O1002.nc', 'O1003.nc']
+        first = splitter.parts[0]['content'].split('\n')
+        assert first[:3] == ['%', 'O1001', 'G90 G54']
+        assert first[-3:] == ['M99', '%', '']
+        body = [line for part in splitter.parts for line in part['content'].split('\n')
+                if line.startswith('G01')]
+        assert body == moves(10)
+        assert splitter.report() == {
+            'dialect': 'fanuc', 'parts': 3, 'subprograms': ['O1001.nc', 'O1002.nc', 'O1003.nc']
+        }
+
+    def test_under_limit(self):
+        """测试未超过上限的程序原样输出"""
+        lines = ['%', 'O1000'] + moves(4) + ['M30', '%']
+        splitter, main = self.split(lines, max_blocks=10)
+        assert main == lines
+        assert splitter.parts == []
+
+    def test_max_bytes(self):
+        """测试按字节数拆分，每个子程序不超过上限"""
+        lines = moves(200) + ['M30']
+        splitter, main = self.split(lines, 'PART.nc', max_bytes=512, first_number=2000)
+        assert main[0] == 'M98 P2000'
+        assert main[-1] == 'M30'
+        assert all(part['size'] <= 512 for part in splitter.parts)
+
+    def test_loop_kept_together(self):
+        """测试循环体内不拆分"""
+        loop = ['#1=0', 'WHILE [#1 LT 5] DO1'] + moves(6) + ['#1=#1+1', 'END1']
+        lines = ['O1000'] + moves(3) + loop + moves(3) + ['M30']
+        splitter, _ = self.split(lines, max_blocks=4)
+        for part in splitter.parts:
+            content = part['content']
+            assert ('WHILE' in content) == ('END1' in content)
+
+    def test_siemens(self):
+        """测试西门子子程序命名和调用"""
+        lines = moves(6) + ['M30']
+        splitter, main = self.split(lines, 'pocket.mpf', dialect='siemens', max_blocks=3)
+        assert main == ['POCKET_1', 'POCKET_2', 'M30']
+        assert splitter.parts[0]['filename'] == 'POCKET_1.SPF'
+        assert splitter.parts[0]['content'].split('\n')[0] == '; POCKET_1'
+        assert splitter.parts[0]['content'].rstrip('\n').endswith('M17')
+
+    def test_heidenhain(self):
+        """测试海德汉子程序调用和程序段重新编号"""
+        body = [f'{i} L X{i} Y0 FMAX' for i in range(1, 7)]
+        lines = ['0 BEGIN PGM PLATE MM'] + body + ['7 M30', '8 END PGM PLATE MM']
+        splitter, main = self.split(lines, 'PLATE.H', dialect='heidenhain', max_blocks=3)
+        assert main == [
+            '0 BEGIN PGM PLATE MM', '1 CALL PGM PLATE_1', '2 CALL PGM PLATE_2', '3 M30', '4 END PGM PLATE MM'
+        ]
+        assert splitter.parts[1]['content'].split('\n')[:2] == ['0 BEGIN PGM PLATE_2 MM', '1 L X4 Y0 FMAX']
+        assert splitter.parts[1]['content'].rstrip('\n').endswith('4 END PGM PLATE_2 MM')
+
+    def test_invalid_config(self):
+        """测试无效的拆分配置"""
+        with pytest.raises(ValueError):
+            ProgramSplitter('mazak', max_blocks=10)
+        with pytest.raises(ValueError):
+            ProgramSplitter('fanuc')
+
+    def test_package_output(self):
+        """测试模板包输出拆分后子程序作为独立结果返回"""
+        templates = self.temp_dir / 'templates'
+        templates.mkdir()
+        (templates / 'main.j2').write_text(
+            "O1000\n{% for i in range(8) %}G01 X{{ i }}. Y0.\n{% endfor %}M30\n", encoding='utf-8'
+        )
+        config = {
+            'package': {'name': 'split', 'displayName': '拆分', 'version': '1.0.0', 'description': '', 'category': '测试'},
+            'templates': {'main': 'templates/main.j2'},
+            'outputs': {'files': {
+                'main': {'template': 'templates/main.j2', 'filename_pattern': 'O1000.nc',
+                         'split': {'dialect': 'fanuc', 'max_blocks': 4}}
+            }}
+        }
+        (self.temp_dir / 'package.yaml').write_text(yaml.safe_dump(config, sort_keys=False), encoding='utf-8')
+
+        result = JinjaRenderer(str(self.temp_dir)).render_package(str(self.temp_dir), {})
+        assert result['order'] == ['main', 'main/O1001', 'main/O1002']
+        main = result['results']['main']
+        assert main['content'] == 'O1000\nM98 P1001\nM98 P1002\nM30\n'
+        assert main['subprograms'] == ['main/O1001', 'main/O1002']
+        assert main['split']['parts'] == 2
+        part = result['results']['main/O1002']
+        assert part['parent'] == 'main'
+        assert part['filename'] == 'O1002.nc'
+        assert part['content'] == 'O1002\nG01 X4. Y0.\nG01 X5. Y0.\nG01 X6. Y0.\nG01 X7. Y0.\nM99\n'
@@ -0,0 +1,92 @@
+"""
+异步渲染任务队列测试
+
+严格遵循PROJECT_REQUIREMENTS.md文档约束
+
+测试任务执行、去重、取消和进程重启后的恢复
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from backend.utils.batch_render import canonical_request_key
+from backend.utils.render_jobs import RenderJobQueue, RenderJobStore
+
+
+def render_stub(name, parameters):
+    """测试用渲染函数"""
+    if name == 'broken':
+        raise RuntimeError('render failed')
+    return {'success': True, 'content': f"{name}:{parameters.get('n')}"}
+
+
+class TestRenderJobs:
+    """渲染任务队列测试类"""
+
+    def setup_method(self):
+        """测试前设置"""
+        self.temp_dir = Path(tempfile.mkdtemp())
+        self.store = RenderJobStore(self.temp_dir / 'jobs.db')
+        self.executor = ThreadPoolExecutor(max_workers=2)
+        self.calls = []
+
+        def task_factory(item):
+            if item['templateName'] == 'missing':
+                raise LookupError('模板包 missing 不存在')
+            self.calls.append(item['parameters'].get('n'))
+            return render_stub, (item['templateName'], item['parameters'])
+
+        self.queue = RenderJobQueue(self.store, task_factory, lambda job: self.executor, heartbeat_timeout=5)
+
+    def teardown_method(self):
+        """测试后清理"""
+        self.executor.shutdown(wait=True)
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_run_job_with_duplicates_and_failures(self):
+        """测试任务执行：重复请求只渲染一次，失败条目单独记录"""
+        requests = [
+            {'templateName': 'a', 'parameters': {'n': 1}},
+            {'templateName': 'a', 'parameters': {'n': 1}},
+            {'templateName': 'broken', 'parameters': {'n': 2}},
+            {'templateName': 'missing', 'parameters': {'n': 3}}
+        ]
+        job = self.store.create(requests)
+        assert self.queue.run(job['id']) == 'completed'
+        assert sorted(self.calls) == [1, 2]
+
+        progress = self.queue.progress(job['id'])
+        assert progress['progress'] == 100.0
+        assert progress['failed_files'] == 2
+        assert progress['eta'] == 0
+
+        results = self.queue.results(job['id'])
+        assert [r['success'] for r in results] == [True, True, False, False]
+        assert results[1]['data']['content'] == 'a:1'
+        assert 'render failed' in results[2]['error']
+
+    def test_resume_stale_job_and_cancel_pending(self):
+        """测试心跳超时的任务被恢复且不重复渲染已完成条目；等待中的任务可直接取消"""
+        requests = [{'templateName': 'a', 'parameters': {'n': i}} for i in range(4)]
+        job = self.store.create(requests)
+        assert self.store.claim(job['id'], 'dead-owner')
+        self.store.record(job['id'], [0], canonical_request_key('a', {'n': 0}), True, {'success': True}, None, 0.1)
+        self.store._conn().execute('UPDATE jobs SET heartbeat = ? WHERE id = ?', (time.time() - 60, job['id']))
+
+        assert self.store.resumable_jobs(heartbeat_timeout=5) == [job['id']]
+        assert self.queue.run(job['id']) == 'completed'
+        assert sorted(self.calls) == [1, 2, 3]
+        assert self.queue.progress(job['id'])['completed_files'] == 4
+
+        pending = self.store.create(requests)
+        assert self.queue.cancel(pending['id'])
+        assert self.queue.progress(pending['id'])['status'] == 'cancelled'
+        assert self.queue.run(pending['id']) is None
+        assert not self.queue.cancel(pending['id'])
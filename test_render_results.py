@@ -0,0 +1,81 @@
+"""
+渲染结果落盘测试
+
+严格遵循PROJECT_REQUIREMENTS.md文档约束
+
+测试小输出内联、大输出落盘返回句柄、渲染失败清理和过期清理
+"""
+
+import hashlib
+import os
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from jinja2 import Environment
+
+from backend.utils.render_results import RenderResultStore
+
+
+class TestRenderResults:
+    """渲染结果目录测试类"""
+
+    def setup_method(self):
+        """测试前设置"""
+        self.temp_dir = Path(tempfile.mkdtemp())
+        self.store = RenderResultStore(self.temp_dir / 'results', spill_threshold=4096)
+        self.template = Environment().from_string(
+            "{% for i in range(n) %}N{{ i }} G01 X{{ i }}.5\n{% endfor %}"
+        )
+
+    def teardown_method(self):
+        """测试后清理"""
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_small_output_inline(self):
+        """测试小输出直接内联返回"""
+        result = self.store.render_to(self.template.generate(n=10), 'small.nc')
+        assert result['content'] == self.template.render(n=10)
+        assert result['lines'] == 10
+        assert 'handle' not in result
+        assert not (self.temp_dir / 'results').exists()
+
+    def test_large_output_spilled(self):
+        """测试大输出落盘，句柄的大小、行数和哈希与内容一致"""
+        expected = self.template.render(n=5000).encode('utf-8')
+        result = self.store.render_to(self.template.generate(n=5000), 'large.nc')
+
+        assert result['spilled'] is True
+        assert result['content'] == ''
+        handle = result['handle']
+        assert handle['size'] == len(expected)
+        assert handle['lines'] == 5000
+        assert handle['sha256'] == hashlib.sha256(expected).hexdigest()
+        assert handle['url'].endswith(handle['id'])
+
+        meta = self.store.get(handle['id'])
+        assert meta['filename'] == 'large.nc'
+        assert self.store.path(handle['id']).read_bytes() == expected
+        assert self.store.get('../' + handle['id']) is None
+
+    def test_failed_render_and_expiry(self):
+        """测试渲染中途失败时删除临时文件，过期结果被清理"""
+        broken = Environment().from_string("{% for i in range(n) %}G01 X{{ i }}\n{% endfor %}{{ 1 / 0 }}")
+        try:
+            self.store.render_to(broken.generate(n=5000), 'broken.nc')
+            assert False, '应抛出渲染错误'
+        except ZeroDivisionError:
+            pass
+        assert list((self.temp_dir / 'results').iterdir()) == []
+
+        handle = self.store.render_to(self.template.generate(n=5000), 'old.nc')['handle']
+        old = time.time() - 7200
+        os.utime(self.store._meta_path(handle['id']), (old, old))
+        self.store.ttl = 3600
+        assert self.store.cleanup() == 1
+        assert self.store.get(handle['id']) is None
+        assert list((self.temp_dir / 'results').iterdir()) == []
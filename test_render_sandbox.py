@@ -0,0 +1,140 @@
+"""
+渲染沙箱与受限渲染进程池测试
+
+严格遵循PROJECT_REQUIREMENTS.md文档约束
+
+测试循环预算、输出上限、循环中的超时检查、沙箱属性限制、超时终止和工作进程回收
+"""
+
+import os
+import sys
+import threading
+import time
+
+import pytest
+from jinja2.exceptions import SecurityError
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from backend.utils.render_sandbox import (
+    RenderLimitError, RenderLimits, RenderTimeoutError, RenderWorkerPool,
+    create_sandboxed_environment, guarded, guarded_lazy, limit_output
+)
+
+
+def render_source(source, parameters):
+    """工作进程中渲染模板字符串"""
+    env = create_sandboxed_environment()
+    return ''.join(limit_output(env.from_string(source).generate(**parameters)))
+
+
+def stubborn_loop():
+    """吞掉超时信号的渲染，只能被终止进程"""
+    while True:
+        try:
+            time.sleep(10)
+        except BaseException:
+            pass
+
+
+def worker_pid():
+    """返回工作进程ID"""
+    return os.getpid()
+
+
+class TestRenderSandbox:
+    """渲染沙箱测试类"""
+
+    def setup_method(self):
+        """测试前设置"""
+        self.env = create_sandboxed_environment()
+        self.limits = RenderLimits(timeout=5, max_output_chars=5000, max_loop_iterations=1000)
+
+    def test_loop_budget(self):
+        """测试嵌套range()的总循环次数计入预算"""
+        template = self.env.from_string("{% for i in range(n) %}{% for j in range(n) %}{% endfor %}{% endfor %}ok")
+        with guarded(self.limits):
+            assert ''.join(limit_output(template.generate(n=30))) == 'ok'
+        with guarded(self.limits):
+            with pytest.raises(RenderLimitError):
+                ''.join(limit_output(template.generate(n=40)))
+
+    def test_loop_deadline_in_thread(self):
+        """测试非主线程中不产生输出的循环在调用range()时检查超时"""
+        limits = RenderLimits(timeout=0.1, max_output_chars=5000, max_loop_iterations=10 ** 9)
+        template = self.env.from_string("{% for i in range(100000) %}{% for j in range(1000) %}{% endfor %}{% endfor %}")
+        errors = []
+
+        def render():
+            try:
+                with guarded(limits):
+                    ''.join(limit_output(template.generate()))
+            except Exception as e:
+                errors.append(e)
+
+        thread = threading.Thread(target=render)
+        started = time.monotonic()
+        thread.start()
+        thread.join(30)
+        assert len(errors) == 1 and isinstance(errors[0], RenderTimeoutError)
+        assert time.monotonic() - started < 5
+
+    def test_lazy_render_time(self):
+        """测试惰性渲染只计生成片段的时间，消费方等待的时间不计入超时"""
+        limits = RenderLimits(timeout=0.2, max_output_chars=5000, max_loop_iterations=1000)
+        template = self.env.from_string("{% for i in range(5) %}{{ i }}{% endfor %}")
+        pieces = []
+        for piece in guarded_lazy(limit_output(template.generate()), limits):
+            time.sleep(0.1)
+            pieces.append(piece)
+        assert ''.join(pieces) == '01234'
+
+        def slow():
+            for i in range(5):
+                time.sleep(0.1)
+                yield str(i)
+
+        with pytest.raises(RenderTimeoutError):
+            list(guarded_lazy(limit_output(slow()), limits))
+
+    def test_output_cap_and_sandbox(self):
+        """测试输出超过上限时中止，模板不能访问内部属性"""
+        template = self.env.from_string("{% for i in range(900) %}G01 X{{ i }}\n{% endfor %}")
+        with guarded(self.limits):
+            with pytest.raises(RenderLimitError):
+                ''.join(limit_output(template.generate()))
+
+        with pytest.raises(RenderLimitError):
+            self.env.from_string("{{ 'x' * 10 ** 12 }}").render()
+        with pytest.raises(RenderLimitError):
+            self.env.from_string("{{ 9 ** 999999 }}").render()
+        assert self.env.from_string("{{ 2 ** 10 * 3 }}|{{ '-' * 3 }}").render() == '3072|---'
+
+        with pytest.raises(SecurityError):
+            self.env.from_string("{{ ''.__class__.__mro__ }}").render()
+
+    def test_worker_pool_timeout_and_recycle(self):
+        """测试超时的渲染只终止所在进程，其他渲染不受影响；工作进程按次数回收"""
+        pool = RenderWorkerPool(2, RenderLimits(timeout=0.5), max_tasks_per_worker=3)
+        try:
+            assert pool.submit(render_source, "G00 X{{ x }}", {'x': 1}).result(timeout=30) == 'G00 X1'
+
+            stuck = pool.submit(stubborn_loop)
+            started = time.monotonic()
+            quick = [pool.submit(render_source, "N{{ n }}", {'n': n}) for n in range(4)]
+            assert [f.result(timeout=30) for f in quick] == ['N0', 'N1', 'N2', 'N3']
+            assert time.monotonic() - started < 2
+
+            with pytest.raises(RenderTimeoutError):
+                stuck.result(timeout=30)
+            with pytest.raises(RenderLimitError):
+                pool.submit(render_source, "{% for i in range(10 ** 9) %}{% endfor %}", {}).result(timeout=30)
+
+            pids = {pool.submit(worker_pid).result(timeout=30) for _ in range(6)}
+            assert len(pids) >= 2
+
+            stats = pool.get_stats()
+            assert stats['timeouts'] == 1
+            assert stats['recycled'] >= 1
+        finally:
+            pool.shutdown()
@@ -0,0 +1,75 @@
+"""
+渲染优先级调度测试
+
+严格遵循PROJECT_REQUIREMENTS.md文档约束
+
+测试优先级顺序、同优先级内的用户轮转和interactive保留工作进程
+"""
+
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from backend.utils.render_scheduler import RenderScheduler
+
+
+class TestRenderScheduler:
+    """渲染调度器测试类"""
+
+    def setup_method(self):
+        """测试前设置"""
+        self.executor = ThreadPoolExecutor(max_workers=4)
+        self.gate = threading.Event()
+        self.order = []
+        self.lock = threading.Lock()
+
+    def teardown_method(self):
+        """测试后清理"""
+        self.gate.set()
+        self.executor.shutdown(wait=True)
+
+    def _task(self, label):
+        self.gate.wait(5)
+        with self.lock:
+            self.order.append(label)
+        return label
+
+    def test_priority_and_fair_share(self):
+        """测试空出的工作进程先分给高优先级，同优先级内按用户轮转"""
+        scheduler = RenderScheduler(lambda: self.executor, max_workers=1)
+        blocker = scheduler.submit('batch', 'alice', self._task, 'blocker')
+
+        futures = [scheduler.submit('batch', 'alice', self._task, f'alice-{i}') for i in range(3)]
+        futures += [scheduler.submit('batch', 'bob', self._task, 'bob-0')]
+        futures += [scheduler.submit('single', 'carol', self._task, 'single')]
+        futures += [scheduler.submit('interactive', 'dave', self._task, 'interactive')]
+
+        self.gate.set()
+        for future in [blocker] + futures:
+            future.result(timeout=5)
+
+        assert self.order == ['blocker', 'interactive', 'single', 'alice-0', 'bob-0', 'alice-1', 'alice-2']
+
+        stats = scheduler.get_stats()['classes']
+        assert stats['batch']['completed'] == 5
+        assert stats['interactive']['wait']['samples'] == 1
+
+    def test_interactive_reserve(self):
+        """测试批量渲染不会占用为interactive保留的工作进程"""
+        scheduler = RenderScheduler(lambda: self.executor, max_workers=3)
+        assert scheduler.interactive_reserve == 1
+
+        batch = [scheduler.submit('batch', 'alice', self._task, f'batch-{i}') for i in range(4)]
+        assert scheduler.get_stats()['classes']['batch']['running'] == 2
+        assert scheduler.get_stats()['classes']['batch']['queued'] == 2
+
+        interactive = scheduler.submit('interactive', 'bob', self._task, 'interactive')
+        assert scheduler.get_stats()['classes']['interactive']['running'] == 1
+        assert interactive.running()
+
+        self.gate.set()
+        for future in batch + [interactive]:
+            future.result(timeout=5)
@@ -0,0 +1,95 @@
+"""
+流式渲染输出测试
+
+严格遵循PROJECT_REQUIREMENTS.md文档约束
+
+测试片段合并、NDJSON帧格式和调度器名额占用
+"""
+
+import hashlib
+import json
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from jinja2 import Environment
+
+from backend.utils.render_scheduler import RenderScheduler
+from backend.utils.render_stream import coalesce_chunks, stream_ndjson, stream_text
+
+
+class TestRenderStream:
+    """流式渲染输出测试类"""
+
+    def setup_method(self):
+        """测试前设置"""
+        self.template = Environment().from_string(
+            "{% for i in range(n) %}G01 X{{ i }} Y{{ i * 2 }}\n{% endfor %}"
+        )
+
+    def test_coalesce_generate_output(self):
+        """测试generate()片段被合并为小首块和固定大小的后续块，内容不变"""
+        expected = self.template.render(n=2000)
+        chunks = list(coalesce_chunks(self.template.generate(n=2000), chunk_size=4096, first_chunk_size=64))
+
+        assert ''.join(chunks) == expected
+        assert 64 <= len(chunks[0]) < 128
+        assert all(4096 <= len(chunk) < 4096 + 64 for chunk in chunks[1:-1])
+
+    def test_ndjson_frames(self):
+        """测试NDJSON帧：start、按序号递增的chunk和带统计的end"""
+        expected = self.template.render(n=500)
+        frames = [json.loads(line) for line in stream_ndjson(
+            coalesce_chunks(self.template.generate(n=500), chunk_size=1024), {'package': 'demo'}
+        )]
+
+        assert frames[0] == {'type': 'start', 'package': 'demo'}
+        chunks = [f for f in frames if f['type'] == 'chunk']
+        assert [f['seq'] for f in chunks] == list(range(len(chunks)))
+        assert ''.join(f['data'] for f in chunks) == expected
+
+        end = frames[-1]
+        assert end['type'] == 'end'
+        assert end['lines'] == 500
+        assert end['bytes'] == len(expected.encode('utf-8'))
+        assert end['sha256'] == hashlib.sha256(expected.encode('utf-8')).hexdigest()
+
+    def test_error_mid_stream(self):
+        """测试渲染中途出错：文本流追加错误说明，NDJSON以error帧结束"""
+        template = Environment().from_string("G00 X0\n{{ 1 / 0 }}")
+        text = ''.join(stream_text(template.generate(), on_error=lambda e: f"; 渲染失败: {e}\n"))
+        assert text.startswith('G00 X0\n; 渲染失败')
+
+        frames = [json.loads(line) for line in stream_ndjson(template.generate())]
+        assert frames[-1]['type'] == 'error'
+        assert 'division' in frames[-1]['error']
+
+    def test_scheduler_slot(self):
+        """测试流式渲染占用调度器名额，退出后释放给排队的条目"""
+        executor = ThreadPoolExecutor(max_workers=1)
+        try:
+            scheduler = RenderScheduler(lambda: executor, max_workers=1)
+            with scheduler.slot('single', 'alice', timeout=5):
+                queued = scheduler.submit('batch', 'bob', lambda: 'done')
+                assert scheduler.get_stats()['classes']['single']['running'] == 1
+                assert not queued.done()
+            assert queued.result(timeout=5) == 'done'
+            assert scheduler.get_stats()['classes']['single']['completed'] == 1
+
+            blocker = threading.Event()
+            busy = scheduler.submit('batch', 'bob', blocker.wait, 5)
+            try:
+                with scheduler.slot('single', 'alice', timeout=0.05):
+                    pass
+                assert False, '名额被占用时应超时'
+            except FutureTimeoutError:
+                pass
+            blocker.set()
+            busy.result(timeout=5)
+            assert scheduler.get_stats()['classes']['single']['queued'] == 0
+        finally:
+            executor.shutdown(wait=True)
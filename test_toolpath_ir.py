@@ -0,0 +1,201 @@
+"""
+刀路中间表示测试
+
+严格遵循PROJECT_REQUIREMENTS.md文档约束
+
+测试刀路指令解析、各方言输出器的翻译、钻孔循环、模板包多方言输出和方言配置检查
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+import yaml
+from jinja2 import Template
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from backend.controllers.render_controller import JinjaRenderer
+from backend.utils.toolpath_ir import (
+    ToolpathError, check_output_dialects, create_emitter, output_dialects, parse_toolpath, translate,
+    translate_many
+)
+
+TOOLPATH = """PROGRAM O1000 POCKET
+UNITS MM
+TOOL T3 ; D10
+SPINDLE S12000 CW
+RAPID X0 Y0 Z5
+LINE Z-1 F100
+X10. F300
+Y10.
+ARC CCW X0 Y20 I-10 J0
+DRILL Z-10 R2 F150
+X10 Y10
+X20 Y10
+SPINDLE OFF
+END
+"""
+
+
+def run(dialect: str, source: str = TOOLPATH, **options) -> list:
+    return ''.join(translate(source.splitlines(), dialect, **options)).splitlines()
+
+
+class TestToolpathIR:
+    """刀路中间表示测试类"""
+
+    def setup_method(self):
+        """测试前准备"""
+        self.temp_dir = Path(tempfile.mkdtemp())
+
+    def teardown_method(self):
+        """测试后清理"""
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_parse(self):
+        """测试指令解析和模态续行"""
+        ops = list(parse_toolpath(['LINE X1 Y2 F300 ; cut', 'X3', '', '; note', 'ARC CW X0 I1 J0', 'Y1']))
+        assert [op.kind for op in ops] == ['LINE', 'LINE', 'COMMENT', 'ARC', 'ARC']
+        assert ops[0].words == {'X': '1', 'Y': '2', 'F': '300'}
+        assert ops[0].comment == 'cut'
+        assert ops[2].comment == 'note'
+        assert ops[4].args == ['CW']
+
+    def test_parse_errors(self):
+        """测试无法识别的指令和缺少的参数"""
+        with pytest.raises(ToolpathError, match='第1行'):
+            list(parse_toolpath(['X1 Y2']))
+        with pytest.raises(ToolpathError, match='第2行'):
+            run('fanuc', 'RAPID X0\nPLUNGE Z-1')
+        with pytest.raises(ToolpathError, match='缺少 T'):
+            run('fanuc', 'TOOL')
+        with pytest.raises(ToolpathError):
+            run('fanuc', 'DRILL Z-5 F100\nX1 Y1')
+        with pytest.raises(ValueError):
+            create_emitter('mazak')
+        # 运动指令中无法识别的内容报错，不丢弃
+        for source in ('LINE X10 Y FOO', 'RAPID X0\nX1 Z', 'ARC CW CCW X1 I1 J0', 'DWELL P1 S'):
+            with pytest.raises(ToolpathError, match='无法识别的内容'):
+                run('fanuc', source)
+
+    def test_exponent_words(self):
+        """测试指数形式的数值（Jinja输出的小浮点数）换成定点形式"""
+        source = 'RAPID X0 Y0 Z5\nLINE X{{ x }} Y2 F3e2\nARC CCW X0 Y4 I-1E-05 J2\n'
+        rendered = Template(source).render(x=1e-05)
+        assert 'X1e-05' in rendered
+        assert run('fanuc', rendered)[1:3] == ['G01 X0.00001 Y2 F300.', 'G03 X0 Y4 I-0.00001 J2']
+        assert run('siemens', rendered)[1] == 'G1 X0.00001 Y2 F300.'
+        # 海德汉圆心按换算后的当前位置计算
+        lines = run('heidenhain', rendered, program_name='P1')
+        assert lines[2:5] == ['2 L X+0.00001 Y+2 R0 F300', '3 CC X+0 Y+4', '4 C X+0 Y+4 DR+']
+
+    def test_fanuc(self):
+        """测试Fanuc输出"""
+        assert run('fanuc') == [
+            '%', 'O1000 (POCKET)', 'G21', 'T3 M06 (D10)', 'S12000 M03',
+            'G00 X0 Y0 Z5', 'G01 Z-1 F100', 'X10. F300', 'Y10.', 'G03 X0 Y20 I-10 J0',
+            'G99 G81 X10 Y10 Z-10 R2 F150', 'X20 Y10', 'G80', 'M05', 'M30', '%'
+        ]
+
+    def test_siemens(self):
+        """测试西门子840D输出"""
+        lines = run('siemens')
+        assert lines[:4] == ['; POCKET', 'G71', 'T3 M6', 'D1 ; D10']
+        assert lines[lines.index('F150') + 1:lines.index('MCALL') + 1] == [
+            'MCALL CYCLE81(2,2,0,-10)', 'G0 X10 Y10', 'X20 Y10', 'MCALL'
+        ]
+        assert lines[-1] == 'M30'
+
+    def test_heidenhain(self):
+        """测试海德汉输出：程序名取文件名、M功能并入定位段、圆弧圆心为绝对坐标"""
+        lines = run('heidenhain', program_name='P100')
+        assert lines[0] == '0 BEGIN PGM P100 MM'
+        assert lines[-1] == f'{len(lines) - 1} END PGM P100 MM'
+        assert '3 L X+0 Y+0 Z+5 R0 FMAX M3' in lines
+        assert '7 CC X+0 Y+10' in lines
+        assert '8 C X+0 Y+20 DR+' in lines
+        assert any('CYCL DEF 200 DRILLING' in line and 'Q201=-12' in line for line in lines)
+        assert '11 L X+20 Y+10 R0 FMAX M99' in lines
+
+    def test_peck_and_dwell(self):
+        """测试深孔循环和孔底暂停的换算"""
+        source = 'RAPID X0 Y0 Z5\nDRILL Z-20 R1 F80 Q4 P0.5 X5 Y5\nDWELL P2'
+        assert run('fanuc', source)[1:] == ['G99 G83 X5 Y5 Z-20 R1 Q4 P500 F80', 'G80', 'G04 X2', 'M30']
+        assert 'MCALL CYCLE83(1,1,0,-20,,,4,0,0.5,0,1,1)' in run('siemens', source)
+
+    def test_translate_many(self):
+        """测试一次解析同时写出多个方言"""
+        emitters = {dialect: create_emitter(dialect) for dialect in ('fanuc', 'siemens')}
+        written = {dialect: [] for dialect in emitters}
+        report = translate_many(
+            TOOLPATH.splitlines(), emitters, {d: written[d].append for d in emitters}
+        )
+        assert report == {'ops': 14, 'dialects': ['fanuc', 'siemens']}
+        assert ''.join(written['fanuc']).splitlines() == run('fanuc')
+        assert ''.join(written['siemens']).splitlines() == run('siemens')
+
+    def test_package_output(self):
+        """测试模板包输出渲染一次、按方言返回多个文件"""
+        templates = self.temp_dir / 'templates'
+        templates.mkdir()
+        (templates / 'path.j2').write_text(
+            "RAPID X0 Y0 Z5\n{{ points | gcode_block('LINE', feed=300) }}\nEND\n", encoding='utf-8'
+        )
+        config = {
+            'package': {'name': 'ir', 'displayName': '刀路', 'version': '1.0.0', 'description': '', 'category': '测试'},
+            'templates': {'main': 'templates/path.j2'},
+            'outputs': {'files': {
+                'path': {'template': 'templates/path.j2', 'filename_pattern': 'PATH',
+                         'dialects': ['fanuc', 'siemens', 'heidenhain']}
+            }}
+        }
+        (self.temp_dir / 'package.yaml').write_text(yaml.safe_dump(config, sort_keys=False), encoding='utf-8')
+
+        result = JinjaRenderer(str(self.temp_dir)).render_package(
+            str(self.temp_dir), {'points': [(1, 0), (2, 0)]}
+        )
+        assert result['order'] == ['path', 'path/siemens', 'path/heidenhain']
+        main = result['results']['path']
+        assert main['filename'] == 'PATH.nc'
+        assert main['content'] == 'G00 X0 Y0 Z5\nG01 X1. Y0. F300.\nX2.\nM30\n'
+        assert main['toolpath'] == {'ops': 4, 'dialects': ['fanuc', 'siemens', 'heidenhain']}
+        assert main['variants'] == ['path/siemens', 'path/heidenhain']
+        assert result['results']['path/siemens']['filename'] == 'PATH.mpf'
+        heidenhain = result['results']['path/heidenhain']
+        assert heidenhain['filename'] == 'PATH.h'
+        assert heidenhain['parent'] == 'path'
+        assert heidenhain['content'].splitlines()[0] == '0 BEGIN PGM PATH MM'
+
+    def test_dialect_config(self):
+        """测试未知方言和刀路输出配置后处理/拆分/分析时报错，渲染结果中只有该输出失败"""
+        assert output_dialects({'template': 'a.j2'}) is None
+        assert output_dialects({'dialects': 'siemens'}) == ['siemens']
+        with pytest.raises(ValueError, match='未知的刀路输出方言'):
+            output_dialects({'dialects': ['fanuc', 'mazak']})
+        with pytest.raises(ValueError, match='postprocess/analyze'):
+            output_dialects({'dialects': ['fanuc'], 'postprocess': {'compact': True}, 'analyze': True})
+
+        templates = self.temp_dir / 'templates'
+        templates.mkdir()
+        (templates / 'path.j2').write_text("RAPID X0 Y0 Z5\nEND\n", encoding='utf-8')
+        config = {
+            'package': {'name': 'ir', 'displayName': '刀路', 'version': '1.0.0', 'description': '', 'category': '测试'},
+            'templates': {'main': 'templates/path.j2'},
+            'outputs': {'files': {
+                'bad': {'template': 'templates/path.j2', 'filename_pattern': 'BAD', 'dialects': ['mazak']},
+                'split': {'template': 'templates/path.j2', 'filename_pattern': 'SPLIT', 'dialects': ['fanuc'],
+                          'split': {'max_lines': 10}},
+                'good': {'template': 'templates/path.j2', 'filename_pattern': 'GOOD', 'dialects': ['fanuc']}
+            }}
+        }
+        assert len(check_output_dialects(config)) == 2
+        (self.temp_dir / 'package.yaml').write_text(yaml.safe_dump(config, sort_keys=False), encoding='utf-8')
+
+        results = JinjaRenderer(str(self.temp_dir)).render_package(str(self.temp_dir), {})['results']
+        assert not results['bad']['success'] and 'mazak' in results['bad']['error']
+        assert not results['split']['success'] and 'split' in results['split']['error']
+        assert results['good']['success'] and results['good']['filename'] == 'GOOD.nc'
@@ -0,0 +1,95 @@
+"""
+刀路点阵生成测试
+
+严格遵循PROJECT_REQUIREMENTS.md文档约束
+
+测试点阵坐标、惰性分块、钻孔循环/走刀格式化和从渲染参数取值
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from backend.utils.jinja_renderer import RenderEngine
+from backend.utils.render_sandbox import RenderLimitError
+from backend.utils.toolpath_patterns import bolt_circle, cut_pass, drill_cycle, peck_grid, pocket_spiral
+
+
+def rounded(points):
+    return [(round(p['x'], 6), round(p['y'], 6)) for p in points]
+
+
+class TestToolpathPatterns:
+    """刀路点阵测试类"""
+
+    def setup_method(self):
+        """测试前准备"""
+        self.env = RenderEngine().env
+
+    def test_bolt_circle(self):
+        """测试均布整圈和指定角度范围的孔位"""
+        assert rounded(bolt_circle(10, 4, center_x=5)) == [(15, 0), (5, 10), (-5, 0), (5, -10)]
+        assert rounded(bolt_circle(10, 3, start_angle=0, span=90)) == [
+            (10, 0), (round(10 * 2 ** 0.5 / 2, 6), round(10 * 2 ** 0.5 / 2, 6)), (0, 10)
+        ]
+        with pytest.raises(ValueError):
+            bolt_circle(10, 0)
+
+    def test_peck_grid_serpentine(self):
+        """测试孔阵的蛇形顺序"""
+        grid = peck_grid(20, 10, 3, 2)
+        assert len(grid) == 6
+        assert rounded(grid) == [(0, 0), (10, 0), (20, 0), (20, 10), (10, 10), (0, 10)]
+        assert rounded(peck_grid(20, 10, 3, 2, serpentine=False))[3] == (0, 10)
+        assert grid[-1] == {'x': 0.0, 'y': 10.0}
+
+    def test_pocket_spiral(self):
+        """测试型腔螺旋由内向外，最后一圈留出刀具半径"""
+        spiral = pocket_spiral(20, 10, 2, tool_diameter=4)
+        points = rounded(spiral)
+        assert points[0] == (0, 0)
+        assert points[1:6] == [(6, -1), (6, 1), (-6, 1), (-6, -1), (6, -1)]
+        assert points[-5:] == [(8, -3), (8, 3), (-8, 3), (-8, -3), (8, -3)]
+        with pytest.raises(ValueError):
+            pocket_spiral(2, 10, 1, tool_diameter=4)
+
+    def test_chunks_match_whole(self):
+        """测试分块计算与整体转换结果一致"""
+        grid = peck_grid(100, 100, 7, 5)
+        chunks = list(grid.chunks(4))
+        assert [len(c) for c in chunks] == [4] * 8 + [3]
+        assert [p for c in chunks for p in c] == grid.to_array().to_list()
+        assert '\n'.join(grid.gcode_blocks('G00', size=4)).startswith('G00 X0. Y0.')
+
+    def test_drill_cycle(self):
+        """测试钻孔固定循环：参数字只在第一孔输出，最后取消循环"""
+        text = drill_cycle(peck_grid(10, 0, 2, 1), z=-5, r=1, cycle='G83', q=2, feed=100)
+        assert text == 'G98 G83 X0. Y0. Z-5. R1. Q2. F100.\nX10.\nG80'
+        assert drill_cycle([], z=-5, r=1) == ''
+
+    def test_cut_pass(self):
+        """测试走刀：定位、下刀、切削进给和抬刀"""
+        text = cut_pass([(0, 0), (10, 0), (10, 10)], z=-2, feed=600, safe_z=5)
+        assert text.split('\n') == [
+            'G00 Z5.', 'G00 X0. Y0.', 'G01 Z-2. F300.', 'X10. F600.', 'Y10.', 'G00 Z5.'
+        ]
+
+    def test_template_variables(self):
+        """测试模板中用prefix从渲染参数取值，显式参数优先"""
+        template = self.env.from_string(
+            "{{ bolt_circle(prefix='bolt') | drill_cycle(prefix='drill') }}\n"
+            "{{ bolt_circle(5, prefix='bolt') | count }}"
+        )
+        text = template.render(bolt_radius=10, bolt_count=2, drill_z=-3, drill_r=1)
+        assert text == 'G98 G81 X10. Y0. Z-3. R1.\nX-10.\nG80\n2'
+
+        template = self.env.from_string("{{ peck_grid(prefix=grid) | length }}")
+        assert template.render(grid={'width': 10, 'height': 10, 'columns': 3, 'rows': 3}) == '9'
+
+    def test_loop_budget(self):
+        """测试超大点阵计入循环次数预算"""
+        with pytest.raises(RenderLimitError):
+            self.env.from_string("{{ peck_grid(1, 1, 100000, 100000) | count }}").render()
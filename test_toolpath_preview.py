@@ -0,0 +1,197 @@
+"""
+刀路预览几何测试
+
+严格遵循PROJECT_REQUIREMENTS.md文档约束
+
+测试轨迹生成、抽稀到顶点预算、圆弧离散、断开点、二进制格式和按内容哈希缓存
+"""
+
+import math
+import os
+import random
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from backend.utils import toolpath_preview
+from backend.utils.render_cache import RenderCache
+from backend.utils.render_results import RenderResultStore
+from backend.utils.toolpath_preview import (
+    KIND_FEED, KIND_JUMP, KIND_RAPID, PolylineDecimator, decode_binary, encode_binary,
+    parse_budget, preview_content, preview_file, preview_lines
+)
+
+
+def preview(text: str, budget: int = 20000) -> dict:
+    return preview_lines(text.splitlines(), budget)
+
+
+def points(geometry: dict) -> list:
+    vertices = geometry['vertices']
+    return [tuple(vertices[i:i + 3]) for i in range(0, len(vertices), 3)]
+
+
+def polyline_distance(point, polyline) -> float:
+    """点到折线的最短距离（只在XY平面内计算）"""
+    best = math.inf
+    for (ax, ay, _), (bx, by, _) in zip(polyline, polyline[1:]):
+        dx, dy = bx - ax, by - ay
+        length = dx * dx + dy * dy
+        t = 0.0 if length == 0 else max(0.0, min(1.0, ((point[0] - ax) * dx + (point[1] - ay) * dy) / length))
+        best = min(best, math.hypot(point[0] - ax - t * dx, point[1] - ay - t * dy))
+    return best
+
+
+class TestToolpathPreview:
+    """刀路预览几何测试类"""
+
+    def setup_method(self):
+        """测试前准备"""
+        self.temp_dir = Path(tempfile.mkdtemp())
+
+    def teardown_method(self):
+        """测试后清理"""
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_collinear_and_kinds(self):
+        """测试共线点合并，快速移动和切削的分界保留"""
+        program = "G90 G00 X0 Y0 Z5\nZ0\nG01 F500\n" + ''.join(f"X{i}\n" for i in range(1, 101)) + "G00 Z5\n"
+        geometry = preview(program)
+        assert points(geometry) == [(0, 0, 5), (0, 0, 0), (100, 0, 0), (100, 0, 5)]
+        assert geometry['kinds'] == [KIND_JUMP, KIND_RAPID, KIND_FEED, KIND_RAPID]
+        assert geometry['sourceVertices'] == 103
+        assert geometry['analysis']['feedDistance'] == 100
+
+    def test_breaks(self):
+        """测试位置未知和坐标系改变后从新起点断开"""
+        geometry = preview("G00 X0 Y0 Z0\nG01 X10 F100\nG28 Z0\nG00 X0 Y0\nZ5\nG92 X100 Y0\nG01 X5\n")
+        assert points(geometry) == [(0, 0, 0), (10, 0, 0), (0, 0, 5), (100, 0, 5), (5, 0, 5)]
+        assert geometry['kinds'] == [KIND_JUMP, KIND_FEED, KIND_JUMP, KIND_JUMP, KIND_FEED]
+
+    def test_arcs(self):
+        """测试I/J整圆、R圆弧和螺旋线的离散"""
+        geometry = preview("G17 G90 G00 X10 Y0 Z0\nG02 X10 Y0 I-10 J0 F600\n")
+        assert geometry['vertexCount'] == 73
+        assert all(math.hypot(x, y) == pytest.approx(10, abs=1e-3) for x, y, _ in points(geometry))
+        # 顺时针：第一个中间点在X轴下方
+        assert points(geometry)[1][1] < 0
+
+        arc = points(preview("G00 X10 Y0 Z0\nG03 X0 Y10 R10 F600\n"))
+        assert len(arc) == 19
+        assert all(math.hypot(x, y) == pytest.approx(10, abs=1e-3) for x, y, _ in arc)
+        large = points(preview("G00 X10 Y0 Z0\nG02 X0 Y10 R-10 F600\n"))
+        # R为负取270°的圆弧，圆心在原点
+        assert len(large) == 55
+        assert all(math.hypot(x, y) == pytest.approx(10, abs=1e-3) for x, y, _ in large)
+        assert min(x for x, _, _ in large) == pytest.approx(-10, abs=0.05)
+
+        helix = points(preview("G00 X10 Y0 Z0\nG03 X10 Y0 Z-4 I-10 J0 F600\n"))
+        assert [z for _, _, z in helix] == sorted((z for _, _, z in helix), reverse=True)
+        assert helix[-1][2] == -4
+
+    def test_budget(self):
+        """测试抽稀到顶点预算且保持形状"""
+        random.seed(1)
+        source = [
+            (50 + 40 * math.cos(i * 0.003) + random.uniform(0, 0.01), 50 + 40 * math.sin(i * 0.003))
+            for i in range(3000)
+        ]
+        program = "G90 G00 X90 Y50 Z0\nG01 F800\n" + ''.join(f"X{x:.4f} Y{y:.4f}\n" for x, y in source)
+        geometry = preview(program, budget=100)
+        assert geometry['vertexCount'] <= 100
+        assert geometry['sourceVertices'] == 3001
+        assert geometry['tolerance'] > 0
+        polyline = points(geometry)
+        worst = max(polyline_distance(point, polyline) for point in source[::7])
+        assert worst <= 2 * geometry['tolerance'] + 1e-6
+
+    def test_decimator_memory(self):
+        """测试流式抽稀保留的点不超过预算两倍"""
+        decimator = PolylineDecimator(budget=50)
+        peak = 0
+        for i in range(5000):
+            decimator.add(math.cos(i * 0.01) * 10, math.sin(i * 0.013) * 10, 0.0, KIND_FEED if i else KIND_JUMP)
+            peak = max(peak, len(decimator.kept))
+        assert peak <= 100
+        assert len(decimator.finish()) <= 50
+
+    def test_boundaries_over_budget(self):
+        """测试分界点本身超出预算时（密集钻孔）降级并在预算以内结束"""
+        holes = ''.join(f"X{i % 150 * 2} Y{i // 150 * 2}\n" for i in range(15000))
+        geometry = preview("G90 G00 X0 Y0 Z10\nG98 G81 Z-3 R1 F100\n" + holes + "G80\n")
+        assert geometry['vertexCount'] <= 20000
+        assert geometry['fallback'] == 'sampled'
+        # G81所在程序段在当前位置也钻一个孔
+        assert geometry['analysis']['feedDistance'] == 15001 * 4
+        assert set(geometry['kinds']) <= {KIND_JUMP, KIND_RAPID, KIND_FEED}
+        assert points(geometry)[0] == (0, 0, 10)
+
+        small = preview("G00 X0 Y0 Z5\nZ1\nG01 Z-1 F100\nG00 Z5\nX10\nG01 Z-1\n", budget=3)
+        assert small['vertexCount'] <= 3
+        assert small['fallback'] is not None
+        assert points(small)[-1] == (10, 0, -1)
+
+    def test_decimator_boundaries(self):
+        """测试交替的快速移动和切削：保留的点不超过预算两倍，合并后的线段取最高的类型"""
+        decimator = PolylineDecimator(budget=10)
+        peak = 0
+        for i in range(2000):
+            decimator.add(float(i % 37), float(i % 11), 0.0, KIND_RAPID if i % 2 else KIND_FEED)
+            peak = max(peak, len(decimator.kept))
+        assert peak <= 20
+        kept = decimator.finish()
+        assert len(kept) <= 10
+        assert decimator.fallback is not None
+        assert KIND_FEED in [point[3] for point in kept[1:]]
+
+    def test_binary(self):
+        """测试二进制格式往返"""
+        geometry = preview("G00 X0 Y0 Z5\nG01 Z-1.5 F100\nX12.25 Y-3\n")
+        data = encode_binary(geometry)
+        assert data[:4] == b'TPV1'
+        assert len(data) == 4 + 4 + 24 + 13 * geometry['vertexCount']
+        decoded = decode_binary(data)
+        assert decoded['vertexCount'] == 3
+        assert decoded['vertices'] == geometry['vertices']
+        assert decoded['kinds'] == geometry['kinds']
+        assert decoded['bounds']['min'] == [0, -3, -1.5]
+        with pytest.raises(ValueError):
+            decode_binary(b'XXXX' + data[4:])
+
+    def test_cache(self, monkeypatch):
+        """测试按内容哈希缓存：内容、落盘结果和文件共用缓存（使用临时目录中的缓存）"""
+        cache = RenderCache(str(self.temp_dir / 'cache'))
+        monkeypatch.setattr(toolpath_preview, 'get_render_cache', lambda: cache)
+        program = "G00 X0 Y0 Z0\nG01 X7 Y3 F100\n"
+        geometry, cached = preview_content(program, budget=500)
+        assert not cached
+        again, cached = preview_content(program, budget=500)
+        assert cached and again == geometry
+        _, cached = preview_content(program, budget=501)
+        assert not cached
+
+        store = RenderResultStore(self.temp_dir / 'results', spill_threshold=0)
+        handle = store.render_to([program], 'P.nc')['handle']
+        meta = store.get(handle['id'])
+        stored, cached = preview_file(store.path(handle['id']), 500, content_hash=meta['sha256'])
+        assert cached and stored == geometry
+
+        path = self.temp_dir / 'p.nc'
+        path.write_text(program.replace('\n', '\r\n'), encoding='utf-8', newline='')
+        from_file, cached = preview_file(path, 500)
+        assert not cached
+        assert from_file['vertices'] == geometry['vertices']
+        assert len(list((self.temp_dir / 'cache').glob('geometry:*.json'))) == 3
+
+    def test_parse_budget(self):
+        """测试顶点预算校验"""
+        assert parse_budget(None) == 20000
+        assert parse_budget('300') == 300
+        for value in (1, 10 ** 7, 'abc'):
+            with pytest.raises(ValueError):
+                parse_budget(value)
@@ -0,0 +1,99 @@
+"""
+版本历史存储测试
+
+严格遵循PROJECT_REQUIREMENTS.md文档约束
+
+测试内容寻址快照、去重、版本对比和检出
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from backend.controllers.file_controller import FileManager
+from backend.controllers.template_controller import template_manager
+from backend.utils.version_store import PackageVersionStore
+
+
+class TestVersionStore:
+    """版本历史存储测试类"""
+
+    def setup_method(self):
+        """测试前设置"""
+        self.temp_dir = Path(tempfile.mkdtemp())
+        self.store = PackageVersionStore(self.temp_dir / 'versions')
+        self.package = self.temp_dir / 'packages' / 'demo'
+        (self.package / 'templates').mkdir(parents=True)
+        (self.package / 'package.yaml').write_text('package:\n  name: demo\n  version: "1.0.0"\n')
+        (self.package / 'templates' / 'main.j2').write_text('G00 X0\n')
+        (self.package / 'templates' / 'sub.j2').write_text('M98 P100\n')
+
+    def teardown_method(self):
+        """测试后清理"""
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def object_count(self):
+        return sum(1 for p in (self.temp_dir / 'versions' / 'objects').rglob('*') if p.is_file())
+
+    def test_snapshot_deduplicates(self):
+        """测试未变化内容不重复存储"""
+        first = self.store.snapshot('demo', self.package)
+        assert first['created'] is True
+        assert first['version'] == '1.0.0'
+        assert self.object_count() == 3
+
+        again = self.store.snapshot('demo', self.package)
+        assert again['created'] is False
+        assert again['id'] == first['id']
+
+        (self.package / 'templates' / 'main.j2').write_text('G00 X10\n')
+        second = self.store.snapshot('demo', self.package, source='save')
+        assert second['created'] is True
+        assert second['parent'] == first['id']
+        assert self.object_count() == 4
+
+        # 其他模板包中的相同内容共享对象
+        shutil.copytree(self.package, self.temp_dir / 'packages' / 'copy')
+        self.store.snapshot('copy', self.temp_dir / 'packages' / 'copy')
+        assert self.object_count() == 4
+
+    def test_diff_and_checkout(self):
+        """测试版本对比和检出"""
+        first = self.store.snapshot('demo', self.package)
+        (self.package / 'templates' / 'main.j2').write_text('G00 X10\n')
+        (self.package / 'templates' / 'sub.j2').unlink()
+        second = self.store.snapshot('demo', self.package)
+
+        diff = self.store.diff('demo', first['id'], second['id'])
+        assert diff['removed'] == ['templates/sub.j2']
+        assert diff['modified'][0]['path'] == 'templates/main.j2'
+        assert '+G00 X10' in diff['modified'][0]['diff']
+        assert diff['unchanged'] == 1
+
+        restored = self.store.checkout('demo', first['id'], self.package)
+        assert restored['source'] == 'checkout'
+        assert (self.package / 'templates' / 'main.j2').read_text() == 'G00 X0\n'
+        assert (self.package / 'templates' / 'sub.j2').exists()
+        assert len(self.store.list_snapshots('demo')) == 3
+
+    def test_file_save_uses_package_name(self, monkeypatch):
+        """测试通过文件接口保存时按package.yaml中的包名记录快照（目录名不同）"""
+        monkeypatch.setattr(template_manager, 'versions', self.store)
+        renamed = self.temp_dir / 'packages' / 'demo-dir'
+        self.package.rename(renamed)
+        (renamed / 'package.yaml').write_text(
+            'package:\n  name: demo\n  displayName: 演示\n  version: "1.0.0"\n  description: ""\n  category: 测试\n',
+            encoding='utf-8'
+        )
+
+        files = FileManager(str(self.temp_dir))
+        files.write_file('packages/demo-dir/templates/main.j2', 'G00 X5\n', backup=False)
+        files.write_file('packages/demo-dir/notes.txt', 'x', backup=False)
+        snapshots = self.store.list_snapshots('demo')
+        assert len(snapshots) == 2
+        assert snapshots[0]['source'] == 'save'
+        assert self.store.list_snapshots('demo-dir') == []